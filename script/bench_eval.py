@@ -0,0 +1,111 @@
+'''
+Benchmark comparing Trace.eval with the compiled evaluator (evaluator.eval_in_trace).
+
+For each model, this finds a few reachable states by unrolling the transition relation,
+and then evaluates the initial conditions, axioms, invariants, and the clauses of the
+invariants (which is what pd mostly evaluates) in every state using both evaluators,
+checking that they agree.
+
+Usage: python3.8 script/bench_eval.py [--depth N] [--repeat N] [FILE ...]
+(defaults to all models in examples/pd)
+'''
+
+import argparse
+from pathlib import Path
+import sys
+import time
+
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import evaluator  # noqa: E402
+import logic  # noqa: E402
+import mypyvy  # noqa: E402
+import syntax  # noqa: E402
+import typechecker  # noqa: E402
+import utils  # noqa: E402
+from semantics import Trace  # noqa: E402
+from solver import Solver  # noqa: E402
+
+def find_trace(s: Solver, max_depth: int) -> Optional[Trace]:
+    prog = syntax.the_program
+    for depth in range(max_depth, -1, -1):
+        t = s.get_translator(depth + 1)
+        with s.new_frame():
+            for init in prog.inits():
+                s.add(t.translate_expr(init.expr))
+            for i in range(depth):
+                logic.assert_any_transition(s, t, i)
+            trace = logic.check_solver(s, depth + 1)
+        if trace is not None:
+            return trace
+    return None
+
+def bench_file(filename: str, depth: int, repeat: int) -> Optional[Tuple[int, float, float]]:
+    utils.args = mypyvy.parse_args(['typecheck', filename])
+    with open(filename) as f:
+        prog = mypyvy.parse_program(f.read(), filename=filename)
+    typechecker.typecheck_program(prog)
+    syntax.the_program = prog
+
+    trace = find_trace(Solver(), depth)
+    if trace is None:
+        print(f'{filename}: no initial state, skipping')
+        return None
+
+    exprs = [init.expr for init in prog.inits()]
+    exprs += [inv.expr for inv in prog.invs()]
+    exprs += [ax.expr for ax in prog.axioms()]
+    for inv in prog.invs():
+        try:
+            exprs += syntax.as_clauses(inv.expr)
+        except Exception:  # not universal
+            pass
+
+    results: List[object] = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [trace.eval(e, i) for i in range(trace.num_states) for e in exprs]
+    interpreted = time.perf_counter() - start
+
+    compiled_results: List[object] = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        compiled_results = [evaluator.eval_in_trace(trace, e, i) for i in range(trace.num_states) for e in exprs]
+    compiled = time.perf_counter() - start
+
+    assert results == compiled_results, f'{filename}: compiled evaluator disagrees with Trace.eval'
+
+    n = len(results) * repeat
+    print(f'{Path(filename).name:45} {n:7} evals  '
+          f'Trace.eval {1000 * interpreted:9.1f}ms  compiled {1000 * compiled:9.1f}ms  '
+          f'speedup {interpreted / compiled:6.1f}x', flush=True)
+    return n, interpreted, compiled
+
+def main() -> None:
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('--depth', type=int, default=2,
+                           help='number of transitions to unroll when looking for states')
+    argparser.add_argument('--repeat', type=int, default=10,
+                           help='number of times to evaluate each formula in each state')
+    argparser.add_argument('files', nargs='*',
+                           default=sorted(str(p) for p in (utils.PROJECT_ROOT / 'examples' / 'pd').glob('*.pyv')))
+    args = argparser.parse_args()
+
+    total_n, total_interpreted, total_compiled = 0, 0.0, 0.0
+    for filename in args.files:
+        res = bench_file(filename, args.depth, args.repeat)
+        if res is not None:
+            n, interpreted, compiled = res
+            total_n += n
+            total_interpreted += interpreted
+            total_compiled += compiled
+
+    if total_compiled > 0:
+        print(f'{"total":45} {total_n:7} evals  '
+              f'Trace.eval {1000 * total_interpreted:9.1f}ms  compiled {1000 * total_compiled:9.1f}ms  '
+              f'speedup {total_interpreted / total_compiled:6.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+'''
+Benchmark of mypyvy startup with a cold and a warm program cache (see src/program_cache.py).
+
+For each model, this runs `mypyvy.py typecheck` as a separate process, first with an
+empty --program-cache directory (cold: the program is parsed, typechecked, and stored)
+and then with the populated directory (warm: the program is loaded from the cache).
+It also reports the in-process time of parsing and typechecking versus loading the
+cached program, which excludes the cost of importing mypyvy.
+
+Usage: python3.8 script/bench_startup.py [--repeat N] [FILE ...]
+(defaults to all models in examples and examples/pd)
+'''
+
+import argparse
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import mypyvy  # noqa: E402
+import program_cache  # noqa: E402
+import utils  # noqa: E402
+
+MYPYVY = utils.PROJECT_ROOT / 'src' / 'mypyvy.py'
+
+def run_typecheck(filename: str, cache_dir: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, str(MYPYVY), 'typecheck', f'--program-cache={cache_dir}', filename],
+                   check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def bench_process(filename: str, repeat: int) -> Tuple[float, float]:
+    cold: List[float] = []
+    warm: List[float] = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cold.append(run_typecheck(filename, cache_dir))
+            warm.append(run_typecheck(filename, cache_dir))
+    return statistics.median(cold), statistics.median(warm)
+
+def bench_in_process(filename: str, repeat: int) -> Tuple[float, float]:
+    utils.args = mypyvy.parse_args(['typecheck', filename])
+    with open(filename) as f:
+        contents = f.read()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = program_cache.ProgramCache(cache_dir)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            prog = mypyvy.parse_and_typecheck(contents, filename)
+        parse = (time.perf_counter() - start) / repeat
+        cache.store(filename, contents, prog)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            assert cache.load(filename, contents) is not None
+        load = (time.perf_counter() - start) / repeat
+    return parse, load
+
+def main() -> None:
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('--repeat', type=int, default=5,
+                           help='number of runs of each configuration (the median is reported)')
+    argparser.add_argument('files', nargs='*',
+                           default=sorted(str(p) for d in ('examples', 'examples/pd')
+                                          for p in (utils.PROJECT_ROOT / d).glob('*.pyv')))
+    args = argparser.parse_args()
+
+    totals = [0.0, 0.0, 0.0, 0.0]
+    for filename in args.files:
+        cold, warm = bench_process(filename, args.repeat)
+        parse, load = bench_in_process(filename, args.repeat)
+        for i, x in enumerate((cold, warm, parse, load)):
+            totals[i] += x
+        print(f'{Path(filename).name:40} cold {1000 * cold:7.1f}ms  warm {1000 * warm:7.1f}ms  '
+              f'(parse+typecheck {1000 * parse:6.1f}ms, load {1000 * load:5.1f}ms)', flush=True)
+
+    cold, warm, parse, load = totals
+    print(f'{"total":40} cold {1000 * cold:7.1f}ms  warm {1000 * warm:7.1f}ms  '
+          f'(parse+typecheck {1000 * parse:6.1f}ms, load {1000 * load:5.1f}ms)')
+
+if __name__ == '__main__':
+    main()
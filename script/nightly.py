@@ -26,6 +26,7 @@ class NightlyArgs:
     no_analyze: bool
     no_publish: bool
     num_seeds: int
+    query_cache: Optional[str]
 
 args: NightlyArgs = cast(NightlyArgs, None)
 
@@ -53,6 +54,8 @@ def parse_args() -> None:
                            help='do not copy the results to the published directory')
     argparser.add_argument('--num-seeds', type=int, default='1',
                            help='how many different random seeds to run for each job')
+    argparser.add_argument('--query-cache', default=None,
+                           help='SQLite database of solver query results shared by all jobs (see mypyvy --query-cache)')
 
     args = cast(NightlyArgs, argparser.parse_args(sys.argv[1:]))
 
@@ -115,6 +118,8 @@ class JobRunner:
                 job = Job(example_file.stem, key,
                           ['updr', '--log=info', '--log-time'] +
                           ([f'--seed={seed}'] if args.num_seeds > 1 else []) +
+                          ([f'--query-cache={Path(args.query_cache).resolve()}']
+                           if args.query_cache is not None else []) +
                           [str(example_file)])
                 self.log_global(f'  {job}')
                 self.jobs.append(job)
@@ -15,7 +15,7 @@ else
     fi
 fi
 
-$CVC4CMD \
+exec $CVC4CMD \
     --lang=smtlib2.6 \
     --finite-model-find \
     --fs-interleave \
@@ -0,0 +1,454 @@
+'''
+This module contains a compiled evaluator for mypyvy expressions over
+finite structures (class semantics.Trace).
+
+Trace.eval walks the expression tree on every call, resolving every
+name through the program's scope and pushing a scope frame for every
+quantifier instantiation. Here, each expression is instead compiled
+once (per program) into a tree of Python closures, in which all names
+are resolved and bound variables are assigned fixed slots in an
+environment list. Traces are converted, lazily and per symbol, into an
+indexed form in which elements are integers and relations/functions are
+dense arrays indexed by the mixed-radix encoding of the argument tuple.
+
+The entry point is eval_in_trace, which is a drop-in replacement for
+Trace.eval: it returns exactly what Trace.eval returns, and falls back
+to Trace.eval for the (rare) expressions the compiler does not support,
+e.g., those involving int-sorted or bool-sorted terms, or definitions.
+
+Note that, just like Trace.onestate_formula_cache, the indexed form of
+a trace is cached, so traces must not be modified after they have been
+evaluated with eval_in_trace.
+'''
+
+from __future__ import annotations
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import product
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import syntax
+from syntax import Expr, SortDecl, RelationDecl, ConstantDecl, FunctionDecl
+from semantics import Trace, Element, PackedRelation, PackedFunction
+
+# A compiled expression is a function from (resolved symbol tables, environment) to a value.
+# Values are bools for formulas and integer element indices for terms.
+CompiledFn = Callable[[List[Any], List[Any]], Any]
+
+# A symbol needed by a compiled expression: a sort (whose table is its size), or a
+# relation/constant/function, together with the state offset (number of enclosing new()'s)
+# at which it is accessed. The offset is None for immutable symbols and for sorts.
+Symbol = Tuple[Union[SortDecl, RelationDecl, ConstantDecl, FunctionDecl], Optional[int]]
+
+
+class _Unsupported(Exception):
+    '''Raised when an expression or trace is outside the fragment supported by the compiler.'''
+    pass
+
+
+@dataclass(eq=False)  # hashed by identity, see IndexedTrace.bound
+class CompiledExpr:
+    fn: CompiledFn
+    symbols: Tuple[Symbol, ...]
+    num_slots: int
+    max_offset: int
+    uses_mutable: bool
+    result_sort: Optional[SortDecl]  # None for formulas, otherwise the sort of the resulting element
+
+
+class IndexedTrace:
+    '''
+    Integer-indexed view of a Trace. Element e of sort S is represented by its position in
+    trace.univs[S]. A relation (function) is represented by a pair (data, radices), where
+    radices gives the universe size of each argument sort, and data is a list of booleans
+    (element indices) indexed by the mixed-radix encoding of the argument tuple. Tuples
+    missing from the trace's interpretation are represented by None.
+
+    Tables are built on demand and cached. To avoid keeping traces alive, this class does
+    not store a reference to its trace, which is instead passed to every method.
+    '''
+    def __init__(self, trace: Trace) -> None:
+        self.sizes: Dict[SortDecl, int] = {s: len(u) for s, u in trace.univs.items()}
+        self.index: Dict[SortDecl, Dict[Element, int]] = {
+            s: {e: i for i, e in enumerate(u)} for s, u in trace.univs.items()
+        }
+        self.tables: Dict[Symbol, Any] = {}
+        # resolved symbol tables, keyed by compiled expression and starting index. the
+        # tables of a compiled expression are dropped when it is evicted from the caches.
+        self.bound: weakref.WeakKeyDictionary[CompiledExpr, Dict[Optional[int], List[Any]]] = \
+            weakref.WeakKeyDictionary()
+
+    def _sort_of(self, s: syntax.Sort) -> SortDecl:
+        if not isinstance(s, syntax.UninterpretedSort) or s.decl is None or s.decl not in self.sizes:
+            raise _Unsupported()
+        return s.decl
+
+    def _encode(self, arity: syntax.Arity, tup: Tuple[Element, ...]) -> int:
+        off = 0
+        for s, e in zip(arity, tup):
+            d = self._sort_of(s)
+            i = self.index[d].get(e)
+            if i is None:
+                raise _Unsupported()
+            off = off * self.sizes[d] + i
+        return off
+
+    def _univs(self, trace: Trace, arity: syntax.Arity) -> Tuple[Tuple[Element, ...], ...]:
+        return tuple(trace.univs[self._sort_of(s)] for s in arity)
+
+    def _radices(self, arity: syntax.Arity) -> Tuple[int, ...]:
+        return tuple(self.sizes[self._sort_of(s)] for s in arity)
+
+    def _element(self, s: syntax.Sort, e: Element) -> int:
+        i = self.index[self._sort_of(s)].get(e)
+        if i is None:
+            raise _Unsupported()
+        return i
+
+    def _build(self, trace: Trace, d: Any, index: Optional[int]) -> Any:
+        if isinstance(d, SortDecl):
+            if d not in self.sizes:
+                raise _Unsupported()
+            return self.sizes[d]
+        elif isinstance(d, RelationDecl):
+            rinterp = trace.rel_interps[index][d] if index is not None else trace.immut_rel_interps[d]
+            radices = self._radices(d.arity)
+            # compact interpretations over the trace's universes already use the same encoding
+            if isinstance(rinterp, PackedRelation) and rinterp.shape.univs == self._univs(trace, d.arity):
+                return (rinterp.table(), radices)
+            rdata: List[Optional[bool]] = [None] * _prod(radices)
+            for tup, b in rinterp.items():
+                rdata[self._encode(d.arity, tup)] = b
+            return (rdata, radices)
+        elif isinstance(d, FunctionDecl):
+            finterp = trace.func_interps[index][d] if index is not None else trace.immut_func_interps[d]
+            radices = self._radices(d.arity)
+            if isinstance(finterp, PackedFunction) and finterp.shape.univs == self._univs(trace, d.arity) and \
+               finterp.image.univs == self._univs(trace, (d.sort,)):
+                return (list(finterp.codes), radices)
+            fdata: List[Optional[int]] = [None] * _prod(radices)
+            for tup, res in finterp.items():
+                fdata[self._encode(d.arity, tup)] = self._element(d.sort, res)
+            return (fdata, radices)
+        else:
+            assert isinstance(d, ConstantDecl)
+            c = trace.const_interps[index][d] if index is not None else trace.immut_const_interps[d]
+            return self._element(d.sort, c)
+
+    def bind(self, trace: Trace, c: CompiledExpr, starting_index: Optional[int]) -> List[Any]:
+        '''Resolve the symbols of c in the given trace, starting at the given state index.'''
+        by_index = self.bound.get(c)
+        if by_index is None:
+            by_index = self.bound[c] = {}
+        tabs = by_index.get(starting_index)
+        if tabs is not None:
+            return tabs
+        # leave reporting of malformed queries to Trace.eval
+        if starting_index is not None:
+            if not (0 <= starting_index and starting_index + c.max_offset < trace.num_states):
+                raise _Unsupported()
+        elif c.uses_mutable:
+            raise _Unsupported()
+        tabs = []
+        for d, offset in c.symbols:
+            k = (d, None if offset is None else starting_index + offset)  # type: ignore
+            t = self.tables.get(k)
+            if t is None:
+                try:
+                    t = self._build(trace, d, k[1])
+                except KeyError:
+                    raise _Unsupported()
+                self.tables[k] = t
+            tabs.append(t)
+        by_index[starting_index] = tabs
+        return tabs
+
+
+def _prod(ns: Tuple[int, ...]) -> int:
+    ans = 1
+    for n in ns:
+        ans *= n
+    return ans
+
+
+def _lookup(data: List[Any], off: int) -> Any:
+    ans = data[off]
+    if ans is None:
+        raise KeyError(off)
+    return ans
+
+
+class _Compiler:
+    def __init__(self, scope: syntax.Scope) -> None:
+        self.scope = scope
+        self.symbols: List[Symbol] = []
+        self.symbol_index: Dict[Symbol, int] = {}
+        self.num_slots = 0
+        self.max_offset = 0
+        self.uses_mutable = False
+
+    def symbol(self, d: Any, offset: Optional[int]) -> int:
+        k = (d, offset)
+        if k not in self.symbol_index:
+            self.symbol_index[k] = len(self.symbols)
+            self.symbols.append(k)
+        return self.symbol_index[k]
+
+    def state_symbol(self, d: Union[RelationDecl, ConstantDecl, FunctionDecl], offset: int) -> int:
+        if d.mutable:
+            self.uses_mutable = True
+            return self.symbol(d, offset)
+        else:
+            return self.symbol(d, None)
+
+    def alloc(self, n: int) -> int:
+        lo = self.num_slots
+        self.num_slots += n
+        return lo
+
+    @staticmethod
+    def sort_decl(s: syntax.InferenceSort) -> SortDecl:
+        if not isinstance(s, syntax.UninterpretedSort) or s.decl is None:
+            raise _Unsupported()
+        return s.decl
+
+    def compile(
+            self,
+            expr: Expr,
+            offset: int,
+            bound: Dict[str, Tuple[int, Optional[SortDecl]]],
+    ) -> Tuple[CompiledFn, Optional[SortDecl]]:
+        '''Returns the compiled function and the sort of its result (None for formulas).'''
+        if isinstance(expr, syntax.Bool):
+            val = expr.val
+            return (lambda t, e: val), None
+        elif isinstance(expr, syntax.UnaryExpr):
+            if expr.op == 'NEW':
+                self.max_offset = max(self.max_offset, offset + 1)
+                return self.compile(expr.arg, offset + 1, bound)
+            elif expr.op == 'NOT':
+                f, _ = self.compile(expr.arg, offset, bound)
+                return (lambda t, e: not f(t, e)), None
+            else:
+                raise _Unsupported()
+        elif isinstance(expr, syntax.BinaryExpr):
+            f1, _ = self.compile(expr.arg1, offset, bound)
+            f2, _ = self.compile(expr.arg2, offset, bound)
+            if expr.op == 'IMPLIES':
+                return (lambda t, e: not f1(t, e) or f2(t, e)), None
+            elif expr.op in ['IFF', 'EQUAL']:
+                return (lambda t, e: f1(t, e) == f2(t, e)), None
+            elif expr.op == 'NOTEQ':
+                return (lambda t, e: f1(t, e) != f2(t, e)), None
+            else:
+                raise _Unsupported()
+        elif isinstance(expr, syntax.NaryExpr):
+            fs = tuple(self.compile(arg, offset, bound)[0] for arg in expr.args)
+            if expr.op == 'AND':
+                def conj(t: List[Any], e: List[Any]) -> bool:
+                    for f in fs:
+                        if not f(t, e):
+                            return False
+                    return True
+                return conj, None
+            elif expr.op == 'OR':
+                def disj(t: List[Any], e: List[Any]) -> bool:
+                    for f in fs:
+                        if f(t, e):
+                            return True
+                    return False
+                return disj, None
+            elif expr.op == 'DISTINCT':
+                n = len(fs)
+                return (lambda t, e: len(set(f(t, e) for f in fs)) == n), None
+            else:
+                raise _Unsupported()
+        elif isinstance(expr, syntax.AppExpr):
+            d = self.scope.get(expr.callee)
+            if not isinstance(d, (RelationDecl, FunctionDecl)):
+                raise _Unsupported()
+            args = []
+            for arg, arg_sort in zip(expr.args, d.arity):
+                f, _ = self.compile(arg, offset, bound)
+                self.sort_decl(arg_sort)
+                args.append(f)
+            result_sort = self.sort_decl(d.sort) if isinstance(d, FunctionDecl) else None
+            return self.compile_app(self.state_symbol(d, offset), args), result_sort
+        elif isinstance(expr, syntax.QuantifierExpr):
+            if expr.quant not in ['FORALL', 'EXISTS']:
+                raise _Unsupported()
+            sorts = [self.sort_decl(sv.sort) for sv in expr.binder.vs]
+            ks = tuple(self.symbol(sort, None) for sort in sorts)
+            lo = self.alloc(len(sorts))
+            hi = lo + len(sorts)
+            inner = dict(bound)
+            for i, (sv, sort) in enumerate(zip(expr.binder.vs, sorts)):
+                inner[sv.name] = (lo + i, sort)
+            body, _ = self.compile(expr.body, offset, inner)
+            if expr.quant == 'FORALL':
+                def forall(t: List[Any], e: List[Any]) -> bool:
+                    for tup in product(*(range(t[k]) for k in ks)):
+                        e[lo:hi] = tup
+                        if not body(t, e):
+                            return False
+                    return True
+                return forall, None
+            else:
+                def exists(t: List[Any], e: List[Any]) -> bool:
+                    for tup in product(*(range(t[k]) for k in ks)):
+                        e[lo:hi] = tup
+                        if body(t, e):
+                            return True
+                    return False
+                return exists, None
+        elif isinstance(expr, syntax.Id):
+            if expr.name in bound:
+                slot, s = bound[expr.name]
+                return (lambda t, e: e[slot]), s
+            a = self.scope.get(expr.name)
+            if isinstance(a, RelationDecl):
+                k = self.state_symbol(a, offset)
+                return (lambda t, e: _lookup(t[k][0], 0)), None
+            elif isinstance(a, ConstantDecl):
+                s = self.sort_decl(a.sort)
+                k = self.state_symbol(a, offset)
+                return (lambda t, e: t[k]), s
+            else:
+                raise _Unsupported()
+        elif isinstance(expr, syntax.IfThenElse):
+            fb, _ = self.compile(expr.branch, offset, bound)
+            ft, s = self.compile(expr.then, offset, bound)
+            fe, _ = self.compile(expr.els, offset, bound)
+            return (lambda t, e: ft(t, e) if fb(t, e) else fe(t, e)), s
+        elif isinstance(expr, syntax.Let):
+            fv, s = self.compile(expr.val, offset, bound)
+            slot = self.alloc(1)
+            inner = dict(bound)
+            inner[expr.binder.vs[0].name] = (slot, s)
+            fbody, sbody = self.compile(expr.body, offset, inner)
+
+            def let(t: List[Any], e: List[Any]) -> Any:
+                e[slot] = fv(t, e)
+                return fbody(t, e)
+            return let, sbody
+        else:
+            raise _Unsupported()
+
+    @staticmethod
+    def compile_app(k: int, args: List[CompiledFn]) -> CompiledFn:
+        if len(args) == 1:
+            a0, = args
+            return lambda t, e: _lookup(t[k][0], a0(t, e))
+        elif len(args) == 2:
+            a0, a1 = args
+
+            def app2(t: List[Any], e: List[Any]) -> Any:
+                data, (_, n1) = t[k]
+                return _lookup(data, a0(t, e) * n1 + a1(t, e))
+            return app2
+        else:
+            def app(t: List[Any], e: List[Any]) -> Any:
+                data, radices = t[k]
+                off = 0
+                for a, n in zip(args, radices):
+                    off = off * n + a(t, e)
+                return _lookup(data, off)
+            return app
+
+
+# LRU caches of compiled expressions, per program (i.e., per vocabulary). None marks unsupported
+# expressions. They are bounded, since pd evaluates an unbounded stream of generated clauses.
+_MAX_COMPILED = 10000
+_compiled: weakref.WeakKeyDictionary[
+    syntax.Program, OrderedDict[Tuple[Expr, Tuple[str, ...]], Optional[CompiledExpr]]
+] = weakref.WeakKeyDictionary()
+# Since hashing an Expr traverses the whole tree, _compiled is fronted by a cache keyed on the
+# identity of the expression object. Entries keep the expression alive, so ids are not reused.
+_compiled_by_id: weakref.WeakKeyDictionary[
+    syntax.Program, OrderedDict[Tuple[int, Tuple[str, ...]], Tuple[Expr, Optional[CompiledExpr]]]
+] = weakref.WeakKeyDictionary()
+# indexed form of traces evaluated so far
+_indexed: weakref.WeakKeyDictionary[Trace, IndexedTrace] = weakref.WeakKeyDictionary()
+
+
+def compile_expr(expr: Expr, free: Tuple[syntax.SortedVar, ...] = ()) -> Optional[CompiledExpr]:
+    '''
+    Compile expr in the vocabulary of syntax.the_program, or return None if expr is
+    not supported by the compiler. The result is cached.
+
+    The variables in free may occur free in expr. They are assigned the first slots of
+    the environment, see eval_compiled.
+    '''
+    prog = syntax.the_program
+    by_id = _compiled_by_id.get(prog)
+    if by_id is None:
+        by_id = _compiled_by_id[prog] = OrderedDict()
+    names = tuple(v.name for v in free)
+    hit = by_id.get((id(expr), names))
+    if hit is not None:
+        by_id.move_to_end((id(expr), names))
+        return hit[1]
+    cache = _compiled.get(prog)
+    if cache is None:
+        cache = _compiled[prog] = OrderedDict()
+    if (expr, names) in cache:
+        cache.move_to_end((expr, names))
+    else:
+        compiler = _Compiler(prog.scope)
+        try:
+            bound: Dict[str, Tuple[int, Optional[SortDecl]]] = {
+                v.name: (i, compiler.sort_decl(v.sort)) for i, v in enumerate(free)
+            }
+            compiler.alloc(len(free))
+            fn, result_sort = compiler.compile(expr, 0, bound)
+        except _Unsupported:
+            cache[expr, names] = None
+        else:
+            cache[expr, names] = CompiledExpr(fn, tuple(compiler.symbols), compiler.num_slots,
+                                              compiler.max_offset, compiler.uses_mutable, result_sort)
+    compiled = cache[expr, names]
+    if len(cache) > _MAX_COMPILED:
+        cache.popitem(last=False)
+    by_id[id(expr), names] = (expr, compiled)
+    if len(by_id) > _MAX_COMPILED:
+        by_id.popitem(last=False)
+    return compiled
+
+
+def eval_in_trace(trace: Trace, expr: Expr, starting_index: Optional[int]) -> Union[Element, bool]:
+    '''Drop-in replacement for trace.eval(expr, starting_index).'''
+    c = compile_expr(expr)
+    if c is not None:
+        it = _indexed.get(trace)
+        if it is None:
+            it = _indexed[trace] = IndexedTrace(trace)
+        try:
+            tabs = it.bind(trace, c, starting_index)
+        except _Unsupported:
+            pass
+        else:
+            ans = c.fn(tabs, [None] * c.num_slots)
+            if c.result_sort is not None:
+                return trace.univs[c.result_sort][ans]
+            return ans
+    return trace.eval(expr, starting_index)
+
+
+def eval_compiled(trace: Trace, c: CompiledExpr, starting_index: Optional[int], env: Sequence[int]) -> Any:
+    '''
+    Evaluate an expression compiled by compile_expr with free variables, whose values are
+    given in env as element indices (positions in trace.univs). Returns a bool for formulas
+    and an element index for terms. Raises KeyError if the trace does not interpret a
+    symbol used by the expression.
+    '''
+    it = _indexed.get(trace)
+    if it is None:
+        it = _indexed[trace] = IndexedTrace(trace)
+    try:
+        tabs = it.bind(trace, c, starting_index)
+    except _Unsupported:
+        raise KeyError(c)
+    e: List[Any] = list(env)
+    e.extend([None] * (c.num_slots - len(env)))
+    return c.fn(tabs, e)
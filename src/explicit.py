@@ -0,0 +1,565 @@
+'''
+This module contains an explicit-state reachability engine for bounded
+instances of a program.
+
+Each transition is compiled once into a successor generator over
+concrete states (class semantics.Trace with one state). The body of a
+transition is split into conjuncts, which are classified as:
+
+- guards, which do not mention the post-state and are evaluated in the
+  pre-state for every assignment of the transition's parameters;
+
+- updates, of the form
+
+      forall xs. g -> (new(R(ys)) <-> phi)
+      forall xs. g -> new(f(ys)) = t
+      new(C) = t
+
+  where g, phi and t do not mention the post-state, and the ys are
+  variables (parameters of the transition or among the xs). Updates
+  determine the entries of modified symbols directly;
+
+- any other conjunct, which is checked by evaluating it on the
+  (pre-state, post-state) pair.
+
+Entries of modified symbols that are not determined by any update are
+enumerated explicitly, so the successors computed are exactly those
+allowed by the transition. Transitions that the compiled evaluator
+cannot handle (e.g., ones calling definitions or using int-sorted
+terms) fall back to enumerating successors with the SMT solver.
+
+Initial states are computed the same way, from every structure for the
+immutable symbols in which each sort has at most a given number of
+elements. These structures are enumerated explicitly when there are
+few enough candidates, and with the SMT solver otherwise. The reachable
+states are then explored with BFS (or DFS), keeping one representative
+per isomorphism class (see Trace.fingerprint).
+'''
+
+from __future__ import annotations
+from collections import deque
+from dataclasses import dataclass
+from itertools import product
+import multiprocessing
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple, Union, cast
+import weakref
+
+import z3
+
+import evaluator
+from evaluator import CompiledExpr
+import syntax
+from syntax import Expr, DefinitionDecl, RelationDecl, ConstantDecl, FunctionDecl, SortDecl
+from semantics import Trace, Element, RelationInterps, ConstantInterps, FunctionInterps
+from solver import Solver
+from translator import Z3Translator
+
+StateDecl = Union[RelationDecl, ConstantDecl, FunctionDecl]
+
+# bound on the number of assignments to the entries of modified symbols not determined by
+# updates, beyond which a transition is handled by the SMT solver
+MAX_CHOICES = 1 << 16
+
+
+class _TooManyChoices(Exception):
+    pass
+
+
+@dataclass
+class _Update:
+    decl: StateDecl
+    vs: Tuple[syntax.SortedVar, ...]  # universally quantified variables of the update
+    args: Tuple[int, ...]  # environment slots of the arguments of decl
+    guard: Optional[CompiledExpr]
+    value: CompiledExpr  # a formula for relations, a term otherwise
+
+
+@dataclass
+class _CompiledTransition:
+    ition: Optional[DefinitionDecl]  # None for the initial conditions
+    params: Tuple[syntax.SortedVar, ...]
+    guards: List[CompiledExpr]
+    updates: List[_Update]
+    others: List[CompiledExpr]  # two-state conjuncts, checked on the (pre-state, post-state) pair
+    mods: List[StateDecl]
+
+
+def _conjuncts(e: Expr, vs: Tuple[syntax.SortedVar, ...] = ()) -> Iterator[Tuple[Tuple[syntax.SortedVar, ...], Expr]]:
+    '''Split e into conjuncts, pushing universal quantifiers inwards.'''
+    if isinstance(e, syntax.NaryExpr) and e.op == 'AND':
+        for arg in e.args:
+            yield from _conjuncts(arg, vs)
+    elif isinstance(e, syntax.QuantifierExpr) and e.quant == 'FORALL':
+        yield from _conjuncts(e.body, vs + e.binder.vs)
+    else:
+        yield vs, e
+
+
+def _match_update(
+        vs: Tuple[syntax.SortedVar, ...],
+        e: Expr,
+        params: Tuple[syntax.SortedVar, ...],
+        under_new: bool,
+) -> Optional[_Update]:
+    '''
+    Match e (under the universally quantified variables vs) against the
+    update patterns described in the module docstring. If under_new is
+    False, the updated symbol appears without new(), which is used for
+    derived relations.
+    '''
+    scope = syntax.the_program.scope
+    guards: List[Expr] = []
+    while isinstance(e, syntax.BinaryExpr) and e.op == 'IMPLIES' and not syntax.uses_new(e.arg1):
+        guards.append(e.arg1)
+        e = e.arg2
+
+    candidates: List[Tuple[Expr, Expr]] = []
+    if isinstance(e, syntax.BinaryExpr) and e.op in ('IFF', 'EQUAL'):
+        candidates = [(e.arg1, e.arg2), (e.arg2, e.arg1)]
+    elif isinstance(e, syntax.UnaryExpr) and e.op == 'NOT':
+        candidates = [(e.arg, syntax.FalseExpr)]
+    else:
+        candidates = [(e, syntax.TrueExpr)]
+
+    free = params + vs
+    names = [v.name for v in free]
+    for target, value in candidates:
+        if under_new:
+            if not (isinstance(target, syntax.UnaryExpr) and target.op == 'NEW'):
+                continue
+            target = target.arg
+        if syntax.uses_new(target) or syntax.uses_new(value):
+            continue
+        if isinstance(target, syntax.AppExpr):
+            callee, args = target.callee, target.args
+        elif isinstance(target, syntax.Id):
+            callee, args = target.name, ()
+        else:
+            continue
+        if callee in names:
+            continue
+        d = scope.get(callee)
+        if not isinstance(d, (RelationDecl, ConstantDecl, FunctionDecl)) or not d.mutable:
+            continue
+        if not all(isinstance(a, syntax.Id) and a.name in names for a in args):
+            continue
+        # later variables shadow earlier ones, just like in evaluator.compile_expr
+        slots = tuple(len(names) - 1 - names[::-1].index(cast(syntax.Id, a).name) for a in args)
+        guard = evaluator.compile_expr(syntax.And(*guards), free) if guards else None
+        compiled_value = evaluator.compile_expr(value, free)
+        if (guards and guard is None) or compiled_value is None:
+            continue
+        return _Update(d, vs, slots, guard, compiled_value)
+    return None
+
+
+def _compile_transition(ition: DefinitionDecl) -> Optional[_CompiledTransition]:
+    scope = syntax.the_program.scope
+    params = ition.binder.vs
+    mods: List[StateDecl] = []
+    for mc in ition.mods:
+        d = scope.get(mc.name)
+        assert isinstance(d, (RelationDecl, ConstantDecl, FunctionDecl))
+        mods.append(d)
+    guards: List[CompiledExpr] = []
+    updates: List[_Update] = []
+    others: List[CompiledExpr] = []
+    for vs, e in _conjuncts(ition.expr):
+        if syntax.uses_new(e):
+            u = _match_update(vs, e, params, under_new=True)
+            if u is not None and u.decl in mods:
+                updates.append(u)
+                continue
+        c = evaluator.compile_expr(syntax.Forall(vs, e), params)
+        if c is None:
+            return None
+        (others if syntax.uses_new(e) else guards).append(c)
+    return _CompiledTransition(ition, params, guards, updates, others, mods)
+
+
+def _compile_init() -> Optional[_CompiledTransition]:
+    '''
+    Compile the initial conditions as a transition with no parameters,
+    from a structure interpreting only the immutable symbols.
+    '''
+    prog = syntax.the_program
+    mods: List[StateDecl] = [*prog.relations(), *prog.constants(), *prog.functions()]
+    mods = [d for d in mods if d.mutable and not (isinstance(d, RelationDecl) and d.is_derived())]
+    updates: List[_Update] = []
+    others: List[CompiledExpr] = []
+    for init in prog.inits():
+        for vs, e in _conjuncts(init.expr):
+            u = _match_update(vs, e, (), under_new=False)
+            if u is not None and u.decl in mods and not u.value.uses_mutable and \
+               (u.guard is None or not u.guard.uses_mutable):
+                updates.append(u)
+                continue
+            c = evaluator.compile_expr(syntax.Forall(vs, e))
+            if c is None:
+                return None
+            others.append(c)
+    return _CompiledTransition(None, (), [], updates, others, mods)
+
+
+def _compile_derived() -> Optional[List[_Update]]:
+    updates = []
+    for d in syntax.the_program.derived_relations():
+        assert d.derived_axiom is not None
+        conjuncts = list(_conjuncts(d.derived_axiom))
+        u = _match_update(*conjuncts[0], params=(), under_new=False) if len(conjuncts) == 1 else None
+        if u is None or u.decl is not d or u.guard is not None or \
+           sorted(u.args) != list(range(len(u.vs))) or len(u.args) != len(d.arity):
+            return None
+        updates.append(u)
+    return updates
+
+
+def _compile_axioms() -> Optional[List[CompiledExpr]]:
+    axioms = []
+    for ax in syntax.the_program.axioms():
+        c = evaluator.compile_expr(ax.expr)
+        if c is None:
+            return None
+        axioms.append(c)
+    return axioms
+
+
+@dataclass
+class _CompiledProgram:
+    transitions: Dict[str, Optional[_CompiledTransition]]
+    init: Optional[_CompiledTransition]
+    derived: List[_Update]
+    axioms: List[CompiledExpr]  # axioms constraining mutable symbols, checked in every state
+    immutable_axioms: List[CompiledExpr]  # checked once per structure of immutable symbols
+
+
+# compiled programs. None marks programs whose derived relations or axioms are not supported,
+# which are then handled entirely by the SMT solver. Similarly, None marks transitions (and
+# initial conditions) that are not supported.
+_compiled: weakref.WeakKeyDictionary[syntax.Program, Optional[_CompiledProgram]] = weakref.WeakKeyDictionary()
+
+
+def _compiled_program() -> Optional[_CompiledProgram]:
+    prog = syntax.the_program
+    if prog not in _compiled:
+        derived = _compile_derived()
+        axioms = _compile_axioms()
+        _compiled[prog] = None if derived is None or axioms is None else _CompiledProgram(
+            {ition.name: _compile_transition(ition) for ition in prog.transitions()},
+            _compile_init(),
+            derived,
+            [c for c in axioms if c.uses_mutable],
+            [c for c in axioms if not c.uses_mutable],
+        )
+    return _compiled[prog]
+
+
+def _sizes(state: Trace, sorts: Sequence[syntax.InferenceSort]) -> List[int]:
+    return [len(state.univs[syntax.get_decl_from_sort(s)]) for s in sorts]
+
+
+def _eval_update(state: Trace, u: _Update, env: List[int], table: Dict[Tuple[int, ...], Any]) -> bool:
+    '''Add the entries determined by u to table. Returns False on conflicting entries.'''
+    for vals in product(*(range(n) for n in _sizes(state, [v.sort for v in u.vs]))):
+        full = env + list(vals)
+        if u.guard is not None and not evaluator.eval_compiled(state, u.guard, 0, full):
+            continue
+        key = tuple(full[i] for i in u.args)
+        val = evaluator.eval_compiled(state, u.value, 0, full)
+        if table.setdefault(key, val) != val:
+            return False
+    return True
+
+
+def _make_trace(pre: Trace, rels: List[RelationInterps], consts: List[ConstantInterps],
+                funcs: List[FunctionInterps]) -> Trace:
+    '''Make a trace with the universes and immutable interpretations of pre.'''
+    t = Trace(len(rels))
+    t.univs = pre.univs
+    t.immut_rel_interps = pre.immut_rel_interps
+    t.immut_const_interps = pre.immut_const_interps
+    t.immut_func_interps = pre.immut_func_interps
+    t.rel_interps, t.const_interps, t.func_interps = rels, consts, funcs
+    return t
+
+
+def _post_states(pre: Trace, t: _CompiledTransition, env: List[int], p: _CompiledProgram) -> Iterator[Trace]:
+    '''
+    Yield the post-states of t from pre with the given parameters. For
+    the initial conditions, pre interprets only the immutable symbols.
+    '''
+    tables: Dict[StateDecl, Dict[Tuple[int, ...], Any]] = {d: {} for d in t.mods}
+    for u in t.updates:
+        if not _eval_update(pre, u, env, tables[u.decl]):
+            return
+
+    def univ(s: syntax.Sort) -> Tuple[Element, ...]:
+        return pre.univs[syntax.get_decl_from_sort(s)]
+
+    # entries of modified symbols not determined by the updates
+    free: List[Tuple[StateDecl, Tuple[int, ...]]] = []
+    for d in t.mods:
+        arity = d.arity if not isinstance(d, ConstantDecl) else ()
+        for key in product(*(range(len(univ(s))) for s in arity)):
+            if key not in tables[d]:
+                free.append((d, key))
+    choices = [(False, True) if isinstance(d, RelationDecl) else range(len(univ(d.sort))) for d, _ in free]
+    n = 1
+    for c in choices:
+        n *= len(c)
+    if n > MAX_CHOICES:
+        raise _TooManyChoices()
+
+    for values in product(*choices):
+        for (d, key), val in zip(free, values):
+            tables[d][key] = val
+        rels = dict(pre.rel_interps[0])
+        consts = dict(pre.const_interps[0])
+        funcs = dict(pre.func_interps[0])
+        for d, table in tables.items():
+            if isinstance(d, RelationDecl):
+                rels[d] = {tuple(univ(s)[i] for s, i in zip(d.arity, k)): v for k, v in table.items()}
+            elif isinstance(d, ConstantDecl):
+                consts[d] = univ(d.sort)[table[()]]
+            else:
+                funcs[d] = {tuple(univ(s)[i] for s, i in zip(d.arity, k)): univ(d.sort)[v] for k, v in table.items()}
+        post = _make_trace(pre, [rels], [consts], [funcs])
+        if p.derived:
+            for u in p.derived:
+                assert isinstance(u.decl, RelationDecl)
+                dtable: Dict[Tuple[int, ...], Any] = {}
+                _eval_update(post, u, [], dtable)
+                rels[u.decl] = {tuple(univ(s)[i] for s, i in zip(u.decl.arity, k)): v for k, v in dtable.items()}
+            post = _make_trace(pre, [rels], [consts], [funcs])
+        if t.ition is None:
+            if not all(evaluator.eval_compiled(post, c, 0, ()) for c in t.others):
+                continue
+        elif t.others:
+            pair = _make_trace(pre, [pre.rel_interps[0], rels], [pre.const_interps[0], consts],
+                               [pre.func_interps[0], funcs])
+            if not all(evaluator.eval_compiled(pair, c, 0, env) for c in t.others):
+                continue
+        if not all(evaluator.eval_compiled(post, c, 0, ()) for c in p.axioms):
+            continue
+        yield post
+
+
+def _enumerate_models(s: Solver, t: Z3Translator, num_states: int) -> Iterator[Trace]:
+    '''
+    Enumerate the models of the assertions in s, projected on the last
+    state, one per isomorphism class. The translator t must be obtained
+    from s before any frames are pushed.
+    '''
+    with s.new_frame():
+        while True:
+            res = s.check()
+            if res == z3.unknown:
+                raise RuntimeError('solver returned unknown while enumerating states')
+            elif res == z3.unsat:
+                return
+            m = Z3Translator.model_to_trace(s.model(minimize=False), num_states)
+            state = m if num_states == 1 else m._as_trace((num_states - 1,))
+            yield state
+            s.add(t.translate_expr(syntax.New(syntax.Not(state.as_onestate_formula(0)), num_states - 1)))
+
+
+def _smt_successors(s: Solver, pre: Trace, ition: DefinitionDecl) -> List[Trace]:
+    '''Enumerate the successors of pre under ition with the solver, one model at a time.'''
+    t = s.get_translator(2)
+    with s.new_frame():
+        s.add(t.translate_expr(pre.as_onestate_formula(0)))
+        s.add(t.translate_expr(ition.as_twostate_formula(syntax.the_program.scope)))
+        return list(_enumerate_models(s, t, 2))
+
+
+_fallback_solver: Optional[Solver] = None
+
+
+def _get_fallback_solver() -> Solver:
+    global _fallback_solver
+    if _fallback_solver is None:
+        _fallback_solver = Solver()
+    return _fallback_solver
+
+
+def successors(state: Trace) -> List[Tuple[str, Trace]]:
+    '''
+    Return the successors of the given one-state trace, each together
+    with the name of the transition leading to it. Successors that are
+    isomorphic to each other may appear more than once.
+    '''
+    p = _compiled_program()
+    result: List[Tuple[str, Trace]] = []
+    for ition in syntax.the_program.transitions():
+        t = p.transitions[ition.name] if p is not None else None
+        posts: List[Trace] = []
+        try:
+            if p is None or t is None:
+                raise _TooManyChoices()
+            for env in product(*(range(n) for n in _sizes(state, [v.sort for v in t.params]))):
+                if all(evaluator.eval_compiled(state, g, 0, env) for g in t.guards):
+                    posts.extend(_post_states(state, t, list(env), p))
+        except _TooManyChoices:
+            posts = _smt_successors(_get_fallback_solver(), state, ition)
+        result.extend((ition.name, post) for post in posts)
+    return result
+
+
+def _immutable_structures(cardinality: int) -> List[Trace]:
+    '''
+    Enumerate the interpretations of the immutable symbols that satisfy
+    the immutable axioms, in which every sort has at most cardinality
+    elements, one per isomorphism class. Raises _TooManyChoices if there
+    are too many candidate interpretations to enumerate explicitly.
+    '''
+    prog = syntax.the_program
+    p = _compiled_program()
+    sorts = list(prog.sorts())
+    decls: List[StateDecl] = [*prog.relations(), *prog.constants(), *prog.functions()]
+    decls = [d for d in decls if not d.mutable]
+    for d in decls:
+        ss = list(d.arity) if not isinstance(d, ConstantDecl) else []
+        if not isinstance(d, RelationDecl):
+            ss.append(d.sort)
+        if not all(isinstance(x, syntax.UninterpretedSort) for x in ss):
+            raise _TooManyChoices()
+    if p is None:
+        raise _TooManyChoices()
+
+    def entries(d: StateDecl, sizes: Dict[SortDecl, int]) -> List[Tuple[int, ...]]:
+        arity = d.arity if not isinstance(d, ConstantDecl) else ()
+        return list(product(*(range(sizes[syntax.get_decl_from_sort(x)]) for x in arity)))
+
+    def values(d: StateDecl, sizes: Dict[SortDecl, int]) -> Sequence[Any]:
+        return (False, True) if isinstance(d, RelationDecl) else range(sizes[syntax.get_decl_from_sort(d.sort)])
+
+    all_sizes = [dict(zip(sorts, ns)) for ns in product(range(1, cardinality + 1), repeat=len(sorts))]
+    for sizes in all_sizes:
+        n = 1
+        for d in decls:
+            n *= len(values(d, sizes)) ** len(entries(d, sizes))
+        if n > MAX_CHOICES:
+            raise _TooManyChoices()
+
+    result: Dict[str, Trace] = {}
+    for sizes in all_sizes:
+        univs = {sort: tuple(f'{sort.name}{i}' for i in range(n)) for sort, n in sizes.items()}
+        free = [(d, key) for d in decls for key in entries(d, sizes)]
+        for vals in product(*(values(d, sizes) for d, _ in free)):
+            t = Trace(1)
+            t.univs = univs
+            rels: Dict[RelationDecl, Dict[Tuple[Element, ...], bool]] = {}
+            funcs: Dict[FunctionDecl, Dict[Tuple[Element, ...], Element]] = {}
+            for (d, key), v in zip(free, vals):
+                args = tuple(univs[syntax.get_decl_from_sort(x)][i] for x, i in zip(d.arity, key)) \
+                    if not isinstance(d, ConstantDecl) else ()
+                if isinstance(d, RelationDecl):
+                    rels.setdefault(d, {})[args] = v
+                elif isinstance(d, ConstantDecl):
+                    t.immut_const_interps[d] = univs[syntax.get_decl_from_sort(d.sort)][v]
+                else:
+                    funcs.setdefault(d, {})[args] = univs[syntax.get_decl_from_sort(d.sort)][v]
+            t.immut_rel_interps.update(rels)
+            t.immut_func_interps.update(funcs)
+            if all(evaluator.eval_compiled(t, c, 0, ()) for c in p.immutable_axioms):
+                result.setdefault(t.fingerprint(0), t)
+    return list(result.values())
+
+
+def initial_states(s: Solver, cardinality: int) -> Iterator[Trace]:
+    '''
+    Enumerate the initial states in which every sort has at most
+    cardinality elements. The interpretations of the immutable symbols
+    are enumerated first, one per isomorphism class, explicitly when
+    there are few enough candidates and with the solver otherwise. The
+    mutable symbols are then interpreted explicitly, so isomorphic
+    initial states may be returned more than once.
+    '''
+    prog = syntax.the_program
+    p = _compiled_program()
+    t = s.get_translator(1)
+    with s.new_frame():
+        for sort in prog.sorts():
+            s.add(s._sort_cardinality_constraint(Z3Translator.sort_to_z3(sort), cardinality))
+        for init in prog.inits():
+            s.add(t.translate_expr(init.expr))
+        if p is None or p.init is None:
+            yield from _enumerate_models(s, t, 1)
+            return
+        compiled_init = p.init
+        compiled = p
+
+        def from_base(base: Trace) -> Iterator[Trace]:
+            try:
+                yield from _post_states(base, compiled_init, [], compiled)
+            except _TooManyChoices:
+                with s.new_frame():
+                    s.add(t.translate_expr(base.as_onestate_formula(0)))
+                    yield from _enumerate_models(s, t, 1)
+
+        try:
+            structures = _immutable_structures(cardinality)
+        except _TooManyChoices:
+            pass
+        else:
+            for base in structures:
+                yield from from_base(base)
+            return
+
+        while True:
+            res = s.check()
+            if res == z3.unknown:
+                raise RuntimeError('solver returned unknown while enumerating initial states')
+            elif res == z3.unsat:
+                return
+            m = Z3Translator.model_to_trace(s.model(minimize=False), 1)
+            base = _make_trace(m, [{}], [{}], [{}])
+            yield from from_base(base)
+            s.add(t.translate_expr(syntax.Not(base.as_onestate_formula(0))))
+
+
+def reachable_states(
+        s: Solver,
+        cardinality: int,
+        dfs: bool = False,
+        cpus: Optional[int] = None,
+        verbose: bool = False,
+) -> List[Trace]:
+    '''
+    Return all states reachable from initial states in which every sort
+    has at most cardinality elements, one per isomorphism class, in the
+    order they were discovered. If cpus is more than 1, successors are
+    computed in parallel by a pool of processes.
+    '''
+    # make sure the compiled program is inherited by worker processes
+    _compiled_program()
+    states: Dict[str, Trace] = {}
+    worklist: Deque[Trace] = deque()
+
+    def add(state: Trace) -> None:
+        fp = state.fingerprint(0)
+        if fp not in states:
+            states[fp] = state
+            worklist.append(state)
+
+    for state in initial_states(s, cardinality):
+        add(state)
+    if verbose:
+        print(f'found {len(states)} initial states')
+
+    pool = multiprocessing.Pool(cpus) if cpus is not None and cpus > 1 else None
+    try:
+        while worklist:
+            batch_size = 1 if pool is None else 4 * cast(int, cpus)
+            batch = [worklist.pop() if dfs else worklist.popleft() for _ in range(min(batch_size, len(worklist)))]
+            results = pool.map(successors, batch) if pool is not None else [successors(state) for state in batch]
+            n = len(states)
+            for succs in results:
+                for _, post in succs:
+                    add(post)
+            if verbose and len(states) > n:
+                print(f'{len(states)} total states so far, worklist has length {len(worklist)}')
+    finally:
+        if pool is not None:
+            pool.terminate()
+    return list(states.values())
@@ -0,0 +1,101 @@
+'''
+Measure how long importing each module takes, for mypyvy --startup-profile.
+
+install() adds an import hook that times the execution of every module imported
+afterwards. report() then lists the modules that took longest, with both their
+cumulative time (including the modules they imported) and their self time.
+This module only uses the standard library, so that it can be installed before
+anything else is imported.
+'''
+from __future__ import annotations
+import importlib.abc
+import importlib.machinery
+import sys
+import time
+from types import ModuleType
+from typing import Any, List, Optional, Sequence, Tuple
+
+class ModuleTime:
+    def __init__(self, name: str, depth: int) -> None:
+        self.name = name
+        self.depth = depth
+        self.cumulative = 0.0
+        self.children = 0.0
+
+    @property
+    def self_time(self) -> float:
+        return self.cumulative - self.children
+
+_start = time.perf_counter()
+_times: List[ModuleTime] = []
+_stack: List[ModuleTime] = []
+
+class _TimingLoader(importlib.abc.Loader):
+    def __init__(self, loader: Any) -> None:
+        self.loader = loader
+
+    def create_module(self, spec: importlib.machinery.ModuleSpec) -> Optional[ModuleType]:
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module: ModuleType) -> None:
+        # some modules look at their own loader (e.g., to find data files), so hide this wrapper from them
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+
+        t = ModuleTime(module.__name__, len(_stack))
+        _stack.append(t)
+        start = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            t.cumulative = time.perf_counter() - start
+            _stack.pop()
+            if _stack:
+                _stack[-1].children += t.cumulative
+            _times.append(t)
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    def find_spec(self, fullname: str, path: Optional[Sequence[str]],
+                  target: Optional[ModuleType] = None) -> Optional[importlib.machinery.ModuleSpec]:
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimingLoader(spec.loader)
+                return spec
+        return None
+
+_finder = _TimingFinder()
+
+def install() -> None:
+    '''Start timing imports. Modules that are already imported are not included in the report.'''
+    global _start
+    if _finder not in sys.meta_path:
+        _start = time.perf_counter()
+        sys.meta_path.insert(0, _finder)
+
+def uninstall() -> None:
+    if _finder in sys.meta_path:
+        sys.meta_path.remove(_finder)
+
+def module_times() -> List[ModuleTime]:
+    '''Return the times of all modules imported so far, in the order their imports finished.'''
+    return list(_times)
+
+def report(phases: Sequence[Tuple[str, float]] = (), limit: int = 30) -> str:
+    '''
+    Return a human-readable summary of the import times, showing the limit slowest modules,
+    followed by the given (description, seconds) phases of startup.
+    '''
+    top_level = sum(t.cumulative for t in _times if t.depth == 0)
+    lines = [f'startup profile: imported {len(_times)} modules in {1000 * top_level:.1f}ms '
+             f'({1000 * (time.perf_counter() - _start):.1f}ms since the profile started)',
+             f'{"cumulative":>12} {"self":>10}  module']
+    for t in sorted(_times, key=lambda t: t.cumulative, reverse=True)[:limit]:
+        lines.append(f'{1000 * t.cumulative:10.1f}ms {1000 * t.self_time:8.1f}ms  {t.name}')
+    for desc, secs in phases:
+        lines.append(f'{desc}: {1000 * secs:.1f}ms')
+    return '\n'.join(lines)
@@ -0,0 +1,214 @@
+'''
+Incremental re-verification for the verify subcommand.
+
+Each obligation of verify (an invariant implied by init, or an invariant
+preserved by a transition) is fingerprinted by the declarations it depends
+on. When an obligation is proved, its fingerprint is stored in a results
+file, together with the invariants in the unsat core of the proof and the
+declarations of the symbols used (see syntax.symbols_used). On the next run,
+an obligation is not re-checked if its fingerprint is unchanged and the
+invariants and symbols its previous proof depended on are also unchanged.
+Adding or strengthening unrelated invariants does not invalidate anything.
+
+Only proofs are stored. Failing obligations are always re-checked, so that
+their counterexamples can be printed.
+'''
+from __future__ import annotations
+from datetime import datetime
+from hashlib import sha1
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import z3
+
+import logic
+from logic import Solver, Trace
+import syntax
+from syntax import DefinitionDecl, Expr, InvariantDecl, New, Not
+from translator import Z3Translator
+import utils
+
+VERSION = 1
+MAX_PROOFS_PER_OBLIGATION = 4
+
+# a stored proof: fingerprints of the invariants it assumed, and of the declarations of the symbols it used
+Proof = Tuple[List[str], Dict[str, str]]
+
+def fingerprint(*parts: str) -> str:
+    return sha1('\0'.join(parts).encode()).hexdigest()
+
+def context_fingerprint(prog: syntax.Program) -> str:
+    '''Fingerprint of the declarations that every obligation may depend on.
+
+    Invariants, public transitions, and initial conditions are fingerprinted
+    separately, and so are mutable state declarations (through symbols_used).
+    '''
+    decls: List[object] = []
+    decls += prog.sorts()
+    decls += (d for d in prog.relations_constants_and_functions() if not d.mutable)
+    decls += prog.derived_relations()
+    decls += prog.axioms()
+    decls += (d for d in prog.definitions() if not d.is_public_transition)
+    return fingerprint(*(str(d) for d in decls))
+
+def symbol_fingerprints(scope: syntax.Scope, exprs: Iterable[Expr]) -> Dict[str, str]:
+    names: Set[str] = set()
+    for e in exprs:
+        names |= set(sym for _, _, sym in syntax.symbols_used(scope, e))
+    fingerprints = {}
+    for name in names:
+        d = scope.get(name)
+        assert d is not None and not isinstance(d, tuple)
+        fingerprints[name] = fingerprint(str(d))
+    return fingerprints
+
+class Results:
+    '''Proofs found by previous runs, indexed by obligation fingerprint.'''
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self.proofs: Dict[str, List[Proof]] = {}
+        try:
+            with open(filename) as f:
+                obj = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(obj, dict) and obj.get('version') == VERSION:
+            self.proofs = {k: [(hyps, syms) for hyps, syms in v] for k, v in obj['proofs'].items()}
+
+    def lookup(self, key: str, inv_fingerprints: Set[str], scope: syntax.Scope) -> bool:
+        for hyps, syms in self.proofs.get(key, []):
+            if all(h in inv_fingerprints for h in hyps) and \
+               all(self._symbol_fingerprint(scope, name) == fp for name, fp in syms.items()):
+                return True
+        return False
+
+    @staticmethod
+    def _symbol_fingerprint(scope: syntax.Scope, name: str) -> Optional[str]:
+        d = scope.get(name)
+        if d is None or isinstance(d, tuple):
+            return None
+        return fingerprint(str(d))
+
+    def add(self, key: str, proof: Proof) -> None:
+        proofs = self.proofs.setdefault(key, [])
+        if proof not in proofs:
+            proofs.insert(0, proof)
+            del proofs[MAX_PROOFS_PER_OBLIGATION:]
+
+    def save(self) -> None:
+        obj = {'version': VERSION, 'proofs': self.proofs}
+        tmp = f'{self.filename}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(obj, f)
+        os.replace(tmp, self.filename)
+
+def check_init_and_transitions_incremental(
+        s: Solver,
+        filename: str,
+        minimize: Optional[bool] = None,
+) -> Tuple[Optional[Tuple[InvariantDecl, Trace]],
+           Optional[Tuple[InvariantDecl, Trace, DefinitionDecl]]]:
+    '''Like check_init followed by check_transitions, but skips obligations proved by a previous run.
+
+    Proofs are loaded from and saved to filename.
+    '''
+    prog = syntax.the_program
+    scope = prog.scope
+    results = Results(filename)
+    invs = list(prog.invs())
+    transitions = list(prog.transitions())
+    inv_fps = [fingerprint(str(inv.expr)) for inv in invs]
+    current_inv_fps = set(inv_fps)
+    ctx = context_fingerprint(prog)
+
+    init_res: Optional[Tuple[InvariantDecl, Trace]] = None
+    tr_res: Optional[Tuple[InvariantDecl, Trace, DefinitionDecl]] = None
+
+    utils.logger.always_print('checking init:')
+    inits_fp = fingerprint(*(str(init.expr) for init in prog.inits()))
+    t = s.get_translator(1)
+    with s.new_frame():
+        for init in prog.inits():
+            s.add(t.translate_expr(init.expr))
+        for inv, inv_fp in zip(invs, inv_fps):
+            msg = logic.invariant_msg(inv)
+            utils.logger.always_print('  implies invariant%s... ' % msg, end='')
+            key = fingerprint('init', ctx, inits_fp, inv_fp)
+            if results.lookup(key, current_inv_fps, scope):
+                logic.report_obligation([], None, None)
+                continue
+
+            with s.new_frame():
+                s.add(t.translate_expr(Not(inv.expr)))
+                start = datetime.now()
+                res = logic.check_solver(s, 1, minimize=minimize)
+                elapsed = datetime.now() - start
+                if res is not None and utils.args.smoke_test_solver:
+                    logic.smoke_test_init_counterexample(s, inv, res)
+            logic.report_obligation([(inv.span, 'invariant%s does not hold in initial state' % msg)], res, elapsed)
+            if res is not None:
+                init_res = inv, res
+                break
+            exprs = [init.expr for init in prog.inits()] + [inv.expr]
+            results.add(key, ([], symbol_fingerprints(scope, exprs)))
+
+    t = s.get_translator(2)
+    with s.new_frame():
+        # each invariant is assumed in the pre-state under an indicator, so that proofs record which
+        # invariants they depend on (from the unsat core)
+        indicators = [z3.Bool(f'inv$_{i}') for i in range(len(invs))]
+        for indicator, inv in zip(indicators, invs):
+            s.add(z3.Implies(indicator, t.translate_expr(inv.expr)))
+
+        for i_transition in logic.checked_transitions():
+            ition = transitions[i_transition]
+            utils.logger.always_print('checking transition %s:' % (ition.name,))
+            twostate = ition.as_twostate_formula(scope)
+            twostate_fp = fingerprint(str(twostate))
+            twostate_symbols = symbol_fingerprints(scope, [twostate])
+            translated = False
+            with s.new_frame():
+                for i_inv in logic.checked_invariants():
+                    inv = invs[i_inv]
+                    msg = logic.invariant_msg(inv)
+                    utils.logger.always_print('  preserves invariant%s... ' % msg, end='')
+                    key = fingerprint('transition', ctx, twostate_fp, inv_fps[i_inv])
+                    if results.lookup(key, current_inv_fps, scope):
+                        logic.report_obligation([], None, None)
+                        continue
+
+                    if not translated:
+                        s.add(t.translate_expr(twostate))
+                        translated = True
+                    with s.new_frame():
+                        s.add(t.translate_expr(New(Not(inv.expr))))
+                        start = datetime.now()
+                        with s.mark_assumptions_necessary():
+                            r = s.check(indicators)
+                            res = None
+                            if r != z3.unsat:
+                                assert r == z3.sat, r
+                                res = Z3Translator.model_to_trace(s.model(indicators, minimize=minimize), 2)
+                                if utils.args.smoke_test_solver:
+                                    logic.smoke_test_transition_counterexample(s, inv, res)
+                            else:
+                                core = set(c.get_id() for c in s.unsat_core())
+                        elapsed = datetime.now() - start
+                    logic.report_obligation(
+                        [(inv.span, 'invariant%s is not preserved by transition %s' % (msg, ition.name)),
+                         (ition.span, 'this transition does not preserve invariant%s' % (msg,))],
+                        res, elapsed)
+                    if res is not None:
+                        tr_res = inv, res, ition
+                        break
+                    hyps = [i for i, indicator in enumerate(indicators) if indicator.get_id() in core]
+                    syms = dict(twostate_symbols)
+                    syms.update(symbol_fingerprints(scope, [inv.expr] + [invs[i].expr for i in hyps]))
+                    results.add(key, (sorted(inv_fps[i] for i in hyps), syms))
+            if tr_res is not None:
+                break
+
+    results.save()
+    return init_res, tr_res
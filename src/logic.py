@@ -1,16 +1,18 @@
 from __future__ import annotations
 from collections import OrderedDict, defaultdict
 from contextlib import contextmanager
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 import time
 import itertools
 import math
+import multiprocessing
 import random
 import io
 import subprocess
 import sys
 from typing import List, Optional, Set, Tuple, Union, Iterable, Dict, Sequence, Iterator
-from typing import cast, Callable
+from typing import cast, Callable, TypeVar
 
 import z3
 
@@ -75,6 +77,55 @@ def check_unsat(
         return None
 
 
+def invariant_msg(inv: syntax.InvariantDecl) -> str:
+    if inv.name is not None:
+        return ' ' + inv.name
+    elif inv.span is not None:
+        return ' on line %d' % inv.span[0].lineno
+    else:
+        return ''
+
+def smoke_test_init_counterexample(s: Solver, inv: syntax.InvariantDecl, res: Trace) -> None:
+    prog = syntax.the_program
+    state = State(res, 0)
+    for ax in prog.axioms():
+        if state.eval(ax.expr) is not True:
+            print('\n\n'.join(str(x) for x in s.debug_recent()))
+            print(res)
+            assert False, f'bad initial counterexample for axiom {ax.expr}'
+    for init in prog.inits():
+        if state.eval(init.expr) is not True:
+            print('\n\n'.join(str(x) for x in s.debug_recent()))
+            print(res)
+            assert False, f'bad initial counterexample for initial condition {init.expr}'
+    if state.eval(inv.expr) is not False:
+        print('\n\n'.join(str(x) for x in s.debug_recent()))
+        print(res)
+        assert False, f'bad initial counterexample for invariant {inv.expr}'
+
+def smoke_test_transition_counterexample(s: Solver, inv: syntax.InvariantDecl, res: Trace) -> None:
+    prog = syntax.the_program
+    pre_state = res.as_state(i=0)
+    for ax in prog.axioms():
+        if pre_state.eval(ax.expr) is not True:
+            print('\n\n'.join(str(x) for x in s.debug_recent()))
+            print(res)
+            assert False, f'bad transition counterexample for axiom {ax.expr} in pre state'
+    for pre_inv in prog.invs():
+        if pre_state.eval(pre_inv.expr) is not True:
+            print('\n\n'.join(str(x) for x in s.debug_recent()))
+            print(res)
+            msg = f'bad transition counterexample for invariant {pre_inv.expr} in pre state'
+            assert False, msg
+    # need to implement mypyvy-level transition->expression translation
+    # res.eval_double_vocabulary(transition, start_location=0)
+    post_state = res.as_state(i=1)
+    if post_state.eval(inv.expr) is not False:
+        print('\n\n'.join(str(x) for x in s.debug_recent()))
+        print(res)
+        msg = f'bad transition counterexample for invariant {inv.expr} in post state'
+        assert False, msg
+
 def check_init(
         s: Solver,
         safety_only: bool = False,
@@ -95,12 +146,7 @@ def check_init(
             with s.new_frame():
                 s.add(t.translate_expr(Not(inv.expr)))
 
-                if inv.name is not None:
-                    msg = ' ' + inv.name
-                elif inv.span is not None:
-                    msg = ' on line %d' % inv.span[0].lineno
-                else:
-                    msg = ''
+                msg = invariant_msg(inv)
                 if verbose:
                     utils.logger.always_print('  implies invariant%s... ' % msg, end='')
                     sys.stdout.flush()
@@ -109,21 +155,7 @@ def check_init(
                                   s, 1, minimize=minimize, verbose=verbose)
                 if res is not None:
                     if utils.args.smoke_test_solver:
-                        state = State(res, 0)
-                        for ax in prog.axioms():
-                            if state.eval(ax.expr) is not True:
-                                print('\n\n'.join(str(x) for x in s.debug_recent()))
-                                print(res)
-                                assert False, f'bad initial counterexample for axiom {ax.expr}'
-                        for init in prog.inits():
-                            if state.eval(init.expr) is not True:
-                                print('\n\n'.join(str(x) for x in s.debug_recent()))
-                                print(res)
-                                assert False, f'bad initial counterexample for initial condition {init.expr}'
-                        if state.eval(inv.expr) is not False:
-                            print('\n\n'.join(str(x) for x in s.debug_recent()))
-                            print(res)
-                            assert False, f'bad initial counterexample for invariant {inv.expr}'
+                        smoke_test_init_counterexample(s, inv, res)
 
                     return inv, res
     return None
@@ -160,12 +192,7 @@ def check_transitions(
                     with s.new_frame():
                         s.add(lator.translate_expr(New(Not(inv.expr))))
 
-                        if inv.name is not None:
-                            msg = ' ' + inv.name
-                        elif inv.span is not None:
-                            msg = ' on line %d' % inv.span[0].lineno
-                        else:
-                            msg = ''
+                        msg = invariant_msg(inv)
                         if verbose:
                             utils.logger.always_print('  preserves invariant%s... ' % msg, end='')
                             sys.stdout.flush()
@@ -177,30 +204,173 @@ def check_transitions(
                                           s, 2, minimize=minimize, verbose=verbose)
                         if res is not None:
                             if utils.args.smoke_test_solver:
-                                pre_state = res.as_state(i=0)
-                                for ax in prog.axioms():
-                                    if pre_state.eval(ax.expr) is not True:
-                                        print('\n\n'.join(str(x) for x in s.debug_recent()))
-                                        print(res)
-                                        assert False, f'bad transition counterexample for axiom {ax.expr} in pre state'
-                                for pre_inv in prog.invs():
-                                    if pre_state.eval(pre_inv.expr) is not True:
-                                        print('\n\n'.join(str(x) for x in s.debug_recent()))
-                                        print(res)
-                                        msg = f'bad transition counterexample for invariant {pre_inv.expr} in pre state'
-                                        assert False, msg
-                                # need to implement mypyvy-level transition->expression translation
-                                # res.eval_double_vocabulary(transition, start_location=0)
-                                post_state = res.as_state(i=1)
-                                if post_state.eval(inv.expr) is not False:
-                                    print('\n\n'.join(str(x) for x in s.debug_recent()))
-                                    print(res)
-                                    msg = f'bad transition counterexample for invariant {inv.expr} in post state'
-                                    assert False, msg
+                                smoke_test_transition_counterexample(s, inv, res)
 
                             return inv, res, ition
     return None
 
+def checked_transitions() -> List[int]:
+    '''Return the indices of the transitions checked by check_transitions, in order.'''
+    return [i_transition for i_transition, ition in enumerate(syntax.the_program.transitions())
+            if not ('check_transition' in utils.args and
+                    utils.args.check_transition is not None and
+                    ition.name not in utils.args.check_transition)]
+
+def checked_invariants() -> List[int]:
+    '''Return the indices of the invariants checked against each transition by check_transitions, in order.'''
+    return [i_inv for i_inv, inv in enumerate(syntax.the_program.invs())
+            if not ('check_invariant' in utils.args and
+                    utils.args.check_invariant is not None and
+                    inv.name not in utils.args.check_invariant)]
+
+def transition_obligations() -> List[Tuple[int, int]]:
+    '''Return the (transition index, invariant index) pairs checked by check_transitions, in order.'''
+    return [(i_transition, i_inv) for i_transition in checked_transitions() for i_inv in checked_invariants()]
+
+def report_obligation(
+        errmsgs: List[Tuple[Optional[syntax.Span], str]],
+        res: Optional[Trace],
+        elapsed: Optional[timedelta],
+) -> None:
+    '''Print the result of an obligation checked outside of check_unsat, in the same format.
+
+    elapsed is None if the result was not computed in this run.
+    '''
+    if res is not None:
+        utils.logger.always_print('')
+        if utils.args.print_counterexample:
+            utils.logger.always_print(str(res))
+        for span, msg in errmsgs:
+            utils.print_error(span, msg)
+    else:
+        if not utils.args.query_time:
+            time_msg = ''
+        elif elapsed is None:
+            time_msg = ' (unchanged)'
+        else:
+            time_msg = ' (%s)' % (elapsed,)
+        utils.logger.always_print('ok.%s' % (time_msg,))
+    sys.stdout.flush()
+
+@dataclass
+class _ObligationSolver:
+    # solver of a worker process of check_init_and_transitions_parallel. the bottom frame contains
+    # the initial conditions (1 state) or the invariants (2 states), and for 2 states the next frame
+    # contains the transition of the last obligation, since consecutive obligations usually share it.
+    s: Solver
+    t: Z3Translator
+    i_transition: Optional[int] = None
+
+_obligation_solvers: Dict[int, _ObligationSolver] = {}
+
+def _get_obligation_solver(i_transition: Optional[int]) -> _ObligationSolver:
+    prog = syntax.the_program
+    num_states = 1 if i_transition is None else 2
+    if num_states not in _obligation_solvers:
+        s = Solver()
+        t = s.get_translator(num_states)
+        if num_states == 1:
+            for init in prog.inits():
+                s.add(t.translate_expr(init.expr))
+        else:
+            for inv in prog.invs():
+                s.add(t.translate_expr(inv.expr))
+        _obligation_solvers[num_states] = _ObligationSolver(s, t)
+    ob = _obligation_solvers[num_states]
+    if i_transition is not None and ob.i_transition != i_transition:
+        if ob.i_transition is not None:
+            ob.s.pop()
+        ob.s.push()
+        ition = list(prog.transitions())[i_transition]
+        ob.s.add(ob.t.translate_expr(ition.as_twostate_formula(prog.scope)))
+        ob.i_transition = i_transition
+    return ob
+
+def _check_obligation_helper(
+        i_transition: Optional[int],
+        i_inv: int,
+        minimize: Optional[bool],
+) -> Tuple[Optional[Trace], timedelta]:
+    # runs in a worker process of check_init_and_transitions_parallel
+    inv = list(syntax.the_program.invs())[i_inv]
+    ob = _get_obligation_solver(i_transition)
+    s = ob.s
+    with s.new_frame():
+        if i_transition is None:
+            s.add(ob.t.translate_expr(Not(inv.expr)))
+        else:
+            s.add(ob.t.translate_expr(New(Not(inv.expr))))
+
+        start = datetime.now()
+        res = check_solver(s, 1 if i_transition is None else 2, minimize=minimize)
+        elapsed = datetime.now() - start
+        if res is not None and utils.args.smoke_test_solver:
+            if i_transition is None:
+                smoke_test_init_counterexample(s, inv, res)
+            else:
+                smoke_test_transition_counterexample(s, inv, res)
+    return res, elapsed
+
+def check_init_and_transitions_parallel(
+        jobs: int,
+        minimize: Optional[bool] = None,
+) -> Tuple[Optional[Tuple[syntax.InvariantDecl, Trace]],
+           Optional[Tuple[syntax.InvariantDecl, Trace, DefinitionDecl]]]:
+    '''Like check_init followed by check_transitions, but checks each (transition, invariant)
+    pair in a separate solver, using a pool of jobs worker processes.
+
+    Results are printed in the same order and format as the sequential version, as soon as
+    they (and all results before them) are available. As in the sequential version, checking
+    stops at the first invariant not implied by init, and at the first transition that does
+    not preserve an invariant.
+    '''
+    prog = syntax.the_program
+    invs = list(prog.invs())
+    transitions = list(prog.transitions())
+
+    tr_obligations = transition_obligations()
+
+    init_res: Optional[Tuple[syntax.InvariantDecl, Trace]] = None
+    tr_res: Optional[Tuple[syntax.InvariantDecl, Trace, DefinitionDecl]] = None
+    with multiprocessing.Pool(processes=jobs) as pool:
+        init_results = [pool.apply_async(_check_obligation_helper, (None, i_inv, minimize))
+                        for i_inv in range(len(invs))]
+        tr_results = [pool.apply_async(_check_obligation_helper, (i_transition, i_inv, minimize))
+                      for i_transition, i_inv in tr_obligations]
+
+        utils.logger.always_print('checking init:')
+        for inv, r in zip(invs, init_results):
+            msg = invariant_msg(inv)
+            utils.logger.always_print('  implies invariant%s... ' % msg, end='')
+            sys.stdout.flush()
+            res, elapsed = r.get()
+            report_obligation([(inv.span, 'invariant%s does not hold in initial state' % msg)], res, elapsed)
+            if res is not None:
+                init_res = inv, res
+                break
+
+        results_by_obligation = dict(zip(tr_obligations, tr_results))
+        for i_transition in checked_transitions():
+            ition = transitions[i_transition]
+            utils.logger.always_print('checking transition %s:' % (ition.name,))
+            for i_inv in checked_invariants():
+                inv = invs[i_inv]
+                msg = invariant_msg(inv)
+                utils.logger.always_print('  preserves invariant%s... ' % msg, end='')
+                sys.stdout.flush()
+                res, elapsed = results_by_obligation[(i_transition, i_inv)].get()
+                report_obligation([(inv.span, 'invariant%s is not preserved by transition %s' % (msg, ition.name)),
+                                   (ition.span, 'this transition does not preserve invariant%s' % (msg,))],
+                                  res, elapsed)
+                if res is not None:
+                    tr_res = inv, res, ition
+                    break
+            if tr_res is not None:
+                break
+        # leaving the context manager terminates any workers still running obligations we no longer need
+
+    return init_res, tr_res
+
 def check_implication(
         s: Solver,
         hyps: Iterable[Expr],
@@ -221,7 +391,7 @@ def check_implication(
 
 def check_two_state_implication_all_transitions(
         s: Solver,
-        old_hyps: Iterable[Expr],
+        old_hyps: Iterable[Union[Expr, State]],
         new_conc: Expr,
         minimize: Optional[bool] = None,
 ) -> Optional[Tuple[z3.ModelRef, DefinitionDecl]]:
@@ -229,7 +399,7 @@ def check_two_state_implication_all_transitions(
     prog = syntax.the_program
     with s.new_frame():
         for h in old_hyps:
-            s.add(t.translate_expr(h))
+            s.add(t.translate_state(h) if isinstance(h, State) else t.translate_expr(h))
         s.add(t.translate_expr(New(Not(new_conc))))
         for trans in prog.transitions():
             with s.new_frame():
@@ -240,6 +410,51 @@ def check_two_state_implication_all_transitions(
                     return s.model(minimize=minimize), trans
         return None
 
+def check_diagram_blocked(
+        s: Solver,
+        old_hyps: Iterable[Expr],
+        inits: Optional[Iterable[Expr]],
+        diag: Diagram,
+) -> Optional[Set[int]]:
+    '''
+    Check that no state satisfying diag is reachable in one transition
+    from a state satisfying old_hyps, nor (if inits is given) satisfies
+    inits. Returns None if one is, and otherwise the union of the unsat
+    cores of these queries, as indices into diag.trackers.
+    '''
+    prog = syntax.the_program
+    core: Set[int] = set()
+
+    def check() -> bool:
+        res = s.check(diag.trackers)
+        assert res in (solver.sat, solver.unsat), res
+        if res == solver.sat:
+            return False
+        core.update(int(x.decl().name()[1:]) for x in s.unsat_core())
+        return True
+
+    t = s.get_translator(2)
+    with s.new_frame():
+        for h in old_hyps:
+            s.add(t.translate_expr(h))
+        s.add(diag.to_z3(t, new=True))
+        for trans in prog.transitions():
+            with s.new_frame():
+                s.add(t.translate_expr(trans.as_twostate_formula(prog.scope)))
+                if not check():
+                    return None
+
+    if inits is not None:
+        t = s.get_translator(1)
+        with s.new_frame():
+            for init in inits:
+                s.add(t.translate_expr(init))
+            s.add(diag.to_z3(t))
+            if not check():
+                return None
+
+    return core
+
 def get_transition_indicator(uid: str, name: str) -> str:
     return '%s_%s_%s' % (TRANSITION_INDICATOR, uid, name)
 
@@ -263,35 +478,101 @@ def assert_any_transition(s: Solver, t: Z3Translator,
     s.add(z3.Or(*tids))
 
 
-def check_bmc(s: Solver, safety: Expr, depth: int, preconds: Optional[Iterable[Expr]] = None,
-              minimize: Optional[bool] = None) -> Optional[Trace]:
-    prog = syntax.the_program
-
-    if preconds is None:
-        preconds = (init.expr for init in prog.inits())
-
-    t = s.get_translator(depth + 1)
-
-    with s.new_frame():
+class IncrementalBMC:
+    '''
+    Bounded model checking of safety from preconds (by default, the
+    initial conditions), which extends a single unrolling of the
+    transition relation one step at a time.
+
+    The states and transitions of the unrolling stay asserted as it
+    grows, and the violation of safety in the last state is passed to
+    the solver as an assumption, so the solver's work on the prefix of
+    the unrolling is reused across depths. Since the solver does not
+    allow adding states while frames are pushed, the translator for
+    max_depth + 1 states is obtained up front. The unrolling lives in a
+    frame of the solver, which is popped by close() (or at the end of a
+    with statement); the solver must not be used for anything else in
+    the meantime.
+    '''
+    def __init__(self, s: Solver, safety: Expr, max_depth: int,
+                 preconds: Optional[Iterable[Union[Expr, State]]] = None) -> None:
+        if preconds is None:
+            preconds = (init.expr for init in syntax.the_program.inits())
+
+        self.s = s
+        self.safety = safety
+        self.max_depth = max_depth
+        self.depth = 0  # number of transitions in the unrolling
+        self.t = s.get_translator(max_depth + 1)
+        self.closed = False
+
+        s.push()
         for precond in preconds:
-            s.add(t.translate_expr(precond))
-
-        s.add(t.translate_expr(syntax.New(syntax.Not(safety), depth)))
-
-        for i in range(depth):
-            s.add(t.translate_expr(New(safety, i)))
-            assert_any_transition(s, t, i, allow_stutter=False)
-
-        res = s.check()
+            s.add(self.t.translate_state(precond) if isinstance(precond, State) else self.t.translate_expr(precond))
+
+    def __enter__(self) -> IncrementalBMC:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.s.pop()
+
+    def extend(self, depth: int) -> None:
+        '''Extend the unrolling to the given number of transitions.'''
+        assert not self.closed
+        assert depth <= self.max_depth, (depth, self.max_depth)
+        while self.depth < depth:
+            self.s.add(self.t.translate_expr(New(self.safety, self.depth)))
+            assert_any_transition(self.s, self.t, self.depth, allow_stutter=False)
+            self.depth += 1
+
+    def check(self, depth: int, minimize: Optional[bool] = None) -> Optional[Trace]:
+        '''
+        Return a trace of the given depth whose last state (only) violates
+        safety, or None if there is none. Depths must be checked in
+        nondecreasing order.
+        '''
+        assert depth >= self.depth, 'the unrolling cannot be shortened'
+        self.extend(depth)
+        bad = self.t.translate_expr(New(Not(self.safety), depth))
+        if self.s.use_cvc4:  # cvc4 does not support assumptions
+            with self.s.new_frame():
+                self.s.add(bad)
+                return self._check(depth, [], minimize)
+        indicator = z3.Bool(f'bmc_bad_{depth}')
+        self.s.add(z3.Implies(indicator, bad))
+        return self._check(depth, [indicator], minimize)
+
+    def _check(self, depth: int, assumptions: Sequence[z3.ExprRef], minimize: Optional[bool]) -> Optional[Trace]:
+        res = self.s.check(assumptions)
         if res == solver.sat:
-            z3m = s.model(minimize=minimize)
-            m = Z3Translator.model_to_trace(z3m, depth + 1)
-            return m
+            z3m = self.s.model(assumptions, minimize=minimize)
+            return Z3Translator.model_to_trace(z3m, depth + 1)
         elif res == solver.unknown:
             print('unknown!')
         return None
 
 
+def check_bmc(s: Solver, safety: Expr, depth: int, preconds: Optional[Iterable[Union[Expr, State]]] = None,
+              minimize: Optional[bool] = None) -> Optional[Trace]:
+    with IncrementalBMC(s, safety, depth, preconds) as bmc:
+        return bmc.check(depth, minimize=minimize)
+
+
+def check_bmc_upto(s: Solver, safety: Expr, depth: int, preconds: Optional[Iterable[Union[Expr, State]]] = None,
+                   minimize: Optional[bool] = None) -> Optional[Trace]:
+    '''Return the shortest trace of at most depth transitions violating safety, if any.'''
+    with IncrementalBMC(s, safety, depth, preconds) as bmc:
+        for k in range(depth + 1):
+            if (m := bmc.check(k, minimize=minimize)) is not None:
+                return m
+    return None
+
+
 _RelevantDecl = Union[SortDecl, RelationDecl, ConstantDecl, FunctionDecl]
 
 class Diagram:
@@ -325,6 +606,10 @@ class Diagram:
         assert prog.scope is not None
         self._typecheck(prog.scope)
 
+    def __getstate__(self) -> Dict[str, object]:
+        # z3 objects cannot be pickled, and the trackers are recomputed by to_z3 anyway
+        return dict(self.__dict__, trackers=[])
+
     @staticmethod
     def _read_first_order_structure(struct: FirstOrderStructure) -> Tuple[
             List[syntax.SortedVar],  # vs
@@ -566,47 +851,111 @@ class Diagram:
             yield
             S -= j
 
-    def generalize(self, s: Solver, constraint: Callable[[Diagram], bool], order: Optional[int] = None) -> None:
-        'drop conjuncts of this diagram subject to the constraint returning true'
-        d: _RelevantDecl
+    @contextmanager
+    def only(self, keep: Set[Tuple[_RelevantDecl, int]]) -> Iterator[None]:
+        'temporarily drop the conjuncts not in keep'
+        dropped = [(d, j) for d, j, _ in self.conjuncts() if (d, j) not in keep]
+        for d, j in dropped:
+            S = self.tombstones[d]
+            assert S is not None
+            S.add(j)
+        yield
+        for d, j in dropped:
+            S = self.tombstones[d]
+            assert S is not None
+            S.remove(j)
+
+    def generalize(
+            self,
+            s: Solver,
+            constraint: Callable[[Diagram], bool],
+            order: Optional[int] = None,
+            core: Optional[Callable[[Diagram], Optional[Set[int]]]] = None,
+    ) -> None:
+        '''
+        Drop conjuncts of this diagram subject to the constraint returning
+        true, which must be monotone (i.e., remain true when conjuncts are
+        added). The remaining conjuncts are minimal: none of them can be
+        dropped on its own. The conjuncts of declarations earlier in the
+        generalization order are dropped in preference to later ones.
+
+        If core is given, it is called instead of the constraint, and must
+        return None if the constraint is false, and otherwise a subset of
+        the conjuncts for which the constraint is still true, as indices
+        into self.reverse_map (e.g., an unsat core over self.trackers, see
+        check_diagram_blocked). This allows dropping many conjuncts with
+        one call. Otherwise, the conjuncts are minimized by QuickXplain.
+        '''
         I: Iterable[_RelevantDecl] = self.ineqs
         R: Iterable[_RelevantDecl] = self.rels
         C: Iterable[_RelevantDecl] = self.consts
         F: Iterable[_RelevantDecl] = self.funcs
 
-        assert constraint(self)
-
         generalization_order = list(itertools.chain(I, R, C, F))
         generalization_order = reorder(generalization_order, order)
+        rank = {d: i for i, d in enumerate(generalization_order)}
+        conjuncts = sorted(((d, j) for d, j, _ in self.conjuncts()), key=lambda x: (rank[x[0]], x[1]))
+        nqueries = s.nqueries
+        ncalls = 0
+
+        def check(keep: Set[Tuple[_RelevantDecl, int]]) -> Optional[Set[Tuple[_RelevantDecl, int]]]:
+            nonlocal ncalls
+            ncalls += 1
+            with self.only(keep):
+                if core is None:
+                    return keep if constraint(self) else None
+                c = core(self)
+                return None if c is None else {self.reverse_map[i] for i in c}
 
-        for d in generalization_order:
-            if isinstance(d, SortDecl) and len(self.ineqs[d]) == 1:
-                continue
-            with self.without(d):
-                res = constraint(self)
-            if res:
-                self.remove_clause(d)
-                continue
-            if isinstance(d, RelationDecl):
-                l = self.rels[d]
-                cs = set()
-                S = self.tombstones[d]
-                assert S is not None
-                for j, x in enumerate(l):
-                    if j not in S and isinstance(x, syntax.UnaryExpr):
-                        cs.add(j)
-                with self.without(d, cs):
-                    res = constraint(self)
-                if res:
-                    self.remove_clause(d, cs)
-
-        for d, j, c in self.conjuncts():
-            with self.without(d, j):
-                res = constraint(self)
-            if res:
-                self.remove_clause(d, j)
+        if core is None:
+            assert check(set(conjuncts)) is not None
+            # QuickXplain keeps conjuncts earlier in the list it is given in preference to later ones
+            kept = set(_quickxplain(lambda xs: check(set(xs)) is not None, conjuncts[::-1]))
+        else:
+            kept = set(conjuncts)
+            while True:
+                res = check(kept)
+                assert res is not None
+                if res >= kept:
+                    break
+                kept &= res
+            for x in conjuncts:
+                if x in kept and (res := check(kept - {x})) is not None:
+                    kept &= res
+
+        for x in conjuncts:
+            if x not in kept:
+                self.remove_clause(*x)
 
         self.prune_unused_vars()
+        utils.logger.info(f'generalized diagram from {len(conjuncts)} to {len(kept)} conjuncts '
+                          f'using {ncalls} constraint checks and {s.nqueries - nqueries} solver queries')
+
+
+_T = TypeVar('_T')
+
+def _quickxplain(holds: Callable[[List[_T]], bool], xs: List[_T]) -> List[_T]:
+    '''
+    Return a minimal sublist of xs for which the monotone predicate holds,
+    assuming it holds for xs, using QuickXplain (Junker, AAAI 2004). Of
+    the minimal sublists, the one returned prefers earlier elements of xs
+    over later ones.
+    '''
+    def qx(background: List[_T], delta: bool, cs: List[_T]) -> List[_T]:
+        if delta and holds(background):
+            return []
+        if len(cs) == 1:
+            return cs
+        k = len(cs) // 2
+        cs1, cs2 = cs[:k], cs[k:]
+        xs2 = qx(background + cs1, True, cs2)
+        xs1 = qx(background + xs2, bool(xs2), cs1)
+        return xs1 + xs2
+
+    if not xs or holds([]):
+        return []
+    return qx([], False, xs)
+
 
 def reorder(lst: List[Union[SortDecl, RelationDecl, ConstantDecl, FunctionDecl]], order: Optional[int]) \
         -> List[Union[SortDecl, RelationDecl, ConstantDecl, FunctionDecl]]:
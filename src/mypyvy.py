@@ -1,30 +1,35 @@
 #!/usr/bin/env python3.8
 
 from __future__ import annotations
+import sys
+if '--startup-profile' in sys.argv:
+    # install the import profiler before importing anything else, so that all imports are measured
+    import import_profile
+    import_profile.install()
+
 import argparse
 from datetime import datetime
+import importlib
 import json
 import logging
-import sys
-from typing import Any, cast, Dict, List, Optional, Tuple, TypeVar, Callable, Union, Sequence, Set
-import z3
+import time
+from typing import Any, cast, Dict, List, Optional, Tuple, TypeVar, Callable, Union, Sequence, Set, TYPE_CHECKING
 import resource
 
-import logic
-from logic import Solver, Trace
 import parser
+import program_cache
 import typechecker
 import syntax
 from syntax import Expr, Program, InvariantDecl, Not
-from semantics import RelationInterps, ConstantInterps, FunctionInterps
-import updr
 import utils
-import relaxed_traces
-from trace import bmc_trace
 
-import pd
-import rethink
-import sep
+# the modules below (and z3, which they import) take a long time to import, so they are only imported by the
+# subcommands that use them. in particular, the typecheck subcommand, which editors run on every save, imports
+# only the parser and the typechecker. see also LazyMain and --startup-profile.
+if TYPE_CHECKING:
+    import logic
+    from logic import Solver, Trace
+    from semantics import RelationInterps, ConstantInterps, FunctionInterps
 
 T = TypeVar('T')
 
@@ -58,6 +63,10 @@ def get_safety() -> List[Expr]:
     return safety
 
 def do_updr(s: Solver) -> None:
+    import z3
+    import logic
+    import updr
+
     if utils.args.use_z3_unsat_cores:
         z3.set_param('smt.core.minimize', True)
 
@@ -65,9 +74,9 @@ def do_updr(s: Solver) -> None:
         return
 
     if not utils.args.checkpoint_in:
-        fs = updr.Frames(s)
+        fs = updr.Frames(s, utils.args.jobs)
     else:
-        fs = updr.load_frames(utils.args.checkpoint_in, s)
+        fs = updr.load_frames(utils.args.checkpoint_in, s, utils.args.jobs)
 
     try:
         fs.search()
@@ -75,6 +84,8 @@ def do_updr(s: Solver) -> None:
     except updr.AbstractCounterexample:
         print('updr found abstract counterexample!')
         pass
+    finally:
+        fs.close()
 
 def debug_tokens(filename: str) -> None:
     l = parser.get_lexer()
@@ -89,8 +100,10 @@ def debug_tokens(filename: str) -> None:
         utils.logger.always_print(str(tok))
 
 JSON = Dict[str, Any]
-def json_counterexample(res: Union[Tuple[InvariantDecl, logic.Trace],
-                                   Tuple[InvariantDecl, logic.Trace, syntax.DefinitionDecl]]) -> JSON:
+VerifyResult = Union[Tuple[InvariantDecl, 'logic.Trace'],
+                     Tuple[InvariantDecl, 'logic.Trace', syntax.DefinitionDecl]]
+
+def json_counterexample(res: VerifyResult) -> JSON:
     inv = res[0]
     trace = res[1]
     if len(res) == 3:
@@ -166,23 +179,34 @@ def json_counterexample(res: Union[Tuple[InvariantDecl, logic.Trace],
 
     return obj
 
-def json_verify_result(res: Union[Tuple[InvariantDecl, logic.Trace],
-                                  Tuple[InvariantDecl, logic.Trace, syntax.DefinitionDecl]]) -> None:
-    json_cex = json_counterexample(res)
-
+def verify_result_json(res: Optional[VerifyResult]) -> JSON:
     obj: JSON = {}
     obj['version'] = 1
     obj['subcommand'] = utils.args.subcommand
-    obj['is_inductive'] = json_cex is None
-    if json_cex is not None:
-        obj['counterexample'] = json_cex
-        json.dump(obj, sys.stdout, indent=4)
+    obj['is_inductive'] = res is None
+    if res is not None:
+        obj['counterexample'] = json_counterexample(res)
+    return obj
+
+def json_verify_result(res: VerifyResult) -> None:
+    json.dump(verify_result_json(res), sys.stdout, indent=4)
 
-def verify(s: Solver) -> None:
+def check_inductive(s: Solver) -> Optional[VerifyResult]:
+    import incremental
+    import logic
+
+    if utils.args.incremental is not None:
+        init_res, tr_res = incremental.check_init_and_transitions_incremental(s, utils.args.incremental)
+    elif utils.args.jobs > 1:
+        init_res, tr_res = logic.check_init_and_transitions_parallel(utils.args.jobs)
+    else:
+        init_res = logic.check_init(s)
+        tr_res = logic.check_transitions(s)
+    return init_res or tr_res
+
+def verify(s: Solver) -> Optional[VerifyResult]:
     old_count = utils.error_count
-    init_res = logic.check_init(s)
-    tr_res = logic.check_transitions(s)
-    res = init_res or tr_res
+    res = check_inductive(s)
     if res is not None and utils.args.json:
         json_verify_result(res)
 
@@ -191,33 +215,60 @@ def verify(s: Solver) -> None:
     else:
         utils.logger.always_print('program has errors.')
 
+    return res
+
 def bmc(s: Solver) -> None:
-    safety = syntax.And(*get_safety())
+    import logic
+    import relaxed_traces
 
-    n = utils.args.depth
+    safety = syntax.And(*get_safety())
 
-    utils.logger.always_print('bmc checking the following property up to depth %d' % n)
+    if utils.args.depth_range is not None:
+        lo, hi = utils.args.depth_range
+        if not 0 <= lo <= hi:
+            utils.print_error_and_exit(None, f'invalid depth range {lo} {hi}')
+        utils.logger.always_print('bmc checking the following property at depths %d to %d' % (lo, hi))
+    else:
+        lo, hi = 0, utils.args.depth
+        utils.logger.always_print('bmc checking the following property up to depth %d' % hi)
     utils.logger.always_print('  ' + str(safety))
 
+    incremental_bmc: Optional[logic.IncrementalBMC] = None
     if not utils.args.relax:
+        incremental_bmc = logic.IncrementalBMC(s, safety, hi)
+
         def bmc_normal(bound: int) -> Optional[Trace]:
-            return logic.check_bmc(s, safety, bound)
+            assert incremental_bmc is not None
+            return incremental_bmc.check(bound)
         bmcer = bmc_normal
     else:
         def bmc_relaxed(bound: int) -> Optional[Trace]:
             return relaxed_traces.check_relaxed_bmc(safety, bound)
         bmcer = bmc_relaxed
 
-    for k in range(0, n + 1):
-        if (m := bmcer(k)) is not None:
-            if utils.args.print_counterexample:
-                print('found violation')
-                print(str(m))
-            break
-    else:
-        print('no violation found.')
+    try:
+        for k in range(lo, hi + 1):
+            start = datetime.now()
+            m = bmcer(k)
+            if utils.args.depth_range is not None:
+                elapsed = (datetime.now() - start).total_seconds()
+                print(f'depth {k}: {"violation found" if m is not None else "no violation"} ({elapsed:.3f}s)')
+            if m is not None:
+                if utils.args.depth_range is not None:
+                    print(f'first violation at depth {k}')
+                if utils.args.print_counterexample:
+                    print('found violation')
+                    print(str(m))
+                break
+        else:
+            print('no violation found.')
+    finally:
+        if incremental_bmc is not None:
+            incremental_bmc.close()
 
 def theorem(s: Solver) -> None:
+    import logic
+
     utils.logger.always_print('checking theorems:')
 
     prog = syntax.the_program
@@ -256,6 +307,10 @@ def ipython(s: Solver) -> None:
 
 
 def load_relaxed_trace_from_updr_cex(prog: Program, s: Solver) -> logic.Trace:
+    import logic
+    import relaxed_traces
+    from trace import bmc_trace
+
     import xml.dom.minidom  # type: ignore
     collection = xml.dom.minidom.parse("paxos_derived_trace.xml").documentElement
 
@@ -313,6 +368,9 @@ def load_relaxed_trace_from_updr_cex(prog: Program, s: Solver) -> logic.Trace:
 
 
 def sandbox(s: Solver) -> None:
+    import logic
+    import relaxed_traces
+
     ####################################################################################
     # SANDBOX for playing with relaxed traces
     import pickle
@@ -408,6 +466,9 @@ def sandbox(s: Solver) -> None:
     ####################################################################################
 
 def trace(s: Solver) -> None:
+    import logic
+    from trace import bmc_trace
+
     # sandbox(s)
 
     prog = syntax.the_program
@@ -430,6 +491,8 @@ def trace(s: Solver) -> None:
 
 
 def check_one_bounded_width_invariant(s: Solver) -> None:
+    import logic
+
     prog = syntax.the_program
     other_decls = [d for d in prog.decls if not isinstance(d, InvariantDecl)]
     invs = list(prog.invs())
@@ -469,10 +532,168 @@ def check_one_bounded_width_invariant(s: Solver) -> None:
 
 
 def relax(s: Solver) -> None:
+    import relaxed_traces
+
     print(relaxed_traces.relaxed_program(syntax.the_program))
 
+class LazyMain:
+    '''
+    The main function of a subcommand that is defined in another module.
+
+    The module is imported only when the subcommand is run, so that defining the
+    command line interface does not import every algorithm implemented in mypyvy.
+    '''
+    def __init__(self, module: str, name: str) -> None:
+        self.module = module
+        self.name = name
+
+    def resolve(self) -> Callable[[Solver], Any]:
+        return getattr(importlib.import_module(self.module), self.name)
+
+    def __call__(self, s: Solver) -> None:
+        self.resolve()(s)
+
+    def __repr__(self) -> str:
+        return f'{self.module}.{self.name}'
+
+def add_pd_argparsers(subparsers: argparse._SubParsersAction) -> List[argparse.ArgumentParser]:
+    result: List[argparse.ArgumentParser] = []
+
+    # forward_explore_inv
+    s = subparsers.add_parser('pd-forward-explore-inv', help='Forward explore program w.r.t. its invariant')
+    s.set_defaults(main=LazyMain('pd', 'forward_explore_inv'))
+    result.append(s)
+
+    # enumerate_reachable_states
+    s = subparsers.add_parser('enumerate-reachable-states',
+                              help='Enumerate the reachable states of a bounded instance, up to isomorphism')
+    s.set_defaults(main=LazyMain('pd', 'enumerate_reachable_states'))
+    s.add_argument('--cardinality', type=int, default=2, help='Bound on the cardinality of every sort')
+    s.add_argument('--dfs', action=utils.YesNoAction, default=False,
+                   help='Explore depth-first instead of breadth-first')
+    result.append(s)
+
+    # repeated_houdini
+    s = subparsers.add_parser('pd-repeated-houdini', help='Run the repeated Houdini algorith in the proof space')
+    s.set_defaults(main=LazyMain('pd', 'repeated_houdini'))
+    s.add_argument('--seed-reachable-states', type=int, metavar='N',
+                   help='start from all reachable states in which every sort has at most N elements')
+    s.add_argument('--sharp', action=utils.YesNoAction, default=True,
+                   help='search for sharp invariants')
+    result.append(s)
+
+    # repeated_houdini_bounds
+    s = subparsers.add_parser('pd-repeated-houdini-bounds', help='Run the repeated Houdini algorith in the proof space')
+    s.set_defaults(main=LazyMain('pd', 'repeated_houdini_bounds'))
+    result.append(s)
+
+    # cdcl_state_bounds
+    s = subparsers.add_parser('pd-cdcl-state-bounds', help='Run the "CDCL state bounds" algorithm')
+    s.set_defaults(main=LazyMain('pd', 'cdcl_state_bounds'))
+    result.append(s)
+
+    # cdcl_predicate_bounds
+    s = subparsers.add_parser('pd-cdcl-predicate-bounds', help='Run the "CDCL predicate bounds" algorithm')
+    s.set_defaults(main=LazyMain('pd', 'cdcl_predicate_bounds'))
+    result.append(s)
+
+    # cdcl_invariant
+    s = subparsers.add_parser('pd-cdcl-invariant', help='Run the "CDCL over invariants" algorithm')
+    s.set_defaults(main=LazyMain('pd', 'cdcl_invariant'))
+    result.append(s)
+
+    # primal_dual_houdini
+    s = subparsers.add_parser('pd-primal-dual-houdini', help='Run the "Primal-Dual" algorithm')
+    s.set_defaults(main=LazyMain('pd', 'primal_dual_houdini'))
+    result.append(s)
+
+    for s in result:
+        s.add_argument('--unroll-to-depth', type=int, help='Unroll transitions to given depth during exploration')
+        s.add_argument('--cpus', type=int, help='Number of CPUs to use in parallel')
+        s.add_argument('--restarts', action=utils.YesNoAction, default=False,
+                       help='Use restarts outside of Z3 by setting Luby timeouts')
+        s.add_argument('--induction-width', type=int, default=1,
+                       help='Upper bound on weight of dual edges to explore.')
+        s.add_argument('--all-subclauses', action=utils.YesNoAction, default=False,
+                       help='Add all subclauses of predicates.')
+        s.add_argument('--optimize-ctis', action=utils.YesNoAction, default=True, help='Optimize internal ctis')
+        s.add_argument('--domain-independence', action=utils.YesNoAction, default=True,
+                       help='Restrict to domain independent clauses')
+        s.add_argument('--max-quantifiers', type=int, help='Maximal number of quantifiers allowed in the invariant')
+        s.add_argument('--cvc4-minimize-models', action=utils.YesNoAction, default=True,
+                       help='Minimize models when using CVC4')
+
+    return result
+
+def add_rethink_argparsers(subparsers: argparse._SubParsersAction) -> List[argparse.ArgumentParser]:
+    result: List[argparse.ArgumentParser] = []
+
+    itp_subparser = subparsers.add_parser('itp-literal', help='experimental inference 1')
+    itp_subparser.set_defaults(main=LazyMain('rethink', 'itp_gen'))
+    result.append(itp_subparser)
+
+    itp_subparser.add_argument('--forward-depth', type=int, default=4, metavar='N',
+                               help='number of steps in backwards exploration')
+    itp_subparser.add_argument('--generalization-order', type=int,
+                               help='generalization order index, -1 means random')
+    itp_subparser.add_argument('--relax-forwards', action=utils.YesNoAction, default=False,
+                               help='relaxed semantics in forwards BMC')
+
+    brat_subparser = subparsers.add_parser('brat', help='experimental inference 2')
+    brat_subparser.set_defaults(main=LazyMain('rethink', 'brat'))
+    result.append(brat_subparser)
+
+    # TODO: remove default for depth
+    brat_subparser.add_argument('--depth', type=int, default=6, metavar='N',
+                                help='number of steps in backwards exploration')
+    brat_subparser.add_argument('--push', action=utils.YesNoAction, default=True,
+                                help='new frame begins with pushing from previous frame')
+    brat_subparser.add_argument('--decrease-depth', action=utils.YesNoAction, default=False,
+                                help='BMC bound decreased as frames increase '
+                                '(similar to PDR with backward-reach cache)')
+    brat_subparser.add_argument('--generalization-order', type=int,
+                                help='generalization order index, -1 means random')
+    brat_subparser.add_argument('--relax-backwards', action=utils.YesNoAction, default=False,
+                                help='relaxed semantics in backwards BMC')
+
+    oneshot_subparser = subparsers.add_parser('oneshot', help='experimental inference 3')
+    oneshot_subparser.set_defaults(main=LazyMain('rethink', 'oneshot'))
+    result.append(oneshot_subparser)
+    oneshot_subparser.add_argument('--depth', type=int, default=6, metavar='N',
+                                   help='number of steps in backwards exploration')
+    oneshot_subparser.add_argument('--forward-depth', type=int, default=4, metavar='N',
+                                   help='number of steps in forwards exploration')
+    oneshot_subparser.add_argument('--relax-forwards', action=utils.YesNoAction, default=False,
+                                   help='relaxed semantics in forwards BMC')
+    oneshot_subparser.add_argument('--relax-backwards', action=utils.YesNoAction, default=False,
+                                   help='relaxed semantics in backwards BMC')
+    oneshot_subparser.add_argument('--generalization-order', type=int,
+                                   help='generalization order index, -1 means random')
+
+    return result
+
+def add_sep_argparsers(subparsers: argparse._SubParsersAction) -> List[argparse.ArgumentParser]:
+    result: List[argparse.ArgumentParser] = []
+
+    # sep
+    s = subparsers.add_parser('sep', help='Run the experimental separation code')
+    s.set_defaults(main=LazyMain('sep', 'sep_main'))
+    s.add_argument('--prefix-portfolio', action=utils.YesNoAction, default=False,
+                   help='learn each invariant by searching for separators with all the universal '
+                        'quantifier prefixes of up to --max-prefix-length variables in parallel, '
+                        'instead of using the prefix of the invariant')
+    s.add_argument('--max-prefix-length', type=int, default=3, metavar='N',
+                   help='the number of quantified variables in the longest prefix of --prefix-portfolio')
+    s.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                   help='search for the separators of --prefix-portfolio using N worker processes')
+    result.append(s)
+
+    return result
+
 def parse_args(args: List[str]) -> utils.MypyvyArgs:
     argparser = argparse.ArgumentParser()
+    # subcommands that do not use the solver override this, which avoids importing z3 and creating a solver
+    argparser.set_defaults(needs_solver=True)
 
     subparsers = argparser.add_subparsers(title='subcommands', dest='subcommand')
     all_subparsers = []
@@ -510,11 +731,20 @@ def parse_args(args: List[str]) -> utils.MypyvyArgs:
         'generate-parser',
         help='internal command used by benchmarking infrastructure to avoid certain race conditions')
     # parser is generated implicitly by main when it parses the program, so we can just nop here
-    generate_parser_subparser.set_defaults(main=nop)
+    generate_parser_subparser.set_defaults(main=nop, needs_solver=False)
     all_subparsers.append(generate_parser_subparser)
 
+    serve_subparser = subparsers.add_parser(
+        'serve',
+        help='answer typecheck, verify, bmc, and trace requests from editors and scripts, '
+             'keeping programs and solvers in memory between requests. the file argument is the path '
+             'of the Unix socket to listen on. see server.py for the protocol')
+    serve_subparser.set_defaults(main=nop, needs_solver=False)
+    all_subparsers.append(serve_subparser)
+
     typecheck_subparser = subparsers.add_parser('typecheck', help='typecheck the file, report any errors, and exit')
-    typecheck_subparser.set_defaults(main=nop)  # program is always typechecked; no further action required
+    # program is always typechecked; no further action required
+    typecheck_subparser.set_defaults(main=nop, needs_solver=False)
     all_subparsers.append(typecheck_subparser)
 
     relax_subparser = subparsers.add_parser(
@@ -531,15 +761,20 @@ def parse_args(args: List[str]) -> utils.MypyvyArgs:
     check_one_bounded_width_invariant_parser.set_defaults(main=check_one_bounded_width_invariant)
     all_subparsers.append(check_one_bounded_width_invariant_parser)
 
-    all_subparsers += pd.add_argparsers(subparsers)
+    all_subparsers += add_pd_argparsers(subparsers)
 
-    all_subparsers += rethink.add_argparsers(subparsers)
+    all_subparsers += add_rethink_argparsers(subparsers)
 
-    all_subparsers += sep.add_argparsers(subparsers)
+    all_subparsers += add_sep_argparsers(subparsers)
 
     for s in all_subparsers:
         s.add_argument('--forbid-parser-rebuild', action=utils.YesNoAction, default=False,
                        help='force loading parser from disk (helps when running mypyvy from multiple processes)')
+        s.add_argument('--program-cache', default=None, metavar='DIR',
+                       help='cache parsed and typechecked programs in the given directory, '
+                            'and load them from there instead of parsing them again when the input is unchanged')
+        s.add_argument('--startup-profile', action='store_true',
+                       help='report how long importing each module and the other steps of startup take')
         s.add_argument('--log', default='warning', choices=['error', 'warning', 'info', 'debug'],
                        help='logging level')
         s.add_argument('--log-time', action=utils.YesNoAction, default=False,
@@ -581,6 +816,24 @@ def parse_args(args: List[str]) -> utils.MypyvyArgs:
                        help='assert that the caches already contain all the answers')
         s.add_argument('--cache-only-discovered', action=utils.YesNoAction, default=False,
                        help='assert that the discovered states already contain all the answers')
+        s.add_argument('--query-cache', default=None, metavar='PATH',
+                       help='cache sat/unsat results of solver queries in the given SQLite database, '
+                            'which can be shared between runs and processes')
+        s.add_argument('--query-profile', action=utils.YesNoAction, default=False,
+                       help='report the time, result, and size of solver queries, aggregated by call site')
+        s.add_argument('--query-profile-json', default=None, metavar='PATH',
+                       help='write the query profile to the given file as JSON (implies --query-profile)')
+        s.add_argument('--query-profile-smt2', default=None, metavar='DIR',
+                       help='write the slowest queries to the given directory as SMT-LIB files '
+                            '(implies --query-profile)')
+        s.add_argument('--query-profile-top', type=int, default=10, metavar='N',
+                       help='number of slowest queries to report in the query profile (default 10)')
+        s.add_argument('--portfolio', type=int, default=None, metavar='N',
+                       help='race N solver configurations (z3 seeds and parameters, and cvc4 if available) '
+                            'in separate processes on each query, and use the first answer')
+        s.add_argument('--portfolio-delay', type=int, default=1000, metavar='MS',
+                       help='with --portfolio, only race queries that the default configuration '
+                            'does not answer within this many milliseconds')
         s.add_argument('--print-exit-code', action=utils.YesNoAction, default=False,
                        help='print the exit code before exiting (good for regression testing)')
         s.add_argument('--exit-0', action=utils.YesNoAction, default=False,
@@ -588,6 +841,8 @@ def parse_args(args: List[str]) -> utils.MypyvyArgs:
 
         s.add_argument('--cvc4', action='store_true',
                        help='use CVC4 as the backend solver. this is not very well supported.')
+        s.add_argument('--cvc4-processes', type=int, default=2, metavar='N',
+                       help='number of long-lived CVC4 processes to keep (default 2)')
 
         s.add_argument('--smoke-test-solver', action=utils.YesNoAction, default=False,
                        help='(for debugging mypyvy itself) double check countermodels by evaluation')
@@ -608,9 +863,19 @@ def parse_args(args: List[str]) -> utils.MypyvyArgs:
                                   help="when verifying inductiveness, check only these transitions")
     verify_subparser.add_argument('--check-invariant', default=None, nargs='+',
                                   help="when verifying inductiveness, check only these invariants")
+    verify_subparser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                                  help='check each (transition, invariant) pair in a separate solver, '
+                                       'using N worker processes')
+    verify_subparser.add_argument('--incremental', default=None, metavar='FILE',
+                                  help='store the proof of each obligation in FILE, and only re-check obligations '
+                                       'whose proofs depend on declarations that changed since the last run '
+                                       '(obligations are checked sequentially, ignoring --jobs)')
     verify_subparser.add_argument('--json', action='store_true',
                                   help="output machine-parseable verification results in JSON format")
 
+    updr_subparser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                                help='push frame conjuncts and search for predecessors of each transition '
+                                     'in parallel, using N worker processes')
     updr_subparser.add_argument('--checkpoint-in',
                                 help='start from internal state as stored in given file')
     updr_subparser.add_argument('--checkpoint-out',
@@ -619,6 +884,9 @@ def parse_args(args: List[str]) -> utils.MypyvyArgs:
     bmc_subparser.add_argument('--safety', help='property to check')
     bmc_subparser.add_argument('--depth', type=int, default=3, metavar='N',
                                help='number of steps to check')
+    bmc_subparser.add_argument('--depth-range', type=int, nargs=2, metavar=('MIN', 'MAX'),
+                               help='check each depth from MIN to MAX (overrides --depth), '
+                               'reporting the time taken by each depth and the first failing depth')
     bmc_subparser.add_argument('--relax', action=utils.YesNoAction, default=False,
                                help='relaxed semantics (domain can decrease)')
 
@@ -648,52 +916,11 @@ def parse_program(input: str, forbid_rebuild: bool = False, filename: Optional[s
     prog.input = input
     return prog
 
-def main() -> None:
-    # limit RAM usage to 45 GB
-    # TODO: make this a command line argument
-    # TODO: not sure if this is actually the right way to do this (also, what about child processes?)
-    resource.setrlimit(resource.RLIMIT_AS, (90 * 10**9, 90 * 10**9))
-
-    utils.args = parse_args(sys.argv[1:])
-
-    if utils.args.log_xml:
-        fmt = '%(message)s'
-    elif utils.args.log_time:
-        fmt = '%(asctime)s %(filename)s:%(lineno)d: %(message)s'
-    else:
-        fmt = '%(filename)s:%(lineno)d: %(message)s'
-
-    if 'json' in utils.args and utils.args.json:
-        utils.args.log = 'critical'
-
-    utils.logger.setLevel(getattr(logging, utils.args.log.upper(), None))
-    handler = logging.StreamHandler(stream=sys.stdout)
-    handler.terminator = ''
-    handler.setFormatter(MyFormatter(fmt))
-    logging.root.addHandler(handler)
-
-    if utils.args.print_cmdline:
-        utils.logger.always_print(' '.join([sys.executable] + sys.argv))
-        utils.logger.info('Running mypyvy with the following options:')
-        for k, v in sorted(vars(utils.args).items()):
-            utils.logger.info(f'    {k} = {v!r}')
-
-    utils.logger.info('setting seed to %d' % utils.args.seed)
-    z3.set_param('smt.random_seed', utils.args.seed)
-    z3.set_param('sat.random_seed', utils.args.seed)
-
-    # utils.logger.info('enable z3 macro finder')
-    # z3.set_param('smt.macro_finder', True)
-
-    if utils.args.timeout is not None:
-        utils.logger.info('setting z3 timeout to %s' % utils.args.timeout)
-        z3.set_param('timeout', utils.args.timeout)
-
+def parse_and_typecheck(input: str, filename: str) -> Program:
+    '''Parse and typecheck the input file, exiting if there are errors.'''
     pre_parse_error_count = utils.error_count
 
-    with open(utils.args.filename) as f:
-        prog = parse_program(f.read(), forbid_rebuild=utils.args.forbid_parser_rebuild,
-                             filename=utils.args.filename)
+    prog = parse_program(input, forbid_rebuild=utils.args.forbid_parser_rebuild, filename=filename)
 
     if utils.error_count > pre_parse_error_count:
         utils.logger.always_print('program has syntax errors.')
@@ -726,13 +953,128 @@ def main() -> None:
         utils.logger.always_print('program has resolution errors.')
         utils.exit(1)
 
+    return prog
+
+def configure_logging() -> None:
+    '''Send log messages to the current sys.stdout, with the level and format given by utils.args.'''
+    if utils.args.log_xml:
+        fmt = '%(message)s'
+    elif utils.args.log_time:
+        fmt = '%(asctime)s %(filename)s:%(lineno)d: %(message)s'
+    else:
+        fmt = '%(filename)s:%(lineno)d: %(message)s'
+
+    if 'json' in utils.args and utils.args.json:
+        utils.args.log = 'critical'
+
+    utils.logger.setLevel(getattr(logging, utils.args.log.upper(), None))
+    # the handler is looked up by name, rather than stored in this module, because this module is imported
+    # a second time (as mypyvy rather than __main__) when it is run as a script that uses the server
+    handler = next((cast(logging.StreamHandler, h) for h in logging.root.handlers if h.get_name() == 'mypyvy'), None)
+    if handler is None:
+        handler = logging.StreamHandler(stream=sys.stdout)
+        handler.set_name('mypyvy')
+        handler.terminator = ''
+        logging.root.addHandler(handler)
+    else:
+        handler.setStream(sys.stdout)
+    handler.setFormatter(MyFormatter(fmt))
+
+def configure_z3() -> None:
+    '''Set z3's global parameters as given by utils.args.'''
+    import z3
+
+    utils.logger.info('setting seed to %d' % utils.args.seed)
+    z3.set_param('smt.random_seed', utils.args.seed)
+    z3.set_param('sat.random_seed', utils.args.seed)
+
+    # utils.logger.info('enable z3 macro finder')
+    # z3.set_param('smt.macro_finder', True)
+
+    if utils.args.timeout is not None:
+        utils.logger.info('setting z3 timeout to %s' % utils.args.timeout)
+        z3.set_param('timeout', utils.args.timeout)
+
+def main() -> None:
+    # limit RAM usage to 45 GB
+    # TODO: make this a command line argument
+    # TODO: not sure if this is actually the right way to do this (also, what about child processes?)
+    resource.setrlimit(resource.RLIMIT_AS, (90 * 10**9, 90 * 10**9))
+
+    utils.args = parse_args(sys.argv[1:])
+
+    configure_logging()
+
+    if utils.args.print_cmdline:
+        utils.logger.always_print(' '.join([sys.executable] + sys.argv))
+        utils.logger.info('Running mypyvy with the following options:')
+        for k, v in sorted(vars(utils.args).items()):
+            utils.logger.info(f'    {k} = {v!r}')
+
+    if utils.args.subcommand == 'serve':
+        import server
+        server.serve(utils.args.filename)
+        utils.exit(0)
+
+    phases: List[Tuple[str, float]] = []
+    start = time.perf_counter()
+
+    with open(utils.args.filename) as f:
+        contents = f.read()
+
+    # the cached program is already typechecked, so it is not used when the program is printed before typechecking
+    cache: Optional[program_cache.ProgramCache] = None
+    if utils.args.program_cache is not None and utils.args.print_program is None:
+        cache = program_cache.ProgramCache(utils.args.program_cache)
+    cached_prog = cache.load(utils.args.filename, contents) if cache is not None else None
+    if cached_prog is not None:
+        prog = cached_prog
+        phases.append(('load program from cache', time.perf_counter() - start))
+    else:
+        prog = parse_and_typecheck(contents, utils.args.filename)
+        phases.append(('parse and typecheck program', time.perf_counter() - start))
+        if cache is not None:
+            cache.store(utils.args.filename, contents, prog)
+
     syntax.the_program = prog
 
-    s = Solver(use_cvc4=utils.args.cvc4)
+    s: Optional[Solver] = None
+    if utils.args.needs_solver or utils.args.ipython:
+        start = time.perf_counter()
+        from logic import Solver
+
+        configure_z3()
+        s = Solver(use_cvc4=utils.args.cvc4)
+        phases.append(('import z3 and create solver', time.perf_counter() - start))
 
-    utils.args.main(s)
+    main_func: Callable[[Solver], Any] = utils.args.main
+    if isinstance(main_func, LazyMain):
+        start = time.perf_counter()
+        main_func = main_func.resolve()
+        phases.append((f'import {utils.args.main!r}', time.perf_counter() - start))
+
+    if utils.args.startup_profile:
+        import import_profile
+        utils.logger.always_print(import_profile.report(phases))
+
+    # subcommands that do not need a solver do not use their argument
+    try:
+        main_func(cast('Solver', s))
+    finally:
+        if s is not None:
+            import query_profile
+            query_profile.report()
+
+    if s is not None:
+        import solver_portfolio
+        import translator
+        if solver_portfolio.wins:
+            utils.logger.always_print('portfolio wins: ' +
+                                      ', '.join(f'{name}: {n}' for name, n in solver_portfolio.wins.most_common()))
+        utils.logger.info(f'translation cache: {translator.translation_cache}')
 
     if utils.args.ipython:
+        assert s is not None
         ipython(s)
 
     utils.exit(1 if utils.error_count > 0 else 0)
@@ -833,12 +833,17 @@ def p_error(t: Any) -> None:
         t.col = l.lexpos - l.bol
         utils.print_error(t, 'syntax error near EOF')
 
+# The parse tables of the two parsers are generated into separate modules (parsetab_program.py and
+# parsetab_expr.py), which are checked in, so that they are only regenerated when the grammar changes.
+# (When both parsers shared one module, each overwrote the other's tables, so most runs rebuilt them.)
+
 program_parser = None
 def get_parser(forbid_rebuild: bool = False) -> ply.yacc.LRParser:
     global program_parser
     if not program_parser:
         # intentionally don's pass optimize=True here, because that disables the signature check
-        program_parser = ply.yacc.yacc(start='program', debug=False)
+        program_parser = ply.yacc.yacc(start='program', debug=False, tabmodule='parsetab_program',
+                                       forbid_rebuild=forbid_rebuild)
 
     return program_parser
 
@@ -847,7 +852,8 @@ expr_parser = None
 def get_expr_parser() -> ply.yacc.LRParser:
     global expr_parser
     if not expr_parser:
-        expr_parser = ply.yacc.yacc(start='expr', debug=False, errorlog=ply.yacc.NullLogger())
+        expr_parser = ply.yacc.yacc(start='expr', debug=False, tabmodule='parsetab_expr',
+                                    errorlog=ply.yacc.NullLogger())
 
     return expr_parser
 
@@ -0,0 +1,144 @@
+
+# parsetab_expr.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'exprrightDOTnonassocELSEnonassocINnonassocIFFrightIMPLIESleftPIPEleftAMPERSANDnonassocEQUALNOTEQNOTEQ2GEGTLELTleftPLUSSUBleftSTARrightBANGTILDEAMPERSAND ANNOT ANY ASSERT AXIOM BANG BOOL COLON COMMA CONSTANT DEFINITION DERIVED DISTINCT DOT ELSE EQUAL EXISTS FALSE FORALL FUNCTION GE GT ID IF IFF IMMUTABLE IMPLIES IN INIT INT INTLIT INVARIANT LBRACE LBRACKET LE LET LPAREN LT MODIFIES MUTABLE NEW NOTEQ NOTEQ2 ONESTATE PIPE PLUS RBRACE RBRACKET RELATION RPAREN SAFETY SAT SKETCH SORT STAR SUB THEN THEOREM TILDE TRACE TRANSITION TRUE TWOSTATE UNSAT ZEROSTATEprogram : declsdecls : emptydecls : decls declid : IDoptional_annotation_args : emptyoptional_annotation_args : LPAREN annotation_args RPARENannotation_args : idannotation_args : annotation_args COMMA idannotation : ANNOT optional_annotation_argsannotations : emptyannotations : annotations annotationdecl : SORT id annotationsmut : MUTABLE\n           | IMMUTABLEarity : emptyarity : LPAREN RPARENarity : LPAREN arity_nonempty RPARENarity_nonempty : sortarity_nonempty : arity_nonempty COMMA sortsort : BOOLsort : INTsort : iddecl : mut RELATION id arity annotationsdecl : DERIVED RELATION id arity annotations COLON exprconstant_decl : mut CONSTANT id COLON sort annotationsdecl : constant_decldecl : mut FUNCTION id LPAREN arity_nonempty RPAREN COLON sort annotationsaxiom_decl : AXIOM opt_name exprdecl : axiom_decldecl : INIT opt_name exprsafety_or_invariant_keyword : SAFETYsafety_or_invariant_keyword : INVARIANTsafety_or_invariant_keyword : SKETCH INVARIANTinvariant_decl : safety_or_invariant_keyword opt_name exprdecl : invariant_declopt_name : emptyopt_name : LBRACKET id RBRACKETquant : FORALL\n             | EXISTSexpr : quant sortedvars DOT exprsortedvar : id COLON sortsortedvar : idsortedvars0 : sortedvarssortedvars0 : emptysortedvars : sortedvarsortedvars : sortedvars COMMA sortedvarexpr : INTLITexpr : TRUEexpr : FALSEexpr : BANG expr\n            | TILDE exprexpr : id LPAREN args RPARENexpr : AMPERSAND exprexpr : expr AMPERSAND exprexpr : PIPE exprexpr : expr PIPE exprexpr : DISTINCT LPAREN args1 RPARENexpr : expr IFF exprexpr : expr IMPLIES exprexpr : expr EQUAL exprexpr : expr NOTEQ expr\n            | expr NOTEQ2 exprexpr : expr GE exprexpr : expr GT exprexpr : expr LE exprexpr : expr LT exprexpr : expr PLUS exprexpr : expr SUB exprexpr : expr STAR exprexpr : NEW LPAREN expr RPARENargs : emptyargs : args1args1 : exprargs1 : args1 COMMA exprexpr : idexpr : LPAREN expr RPARENexpr : IF expr THEN expr ELSE exprexpr : LET sortedvar EQUAL expr IN exprparams : sortedvars0mod : idmodlist : modmodlist : modlist COMMA modmods : MODIFIES modlistdecl : TRANSITION id LPAREN params RPAREN definition_bodydefinition_body : mods exprdefinition_body : EQUAL exprkstate : ZEROSTATE\n              | ONESTATE\n              | TWOSTATE\n              | emptydecl : kstate THEOREM opt_name exprdecl : kstate DEFINITION id LPAREN params RPAREN definition_bodytrace_transition : ANY TRANSITIONoptional_tcall_args : emptytcall_args : emptytcall_args : tcall_args1tcall_arg : STARtcall_arg : exprtcall_args1 : tcall_argtcall_args1 : tcall_args1 COMMA tcall_argoptional_tcall_args : LPAREN tcall_args RPARENtrace_transition : trace_transition_callstrace_transition_calls : trace_transition_calltrace_transition_calls : trace_transition_calls PIPE trace_transition_calltrace_transition_call : ID optional_tcall_argstrace_component : ASSERT exprtrace_component : ASSERT INITtrace_component : trace_transitiontrace_components : emptytrace_components : trace_components trace_componentsatunsat : SAT\n                | UNSATdecl : satunsat TRACE LBRACE trace_components RBRACEempty :'
+    
+_lr_action_items = {'INTLIT':([0,6,7,9,10,11,14,19,20,21,22,23,24,25,26,27,28,29,30,31,32,38,42,43,60,70,71,79,85,86,],[3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,]),'TRUE':([0,6,7,9,10,11,14,19,20,21,22,23,24,25,26,27,28,29,30,31,32,38,42,43,60,70,71,79,85,86,],[4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,4,]),'FALSE':([0,6,7,9,10,11,14,19,20,21,22,23,24,25,26,27,28,29,30,31,32,38,42,43,60,70,71,79,85,86,],[5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,5,]),'BANG':([0,6,7,9,10,11,14,19,20,21,22,23,24,25,26,27,28,29,30,31,32,38,42,43,60,70,71,79,85,86,],[6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,6,]),'TILDE':([0,6,7,9,10,11,14,19,20,21,22,23,24,25,26,27,28,29,30,31,32,38,42,43,60,70,71,79,85,86,],[7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,7,]),'AMPERSAND':([0,1,3,4,5,6,7,8,9,10,11,14,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,36,37,38,39,40,41,42,43,44,46,47,48,49,50,51,52,53,54,55,56,57,58,59,60,66,67,69,70,71,72,78,79,80,81,82,83,84,85,86,87,88,],[10,19,-47,-48,-49,10,10,-75,10,10,10,10,-4,10,10,10,10,10,10,10,10,10,10,10,10,10,10,-50,-51,10,19,-53,19,10,10,19,-54,19,19,19,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,10,19,-76,19,10,10,19,-52,10,-57,-70,19,19,19,10,10,19,19,]),'PIPE':([0,1,3,4,5,6,7,8,9,10,11,14,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,36,37,38,39,40,41,42,43,44,46,47,48,49,50,51,52,53,54,55,56,57,58,59,60,66,67,69,70,71,72,78,79,80,81,82,83,84,85,86,87,88,],[11,20,-47,-48,-49,11,11,-75,11,11,11,11,-4,11,11,11,11,11,11,11,11,11,11,11,11,11,11,-50,-51,11,20,-53,-55,11,11,20,-54,-56,20,20,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,11,20,-76,20,11,11,20,-52,11,-57,-70,20,20,20,11,11,20,20,]),'DISTINCT':([0,6,7,9,10,11,14,19,20,21,22,23,24,25,26,27,28,29,30,31,32,38,42,43,60,70,71,79,85,86,],[12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,]),'NEW':([0,6,7,9,10,11,14,19,20,21,22,23,24,25,26,27,28,29,30,31,32,38,42,43,60,70,71,79,85,86,],[13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,]),'LPAREN':([0,6,7,8,9,10,11,12,13,14,18,19,20,21,22,23,24,25,26,27,28,29,30,31,32,38,42,43,60,70,71,79,85,86,],[9,9,9,38,9,9,9,42,43,9,-4,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,9,]),'IF':([0,6,7,9,10,11,14,19,20,21,22,23,24,25,26,27,28,29,30,31,32,38,42,43,60,70,71,79,85,86,],[14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,]),'LET':([0,6,7,9,10,11,14,19,20,21,22,23,24,25,26,27,28,29,30,31,32,38,42,43,60,70,71,79,85,86,],[15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,]),'FORALL':([0,6,7,9,10,11,14,19,20,21,22,23,24,25,26,27,28,29,30,31,32,38,42,43,60,70,71,79,85,86,],[16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,]),'EXISTS':([0,6,7,9,10,11,14,19,20,21,22,23,24,25,26,27,28,29,30,31,32,38,42,43,60,70,71,79,85,86,],[17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,]),'ID':([0,2,6,7,9,10,11,14,15,16,17,19,20,21,22,23,24,25,26,27,28,29,30,31,32,38,42,43,60,61,62,70,71,79,85,86,],[18,18,18,18,18,18,18,18,18,-38,-39,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,]),'$end':([1,3,4,5,8,18,36,37,40,41,46,47,48,49,50,51,52,53,54,55,56,57,58,59,67,72,78,80,81,87,88,],[0,-47,-48,-49,-75,-4,-50,-51,-53,-55,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-40,-52,-57,-70,-77,-78,]),'IFF':([1,3,4,5,8,18,36,37,39,40,41,44,46,47,48,49,50,51,52,53,54,55,56,57,58,59,66,67,69,72,78,80,81,82,83,84,87,88,],[21,-47,-48,-49,-75,-4,-50,-51,21,-53,-55,21,-54,-56,None,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,21,-76,21,21,-52,-57,-70,21,21,21,21,21,]),'IMPLIES':([1,3,4,5,8,18,36,37,39,40,41,44,46,47,48,49,50,51,52,53,54,55,56,57,58,59,66,67,69,72,78,80,81,82,83,84,87,88,],[22,-47,-48,-49,-75,-4,-50,-51,22,-53,-55,22,-54,-56,22,22,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,22,-76,22,22,-52,-57,-70,22,22,22,22,22,]),'EQUAL':([1,3,4,5,8,18,35,36,37,39,40,41,44,45,46,47,48,49,50,51,52,53,54,55,56,57,58,59,66,67,69,72,74,75,76,77,78,80,81,82,83,84,87,88,],[23,-47,-48,-49,-75,-4,-42,-50,-51,23,23,23,23,71,23,23,23,23,None,None,None,None,None,None,None,-67,-68,-69,23,-76,23,23,-22,-41,-20,-21,-52,-57,-70,23,23,23,23,23,]),'NOTEQ':([1,3,4,5,8,18,36,37,39,40,41,44,46,47,48,49,50,51,52,53,54,55,56,57,58,59,66,67,69,72,78,80,81,82,83,84,87,88,],[24,-47,-48,-49,-75,-4,-50,-51,24,24,24,24,24,24,24,24,None,None,None,None,None,None,None,-67,-68,-69,24,-76,24,24,-52,-57,-70,24,24,24,24,24,]),'NOTEQ2':([1,3,4,5,8,18,36,37,39,40,41,44,46,47,48,49,50,51,52,53,54,55,56,57,58,59,66,67,69,72,78,80,81,82,83,84,87,88,],[25,-47,-48,-49,-75,-4,-50,-51,25,25,25,25,25,25,25,25,None,None,None,None,None,None,None,-67,-68,-69,25,-76,25,25,-52,-57,-70,25,25,25,25,25,]),'GE':([1,3,4,5,8,18,36,37,39,40,41,44,46,47,48,49,50,51,52,53,54,55,56,57,58,59,66,67,69,72,78,80,81,82,83,84,87,88,],[26,-47,-48,-49,-75,-4,-50,-51,26,26,26,26,26,26,26,26,None,None,None,None,None,None,None,-67,-68,-69,26,-76,26,26,-52,-57,-70,26,26,26,26,26,]),'GT':([1,3,4,5,8,18,36,37,39,40,41,44,46,47,48,49,50,51,52,53,54,55,56,57,58,59,66,67,69,72,78,80,81,82,83,84,87,88,],[27,-47,-48,-49,-75,-4,-50,-51,27,27,27,27,27,27,27,27,None,None,None,None,None,None,None,-67,-68,-69,27,-76,27,27,-52,-57,-70,27,27,27,27,27,]),'LE':([1,3,4,5,8,18,36,37,39,40,41,44,46,47,48,49,50,51,52,53,54,55,56,57,58,59,66,67,69,72,78,80,81,82,83,84,87,88,],[28,-47,-48,-49,-75,-4,-50,-51,28,28,28,28,28,28,28,28,None,None,None,None,None,None,None,-67,-68,-69,28,-76,28,28,-52,-57,-70,28,28,28,28,28,]),'LT':([1,3,4,5,8,18,36,37,39,40,41,44,46,47,48,49,50,51,52,53,54,55,56,57,58,59,66,67,69,72,78,80,81,82,83,84,87,88,],[29,-47,-48,-49,-75,-4,-50,-51,29,29,29,29,29,29,29,29,None,None,None,None,None,None,None,-67,-68,-69,29,-76,29,29,-52,-57,-70,29,29,29,29,29,]),'PLUS':([1,3,4,5,8,18,36,37,39,40,41,44,46,47,48,49,50,51,52,53,54,55,56,57,58,59,66,67,69,72,78,80,81,82,83,84,87,88,],[30,-47,-48,-49,-75,-4,-50,-51,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,-67,-68,-69,30,-76,30,30,-52,-57,-70,30,30,30,30,30,]),'SUB':([1,3,4,5,8,18,36,37,39,40,41,44,46,47,48,49,50,51,52,53,54,55,56,57,58,59,66,67,69,72,78,80,81,82,83,84,87,88,],[31,-47,-48,-49,-75,-4,-50,-51,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,-67,-68,-69,31,-76,31,31,-52,-57,-70,31,31,31,31,31,]),'STAR':([1,3,4,5,8,18,36,37,39,40,41,44,46,47,48,49,50,51,52,53,54,55,56,57,58,59,66,67,69,72,78,80,81,82,83,84,87,88,],[32,-47,-48,-49,-75,-4,-50,-51,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,-69,32,-76,32,32,-52,-57,-70,32,32,32,32,32,]),'RPAREN':([3,4,5,8,18,36,37,38,39,40,41,46,47,48,49,50,51,52,53,54,55,56,57,58,59,63,64,65,66,67,68,69,72,78,80,81,84,87,88,],[-47,-48,-49,-75,-4,-50,-51,-114,67,-53,-55,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,78,-71,-72,-73,-76,80,81,-40,-52,-57,-70,-74,-77,-78,]),'THEN':([3,4,5,8,18,36,37,40,41,44,46,47,48,49,50,51,52,53,54,55,56,57,58,59,67,72,78,80,81,87,88,],[-47,-48,-49,-75,-4,-50,-51,-53,-55,70,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-40,-52,-57,-70,-77,-78,]),'COMMA':([3,4,5,8,18,33,34,35,36,37,40,41,46,47,48,49,50,51,52,53,54,55,56,57,58,59,65,66,67,68,72,73,74,75,76,77,78,80,81,84,87,88,],[-47,-48,-49,-75,-4,61,-45,-42,-50,-51,-53,-55,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,79,-73,-76,79,-40,-46,-22,-41,-20,-21,-52,-57,-70,-74,-77,-78,]),'ELSE':([3,4,5,8,18,36,37,40,41,46,47,48,49,50,51,52,53,54,55,56,57,58,59,67,72,78,80,81,82,87,88,],[-47,-48,-49,-75,-4,-50,-51,-53,-55,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-40,-52,-57,-70,85,-77,-78,]),'IN':([3,4,5,8,18,36,37,40,41,46,47,48,49,50,51,52,53,54,55,56,57,58,59,67,72,78,80,81,83,87,88,],[-47,-48,-49,-75,-4,-50,-51,-53,-55,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-40,-52,-57,-70,86,-77,-78,]),'COLON':([18,35,],[-4,62,]),'DOT':([18,33,34,35,73,74,75,76,77,],[-4,60,-45,-42,-46,-22,-41,-20,-21,]),'BOOL':([62,],[76,]),'INT':([62,],[77,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'expr':([0,6,7,9,10,11,14,19,20,21,22,23,24,25,26,27,28,29,30,31,32,38,42,43,60,70,71,79,85,86,],[1,36,37,39,40,41,44,46,47,48,49,50,51,52,53,54,55,56,57,58,59,66,66,69,72,82,83,84,87,88,]),'quant':([0,6,7,9,10,11,14,19,20,21,22,23,24,25,26,27,28,29,30,31,32,38,42,43,60,70,71,79,85,86,],[2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,]),'id':([0,2,6,7,9,10,11,14,15,19,20,21,22,23,24,25,26,27,28,29,30,31,32,38,42,43,60,61,62,70,71,79,85,86,],[8,35,8,8,8,8,8,8,35,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,35,74,8,8,8,8,8,]),'sortedvars':([2,],[33,]),'sortedvar':([2,15,61,],[34,45,73,]),'args':([38,],[63,]),'empty':([38,],[64,]),'args1':([38,42,],[65,68,]),'sort':([62,],[75,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> expr","S'",1,None,None,None),
+  ('program -> decls','program',1,'p_program','parser.py',181),
+  ('decls -> empty','decls',1,'p_decls_empty','parser.py',186),
+  ('decls -> decls decl','decls',2,'p_decls_decl','parser.py',190),
+  ('id -> ID','id',1,'p_id','parser.py',194),
+  ('optional_annotation_args -> empty','optional_annotation_args',1,'p_optional_annotation_args_empty','parser.py',198),
+  ('optional_annotation_args -> LPAREN annotation_args RPAREN','optional_annotation_args',3,'p_optional_annotation_args_nonempty','parser.py',202),
+  ('annotation_args -> id','annotation_args',1,'p_annotation_args_one','parser.py',206),
+  ('annotation_args -> annotation_args COMMA id','annotation_args',3,'p_annotation_args_more','parser.py',210),
+  ('annotation -> ANNOT optional_annotation_args','annotation',2,'p_annotation','parser.py',259),
+  ('annotations -> empty','annotations',1,'p_annotations_empty','parser.py',268),
+  ('annotations -> annotations annotation','annotations',2,'p_annotations_one','parser.py',272),
+  ('decl -> SORT id annotations','decl',3,'p_decl_sort','parser.py',276),
+  ('mut -> MUTABLE','mut',1,'p_decl_mut','parser.py',286),
+  ('mut -> IMMUTABLE','mut',1,'p_decl_mut','parser.py',287),
+  ('arity -> empty','arity',1,'p_arity_empty','parser.py',291),
+  ('arity -> LPAREN RPAREN','arity',2,'p_arity_paren_empty','parser.py',295),
+  ('arity -> LPAREN arity_nonempty RPAREN','arity',3,'p_arity_nonempty','parser.py',299),
+  ('arity_nonempty -> sort','arity_nonempty',1,'p_arity_nonempty_one','parser.py',303),
+  ('arity_nonempty -> arity_nonempty COMMA sort','arity_nonempty',3,'p_arity_nonempty_more','parser.py',307),
+  ('sort -> BOOL','sort',1,'p_sort_bool','parser.py',311),
+  ('sort -> INT','sort',1,'p_sort_int','parser.py',316),
+  ('sort -> id','sort',1,'p_sort_uninterp','parser.py',321),
+  ('decl -> mut RELATION id arity annotations','decl',5,'p_decl_relation','parser.py',326),
+  ('decl -> DERIVED RELATION id arity annotations COLON expr','decl',7,'p_decl_relation_derived','parser.py',343),
+  ('constant_decl -> mut CONSTANT id COLON sort annotations','constant_decl',6,'p_constant_decl','parser.py',356),
+  ('decl -> constant_decl','decl',1,'p_decl_constant_decl','parser.py',367),
+  ('decl -> mut FUNCTION id LPAREN arity_nonempty RPAREN COLON sort annotations','decl',9,'p_decl_function','parser.py',371),
+  ('axiom_decl -> AXIOM opt_name expr','axiom_decl',3,'p_axiom_decl','parser.py',383),
+  ('decl -> axiom_decl','decl',1,'p_decl_axiom_decl','parser.py',390),
+  ('decl -> INIT opt_name expr','decl',3,'p_decl_init','parser.py',394),
+  ('safety_or_invariant_keyword -> SAFETY','safety_or_invariant_keyword',1,'p_safety_or_invariant_keyword_safety','parser.py',401),
+  ('safety_or_invariant_keyword -> INVARIANT','safety_or_invariant_keyword',1,'p_safety_or_invariant_keyword_invariant','parser.py',405),
+  ('safety_or_invariant_keyword -> SKETCH INVARIANT','safety_or_invariant_keyword',2,'p_safety_or_invariant_keyword_sketch_invariant','parser.py',409),
+  ('invariant_decl -> safety_or_invariant_keyword opt_name expr','invariant_decl',3,'p_invariant_decl','parser.py',413),
+  ('decl -> invariant_decl','decl',1,'p_decl_invariant','parser.py',424),
+  ('opt_name -> empty','opt_name',1,'p_opt_name_none','parser.py',428),
+  ('opt_name -> LBRACKET id RBRACKET','opt_name',3,'p_opt_name_some','parser.py',432),
+  ('quant -> FORALL','quant',1,'p_quant','parser.py',436),
+  ('quant -> EXISTS','quant',1,'p_quant','parser.py',437),
+  ('expr -> quant sortedvars DOT expr','expr',4,'p_expr_quantifier','parser.py',441),
+  ('sortedvar -> id COLON sort','sortedvar',3,'p_sortedvar','parser.py',449),
+  ('sortedvar -> id','sortedvar',1,'p_sortedvar_nosort','parser.py',455),
+  ('sortedvars0 -> sortedvars','sortedvars0',1,'p_sortedvars0_one','parser.py',460),
+  ('sortedvars0 -> empty','sortedvars0',1,'p_sortedvars0_zero','parser.py',464),
+  ('sortedvars -> sortedvar','sortedvars',1,'p_sortedvars_one','parser.py',468),
+  ('sortedvars -> sortedvars COMMA sortedvar','sortedvars',3,'p_sortedvars_more','parser.py',472),
+  ('expr -> INTLIT','expr',1,'p_expr_intlit','parser.py',476),
+  ('expr -> TRUE','expr',1,'p_expr_true','parser.py',480),
+  ('expr -> FALSE','expr',1,'p_expr_false','parser.py',484),
+  ('expr -> BANG expr','expr',2,'p_expr_not','parser.py',488),
+  ('expr -> TILDE expr','expr',2,'p_expr_not','parser.py',489),
+  ('expr -> id LPAREN args RPAREN','expr',4,'p_expr_app','parser.py',494),
+  ('expr -> AMPERSAND expr','expr',2,'p_expr_and1','parser.py',500),
+  ('expr -> expr AMPERSAND expr','expr',3,'p_expr_and','parser.py',504),
+  ('expr -> PIPE expr','expr',2,'p_expr_or1','parser.py',514),
+  ('expr -> expr PIPE expr','expr',3,'p_expr_or','parser.py',518),
+  ('expr -> DISTINCT LPAREN args1 RPAREN','expr',4,'p_expr_distinct','parser.py',529),
+  ('expr -> expr IFF expr','expr',3,'p_expr_iff','parser.py',533),
+  ('expr -> expr IMPLIES expr','expr',3,'p_expr_implies','parser.py',540),
+  ('expr -> expr EQUAL expr','expr',3,'p_expr_eq','parser.py',547),
+  ('expr -> expr NOTEQ expr','expr',3,'p_expr_noteq','parser.py',554),
+  ('expr -> expr NOTEQ2 expr','expr',3,'p_expr_noteq','parser.py',555),
+  ('expr -> expr GE expr','expr',3,'p_expr_ge','parser.py',562),
+  ('expr -> expr GT expr','expr',3,'p_expr_gt','parser.py',569),
+  ('expr -> expr LE expr','expr',3,'p_expr_le','parser.py',576),
+  ('expr -> expr LT expr','expr',3,'p_expr_lt','parser.py',583),
+  ('expr -> expr PLUS expr','expr',3,'p_expr_plus','parser.py',590),
+  ('expr -> expr SUB expr','expr',3,'p_expr_sub','parser.py',597),
+  ('expr -> expr STAR expr','expr',3,'p_expr_mult','parser.py',604),
+  ('expr -> NEW LPAREN expr RPAREN','expr',4,'p_expr_new','parser.py',611),
+  ('args -> empty','args',1,'p_args_empty','parser.py',616),
+  ('args -> args1','args',1,'p_args_at_least_one','parser.py',620),
+  ('args1 -> expr','args1',1,'p_args1_one','parser.py',624),
+  ('args1 -> args1 COMMA expr','args1',3,'p_args1_more','parser.py',628),
+  ('expr -> id','expr',1,'p_expr_id','parser.py',632),
+  ('expr -> LPAREN expr RPAREN','expr',3,'p_expr_paren','parser.py',637),
+  ('expr -> IF expr THEN expr ELSE expr','expr',6,'p_expr_if','parser.py',641),
+  ('expr -> LET sortedvar EQUAL expr IN expr','expr',6,'p_expr_let','parser.py',648),
+  ('params -> sortedvars0','params',1,'p_params','parser.py',655),
+  ('mod -> id','mod',1,'p_mod','parser.py',659),
+  ('modlist -> mod','modlist',1,'p_modlist_one','parser.py',664),
+  ('modlist -> modlist COMMA mod','modlist',3,'p_modlist_more','parser.py',668),
+  ('mods -> MODIFIES modlist','mods',2,'p_mods','parser.py',672),
+  ('decl -> TRANSITION id LPAREN params RPAREN definition_body','decl',6,'p_decl_transition','parser.py',676),
+  ('definition_body -> mods expr','definition_body',2,'p_decl_definition_body_mods_expr','parser.py',686),
+  ('definition_body -> EQUAL expr','definition_body',2,'p_decl_definition_body_expr','parser.py',690),
+  ('kstate -> ZEROSTATE','kstate',1,'p_kstate','parser.py',704),
+  ('kstate -> ONESTATE','kstate',1,'p_kstate','parser.py',705),
+  ('kstate -> TWOSTATE','kstate',1,'p_kstate','parser.py',706),
+  ('kstate -> empty','kstate',1,'p_kstate','parser.py',707),
+  ('decl -> kstate THEOREM opt_name expr','decl',4,'p_decl_theorem','parser.py',714),
+  ('decl -> kstate DEFINITION id LPAREN params RPAREN definition_body','decl',7,'p_decl_definition','parser.py',721),
+  ('trace_transition -> ANY TRANSITION','trace_transition',2,'p_trace_transition_any','parser.py',737),
+  ('optional_tcall_args -> empty','optional_tcall_args',1,'p_optional_tcall_args_none','parser.py',741),
+  ('tcall_args -> empty','tcall_args',1,'p_tcall_args_empty','parser.py',745),
+  ('tcall_args -> tcall_args1','tcall_args',1,'p_tcall_args_nonempty','parser.py',749),
+  ('tcall_arg -> STAR','tcall_arg',1,'p_tcall_arg_star','parser.py',753),
+  ('tcall_arg -> expr','tcall_arg',1,'p_tcall_arg_expr','parser.py',757),
+  ('tcall_args1 -> tcall_arg','tcall_args1',1,'p_tcall_args1_arg','parser.py',761),
+  ('tcall_args1 -> tcall_args1 COMMA tcall_arg','tcall_args1',3,'p_tcall_args1_more','parser.py',765),
+  ('optional_tcall_args -> LPAREN tcall_args RPAREN','optional_tcall_args',3,'p_optional_tcall_args_some','parser.py',769),
+  ('trace_transition -> trace_transition_calls','trace_transition',1,'p_trace_transition_calls','parser.py',773),
+  ('trace_transition_calls -> trace_transition_call','trace_transition_calls',1,'p_trace_transition_calls_one','parser.py',777),
+  ('trace_transition_calls -> trace_transition_calls PIPE trace_transition_call','trace_transition_calls',3,'p_trace_transition_calls_more','parser.py',781),
+  ('trace_transition_call -> ID optional_tcall_args','trace_transition_call',2,'p_trace_transition_call','parser.py',785),
+  ('trace_component -> ASSERT expr','trace_component',2,'p_trace_component_assert','parser.py',790),
+  ('trace_component -> ASSERT INIT','trace_component',2,'p_trace_component_assert_init','parser.py',795),
+  ('trace_component -> trace_transition','trace_component',1,'p_trace_component_transition','parser.py',799),
+  ('trace_components -> empty','trace_components',1,'p_trace_components_empty','parser.py',803),
+  ('trace_components -> trace_components trace_component','trace_components',2,'p_trace_components_component','parser.py',807),
+  ('satunsat -> SAT','satunsat',1,'p_satunsat','parser.py',811),
+  ('satunsat -> UNSAT','satunsat',1,'p_satunsat','parser.py',812),
+  ('decl -> satunsat TRACE LBRACE trace_components RBRACE','decl',5,'p_decl_trace','parser.py',816),
+  ('empty -> <empty>','empty',0,'p_empty','parser.py',821),
+]
@@ -0,0 +1,144 @@
+
+# parsetab_program.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'programrightDOTnonassocELSEnonassocINnonassocIFFrightIMPLIESleftPIPEleftAMPERSANDnonassocEQUALNOTEQNOTEQ2GEGTLELTleftPLUSSUBleftSTARrightBANGTILDEAMPERSAND ANNOT ANY ASSERT AXIOM BANG BOOL COLON COMMA CONSTANT DEFINITION DERIVED DISTINCT DOT ELSE EQUAL EXISTS FALSE FORALL FUNCTION GE GT ID IF IFF IMMUTABLE IMPLIES IN INIT INT INTLIT INVARIANT LBRACE LBRACKET LE LET LPAREN LT MODIFIES MUTABLE NEW NOTEQ NOTEQ2 ONESTATE PIPE PLUS RBRACE RBRACKET RELATION RPAREN SAFETY SAT SKETCH SORT STAR SUB THEN THEOREM TILDE TRACE TRANSITION TRUE TWOSTATE UNSAT ZEROSTATEprogram : declsdecls : emptydecls : decls declid : IDoptional_annotation_args : emptyoptional_annotation_args : LPAREN annotation_args RPARENannotation_args : idannotation_args : annotation_args COMMA idannotation : ANNOT optional_annotation_argsannotations : emptyannotations : annotations annotationdecl : SORT id annotationsmut : MUTABLE\n           | IMMUTABLEarity : emptyarity : LPAREN RPARENarity : LPAREN arity_nonempty RPARENarity_nonempty : sortarity_nonempty : arity_nonempty COMMA sortsort : BOOLsort : INTsort : iddecl : mut RELATION id arity annotationsdecl : DERIVED RELATION id arity annotations COLON exprconstant_decl : mut CONSTANT id COLON sort annotationsdecl : constant_decldecl : mut FUNCTION id LPAREN arity_nonempty RPAREN COLON sort annotationsaxiom_decl : AXIOM opt_name exprdecl : axiom_decldecl : INIT opt_name exprsafety_or_invariant_keyword : SAFETYsafety_or_invariant_keyword : INVARIANTsafety_or_invariant_keyword : SKETCH INVARIANTinvariant_decl : safety_or_invariant_keyword opt_name exprdecl : invariant_declopt_name : emptyopt_name : LBRACKET id RBRACKETquant : FORALL\n             | EXISTSexpr : quant sortedvars DOT exprsortedvar : id COLON sortsortedvar : idsortedvars0 : sortedvarssortedvars0 : emptysortedvars : sortedvarsortedvars : sortedvars COMMA sortedvarexpr : INTLITexpr : TRUEexpr : FALSEexpr : BANG expr\n            | TILDE exprexpr : id LPAREN args RPARENexpr : AMPERSAND exprexpr : expr AMPERSAND exprexpr : PIPE exprexpr : expr PIPE exprexpr : DISTINCT LPAREN args1 RPARENexpr : expr IFF exprexpr : expr IMPLIES exprexpr : expr EQUAL exprexpr : expr NOTEQ expr\n            | expr NOTEQ2 exprexpr : expr GE exprexpr : expr GT exprexpr : expr LE exprexpr : expr LT exprexpr : expr PLUS exprexpr : expr SUB exprexpr : expr STAR exprexpr : NEW LPAREN expr RPARENargs : emptyargs : args1args1 : exprargs1 : args1 COMMA exprexpr : idexpr : LPAREN expr RPARENexpr : IF expr THEN expr ELSE exprexpr : LET sortedvar EQUAL expr IN exprparams : sortedvars0mod : idmodlist : modmodlist : modlist COMMA modmods : MODIFIES modlistdecl : TRANSITION id LPAREN params RPAREN definition_bodydefinition_body : mods exprdefinition_body : EQUAL exprkstate : ZEROSTATE\n              | ONESTATE\n              | TWOSTATE\n              | emptydecl : kstate THEOREM opt_name exprdecl : kstate DEFINITION id LPAREN params RPAREN definition_bodytrace_transition : ANY TRANSITIONoptional_tcall_args : emptytcall_args : emptytcall_args : tcall_args1tcall_arg : STARtcall_arg : exprtcall_args1 : tcall_argtcall_args1 : tcall_args1 COMMA tcall_argoptional_tcall_args : LPAREN tcall_args RPARENtrace_transition : trace_transition_callstrace_transition_calls : trace_transition_calltrace_transition_calls : trace_transition_calls PIPE trace_transition_calltrace_transition_call : ID optional_tcall_argstrace_component : ASSERT exprtrace_component : ASSERT INITtrace_component : trace_transitiontrace_components : emptytrace_components : trace_components trace_componentsatunsat : SAT\n                | UNSATdecl : satunsat TRACE LBRACE trace_components RBRACEempty :'
+    
+_lr_action_items = {'SORT':([0,2,3,4,8,9,11,28,29,44,45,46,50,52,53,54,57,72,73,74,75,76,77,99,100,103,104,114,118,119,121,122,125,126,127,129,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,159,169,172,174,177,179,180,183,195,199,203,204,208,217,218,219,223,],[-114,5,-2,-3,-26,-29,-35,-114,-4,-12,-10,-114,-30,-47,-48,-49,-75,-28,-34,-11,-114,-114,-15,-50,-51,-53,-55,-91,-9,-5,-23,-16,-20,-21,-22,-114,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-113,-17,-25,-40,-52,-57,-70,-84,-6,-24,-85,-86,-92,-114,-77,-78,-27,]),'DERIVED':([0,2,3,4,8,9,11,28,29,44,45,46,50,52,53,54,57,72,73,74,75,76,77,99,100,103,104,114,118,119,121,122,125,126,127,129,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,159,169,172,174,177,179,180,183,195,199,203,204,208,217,218,219,223,],[-114,7,-2,-3,-26,-29,-35,-114,-4,-12,-10,-114,-30,-47,-48,-49,-75,-28,-34,-11,-114,-114,-15,-50,-51,-53,-55,-91,-9,-5,-23,-16,-20,-21,-22,-114,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-113,-17,-25,-40,-52,-57,-70,-84,-6,-24,-85,-86,-92,-114,-77,-78,-27,]),'INIT':([0,2,3,4,8,9,11,28,29,44,45,46,50,52,53,54,57,72,73,74,75,76,77,99,100,103,104,114,118,119,121,122,125,126,127,129,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,159,161,169,172,174,177,179,180,183,195,199,203,204,208,217,218,219,223,],[-114,10,-2,-3,-26,-29,-35,-114,-4,-12,-10,-114,-30,-47,-48,-49,-75,-28,-34,-11,-114,-114,-15,-50,-51,-53,-55,-91,-9,-5,-23,-16,-20,-21,-22,-114,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-113,189,-17,-25,-40,-52,-57,-70,-84,-6,-24,-85,-86,-92,-114,-77,-78,-27,]),'TRANSITION':([0,2,3,4,8,9,11,28,29,44,45,46,50,52,53,54,57,72,73,74,75,76,77,99,100,103,104,114,118,119,121,122,125,126,127,129,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,159,163,169,172,174,177,179,180,183,195,199,203,204,208,217,218,219,223,],[-114,12,-2,-3,-26,-29,-35,-114,-4,-12,-10,-114,-30,-47,-48,-49,-75,-28,-34,-11,-114,-114,-15,-50,-51,-53,-55,-91,-9,-5,-23,-16,-20,-21,-22,-114,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-113,190,-17,-25,-40,-52,-57,-70,-84,-6,-24,-85,-86,-92,-114,-77,-78,-27,]),'MUTABLE':([0,2,3,4,8,9,11,28,29,44,45,46,50,52,53,54,57,72,73,74,75,76,77,99,100,103,104,114,118,119,121,122,125,126,127,129,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,159,169,172,174,177,179,180,183,195,199,203,204,208,217,218,219,223,],[-114,15,-2,-3,-26,-29,-35,-114,-4,-12,-10,-114,-30,-47,-48,-49,-75,-28,-34,-11,-114,-114,-15,-50,-51,-53,-55,-91,-9,-5,-23,-16,-20,-21,-22,-114,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-113,-17,-25,-40,-52,-57,-70,-84,-6,-24,-85,-86,-92,-114,-77,-78,-27,]),'IMMUTABLE':([0,2,3,4,8,9,11,28,29,44,45,46,50,52,53,54,57,72,73,74,75,76,77,99,100,103,104,114,118,119,121,122,125,126,127,129,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,159,169,172,174,177,179,180,183,195,199,203,204,208,217,218,219,223,],[-114,16,-2,-3,-26,-29,-35,-114,-4,-12,-10,-114,-30,-47,-48,-49,-75,-28,-34,-11,-114,-114,-15,-50,-51,-53,-55,-91,-9,-5,-23,-16,-20,-21,-22,-114,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-113,-17,-25,-40,-52,-57,-70,-84,-6,-24,-85,-86,-92,-114,-77,-78,-27,]),'AXIOM':([0,2,3,4,8,9,11,28,29,44,45,46,50,52,53,54,57,72,73,74,75,76,77,99,100,103,104,114,118,119,121,122,125,126,127,129,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,159,169,172,174,177,179,180,183,195,199,203,204,208,217,218,219,223,],[-114,17,-2,-3,-26,-29,-35,-114,-4,-12,-10,-114,-30,-47,-48,-49,-75,-28,-34,-11,-114,-114,-15,-50,-51,-53,-55,-91,-9,-5,-23,-16,-20,-21,-22,-114,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-113,-17,-25,-40,-52,-57,-70,-84,-6,-24,-85,-86,-92,-114,-77,-78,-27,]),'ZEROSTATE':([0,2,3,4,8,9,11,28,29,44,45,46,50,52,53,54,57,72,73,74,75,76,77,99,100,103,104,114,118,119,121,122,125,126,127,129,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,159,169,172,174,177,179,180,183,195,199,203,204,208,217,218,219,223,],[-114,19,-2,-3,-26,-29,-35,-114,-4,-12,-10,-114,-30,-47,-48,-49,-75,-28,-34,-11,-114,-114,-15,-50,-51,-53,-55,-91,-9,-5,-23,-16,-20,-21,-22,-114,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-113,-17,-25,-40,-52,-57,-70,-84,-6,-24,-85,-86,-92,-114,-77,-78,-27,]),'ONESTATE':([0,2,3,4,8,9,11,28,29,44,45,46,50,52,53,54,57,72,73,74,75,76,77,99,100,103,104,114,118,119,121,122,125,126,127,129,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,159,169,172,174,177,179,180,183,195,199,203,204,208,217,218,219,223,],[-114,20,-2,-3,-26,-29,-35,-114,-4,-12,-10,-114,-30,-47,-48,-49,-75,-28,-34,-11,-114,-114,-15,-50,-51,-53,-55,-91,-9,-5,-23,-16,-20,-21,-22,-114,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-113,-17,-25,-40,-52,-57,-70,-84,-6,-24,-85,-86,-92,-114,-77,-78,-27,]),'TWOSTATE':([0,2,3,4,8,9,11,28,29,44,45,46,50,52,53,54,57,72,73,74,75,76,77,99,100,103,104,114,118,119,121,122,125,126,127,129,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,159,169,172,174,177,179,180,183,195,199,203,204,208,217,218,219,223,],[-114,21,-2,-3,-26,-29,-35,-114,-4,-12,-10,-114,-30,-47,-48,-49,-75,-28,-34,-11,-114,-114,-15,-50,-51,-53,-55,-91,-9,-5,-23,-16,-20,-21,-22,-114,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-113,-17,-25,-40,-52,-57,-70,-84,-6,-24,-85,-86,-92,-114,-77,-78,-27,]),'SAT':([0,2,3,4,8,9,11,28,29,44,45,46,50,52,53,54,57,72,73,74,75,76,77,99,100,103,104,114,118,119,121,122,125,126,127,129,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,159,169,172,174,177,179,180,183,195,199,203,204,208,217,218,219,223,],[-114,23,-2,-3,-26,-29,-35,-114,-4,-12,-10,-114,-30,-47,-48,-49,-75,-28,-34,-11,-114,-114,-15,-50,-51,-53,-55,-91,-9,-5,-23,-16,-20,-21,-22,-114,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-113,-17,-25,-40,-52,-57,-70,-84,-6,-24,-85,-86,-92,-114,-77,-78,-27,]),'UNSAT':([0,2,3,4,8,9,11,28,29,44,45,46,50,52,53,54,57,72,73,74,75,76,77,99,100,103,104,114,118,119,121,122,125,126,127,129,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,159,169,172,174,177,179,180,183,195,199,203,204,208,217,218,219,223,],[-114,24,-2,-3,-26,-29,-35,-114,-4,-12,-10,-114,-30,-47,-48,-49,-75,-28,-34,-11,-114,-114,-15,-50,-51,-53,-55,-91,-9,-5,-23,-16,-20,-21,-22,-114,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-113,-17,-25,-40,-52,-57,-70,-84,-6,-24,-85,-86,-92,-114,-77,-78,-27,]),'SAFETY':([0,2,3,4,8,9,11,28,29,44,45,46,50,52,53,54,57,72,73,74,75,76,77,99,100,103,104,114,118,119,121,122,125,126,127,129,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,159,169,172,174,177,179,180,183,195,199,203,204,208,217,218,219,223,],[-114,25,-2,-3,-26,-29,-35,-114,-4,-12,-10,-114,-30,-47,-48,-49,-75,-28,-34,-11,-114,-114,-15,-50,-51,-53,-55,-91,-9,-5,-23,-16,-20,-21,-22,-114,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-113,-17,-25,-40,-52,-57,-70,-84,-6,-24,-85,-86,-92,-114,-77,-78,-27,]),'INVARIANT':([0,2,3,4,8,9,11,27,28,29,44,45,46,50,52,53,54,57,72,73,74,75,76,77,99,100,103,104,114,118,119,121,122,125,126,127,129,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,159,169,172,174,177,179,180,183,195,199,203,204,208,217,218,219,223,],[-114,26,-2,-3,-26,-29,-35,43,-114,-4,-12,-10,-114,-30,-47,-48,-49,-75,-28,-34,-11,-114,-114,-15,-50,-51,-53,-55,-91,-9,-5,-23,-16,-20,-21,-22,-114,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-113,-17,-25,-40,-52,-57,-70,-84,-6,-24,-85,-86,-92,-114,-77,-78,-27,]),'SKETCH':([0,2,3,4,8,9,11,28,29,44,45,46,50,52,53,54,57,72,73,74,75,76,77,99,100,103,104,114,118,119,121,122,125,126,127,129,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,159,169,172,174,177,179,180,183,195,199,203,204,208,217,218,219,223,],[-114,27,-2,-3,-26,-29,-35,-114,-4,-12,-10,-114,-30,-47,-48,-49,-75,-28,-34,-11,-114,-114,-15,-50,-51,-53,-55,-91,-9,-5,-23,-16,-20,-21,-22,-114,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-113,-17,-25,-40,-52,-57,-70,-84,-6,-24,-85,-86,-92,-114,-77,-78,-27,]),'THEOREM':([0,2,3,4,8,9,11,13,19,20,21,22,28,29,44,45,46,50,52,53,54,57,72,73,74,75,76,77,99,100,103,104,114,118,119,121,122,125,126,127,129,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,159,169,172,174,177,179,180,183,195,199,203,204,208,217,218,219,223,],[-114,-114,-2,-3,-26,-29,-35,38,-87,-88,-89,-90,-114,-4,-12,-10,-114,-30,-47,-48,-49,-75,-28,-34,-11,-114,-114,-15,-50,-51,-53,-55,-91,-9,-5,-23,-16,-20,-21,-22,-114,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-113,-17,-25,-40,-52,-57,-70,-84,-6,-24,-85,-86,-92,-114,-77,-78,-27,]),'DEFINITION':([0,2,3,4,8,9,11,13,19,20,21,22,28,29,44,45,46,50,52,53,54,57,72,73,74,75,76,77,99,100,103,104,114,118,119,121,122,125,126,127,129,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,159,169,172,174,177,179,180,183,195,199,203,204,208,217,218,219,223,],[-114,-114,-2,-3,-26,-29,-35,39,-87,-88,-89,-90,-114,-4,-12,-10,-114,-30,-47,-48,-49,-75,-28,-34,-11,-114,-114,-15,-50,-51,-53,-55,-91,-9,-5,-23,-16,-20,-21,-22,-114,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-113,-17,-25,-40,-52,-57,-70,-84,-6,-24,-85,-86,-92,-114,-77,-78,-27,]),'$end':([0,1,2,3,4,8,9,11,28,29,44,45,46,50,52,53,54,57,72,73,74,75,76,77,99,100,103,104,114,118,119,121,122,125,126,127,129,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,159,169,172,174,177,179,180,183,195,199,203,204,208,217,218,219,223,],[-114,0,-1,-2,-3,-26,-29,-35,-114,-4,-12,-10,-114,-30,-47,-48,-49,-75,-28,-34,-11,-114,-114,-15,-50,-51,-53,-55,-91,-9,-5,-23,-16,-20,-21,-22,-114,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-113,-17,-25,-40,-52,-57,-70,-84,-6,-24,-85,-86,-92,-114,-77,-78,-27,]),'ID':([5,10,12,17,18,25,26,29,30,31,32,33,34,35,36,38,39,41,42,43,51,52,53,54,55,56,57,58,59,60,63,64,65,66,68,69,71,78,79,80,82,83,84,85,86,87,88,89,90,91,92,93,94,95,99,100,101,103,104,105,106,109,115,116,117,120,131,132,133,134,135,136,137,138,139,140,141,142,143,144,145,146,147,152,155,156,160,161,162,164,165,166,170,173,174,177,178,179,180,184,185,186,188,189,190,191,192,193,194,196,198,201,202,205,206,207,209,218,219,220,221,222,224,],[29,-114,29,-114,-114,-31,-32,-4,29,29,29,29,29,-36,29,-114,29,29,29,-33,29,-47,-48,-49,29,29,-75,29,29,29,29,29,-38,-39,29,29,-114,29,29,29,29,29,29,29,29,29,29,29,29,29,29,29,29,29,-50,-51,29,-53,-55,29,29,-37,29,166,-109,29,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,29,29,29,-76,29,29,-110,29,-108,-102,-103,-114,29,29,-40,-52,29,-57,-70,29,29,29,-106,-107,-93,166,-105,-94,29,29,29,29,29,-83,-81,-80,-104,-77,-78,29,-101,29,-82,]),'RELATION':([6,7,15,16,],[30,33,-13,-14,]),'FUNCTION':([6,15,16,],[31,-13,-14,]),'CONSTANT':([6,15,16,],[32,-13,-14,]),'LBRACKET':([10,17,18,25,26,38,43,],[36,36,36,-31,-32,36,-33,]),'INTLIT':([10,17,18,25,26,29,34,35,38,41,42,43,55,56,58,59,60,63,69,82,83,84,85,86,87,88,89,90,91,92,93,94,95,101,105,106,109,145,155,156,161,173,178,184,185,194,201,202,205,206,207,222,224,],[-114,-114,-114,-31,-32,-4,52,-36,-114,52,52,-33,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,-37,52,52,52,52,52,52,52,52,52,52,52,-83,-81,-80,52,-82,]),'TRUE':([10,17,18,25,26,29,34,35,38,41,42,43,55,56,58,59,60,63,69,82,83,84,85,86,87,88,89,90,91,92,93,94,95,101,105,106,109,145,155,156,161,173,178,184,185,194,201,202,205,206,207,222,224,],[-114,-114,-114,-31,-32,-4,53,-36,-114,53,53,-33,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,-37,53,53,53,53,53,53,53,53,53,53,53,-83,-81,-80,53,-82,]),'FALSE':([10,17,18,25,26,29,34,35,38,41,42,43,55,56,58,59,60,63,69,82,83,84,85,86,87,88,89,90,91,92,93,94,95,101,105,106,109,145,155,156,161,173,178,184,185,194,201,202,205,206,207,222,224,],[-114,-114,-114,-31,-32,-4,54,-36,-114,54,54,-33,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,-37,54,54,54,54,54,54,54,54,54,54,54,-83,-81,-80,54,-82,]),'BANG':([10,17,18,25,26,29,34,35,38,41,42,43,55,56,58,59,60,63,69,82,83,84,85,86,87,88,89,90,91,92,93,94,95,101,105,106,109,145,155,156,161,173,178,184,185,194,201,202,205,206,207,222,224,],[-114,-114,-114,-31,-32,-4,55,-36,-114,55,55,-33,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,-37,55,55,55,55,55,55,55,55,55,55,55,-83,-81,-80,55,-82,]),'TILDE':([10,17,18,25,26,29,34,35,38,41,42,43,55,56,58,59,60,63,69,82,83,84,85,86,87,88,89,90,91,92,93,94,95,101,105,106,109,145,155,156,161,173,178,184,185,194,201,202,205,206,207,222,224,],[-114,-114,-114,-31,-32,-4,56,-36,-114,56,56,-33,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,-37,56,56,56,56,56,56,56,56,56,56,56,-83,-81,-80,56,-82,]),'AMPERSAND':([10,17,18,25,26,29,34,35,38,41,42,43,50,52,53,54,55,56,57,58,59,60,63,69,72,73,82,83,84,85,86,87,88,89,90,91,92,93,94,95,99,100,101,102,103,104,105,106,107,109,114,131,132,133,134,135,136,137,138,139,140,141,142,143,144,145,151,152,154,155,156,161,173,174,177,178,179,180,181,182,184,185,188,194,199,200,201,202,203,204,205,206,207,215,218,219,222,224,],[-114,-114,-114,-31,-32,-4,59,-36,-114,59,59,-33,82,-47,-48,-49,59,59,-75,59,59,59,59,59,82,82,59,59,59,59,59,59,59,59,59,59,59,59,59,59,-50,-51,59,82,-53,82,59,59,82,-37,82,-54,82,82,82,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,59,82,-76,82,59,59,59,59,82,-52,59,-57,-70,82,82,59,59,82,59,82,82,59,59,82,82,-83,-81,-80,82,82,82,59,-82,]),'PIPE':([10,17,18,25,26,29,34,35,38,41,42,43,50,52,53,54,55,56,57,58,59,60,63,69,72,73,82,83,84,85,86,87,88,89,90,91,92,93,94,95,99,100,101,102,103,104,105,106,107,109,114,131,132,133,134,135,136,137,138,139,140,141,142,143,144,145,151,152,154,155,156,161,164,165,166,173,174,177,178,179,180,181,182,184,185,188,192,193,194,199,200,201,202,203,204,205,206,207,209,215,218,219,221,222,224,],[-114,-114,-114,-31,-32,-4,60,-36,-114,60,60,-33,83,-47,-48,-49,60,60,-75,60,60,60,60,60,83,83,60,60,60,60,60,60,60,60,60,60,60,60,60,60,-50,-51,60,83,-53,-55,60,60,83,-37,83,-54,-56,83,83,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,60,83,-76,83,60,60,60,191,-103,-114,60,83,-52,60,-57,-70,83,83,60,60,83,-105,-94,60,83,83,60,60,83,83,-83,-81,-80,-104,83,83,83,-101,60,-82,]),'DISTINCT':([10,17,18,25,26,29,34,35,38,41,42,43,55,56,58,59,60,63,69,82,83,84,85,86,87,88,89,90,91,92,93,94,95,101,105,106,109,145,155,156,161,173,178,184,185,194,201,202,205,206,207,222,224,],[-114,-114,-114,-31,-32,-4,61,-36,-114,61,61,-33,61,61,61,61,61,61,61,61,61,61,61,61,61,61,61,61,61,61,61,61,61,61,61,61,-37,61,61,61,61,61,61,61,61,61,61,61,-83,-81,-80,61,-82,]),'NEW':([10,17,18,25,26,29,34,35,38,41,42,43,55,56,58,59,60,63,69,82,83,84,85,86,87,88,89,90,91,92,93,94,95,101,105,106,109,145,155,156,161,173,178,184,185,194,201,202,205,206,207,222,224,],[-114,-114,-114,-31,-32,-4,62,-36,-114,62,62,-33,62,62,62,62,62,62,62,62,62,62,62,62,62,62,62,62,62,62,62,62,62,62,62,62,-37,62,62,62,62,62,62,62,62,62,62,62,-83,-81,-80,62,-82,]),'LPAREN':([10,17,18,25,26,29,34,35,37,38,41,42,43,46,47,49,55,56,57,58,59,60,61,62,63,69,70,75,82,83,84,85,86,87,88,89,90,91,92,93,94,95,101,105,106,109,145,155,156,161,166,173,178,184,185,194,201,202,205,206,207,222,224,],[-114,-114,-114,-31,-32,-4,58,-36,68,-114,58,58,-33,78,79,78,58,58,101,58,58,58,105,106,58,58,115,120,58,58,58,58,58,58,58,58,58,58,58,58,58,58,58,58,58,-37,58,58,58,58,194,58,58,58,58,58,58,58,-83,-81,-80,58,-82,]),'IF':([10,17,18,25,26,29,34,35,38,41,42,43,55,56,58,59,60,63,69,82,83,84,85,86,87,88,89,90,91,92,93,94,95,101,105,106,109,145,155,156,161,173,178,184,185,194,201,202,205,206,207,222,224,],[-114,-114,-114,-31,-32,-4,63,-36,-114,63,63,-33,63,63,63,63,63,63,63,63,63,63,63,63,63,63,63,63,63,63,63,63,63,63,63,63,-37,63,63,63,63,63,63,63,63,63,63,63,-83,-81,-80,63,-82,]),'LET':([10,17,18,25,26,29,34,35,38,41,42,43,55,56,58,59,60,63,69,82,83,84,85,86,87,88,89,90,91,92,93,94,95,101,105,106,109,145,155,156,161,173,178,184,185,194,201,202,205,206,207,222,224,],[-114,-114,-114,-31,-32,-4,64,-36,-114,64,64,-33,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,64,-37,64,64,64,64,64,64,64,64,64,64,64,-83,-81,-80,64,-82,]),'FORALL':([10,17,18,25,26,29,34,35,38,41,42,43,55,56,58,59,60,63,69,82,83,84,85,86,87,88,89,90,91,92,93,94,95,101,105,106,109,145,155,156,161,173,178,184,185,194,201,202,205,206,207,222,224,],[-114,-114,-114,-31,-32,-4,65,-36,-114,65,65,-33,65,65,65,65,65,65,65,65,65,65,65,65,65,65,65,65,65,65,65,65,65,65,65,65,-37,65,65,65,65,65,65,65,65,65,65,65,-83,-81,-80,65,-82,]),'EXISTS':([10,17,18,25,26,29,34,35,38,41,42,43,55,56,58,59,60,63,69,82,83,84,85,86,87,88,89,90,91,92,93,94,95,101,105,106,109,145,155,156,161,173,178,184,185,194,201,202,205,206,207,222,224,],[-114,-114,-114,-31,-32,-4,66,-36,-114,66,66,-33,66,66,66,66,66,66,66,66,66,66,66,66,66,66,66,66,66,66,66,66,66,66,66,66,-37,66,66,66,66,66,66,66,66,66,66,66,-83,-81,-80,66,-82,]),'TRACE':([14,23,24,],[40,-111,-112,]),'ANNOT':([28,29,44,45,46,49,74,75,76,77,81,118,119,121,122,125,126,127,129,130,169,172,195,217,223,],[-114,-4,75,-10,-114,-114,-11,-114,-114,-15,-114,-9,-5,75,-16,-20,-21,-22,-114,75,-17,75,-6,-114,75,]),'COLON':([29,45,48,49,74,75,77,81,98,118,119,122,130,169,171,195,],[-4,-10,80,-114,-11,-114,-15,-114,147,-9,-5,-16,173,-17,198,-6,]),'IFF':([29,50,52,53,54,57,72,73,99,100,102,103,104,107,114,131,132,133,134,135,136,137,138,139,140,141,142,143,144,151,152,154,174,177,179,180,181,182,188,199,200,203,204,215,218,219,],[-4,84,-47,-48,-49,-75,84,84,-50,-51,84,-53,-55,84,84,-54,-56,None,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,84,-76,84,84,-52,-57,-70,84,84,84,84,84,84,84,84,84,84,]),'IMPLIES':([29,50,52,53,54,57,72,73,99,100,102,103,104,107,114,131,132,133,134,135,136,137,138,139,140,141,142,143,144,151,152,154,174,177,179,180,181,182,188,199,200,203,204,215,218,219,],[-4,85,-47,-48,-49,-75,85,85,-50,-51,85,-53,-55,85,85,-54,-56,85,85,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,85,-76,85,85,-52,-57,-70,85,85,85,85,85,85,85,85,85,85,]),'EQUAL':([29,50,52,53,54,57,72,73,98,99,100,102,103,104,107,108,114,125,126,127,131,132,133,134,135,136,137,138,139,140,141,142,143,144,151,152,154,157,174,176,177,179,180,181,182,187,188,199,200,203,204,215,218,219,],[-4,86,-47,-48,-49,-75,86,86,-42,-50,-51,86,86,86,86,156,86,-20,-21,-22,86,86,86,86,None,None,None,None,None,None,None,-67,-68,-69,86,-76,86,185,86,-41,-52,-57,-70,86,86,185,86,86,86,86,86,86,86,86,]),'NOTEQ':([29,50,52,53,54,57,72,73,99,100,102,103,104,107,114,131,132,133,134,135,136,137,138,139,140,141,142,143,144,151,152,154,174,177,179,180,181,182,188,199,200,203,204,215,218,219,],[-4,87,-47,-48,-49,-75,87,87,-50,-51,87,87,87,87,87,87,87,87,87,None,None,None,None,None,None,None,-67,-68,-69,87,-76,87,87,-52,-57,-70,87,87,87,87,87,87,87,87,87,87,]),'NOTEQ2':([29,50,52,53,54,57,72,73,99,100,102,103,104,107,114,131,132,133,134,135,136,137,138,139,140,141,142,143,144,151,152,154,174,177,179,180,181,182,188,199,200,203,204,215,218,219,],[-4,88,-47,-48,-49,-75,88,88,-50,-51,88,88,88,88,88,88,88,88,88,None,None,None,None,None,None,None,-67,-68,-69,88,-76,88,88,-52,-57,-70,88,88,88,88,88,88,88,88,88,88,]),'GE':([29,50,52,53,54,57,72,73,99,100,102,103,104,107,114,131,132,133,134,135,136,137,138,139,140,141,142,143,144,151,152,154,174,177,179,180,181,182,188,199,200,203,204,215,218,219,],[-4,89,-47,-48,-49,-75,89,89,-50,-51,89,89,89,89,89,89,89,89,89,None,None,None,None,None,None,None,-67,-68,-69,89,-76,89,89,-52,-57,-70,89,89,89,89,89,89,89,89,89,89,]),'GT':([29,50,52,53,54,57,72,73,99,100,102,103,104,107,114,131,132,133,134,135,136,137,138,139,140,141,142,143,144,151,152,154,174,177,179,180,181,182,188,199,200,203,204,215,218,219,],[-4,90,-47,-48,-49,-75,90,90,-50,-51,90,90,90,90,90,90,90,90,90,None,None,None,None,None,None,None,-67,-68,-69,90,-76,90,90,-52,-57,-70,90,90,90,90,90,90,90,90,90,90,]),'LE':([29,50,52,53,54,57,72,73,99,100,102,103,104,107,114,131,132,133,134,135,136,137,138,139,140,141,142,143,144,151,152,154,174,177,179,180,181,182,188,199,200,203,204,215,218,219,],[-4,91,-47,-48,-49,-75,91,91,-50,-51,91,91,91,91,91,91,91,91,91,None,None,None,None,None,None,None,-67,-68,-69,91,-76,91,91,-52,-57,-70,91,91,91,91,91,91,91,91,91,91,]),'LT':([29,50,52,53,54,57,72,73,99,100,102,103,104,107,114,131,132,133,134,135,136,137,138,139,140,141,142,143,144,151,152,154,174,177,179,180,181,182,188,199,200,203,204,215,218,219,],[-4,92,-47,-48,-49,-75,92,92,-50,-51,92,92,92,92,92,92,92,92,92,None,None,None,None,None,None,None,-67,-68,-69,92,-76,92,92,-52,-57,-70,92,92,92,92,92,92,92,92,92,92,]),'PLUS':([29,50,52,53,54,57,72,73,99,100,102,103,104,107,114,131,132,133,134,135,136,137,138,139,140,141,142,143,144,151,152,154,174,177,179,180,181,182,188,199,200,203,204,215,218,219,],[-4,93,-47,-48,-49,-75,93,93,-50,-51,93,93,93,93,93,93,93,93,93,93,93,93,93,93,93,93,-67,-68,-69,93,-76,93,93,-52,-57,-70,93,93,93,93,93,93,93,93,93,93,]),'SUB':([29,50,52,53,54,57,72,73,99,100,102,103,104,107,114,131,132,133,134,135,136,137,138,139,140,141,142,143,144,151,152,154,174,177,179,180,181,182,188,199,200,203,204,215,218,219,],[-4,94,-47,-48,-49,-75,94,94,-50,-51,94,94,94,94,94,94,94,94,94,94,94,94,94,94,94,94,-67,-68,-69,94,-76,94,94,-52,-57,-70,94,94,94,94,94,94,94,94,94,94,]),'STAR':([29,50,52,53,54,57,72,73,99,100,102,103,104,107,114,131,132,133,134,135,136,137,138,139,140,141,142,143,144,151,152,154,174,177,179,180,181,182,188,194,199,200,203,204,215,218,219,222,],[-4,95,-47,-48,-49,-75,95,95,-50,-51,95,95,95,95,95,95,95,95,95,95,95,95,95,95,95,95,95,95,-69,95,-76,95,95,-52,-57,-70,95,95,95,214,95,95,95,95,95,95,95,214,]),'RBRACKET':([29,67,],[-4,109,]),'DOT':([29,96,97,98,125,126,127,175,176,],[-4,145,-45,-42,-20,-21,-22,-46,-41,]),'COMMA':([29,52,53,54,57,96,97,98,99,100,103,104,112,123,124,125,126,127,128,131,132,133,134,135,136,137,138,139,140,141,142,143,144,150,151,152,153,167,168,174,175,176,177,179,180,197,200,205,206,207,212,213,214,215,216,218,219,224,225,],[-4,-47,-48,-49,-75,146,-45,-42,-50,-51,-53,-55,146,170,-18,-20,-21,-22,170,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,178,-73,-76,178,196,-7,-40,-46,-41,-52,-57,-70,-19,-74,220,-81,-80,222,-99,-97,-98,-8,-77,-78,-82,-100,]),'RPAREN':([29,52,53,54,57,68,78,97,98,99,100,101,102,103,104,110,111,112,113,115,123,124,125,126,127,128,131,132,133,134,135,136,137,138,139,140,141,142,143,144,148,149,150,151,152,153,154,158,167,168,174,175,176,177,179,180,194,197,200,210,211,212,213,214,215,216,218,219,225,],[-4,-47,-48,-49,-75,-114,122,-45,-42,-50,-51,-114,152,-53,-55,157,-79,-43,-44,-114,169,-18,-20,-21,-22,171,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,177,-71,-72,-73,-76,179,180,187,195,-7,-40,-46,-41,-52,-57,-70,-114,-19,-74,221,-95,-96,-99,-97,-98,-8,-77,-78,-100,]),'THEN':([29,52,53,54,57,99,100,103,104,107,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,174,177,179,180,218,219,],[-4,-47,-48,-49,-75,-50,-51,-53,-55,155,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-40,-52,-57,-70,-77,-78,]),'ELSE':([29,52,53,54,57,99,100,103,104,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,174,177,179,180,181,218,219,],[-4,-47,-48,-49,-75,-50,-51,-53,-55,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-40,-52,-57,-70,201,-77,-78,]),'IN':([29,52,53,54,57,99,100,103,104,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,174,177,179,180,182,218,219,],[-4,-47,-48,-49,-75,-50,-51,-53,-55,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-40,-52,-57,-70,202,-77,-78,]),'RBRACE':([29,52,53,54,57,71,99,100,103,104,116,117,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,160,162,164,165,166,174,177,179,180,188,189,190,192,193,209,218,219,221,],[-4,-47,-48,-49,-75,-114,-50,-51,-53,-55,159,-109,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-110,-108,-102,-103,-114,-40,-52,-57,-70,-106,-107,-93,-105,-94,-104,-77,-78,-101,]),'ASSERT':([29,52,53,54,57,71,99,100,103,104,116,117,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,160,162,164,165,166,174,177,179,180,188,189,190,192,193,209,218,219,221,],[-4,-47,-48,-49,-75,-114,-50,-51,-53,-55,161,-109,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-110,-108,-102,-103,-114,-40,-52,-57,-70,-106,-107,-93,-105,-94,-104,-77,-78,-101,]),'ANY':([29,52,53,54,57,71,99,100,103,104,116,117,131,132,133,134,135,136,137,138,139,140,141,142,143,144,152,160,162,164,165,166,174,177,179,180,188,189,190,192,193,209,218,219,221,],[-4,-47,-48,-49,-75,-114,-50,-51,-53,-55,163,-109,-54,-56,-58,-59,-60,-61,-62,-63,-64,-65,-66,-67,-68,-69,-76,-110,-108,-102,-103,-114,-40,-52,-57,-70,-106,-107,-93,-105,-94,-104,-77,-78,-101,]),'LBRACE':([40,],[71,]),'BOOL':([78,79,80,147,170,198,],[125,125,125,125,125,125,]),'INT':([78,79,80,147,170,198,],[126,126,126,126,126,126,]),'MODIFIES':([157,187,],[186,186,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'program':([0,],[1,]),'decls':([0,],[2,]),'empty':([0,2,10,17,18,28,38,46,49,68,71,75,76,81,101,115,129,166,194,217,],[3,22,35,35,35,45,35,77,77,113,117,119,45,45,149,113,45,193,211,45,]),'decl':([2,],[4,]),'mut':([2,],[6,]),'constant_decl':([2,],[8,]),'axiom_decl':([2,],[9,]),'invariant_decl':([2,],[11,]),'kstate':([2,],[13,]),'satunsat':([2,],[14,]),'safety_or_invariant_keyword':([2,],[18,]),'id':([5,12,30,31,32,33,34,36,39,41,42,51,55,56,58,59,60,63,64,68,69,78,79,80,82,83,84,85,86,87,88,89,90,91,92,93,94,95,101,105,106,115,120,145,146,147,155,156,161,170,173,178,184,185,186,194,196,198,201,202,220,222,],[28,37,46,47,48,49,57,67,70,57,57,98,57,57,57,57,57,57,98,98,57,127,127,127,57,57,57,57,57,57,57,57,57,57,57,57,57,57,57,57,57,98,168,57,98,127,57,57,57,127,57,57,57,57,207,57,216,127,57,57,207,57,]),'opt_name':([10,17,18,38,],[34,41,42,69,]),'annotations':([28,76,81,129,217,],[44,121,130,172,223,]),'expr':([34,41,42,55,56,58,59,60,63,69,82,83,84,85,86,87,88,89,90,91,92,93,94,95,101,105,106,145,155,156,161,173,178,184,185,194,201,202,222,],[50,72,73,99,100,102,103,104,107,114,131,132,133,134,135,136,137,138,139,140,141,142,143,144,151,151,154,174,181,182,188,199,200,203,204,215,218,219,215,]),'quant':([34,41,42,55,56,58,59,60,63,69,82,83,84,85,86,87,88,89,90,91,92,93,94,95,101,105,106,145,155,156,161,173,178,184,185,194,201,202,222,],[51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,]),'annotation':([44,121,130,172,223,],[74,74,74,74,74,]),'arity':([46,49,],[76,81,]),'sortedvars':([51,68,115,],[96,112,112,]),'sortedvar':([51,64,68,115,146,],[97,108,97,97,175,]),'params':([68,115,],[110,158,]),'sortedvars0':([68,115,],[111,111,]),'trace_components':([71,],[116,]),'optional_annotation_args':([75,],[118,]),'arity_nonempty':([78,79,],[123,128,]),'sort':([78,79,80,147,170,198,],[124,124,129,176,197,217,]),'args':([101,],[148,]),'args1':([101,105,],[150,153,]),'trace_component':([116,],[160,]),'trace_transition':([116,],[162,]),'trace_transition_calls':([116,],[164,]),'trace_transition_call':([116,191,],[165,209,]),'annotation_args':([120,],[167,]),'definition_body':([157,187,],[183,208,]),'mods':([157,187,],[184,184,]),'optional_tcall_args':([166,],[192,]),'modlist':([186,],[205,]),'mod':([186,220,],[206,224,]),'tcall_args':([194,],[210,]),'tcall_args1':([194,],[212,]),'tcall_arg':([194,222,],[213,225,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> program","S'",1,None,None,None),
+  ('program -> decls','program',1,'p_program','parser.py',181),
+  ('decls -> empty','decls',1,'p_decls_empty','parser.py',186),
+  ('decls -> decls decl','decls',2,'p_decls_decl','parser.py',190),
+  ('id -> ID','id',1,'p_id','parser.py',194),
+  ('optional_annotation_args -> empty','optional_annotation_args',1,'p_optional_annotation_args_empty','parser.py',198),
+  ('optional_annotation_args -> LPAREN annotation_args RPAREN','optional_annotation_args',3,'p_optional_annotation_args_nonempty','parser.py',202),
+  ('annotation_args -> id','annotation_args',1,'p_annotation_args_one','parser.py',206),
+  ('annotation_args -> annotation_args COMMA id','annotation_args',3,'p_annotation_args_more','parser.py',210),
+  ('annotation -> ANNOT optional_annotation_args','annotation',2,'p_annotation','parser.py',259),
+  ('annotations -> empty','annotations',1,'p_annotations_empty','parser.py',268),
+  ('annotations -> annotations annotation','annotations',2,'p_annotations_one','parser.py',272),
+  ('decl -> SORT id annotations','decl',3,'p_decl_sort','parser.py',276),
+  ('mut -> MUTABLE','mut',1,'p_decl_mut','parser.py',286),
+  ('mut -> IMMUTABLE','mut',1,'p_decl_mut','parser.py',287),
+  ('arity -> empty','arity',1,'p_arity_empty','parser.py',291),
+  ('arity -> LPAREN RPAREN','arity',2,'p_arity_paren_empty','parser.py',295),
+  ('arity -> LPAREN arity_nonempty RPAREN','arity',3,'p_arity_nonempty','parser.py',299),
+  ('arity_nonempty -> sort','arity_nonempty',1,'p_arity_nonempty_one','parser.py',303),
+  ('arity_nonempty -> arity_nonempty COMMA sort','arity_nonempty',3,'p_arity_nonempty_more','parser.py',307),
+  ('sort -> BOOL','sort',1,'p_sort_bool','parser.py',311),
+  ('sort -> INT','sort',1,'p_sort_int','parser.py',316),
+  ('sort -> id','sort',1,'p_sort_uninterp','parser.py',321),
+  ('decl -> mut RELATION id arity annotations','decl',5,'p_decl_relation','parser.py',326),
+  ('decl -> DERIVED RELATION id arity annotations COLON expr','decl',7,'p_decl_relation_derived','parser.py',343),
+  ('constant_decl -> mut CONSTANT id COLON sort annotations','constant_decl',6,'p_constant_decl','parser.py',356),
+  ('decl -> constant_decl','decl',1,'p_decl_constant_decl','parser.py',367),
+  ('decl -> mut FUNCTION id LPAREN arity_nonempty RPAREN COLON sort annotations','decl',9,'p_decl_function','parser.py',371),
+  ('axiom_decl -> AXIOM opt_name expr','axiom_decl',3,'p_axiom_decl','parser.py',383),
+  ('decl -> axiom_decl','decl',1,'p_decl_axiom_decl','parser.py',390),
+  ('decl -> INIT opt_name expr','decl',3,'p_decl_init','parser.py',394),
+  ('safety_or_invariant_keyword -> SAFETY','safety_or_invariant_keyword',1,'p_safety_or_invariant_keyword_safety','parser.py',401),
+  ('safety_or_invariant_keyword -> INVARIANT','safety_or_invariant_keyword',1,'p_safety_or_invariant_keyword_invariant','parser.py',405),
+  ('safety_or_invariant_keyword -> SKETCH INVARIANT','safety_or_invariant_keyword',2,'p_safety_or_invariant_keyword_sketch_invariant','parser.py',409),
+  ('invariant_decl -> safety_or_invariant_keyword opt_name expr','invariant_decl',3,'p_invariant_decl','parser.py',413),
+  ('decl -> invariant_decl','decl',1,'p_decl_invariant','parser.py',424),
+  ('opt_name -> empty','opt_name',1,'p_opt_name_none','parser.py',428),
+  ('opt_name -> LBRACKET id RBRACKET','opt_name',3,'p_opt_name_some','parser.py',432),
+  ('quant -> FORALL','quant',1,'p_quant','parser.py',436),
+  ('quant -> EXISTS','quant',1,'p_quant','parser.py',437),
+  ('expr -> quant sortedvars DOT expr','expr',4,'p_expr_quantifier','parser.py',441),
+  ('sortedvar -> id COLON sort','sortedvar',3,'p_sortedvar','parser.py',449),
+  ('sortedvar -> id','sortedvar',1,'p_sortedvar_nosort','parser.py',455),
+  ('sortedvars0 -> sortedvars','sortedvars0',1,'p_sortedvars0_one','parser.py',460),
+  ('sortedvars0 -> empty','sortedvars0',1,'p_sortedvars0_zero','parser.py',464),
+  ('sortedvars -> sortedvar','sortedvars',1,'p_sortedvars_one','parser.py',468),
+  ('sortedvars -> sortedvars COMMA sortedvar','sortedvars',3,'p_sortedvars_more','parser.py',472),
+  ('expr -> INTLIT','expr',1,'p_expr_intlit','parser.py',476),
+  ('expr -> TRUE','expr',1,'p_expr_true','parser.py',480),
+  ('expr -> FALSE','expr',1,'p_expr_false','parser.py',484),
+  ('expr -> BANG expr','expr',2,'p_expr_not','parser.py',488),
+  ('expr -> TILDE expr','expr',2,'p_expr_not','parser.py',489),
+  ('expr -> id LPAREN args RPAREN','expr',4,'p_expr_app','parser.py',494),
+  ('expr -> AMPERSAND expr','expr',2,'p_expr_and1','parser.py',500),
+  ('expr -> expr AMPERSAND expr','expr',3,'p_expr_and','parser.py',504),
+  ('expr -> PIPE expr','expr',2,'p_expr_or1','parser.py',514),
+  ('expr -> expr PIPE expr','expr',3,'p_expr_or','parser.py',518),
+  ('expr -> DISTINCT LPAREN args1 RPAREN','expr',4,'p_expr_distinct','parser.py',529),
+  ('expr -> expr IFF expr','expr',3,'p_expr_iff','parser.py',533),
+  ('expr -> expr IMPLIES expr','expr',3,'p_expr_implies','parser.py',540),
+  ('expr -> expr EQUAL expr','expr',3,'p_expr_eq','parser.py',547),
+  ('expr -> expr NOTEQ expr','expr',3,'p_expr_noteq','parser.py',554),
+  ('expr -> expr NOTEQ2 expr','expr',3,'p_expr_noteq','parser.py',555),
+  ('expr -> expr GE expr','expr',3,'p_expr_ge','parser.py',562),
+  ('expr -> expr GT expr','expr',3,'p_expr_gt','parser.py',569),
+  ('expr -> expr LE expr','expr',3,'p_expr_le','parser.py',576),
+  ('expr -> expr LT expr','expr',3,'p_expr_lt','parser.py',583),
+  ('expr -> expr PLUS expr','expr',3,'p_expr_plus','parser.py',590),
+  ('expr -> expr SUB expr','expr',3,'p_expr_sub','parser.py',597),
+  ('expr -> expr STAR expr','expr',3,'p_expr_mult','parser.py',604),
+  ('expr -> NEW LPAREN expr RPAREN','expr',4,'p_expr_new','parser.py',611),
+  ('args -> empty','args',1,'p_args_empty','parser.py',616),
+  ('args -> args1','args',1,'p_args_at_least_one','parser.py',620),
+  ('args1 -> expr','args1',1,'p_args1_one','parser.py',624),
+  ('args1 -> args1 COMMA expr','args1',3,'p_args1_more','parser.py',628),
+  ('expr -> id','expr',1,'p_expr_id','parser.py',632),
+  ('expr -> LPAREN expr RPAREN','expr',3,'p_expr_paren','parser.py',637),
+  ('expr -> IF expr THEN expr ELSE expr','expr',6,'p_expr_if','parser.py',641),
+  ('expr -> LET sortedvar EQUAL expr IN expr','expr',6,'p_expr_let','parser.py',648),
+  ('params -> sortedvars0','params',1,'p_params','parser.py',655),
+  ('mod -> id','mod',1,'p_mod','parser.py',659),
+  ('modlist -> mod','modlist',1,'p_modlist_one','parser.py',664),
+  ('modlist -> modlist COMMA mod','modlist',3,'p_modlist_more','parser.py',668),
+  ('mods -> MODIFIES modlist','mods',2,'p_mods','parser.py',672),
+  ('decl -> TRANSITION id LPAREN params RPAREN definition_body','decl',6,'p_decl_transition','parser.py',676),
+  ('definition_body -> mods expr','definition_body',2,'p_decl_definition_body_mods_expr','parser.py',686),
+  ('definition_body -> EQUAL expr','definition_body',2,'p_decl_definition_body_expr','parser.py',690),
+  ('kstate -> ZEROSTATE','kstate',1,'p_kstate','parser.py',704),
+  ('kstate -> ONESTATE','kstate',1,'p_kstate','parser.py',705),
+  ('kstate -> TWOSTATE','kstate',1,'p_kstate','parser.py',706),
+  ('kstate -> empty','kstate',1,'p_kstate','parser.py',707),
+  ('decl -> kstate THEOREM opt_name expr','decl',4,'p_decl_theorem','parser.py',714),
+  ('decl -> kstate DEFINITION id LPAREN params RPAREN definition_body','decl',7,'p_decl_definition','parser.py',721),
+  ('trace_transition -> ANY TRANSITION','trace_transition',2,'p_trace_transition_any','parser.py',737),
+  ('optional_tcall_args -> empty','optional_tcall_args',1,'p_optional_tcall_args_none','parser.py',741),
+  ('tcall_args -> empty','tcall_args',1,'p_tcall_args_empty','parser.py',745),
+  ('tcall_args -> tcall_args1','tcall_args',1,'p_tcall_args_nonempty','parser.py',749),
+  ('tcall_arg -> STAR','tcall_arg',1,'p_tcall_arg_star','parser.py',753),
+  ('tcall_arg -> expr','tcall_arg',1,'p_tcall_arg_expr','parser.py',757),
+  ('tcall_args1 -> tcall_arg','tcall_args1',1,'p_tcall_args1_arg','parser.py',761),
+  ('tcall_args1 -> tcall_args1 COMMA tcall_arg','tcall_args1',3,'p_tcall_args1_more','parser.py',765),
+  ('optional_tcall_args -> LPAREN tcall_args RPAREN','optional_tcall_args',3,'p_optional_tcall_args_some','parser.py',769),
+  ('trace_transition -> trace_transition_calls','trace_transition',1,'p_trace_transition_calls','parser.py',773),
+  ('trace_transition_calls -> trace_transition_call','trace_transition_calls',1,'p_trace_transition_calls_one','parser.py',777),
+  ('trace_transition_calls -> trace_transition_calls PIPE trace_transition_call','trace_transition_calls',3,'p_trace_transition_calls_more','parser.py',781),
+  ('trace_transition_call -> ID optional_tcall_args','trace_transition_call',2,'p_trace_transition_call','parser.py',785),
+  ('trace_component -> ASSERT expr','trace_component',2,'p_trace_component_assert','parser.py',790),
+  ('trace_component -> ASSERT INIT','trace_component',2,'p_trace_component_assert_init','parser.py',795),
+  ('trace_component -> trace_transition','trace_component',1,'p_trace_component_transition','parser.py',799),
+  ('trace_components -> empty','trace_components',1,'p_trace_components_empty','parser.py',803),
+  ('trace_components -> trace_components trace_component','trace_components',2,'p_trace_components_component','parser.py',807),
+  ('satunsat -> SAT','satunsat',1,'p_satunsat','parser.py',811),
+  ('satunsat -> UNSAT','satunsat',1,'p_satunsat','parser.py',812),
+  ('decl -> satunsat TRACE LBRACE trace_components RBRACE','decl',5,'p_decl_trace','parser.py',816),
+  ('empty -> <empty>','empty',0,'p_empty','parser.py',821),
+]
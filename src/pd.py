@@ -4,7 +4,6 @@ This file contains code for the Primal Dual research project
 
 from __future__ import annotations
 
-import argparse
 import itertools
 from itertools import product, chain, combinations, repeat
 from functools import reduce
@@ -20,15 +19,20 @@ from contextlib import nullcontext
 import random
 from random import randint
 import queue
+import threading
 from datetime import datetime, timedelta
 from hashlib import sha1
 from dataclasses import dataclass
 
+import numpy as np
+
 from syntax import *
 from logic import *
 from translator import Z3Translator
+import evaluator
+import explicit
 
-from typing import TypeVar, Iterable, FrozenSet, Union, Callable, Generator, Set, Optional, cast, Type, Collection, TYPE_CHECKING, AbstractSet
+from typing import TypeVar, Iterable, FrozenSet, Union, Callable, Generator, Set, Optional, cast, Type, Collection, TYPE_CHECKING, AbstractSet, Mapping
 
 A = TypeVar('A')
 # form: https://docs.python.org/3/library/itertools.html#itertools-recipes
@@ -205,14 +209,14 @@ def get_solver() -> Solver:
 
 
 def cheap_check_implication(
-        hyps: Iterable[Expr],
+        hyps: Iterable[Union[Expr, State]],
         concs: Iterable[Expr],
 ) -> bool:
     s = get_solver()
     t = s.get_translator(1)
     with s.new_frame():
         for e in hyps:
-            s.add(t.translate_expr(e))
+            s.add(t.translate_state(e) if isinstance(e, State) else t.translate_expr(e))
         for e in concs:
             with s.new_frame():
                 s.add(z3.Not(t.translate_expr(e)))
@@ -226,14 +230,16 @@ def eval_in_state(s: Optional[Solver], m: PDState, p: Expr) -> bool:
     # if s is None:
     #     s = get_solver()
     cache = _cache_eval_in_state
-    k = (m, p)
+    k = (m.fingerprint(0), p)
     if k not in cache:
-        res = m.as_state(0).eval(p)
+        res = evaluator.eval_in_trace(m, p, 0)
         assert isinstance(res, bool)
         cache[k] = res
 
         # Older ways:
         #
+        # cache[k] = m.as_state(0).eval(p)
+        #
         # cache[k] = eval_clause_in_state(p, m)
         #
         # if m.z3model is not None:
@@ -299,18 +305,18 @@ def is_substructure(s: PDState, t: PDState) -> bool:
 
 _cache_two_state_implication : Dict[Any,Any] = dict(h=0,r=0)
 _cache_transitions: List[Tuple[PDState,PDState]] = []
-def isomorphic_states(solver: Solver, s: PDState, t: PDState) -> bool:
-    x = s.as_onestate_formula(0)
-    y = t.as_onestate_formula(0)
-    return x == y # or cheap_check_implication([], [Iff(x, y)])
-    # TODO: we need to figure this out. are two isomorphic structures the same state or no? this showed up in:
-    # time ./src/mypyvy.py pd-repeated-houdini --no-sharp --clear-cache examples/lockserv.pyv > 1
-    # time ./src/mypyvy.py pd-repeated-houdini --no-sharp --clear-cache-memo --cache-only-discovered examples/lockserv.pyv > 2
-    # this can be fixed by checking equivalence between onestate formulas, but this is very slow
+def isomorphic_states(solver: Optional[Solver], s: PDState, t: PDState) -> bool:
+    # isomorphic structures are considered the same state, see Trace.fingerprint
+    return s.fingerprint(0) == t.fingerprint(0)
+
+def state_index(states: Sequence[PDState], s: PDState) -> Optional[int]:
+    '''Returns the index of a state in states that is isomorphic to s, or None'''
+    fp = s.fingerprint(0)
+    return next((i for i, t in enumerate(states) if t.fingerprint(0) == fp), None)
 def check_two_state_implication_multiprocessing_helper(
         seed: Optional[int],
         s: Optional[Solver],
-        old_hyps: Iterable[Expr],
+        old_hyps: Iterable[Union[Expr, State]],
         new_conc: Expr,
         minimize: Optional[bool] = None,
 ) -> Optional[Tuple[Trace, Trace]]:
@@ -334,7 +340,7 @@ def check_two_state_implication_multiprocessing_helper(
         return unpack_cti(z3m, keep_prestate_in_poststate=True)
 def check_two_state_implication_multiprocessing(
         s: Solver,
-        old_hyps: Iterable[Expr],
+        old_hyps: Iterable[Union[Expr, State]],
         new_conc: Expr,
         minimize: Optional[bool] = None,
 ) -> Optional[Tuple[Trace, Trace]]:
@@ -372,7 +378,7 @@ def check_two_state_implication(
 
     if not isinstance(precondition, PDState):
         precondition = tuple(precondition)
-    k = (precondition, p)
+    k = (precondition.fingerprint(0) if isinstance(precondition, PDState) else precondition, p)
     cache = _cache_two_state_implication
     if k not in cache:
         if utils.args.cache_only:
@@ -387,7 +393,7 @@ def check_two_state_implication(
             for _k in cache:
                 if isinstance(_k, tuple):
                     x, y = _k
-                    if x == precondition:
+                    if x == k[0]:
                         print(y, cache[_k], y == p, hash(y), hash(p))
             assert False
 
@@ -407,7 +413,7 @@ def check_two_state_implication(
         else:
             res = check_two_state_implication_multiprocessing(
                 s,
-                [precondition.as_onestate_formula(0)] if isinstance(precondition, PDState) else precondition,
+                [precondition.as_state(0)] if isinstance(precondition, PDState) else precondition,
                 p,
                 minimize
             )
@@ -430,8 +436,8 @@ def check_two_state_implication(
                         print('poststate:')
                         print('-'*80 + '\n' + str(poststate) + '\n' + '-'*80)
                         if isinstance(precondition, PDState):
-                            print(f'prestate.as_onestate_formula(0) == precondition.as_onestate_formula(0): '
-                                  f'{prestate.as_onestate_formula(0) == precondition.as_onestate_formula(0)}')
+                            print(f'isomorphic_states(s, prestate, precondition): '
+                                  f'{isomorphic_states(s, prestate, precondition)}')
                         else:
                             print(f'all(eval_in_state(s, prestate, q) for q in precondition): '
                                   f'{all(eval_in_state(s, prestate, q) for q in precondition)}')
@@ -753,7 +759,8 @@ def check_dual_edge_multiprocessing_seeds(
             print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_multiprocessing_seeds: terminating process with PID={process.pid}')
             process.terminate()
             process.join()
-        assert len(multiprocessing.active_children()) == 0
+        # other children, e.g., the workers of get_hoare_worker_pool, are kept between calls
+        assert not any(process.is_alive() for process, _, _, _, _ in running)
 def check_dual_edge(
         s: Solver,
         ps: Tuple[Expr,...],
@@ -1016,20 +1023,56 @@ class HoareQuery:
             i_transition=i_transition,
         )
 
-# see: https://mypy.readthedocs.io/en/latest/common_issues.html#using-classes-that-are-generic-in-stubs-but-not-at-runtime
-if TYPE_CHECKING:
-    # this is only processed by mypy
-    T = Tuple[
-        HoareQuery,
-        bool, # True means valid, False means invalid
-        Optional[Tuple[PDState, PDState]], # optional CTI for invalid, but not required
-    ]
-    CheckDualEdgeOptimizeQueue = multiprocessing.Queue[T]
-    CheckDualEdgeOptimizeJoinableQueue = multiprocessing.JoinableQueue[T]
-else:
-    # this is not seen by mypy but will be executed at runtime.
-    CheckDualEdgeOptimizeQueue = multiprocessing.Queue
-    CheckDualEdgeOptimizeJoinableQueue = multiprocessing.JoinableQueue
+# number of seconds a worker of check_dual_edge_optimize is given to stop checking a cancelled
+# query (which interrupts its solver) before its process is killed and replaced
+_HOARE_CANCEL_GRACE = timedelta(seconds=10)
+
+class _HoareQueryCancelled(Exception):
+    pass
+
+# the arguments of check_dual_edge_optimize_multiprocessing_helper, except for control
+_HoareQueryArgs = Tuple[Tuple[Expr, ...], Tuple[Expr, ...], HoareQuery, bool, bool, bool, bool, bool]
+
+class _HoareQueryControl:
+    '''
+    The query being checked by a worker process of check_dual_edge_optimize, see HoareWorker.
+
+    The query is checked by the main thread of the worker, while another
+    thread receives the unsats found by other workers, and cancellations.
+    '''
+    def __init__(self, results: multiprocessing.connection.Connection) -> None:
+        self.results = results
+        self.lock = threading.Lock()
+        self.query_id = 0
+        self.known_unsats: List[HoareQuery] = []
+        self.cancelled = False
+        self.solver: Optional[Solver] = None  # the solver checking the query, which a cancellation interrupts
+
+    def send_result(self, hq: HoareQuery, valid: bool, cti: Optional[Tuple[PDState, PDState]]) -> None:
+        self.results.send(('result', self.query_id, hq, valid, cti))
+
+# the solvers of a worker process of check_dual_edge_optimize, indexed by whether they use
+# cvc4. they keep the program and its axioms between queries, and each query is checked in
+# a new frame
+_hoare_solvers: Dict[bool, Solver] = {}
+
+def _hoare_solver(use_cvc4: bool) -> Solver:
+    # runs in a worker process, see HoareWorker
+    if use_cvc4 not in _hoare_solvers:
+        _hoare_solvers[use_cvc4] = Solver(use_cvc4=use_cvc4)
+    s = _hoare_solvers[use_cvc4]
+    while len(s.stack) > 1:
+        s.pop()
+    return s
+
+def _reset_hoare_solvers() -> None:
+    # runs in a worker process, see HoareWorker
+    # an interrupted z3 solver is not reliable afterwards (its models may violate its assertions),
+    # and an interrupt that arrives between checks leaves the context cancelled until the next
+    # check, which makes model evaluation return unevaluated terms. so after a cancelled query,
+    # the solvers are replaced, and a trivial check clears the cancellation
+    _hoare_solvers.clear()
+    z3.Solver().check()
 
 def check_dual_edge_optimize_multiprocessing_helper(
         ps: Tuple[Expr,...],
@@ -1040,9 +1083,9 @@ def check_dual_edge_optimize_multiprocessing_helper(
         whole_clauses: bool, # if True, only try the empty clause or the entire top_clause (used in find_dual_backward_transition)
         use_cvc4: bool,
         save_smt2: bool, # TODO: move to separate function
-        q1: CheckDualEdgeOptimizeJoinableQueue,
-        q2: CheckDualEdgeOptimizeQueue,
+        control: _HoareQueryControl,
 ) -> None:
+    # runs in a worker process, see HoareWorker
     if use_cvc4:
         minimize = utils.args.cvc4_minimize_models
     else:
@@ -1053,37 +1096,27 @@ def check_dual_edge_optimize_multiprocessing_helper(
             assert cti is None or not valid
             if not produce_cti:
                 cti = None
-            q1.put((hq, valid, cti))
+            control.send_result(hq, valid, cti)
         def validate_cti(prestate: PDState, poststate: PDState) -> None:
             # TODO: remove this once we trust the code enough
             assert all(eval_in_state(None, prestate,  p) for p in ps), f'{greeting}: {(ps, top_clauses, hq, s.debug_recent())}'
             assert all(eval_in_state(None, poststate, p) for p in ps), f'{greeting}: {(ps, top_clauses, hq, s.debug_recent())}'
             assert all(eval_in_state(None, prestate,  mp.to_clause(k, hq.q_pre[k])) for k in range(mp.m)), f'{greeting}: {(ps, top_clauses, hq, s.debug_recent())}'
             assert all(not eval_in_state(None, poststate, mp.to_clause(k, hq.q_post[k])) for k in range(mp.m)), f'{greeting}: {(ps, top_clauses, hq, s.debug_recent())}'
-        known_unsats: List[HoareQuery] = []
-        def recv_unsats() -> None:
-            while True:
-                try:
-                    hq, valid, cti = q2.get_nowait()
-                except queue.Empty:
-                    break
-                assert valid and cti is None
-                known_unsats.append(hq)
         def known_to_be_unsat(hq: HoareQuery) -> bool:
             if any(len(x) == 0 for x in hq.q_pre):
                 return True
-            recv_unsats()
+            # known_unsats grows as other workers find unsats, see _hoare_worker_main
             return any(
                 hq <= unsat_hq
-                for unsat_hq in known_unsats
+                for unsat_hq in control.known_unsats
             )
-        recv_unsats()
         prog = syntax.the_program
         mp = MultiSubclausesMapICE(top_clauses, [], []) # only used to get clauses from seeds
         greeting = f'[PID={os.getpid()}] check_dual_edge_optimize_multiprocessing_helper: use_cvc4={use_cvc4}, hq={hq}'
         # TODO: better logging, maybe with meaningful process names
         def get_solver(hq: HoareQuery) -> Tuple[Solver, Z3Translator]:
-            s = Solver(use_cvc4=use_cvc4)
+            s = _hoare_solver(use_cvc4)
             seed = randint(0, 10**6)
             if not use_cvc4:
                 # print(f'[{datetime.now()}] {greeting}: setting z3 seed to {seed}')
@@ -1096,6 +1129,7 @@ def check_dual_edge_optimize_multiprocessing_helper(
                 # print(f'[{datetime.now()}] {greeting}: using cvc4 (random seed set by run_cvc4.sh)')
                 pass
             t = s.get_translator(2)
+            s.push()  # popped by _hoare_solver before the next query
             # add transition relation
             s.add(t.translate_expr(list(prog.transitions())[hq.i_transition].as_twostate_formula(prog.scope)))
             # add ps
@@ -1110,6 +1144,13 @@ def check_dual_edge_optimize_multiprocessing_helper(
                 if len(hq.q_post[k]) > 0:
                     s.add(z3.Not(t.translate_expr(New(mp.to_clause(k, hq.q_post[k])))))
             return s, t
+        def check() -> z3.CheckSatResult:
+            # cancelling the query interrupts the solver, see _hoare_worker_main
+            res = s.check()
+            if control.cancelled:
+                raise _HoareQueryCancelled()
+            assert res in (z3.sat, z3.unsat)
+            return res
         s, t = get_solver(hq)
         if save_smt2:
             smt2 = s.z3solver.to_smt2()
@@ -1118,7 +1159,7 @@ def check_dual_edge_optimize_multiprocessing_helper(
             open(fn, 'w').write(smt2)
             # TODO: we should actually exit here, i.e., make saving to smt2 a separate function
         print(f'[{datetime.now()}] {greeting}: checking input queury')
-        z3res = s.check()
+        z3res = check()
         print(f'[{datetime.now()}] {greeting}: got {z3res}' + (', optimizing cti' if z3res == z3.sat and optimize else ''))
         assert z3res in (z3.sat, z3.unsat)
         if z3res == z3.unsat:
@@ -1141,7 +1182,7 @@ def check_dual_edge_optimize_multiprocessing_helper(
                 if known_to_be_unsat(other_hq):
                     continue
                 s, t = get_solver(other_hq)
-                z3res = s.check()
+                z3res = check()
                 assert z3res in (z3.sat, z3.unsat)
                 if z3res == z3.unsat:
                     send_result(other_hq, True)
@@ -1153,7 +1194,7 @@ def check_dual_edge_optimize_multiprocessing_helper(
                 # all transitions are unsat, return
                 return
 
-        assert s.check() == z3.sat
+        assert check() == z3.sat
 
         if not optimize and not produce_cti:
             # just report that the Hoare triple is invalid
@@ -1209,7 +1250,7 @@ def check_dual_edge_optimize_multiprocessing_helper(
                 s.push()
                 s.add(z3.Not(t.translate_expr(New(mp.to_clause(k, hq_try.q_post[k])))))
                 # print(f'[{datetime.now()}] {greeting}: trying to weaken postcondition k={k}, d={sorted(d)}')
-                z3res = s.check()
+                z3res = check()
                 # print(f'[{datetime.now()}] {greeting}: got {z3res}')
                 assert z3res in (z3.sat, z3.unsat)
                 if z3res == z3.unsat:
@@ -1230,7 +1271,7 @@ def check_dual_edge_optimize_multiprocessing_helper(
                 s.pop()
             # print(f'[{datetime.now()}] {greeting}: optimal q_post[{k}]: {sorted(hq.q_post[k])}')
             s.add(z3.Not(t.translate_expr(New(mp.to_clause(k, hq.q_post[k])))))
-            assert s.check() == z3.sat
+            assert check() == z3.sat
         # print(f'[{datetime.now()}] {greeting}: optimizing precondition')
         for k in range(mp.m):  # TODO: random shuffle?
             if not whole_clauses:
@@ -1247,7 +1288,7 @@ def check_dual_edge_optimize_multiprocessing_helper(
                 s.push()
                 s.add(t.translate_expr(mp.to_clause(k, hq_try.q_pre[k])))
                 # print(f'[{datetime.now()}] {greeting}: trying to strengthen precondition k={k}, d={sorted(d)}')
-                z3res = s.check()
+                z3res = check()
                 # print(f'[{datetime.now()}] {greeting}: got {z3res}')
                 assert z3res in (z3.sat, z3.unsat)
                 if z3res == z3.unsat:
@@ -1268,40 +1309,224 @@ def check_dual_edge_optimize_multiprocessing_helper(
                 s.pop()
             # print(f'[{datetime.now()}] {greeting}: optimal q_pre[{k}]: {sorted(hq.q_pre[k])}')
             s.add(t.translate_expr(mp.to_clause(k, hq.q_pre[k])))
-            assert s.check() == z3.sat
+            assert check() == z3.sat
         # print(f'[{datetime.now()}] {greeting}: found optimal cti')
     finally:
-        q1.join()
-        print(f'[{datetime.now()}] {greeting}: finished and joined q1, returning')
-
-@dataclass
-class RunningProcess:
-    process: multiprocessing.Process
-    q1: CheckDualEdgeOptimizeJoinableQueue
-    q2: CheckDualEdgeOptimizeQueue
-    deadline: datetime
-    hq: HoareQuery
-    use_cvc4: bool
-    def terminate(self) -> None:
-        '''Terminate the process if it's still alive (using SIGTERM).
+        print(f'[{datetime.now()}] {greeting}: finished, returning')
+
+def _hoare_worker_main(requests: multiprocessing.connection.Connection,
+                       results: multiprocessing.connection.Connection) -> None:
+    # runs in a worker process, see HoareWorker
+    control = _HoareQueryControl(results)
+    queries: queue.Queue[Optional[Tuple[int, _HoareQueryArgs]]] = queue.Queue()
+
+    def receive() -> None:
+        while True:
+            with control.lock:
+                interrupting = control.cancelled and control.solver is not None
+                if interrupting:
+                    assert control.solver is not None
+                    control.solver.interrupt()
+            # an interrupt just before a check starts is lost, so it is repeated until the query stops
+            if interrupting and not requests.poll(0.1):
+                continue
+            try:
+                msg = requests.recv()
+            except EOFError:
+                # the parent is gone
+                with control.lock:
+                    control.cancelled = True
+                queries.put(None)
+                return
+            with control.lock:
+                if msg[0] == 'query':
+                    # the previous query is done, since a worker is only sent a query when it is idle
+                    _, control.query_id, args, known_unsats = msg
+                    control.known_unsats = list(known_unsats)
+                    control.cancelled = False
+                    queries.put((control.query_id, args))
+                elif msg[0] == 'unsat':
+                    if msg[1] == control.query_id:
+                        control.known_unsats.append(msg[2])
+                elif msg[0] == 'cancel':
+                    if msg[1] == control.query_id:
+                        control.cancelled = True
+                else:
+                    assert False, msg
 
-        Makes sure to close the queues and join their thread so it
-        does not get pipe errors.
+    threading.Thread(target=receive, daemon=True).start()
+    while True:
+        query = queries.get()
+        if query is None:
+            return
+        query_id, args = query
+        use_cvc4 = args[6]
+        with control.lock:
+            control.solver = _hoare_solver(use_cvc4)
+        try:
+            check_dual_edge_optimize_multiprocessing_helper(*args, control)
+        except Exception:
+            # a cancelled query may also stop with other errors, e.g., when cvc4 is killed
+            if not control.cancelled:
+                raise
+        with control.lock:
+            control.solver = None
+            cancelled = control.cancelled
+        if cancelled:
+            _reset_hoare_solvers()
+        results.send(('done', query_id, cancelled))
+
+class HoareWorker:
+    '''
+    A long-lived process that checks Hoare queries for check_dual_edge_optimize,
+    one at a time, keeping its solvers between them (see _hoare_solver).
+
+    A query is given a deadline, after which it is cancelled, like a query that
+    is no longer needed. Cancelling is cooperative: the worker interrupts its
+    solver, and reports that it is done. Only if it does not do so within
+    _HOARE_CANCEL_GRACE is its process killed and replaced.
+    '''
+    def __init__(self) -> None:
+        self.query_id = 0
+        # the last query submitted, and its budget
+        self.hq: Optional[HoareQuery] = None
+        self.use_cvc4 = False
+        self.deadline = datetime.now()
+        self.busy = False  # True until the worker reports that the last query is done
+        self.cancelled_at: Optional[datetime] = None  # if the last query was cancelled
+        self._start()
+
+    def _start(self) -> None:
+        requests, self.requests = multiprocessing.Pipe(duplex=False)
+        self.results, results = multiprocessing.Pipe(duplex=False)
+        self.process = multiprocessing.Process(target=_hoare_worker_main, args=(requests, results), daemon=True)
+        self.process.start()
+        requests.close()
+        results.close()
+
+    def restart(self) -> None:
+        '''Kill the process (e.g., if it does not stop a cancelled query), and start a new one.'''
+        self.terminate()
+        self.busy = False
+        self.cancelled_at = None
+        self._start()
+
+    def terminate(self) -> None:
+        self.process.terminate()
+        self.process.join()
+        self.requests.close()
+        self.results.close()
+
+    def submit(
+            self,
+            ps: Tuple[Expr, ...],
+            top_clauses: Tuple[Expr, ...],
+            hq: HoareQuery,
+            produce_cti: bool,
+            optimize: bool,
+            whole_clauses: bool,
+            use_cvc4: bool,
+            save_smt2: bool,
+            known_unsats: List[HoareQuery],
+            timeout: timedelta,
+    ) -> None:
+        '''Start checking a query (see check_dual_edge_optimize_multiprocessing_helper).'''
+        assert not self.busy
+        self.query_id += 1
+        self.hq = hq
+        self.use_cvc4 = use_cvc4
+        self.deadline = datetime.now() + timeout
+        self.busy = True
+        self.cancelled_at = None
+        args: _HoareQueryArgs = (ps, top_clauses, hq, produce_cti, optimize, whole_clauses, use_cvc4, save_smt2)
+        self.requests.send(('query', self.query_id, args, known_unsats))
+
+    def send_unsat(self, hq: HoareQuery) -> None:
+        '''Tell the worker that hq is unsat, which may save it some checks.'''
+        assert self.busy
+        self.requests.send(('unsat', self.query_id, hq))
+
+    def cancel(self) -> None:
+        assert self.busy
+        if self.cancelled_at is None:
+            self.cancelled_at = datetime.now()
+            self.requests.send(('cancel', self.query_id))
+
+    def receive(self) -> List[Tuple[HoareQuery, bool, Optional[Tuple[PDState, PDState]]]]:
         '''
-        if not self.process.is_alive():
-            # no need to close and join the queues here, and doing so
-            # leads to a rare deadlock
-            self.process.join()
-        else:
-            # need to close and join the queues here, otherwise we'll
-            # get pipe errors from the queues' threads.
-            self.q1.close()
-            self.q2.close()
-            # it seems this can lead to deadlocks even if self.process.is_alive returned true. maybe its enough just to close the queue? (question is will we get pipe errors)
-            # self.q1.join_thread()
-            # self.q2.join_thread()
-            self.process.terminate()
-            self.process.join()
+        Return the new results of the current query, i.e., (hq, valid, cti) tuples,
+        and mark the worker as not busy if the query is done. The results of a
+        cancelled query are ignored.
+        '''
+        results = []
+        while self.busy and self.results.poll():
+            try:
+                msg = self.results.recv()
+            except EOFError:
+                self.process.join()
+                assert False, f'worker with PID={self.process.pid} exited with code {self.process.exitcode}'
+            assert msg[1] == self.query_id, msg
+            if msg[0] == 'result':
+                if self.cancelled_at is None:
+                    results.append(msg[2:])
+            elif msg[0] == 'done':
+                self.busy = False
+            else:
+                assert False, msg
+        return results
+
+class HoareWorkerPool:
+    '''The workers of check_dual_edge_optimize, see get_hoare_worker_pool.'''
+    def __init__(self, n: int) -> None:
+        self.prog = syntax.the_program
+        self.args = utils.args
+        self.workers = [HoareWorker() for _ in range(n)]
+
+    def restart_unresponsive(self) -> None:
+        '''Replace the workers that did not stop a cancelled query in time.'''
+        now = datetime.now()
+        for w in self.workers:
+            if w.busy and w.cancelled_at is not None and now > w.cancelled_at + _HOARE_CANCEL_GRACE:
+                print(f'[{datetime.now()}] [PID={os.getpid()}] HoareWorkerPool: killing worker with PID={w.process.pid}, '
+                      f'which did not stop its cancelled query hq={w.hq}, use_cvc4={w.use_cvc4}')
+                w.restart()
+
+    def wait(self, deadline: Optional[datetime]) -> None:
+        '''Wait until some busy worker has news, or until deadline (or the deadline of a cancellation) passes.'''
+        deadlines = [w.cancelled_at + _HOARE_CANCEL_GRACE for w in self.workers if w.busy and w.cancelled_at is not None]
+        if deadline is not None:
+            deadlines.append(deadline)
+        seconds = max(0.1, (min(deadlines) - datetime.now()).total_seconds()) if len(deadlines) > 0 else 0.1
+        multiprocessing.connection.wait([w.results for w in self.workers if w.busy], timeout=seconds)
+
+    def cancel_all(self) -> None:
+        for w in self.workers:
+            if w.busy:
+                w.cancel()
+
+    def close(self) -> None:
+        for w in self.workers:
+            w.terminate()
+
+_hoare_worker_pool: Optional[HoareWorkerPool] = None
+
+def get_hoare_worker_pool(n: int) -> HoareWorkerPool:
+    '''
+    Return a pool of n workers for check_dual_edge_optimize.
+
+    The pool is kept between calls, e.g., between iterations of primal_dual_houdini,
+    so the workers keep their solvers. It is only replaced when n, the program, or
+    the command line arguments change, since the workers have those of the process
+    that started them.
+    '''
+    global _hoare_worker_pool
+    pool = _hoare_worker_pool
+    if pool is None or len(pool.workers) != n or pool.prog is not syntax.the_program or pool.args is not utils.args or \
+       not all(w.process.is_alive() for w in pool.workers):
+        if pool is not None:
+            pool.close()
+        pool = _hoare_worker_pool = HoareWorkerPool(n)
+    return pool
 
 def check_dual_edge_optimize_find_cti(
         ps: Tuple[Expr, ...],
@@ -1313,7 +1538,7 @@ def check_dual_edge_optimize_find_cti(
     this uses multiprocessing to check a dual edge, and get an
     optimized cti in case the edge is not valid
 
-    this function uses multiprocessing to start multiple solvers for
+    this function uses the workers of get_hoare_worker_pool to run multiple solvers for
     different transitions, qs, and random seeds, and restarts the solvers using a Luby sequence
 
     '''
@@ -1347,12 +1572,12 @@ def check_dual_edge_optimize_find_cti(
 
     print(f'[{datetime.now()}] check_dual_edge_optimize_find_cti: initially with {len(active_queries)} active queries')
 
-    running: List[RunningProcess] = [] # list of currently running processes
+    pool = get_hoare_worker_pool(n_cpus)
 
     # details about the best SAT result we got so far:
     current_cti: Optional[Tuple[PDState, PDState]] = None
     current_hq: Optional[HoareQuery] = None
-    current_sat_rp: Optional[RunningProcess] = None
+    current_sat_query: Optional[Tuple[HoareWorker, int]] = None # the worker and its query id
 
     # map (hq, use_cvc4) to number of attempts spent on it (note that attempt i takes Luby[i] time)
     # nothing is ever removed from tasks, and active_queries is used to maintain the active ones
@@ -1362,36 +1587,28 @@ def check_dual_edge_optimize_find_cti(
         while True:
             # see if we got new results
             n_known_unsats = len(known_unsats) # to later send the new onces
-            worklist = list(running)
             any_news = False
-            while len(worklist) > 0:
-                rp = worklist[0]
-                try:
-                    hq, valid, cti = rp.q1.get_nowait()
-                    rp.q1.task_done()
-                except queue.Empty:
-                    worklist = worklist[1:]
-                    continue
+            for w, (hq, valid, cti) in ((w, res) for w in pool.workers for res in w.receive()):
                 any_news = True
-                assert hq <= rp.hq.replace_transition(hq.i_transition) # we may get a cti for another transition, and we allow it
+                assert w.hq is not None and hq <= w.hq.replace_transition(hq.i_transition) # we may get a cti for another transition, and we allow it
                 assert (valid and cti is None) or (not valid and cti is not None)
                 if valid:
                     # got new unsat result
-                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: got an UNSAT result from PID={rp.process.pid} for hq={hq}, use_cvc4={rp.use_cvc4}')
+                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: got an UNSAT result from PID={w.process.pid} for hq={hq}, use_cvc4={w.use_cvc4}')
                     known_unsats.append(hq)
                 elif current_hq is not None and not hq.replace_transition(0) < current_hq.replace_transition(0):
                     # got a new cti but it's not better than our current best model (ignoring the transition), so we ignore it
-                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: got a SAT result from PID={rp.process.pid} that we discard (hq={hq}, use_cvc4={rp.use_cvc4})')
+                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: got a SAT result from PID={w.process.pid} that we discard (hq={hq}, use_cvc4={w.use_cvc4})')
                 else:
                     # the new cti is strictly better than our current
-                    # cti. this is a big deal. the process that found
-                    # it becomes not subject to timeout, all the other
-                    # processes will get killed, and new queries will
-                    # get started
-                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: got a SAT result from PID={rp.process.pid} that is better than what we had (hq={hq}, use_cvc4={rp.use_cvc4})')
+                    # cti. this is a big deal. the worker that found
+                    # it becomes not subject to timeout, the queries of
+                    # all the other workers will get cancelled, and new
+                    # queries will get started
+                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: got a SAT result from PID={w.process.pid} that is better than what we had (hq={hq}, use_cvc4={w.use_cvc4})')
                     current_cti = cti
                     current_hq = hq
-                    current_sat_rp = rp
+                    current_sat_query = (w, w.query_id)
                     active_queries = []
                     # first, see if there is a way to weaken the postcondition where it was non-trivial before
                     for k in range(mp.m):
@@ -1444,46 +1661,44 @@ def check_dual_edge_optimize_find_cti(
                 #    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti:     {hq}')
                 # print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: carrying on')
 
-            # kill processes that timed out or whose query is no longer active (except for current_sat_rp - the last process to return a model)
+            # cancel queries that timed out or are no longer active (except for current_sat_query - the last query to return a model)
             now = datetime.now()
-            still_running = []
-            for rp in running:
-                if not rp.process.is_alive():
-                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: process with PID={rp.process.pid} terminated')
-                    rp.terminate()
-                    assert rp.process.exitcode == 0, rp.process.exitcode
-                elif rp is current_sat_rp:
-                    # this processes is protected, and its task doesn't need to be in tasks
-                    still_running.append(rp)
-                elif all(rp.hq.replace_transition(i_transition) not in active_queries for i_transition in range(n_transitions)): # rp will also try other transitions
-                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: terminating process with PID={rp.process.pid}, hq={rp.hq}, use_cvc4={rp.use_cvc4} due to another result')
-                    rp.terminate()
-                elif now > rp.deadline:
-                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: terminating process with PID={rp.process.pid}, hq={rp.hq}, use_cvc4={rp.use_cvc4} due to timeout')
-                    rp.terminate()
-                else:
-                    still_running.append(rp)
-            running = still_running
-
-            # send new_unsats to everyone whose still running
+            for w in pool.workers:
+                if not w.busy or w.cancelled_at is not None:
+                    continue
+                assert w.hq is not None
+                if (w, w.query_id) == current_sat_query:
+                    # this query is protected, and its task doesn't need to be in tasks
+                    pass
+                elif all(w.hq.replace_transition(i_transition) not in active_queries for i_transition in range(n_transitions)): # w will also try other transitions
+                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: cancelling query of worker with PID={w.process.pid}, hq={w.hq}, use_cvc4={w.use_cvc4} due to another result')
+                    w.cancel()
+                elif now > w.deadline:
+                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: cancelling query of worker with PID={w.process.pid}, hq={w.hq}, use_cvc4={w.use_cvc4} due to timeout')
+                    w.cancel()
+            pool.restart_unresponsive()
+
+            # send new_unsats to every worker whose query is still running
             for hq in known_unsats[n_known_unsats:]:
-                for rp in running:
-                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: sending new unsat to process with PID={rp.process.pid}')
-                    rp.q2.put((hq, True, None))
+                for w in pool.workers:
+                    if w.busy and w.cancelled_at is None:
+                        print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: sending new unsat to worker with PID={w.process.pid}')
+                        w.send_unsat(hq)
 
-            # start new processes
+            # start new queries on idle workers
             active_tasks = list(product(
                 active_queries, # hq
                 [False, True], # use_cvc4
             ))
-            while len(running) < n_cpus:
+            for w in pool.workers:
+                if w.busy:
+                    continue
                 task_to_run = min(active_tasks, key=tasks.__getitem__)
                 hq, use_cvc4 = task_to_run
                 timeout = t0 * luby(tasks[task_to_run])
                 tasks[task_to_run] += 1
-                q1 = CheckDualEdgeOptimizeJoinableQueue()
-                q2 = CheckDualEdgeOptimizeQueue()
-                args = (
+                print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: starting new query on worker with PID={w.process.pid} for hq={hq}, use_cvc4={use_cvc4} with a timeout of {timeout.total_seconds()} seconds')
+                w.submit(
                     ps,
                     top_clauses,
                     hq,
@@ -1492,55 +1707,22 @@ def check_dual_edge_optimize_find_cti(
                     whole_clauses,
                     use_cvc4,
                     not use_cvc4 and tasks[task_to_run] == n_cpus + 1, # on the (n_cpu + 1)'th attempt, save to smt2 for later analysis
-                    q1,
-                    q2,
-                )
-                if TYPE_CHECKING: # trick to get typechecking for check_dual_edge_optimize_multiprocessing_helper
-                    check_dual_edge_optimize_multiprocessing_helper(*args)
-                process = multiprocessing.Process(
-                    target=check_dual_edge_optimize_multiprocessing_helper,
-                    args=args,
-                )
-                deadline = datetime.now() +  timeout
-                print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: starting new process for hq={hq}, use_cvc4={use_cvc4} with a timeout of {timeout.total_seconds()} seconds')
-                rp = RunningProcess(
-                    process,
-                    q1,
-                    q2,
-                    deadline,
-                    hq,
-                    use_cvc4,
+                    known_unsats,
+                    timeout,
                 )
-                for hq in known_unsats: # put known_unsats in q2 before starting the process
-                    rp.q2.put((hq, True, None))
-                process.start()
-                running.append(rp)
-
-            # wait for a bit
-            # print('\n\nsleeping for a bit\n\n')
-            # time.sleep(0.1)
-            # print('\n\nwaking up again\n\n')
 
             # wait until we have new results, or until the next deadline expires
             earliest_deadline = min(
-                (rp.deadline for rp in running if rp is not current_sat_rp),
+                (w.deadline for w in pool.workers if w.busy and w.cancelled_at is None and (w, w.query_id) != current_sat_query),
                 default=None,
             )
-            seconds = (0.1 if earliest_deadline is None else
-                       (earliest_deadline - datetime.now()).total_seconds())
-            seconds = max(0.1, seconds)
-            print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: waiting for news with a timeout of {seconds} seconds')
-            multiprocessing.connection.wait(
-                [rp.q1._reader for rp in running], # type: ignore
-                timeout=seconds,
-            )
+            print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: waiting for news until {earliest_deadline}')
+            pool.wait(earliest_deadline)
         assert False
     finally:
-        # terminate all running processeses
-        for rp in running:
-            print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: terminating process with PID={rp.process.pid}')
-            rp.terminate()
-        assert len(multiprocessing.active_children()) == 0
+        # cancel all running queries, the workers are kept for the next call
+        print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_find_cti: cancelling all running queries')
+        pool.cancel_all()
 
 def check_dual_edge_optimize_minimize_ps(
         ps: Tuple[Expr, ...],
@@ -1550,7 +1732,7 @@ def check_dual_edge_optimize_minimize_ps(
     '''
     this uses multiprocessing to minimize the ps required for the given valid dual edge
 
-    this function uses multiprocessing to start multiple solvers for
+    this function uses the workers of get_hoare_worker_pool to run multiple solvers for
     different transitions, ps, and random seeds, and restarts the solvers using a Luby sequence
 
     '''
@@ -1610,7 +1792,7 @@ def check_dual_edge_optimize_minimize_ps(
 
     print(f'[{datetime.now()}] check_dual_edge_optimize_minimize_ps: initially with {len(active_queries)} active queries')
 
-    running: List[RunningProcess] = [] # list of currently running processes
+    pool = get_hoare_worker_pool(n_cpus)
 
     # map (hq, use_cvc4) to number of attempts spent on it (note that attempt i takes Luby[i] time)
     # nothing is ever removed from tasks, and active_queries is used to maintain the active ones
@@ -1619,27 +1801,19 @@ def check_dual_edge_optimize_minimize_ps(
     try:
         while True:
             # see if we got new results
-            worklist = list(running)
             any_news = False
-            while len(worklist) > 0:
-                rp = worklist[0]
-                try:
-                    hq, valid, cti = rp.q1.get_nowait()
-                    rp.q1.task_done()
-                except queue.Empty:
-                    worklist = worklist[1:]
-                    continue
+            for w, (hq, valid, cti) in ((w, res) for w in pool.workers for res in w.receive()):
                 any_news = True
                 assert cti is None
                 if valid:
                     # got new unsat result
                     # this may trigger changing the current_p, but we'll check that later since it requires more than one result
-                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_minimize_ps: got an UNSAT result from PID={rp.process.pid} for hq={hq}, use_cvc4={rp.use_cvc4}')
+                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_minimize_ps: got an UNSAT result from PID={w.process.pid} for hq={hq}, use_cvc4={w.use_cvc4}')
                     known_unsats.append(hq)
                 else:
                     # got new sat result
                     # this makes some other queries unneeded, but we'll filter them later
-                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_minimize_ps: got a SAT result from PID={rp.process.pid} for hq={hq}, use_cvc4={rp.use_cvc4}')
+                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_minimize_ps: got a SAT result from PID={w.process.pid} for hq={hq}, use_cvc4={w.use_cvc4}')
                     known_sats.append(hq)
 
             if any_news:
@@ -1670,37 +1844,34 @@ def check_dual_edge_optimize_minimize_ps(
                     #     print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_minimize_ps:     {hq}')
                     # print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_minimize_ps: carrying on')
 
-            # kill processes that timed out or whose query is no longer active
+            # cancel queries that timed out or are no longer active
             now = datetime.now()
-            still_running = []
-            for rp in running:
-                if not rp.process.is_alive():
-                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_minimize_ps: process with PID={rp.process.pid} terminated')
-                    rp.terminate()
-                    assert rp.process.exitcode == 0, rp.process.exitcode
-                elif all(rp.hq.replace_transition(i_transition) not in active_queries for i_transition in range(n_transitions)): # rp will also try other transitions
-                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_minimize_ps: terminating process with PID={rp.process.pid}, hq={rp.hq}, use_cvc4={rp.use_cvc4} due to another result')
-                    rp.terminate()
-                elif now > rp.deadline:
-                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_minimize_ps: terminating process with PID={rp.process.pid}, hq={rp.hq}, use_cvc4={rp.use_cvc4} due to timeout')
-                    rp.terminate()
-                else:
-                    still_running.append(rp)
-            running = still_running
-
-            # start new processes
+            for w in pool.workers:
+                if not w.busy or w.cancelled_at is not None:
+                    continue
+                assert w.hq is not None
+                if all(w.hq.replace_transition(i_transition) not in active_queries for i_transition in range(n_transitions)): # w will also try other transitions
+                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_minimize_ps: cancelling query of worker with PID={w.process.pid}, hq={w.hq}, use_cvc4={w.use_cvc4} due to another result')
+                    w.cancel()
+                elif now > w.deadline:
+                    print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_minimize_ps: cancelling query of worker with PID={w.process.pid}, hq={w.hq}, use_cvc4={w.use_cvc4} due to timeout')
+                    w.cancel()
+            pool.restart_unresponsive()
+
+            # start new queries on idle workers
             active_tasks = list(product(
                 active_queries, # hq
                 [False, True], # use_cvc4
             ))
-            while len(running) < n_cpus:
+            for w in pool.workers:
+                if w.busy:
+                    continue
                 task_to_run = min(active_tasks, key=tasks.__getitem__)
                 hq, use_cvc4 = task_to_run
                 timeout = t0 * luby(tasks[task_to_run])
                 tasks[task_to_run] += 1
-                q1 = CheckDualEdgeOptimizeJoinableQueue()
-                q2 = CheckDualEdgeOptimizeQueue()
-                args = (
+                print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_minimize_ps: starting new query on worker with PID={w.process.pid} for hq={hq}, use_cvc4={use_cvc4} with a timeout of {timeout.total_seconds()} seconds')
+                w.submit(
                     ps,
                     top_clauses,
                     hq,
@@ -1709,48 +1880,22 @@ def check_dual_edge_optimize_minimize_ps(
                     False, # whole_clauses
                     use_cvc4,
                     not use_cvc4 and tasks[task_to_run] == n_cpus + 1, # on the (n_cpu + 1)'th attempt, save to smt2 for later analysis
-                    q1,
-                    q2,
+                    [],
+                    timeout,
                 )
-                if TYPE_CHECKING: # trick to get typechecking for check_dual_edge_optimize_multiprocessing_helper
-                    check_dual_edge_optimize_multiprocessing_helper(*args)
-                process = multiprocessing.Process(
-                    target=check_dual_edge_optimize_multiprocessing_helper,
-                    args=args,
-                )
-                deadline = datetime.now() +  timeout
-                print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_minimize_ps: starting new process for hq={hq}, use_cvc4={use_cvc4} with a timeout of {timeout.total_seconds()} seconds')
-                rp = RunningProcess(
-                    process,
-                    q1,
-                    q2,
-                    deadline,
-                    hq,
-                    use_cvc4,
-                )
-                process.start()
-                running.append(rp)
 
             # wait until we have new results, or until the next deadline expires
             earliest_deadline = min(
-                (rp.deadline for rp in running),
+                (w.deadline for w in pool.workers if w.busy and w.cancelled_at is None),
                 default=None,
             )
-            seconds = (0.1 if earliest_deadline is None else
-                       (earliest_deadline - datetime.now()).total_seconds())
-            seconds = max(0.1, seconds)
-            print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_minimize_ps: waiting for news with a timeout of {seconds} seconds')
-            multiprocessing.connection.wait(
-                [rp.q1._reader for rp in running], # type: ignore
-                timeout=seconds,
-            )
+            print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_minimize_ps: waiting for news until {earliest_deadline}')
+            pool.wait(earliest_deadline)
         assert False
     finally:
-        # terminate all running processeses
-        for rp in running:
-            print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_minimize_ps: terminating process with PID={rp.process.pid}')
-            rp.terminate()
-        assert len(multiprocessing.active_children()) == 0
+        # cancel all running queries, the workers are kept for the next call
+        print(f'[{datetime.now()}] [PID={os.getpid()}] check_dual_edge_optimize_minimize_ps: cancelling all running queries')
+        pool.cancel_all()
 
 def check_dual_edge_optimize(
         ps: Tuple[Expr,...],
@@ -1819,18 +1964,26 @@ def check_k_state_implication(
         p: Expr,
         k: int,
         msg: str = 'transition',
+        bmc: Optional[IncrementalBMC] = None,
 ) -> Optional[Tuple[PDState,...]]:
+    '''
+    If bmc is given, it must be an unrolling of p from precondition, which
+    is used instead of a fresh one (see logic.IncrementalBMC).
+    '''
     # TODO: we should cache these
 
     if not isinstance(precondition, PDState):
         precondition = tuple(precondition)
 
-    om = check_bmc(
-        s,
-        p,
-        k,
-        [precondition.as_onestate_formula(0)] if isinstance(precondition, PDState) else precondition,
-    )
+    if bmc is not None:
+        om = bmc.check(k)
+    else:
+        om = check_bmc(
+            s,
+            p,
+            k,
+            [precondition.as_state(0)] if isinstance(precondition, PDState) else precondition,
+        )
     if om is None:
         return None
     else:
@@ -2075,10 +2228,10 @@ def map_clause_state_interaction(variables: Tuple[SortedVar,...],
     all_n = frozenset(range(n))
     solver = Solver()
     t = solver.get_translator(1)
-    solver.add(t.translate_expr(
-        state_or_predicate.as_onestate_formula(0) if isinstance(state_or_predicate, PDState) else
-        state_or_predicate
-    ))
+    solver.add(
+        t.translate_state(state_or_predicate.as_state(0)) if isinstance(state_or_predicate, PDState) else
+        t.translate_expr(state_or_predicate)
+    )
 
     # there is some craziness here about mixing a mypyvy clause with z3 indicator variables
     # some of this code is taken out of syntax.Z3Translator.translate_expr
@@ -2174,6 +2327,115 @@ def map_clause_state_interaction_instantiate(
     literals) that are violated by the given state (equivalent to
     all_mss computed by map_clause_state_interaction), using explicit
     iteration over all quantifier instantiations.
+
+    All literals are evaluated over all instantiations at once, as a
+    boolean matrix (instantiations x literals) computed with numpy,
+    and the maximal violated subsets are then extracted from the rows
+    of this matrix using bitset operations. The result is the same
+    (including order) as map_clause_state_interaction_instantiate_python.
+    '''
+    univs: Dict[str, Tuple[str, ...]] = {d.name: u for d, u in state.univs.items()}
+    index: Dict[str, Dict[str, int]] = {name: {e: i for i, e in enumerate(u)} for name, u in univs.items()}
+    m = state.as_state(0)
+    consts = {d.name: (d, v) for d, v in m.const_interps.items()}
+    functions = {d.name: (d, v) for d, v in m.func_interps.items()}
+    relations = {d.name: (d, v) for d, v in m.rel_interps.items()}
+
+    for v in variables:
+        assert isinstance(v.sort, UninterpretedSort), v
+    shape = tuple(len(univs[cast(UninterpretedSort, v.sort).name]) for v in variables)
+    # each variable ranges over its own axis of the instantiation grid
+    var_values: Dict[str, np.ndarray] = {
+        v.name: np.arange(shape[i]).reshape(tuple(shape[i] if j == i else 1 for j in range(len(shape))))
+        for i, v in enumerate(variables)
+    }
+
+    tables: Dict[str, np.ndarray] = {}
+    def table(name: str) -> np.ndarray:
+        if name not in tables:
+            d: Union[RelationDecl, FunctionDecl]
+            if name in relations:
+                d, rinterp = relations[name]
+                arr = np.zeros(tuple(len(univs[str(s)]) for s in d.arity), dtype=bool)
+                for tup, b in rinterp.items():
+                    arr[tuple(index[str(s)][e] for s, e in zip(d.arity, tup))] = b
+            else:
+                d, finterp = functions[name]
+                arr = np.zeros(tuple(len(univs[str(s)]) for s in d.arity), dtype=int)
+                for tup, e in finterp.items():
+                    arr[tuple(index[str(s)][x] for s, x in zip(d.arity, tup))] = index[str(d.sort)][e]
+            tables[name] = arr
+        return tables[name]
+
+    def get_term(t: Expr) -> Any:
+        if isinstance(t, Id):
+            if t.name in consts:
+                d, e = consts[t.name]
+                return index[str(d.sort)][e]
+            return var_values[t.name]
+        elif isinstance(t, AppExpr):
+            return table(t.callee)[tuple(get_term(a) for a in t.args)]
+        else:
+            assert False, t
+
+    def ev(lit: Expr) -> Any:
+        if isinstance(lit, Bool):
+            return np.bool_(lit.val)
+        elif isinstance(lit, UnaryExpr):
+            assert lit.op == 'NOT', lit
+            return np.logical_not(ev(lit.arg))
+        elif isinstance(lit, BinaryExpr):
+            assert lit.op in ('EQUAL', 'NOTEQ'), lit
+            op = np.equal if lit.op == 'EQUAL' else np.not_equal
+            return op(get_term(lit.arg1), get_term(lit.arg2))
+        elif isinstance(lit, AppExpr):
+            return table(lit.callee)[tuple(get_term(a) for a in lit.args)]
+        elif isinstance(lit, Id):
+            # nullary relation
+            return table(lit.name)[()]
+        else:
+            assert False, lit
+
+    n = reduce(lambda x, y: x * y, shape, 1)
+    print(f'[{datetime.now()}] map_clause_state_interaction_instantiate: PID={os.getpid()}, iterating over {n} instantiations... ')
+    # violated[i, j] is true iff literal j is false in instantiation i (in the order of product(*universes))
+    violated = np.empty((n, len(literals)), dtype=bool)
+    for j, lit in enumerate(literals):
+        violated[:, j] = np.logical_not(np.broadcast_to(ev(lit), shape)).reshape(-1)
+
+    result: List[FrozenSet[int]] = []
+    if n == 0:
+        pass
+    elif len(literals) == 0:
+        result = [frozenset()]
+    else:
+        # one bitset per instantiation; keep distinct ones in order of first occurrence
+        bitsets = np.packbits(violated, axis=1)
+        distinct, first = np.unique(bitsets, axis=0, return_index=True)
+        distinct = distinct[np.argsort(first)]
+        for i in range(len(distinct)):
+            # distinct[i] is a strict subset of some other (distinct) bitset
+            subsumed = ~np.any(distinct[i] & ~distinct, axis=1)
+            subsumed[i] = False
+            if not subsumed.any():
+                bits = np.unpackbits(distinct[i], count=len(literals))
+                result.append(frozenset(int(x) for x in np.flatnonzero(bits)))
+    print(f'[{datetime.now()}] map_clause_state_interaction_instantiate: PID={os.getpid()}, iterated over {n} instantiations, found {len(result)} MSSs')
+    return result
+
+def map_clause_state_interaction_instantiate_python(
+        variables: Tuple[SortedVar,...],
+        literals: Tuple[Expr,...],
+        state: PDState,
+) -> List[FrozenSet[int]]:
+    '''Return a list of maximal subclauses of the given clause (indices to
+    literals) that are violated by the given state (equivalent to
+    all_mss computed by map_clause_state_interaction), using explicit
+    iteration over all quantifier instantiations.
+
+    This is the original pure Python implementation, which is much
+    slower than map_clause_state_interaction_instantiate. It is kept
+    for testing and debugging.
     '''
     def ev(values: Sequence[str], lit: Expr) -> bool:
         # TODO: rewrite this with James, this is a hacky partial implementation of first-order logic semantics for class Trace (written on a plane from Phoenix to SF)
@@ -2182,10 +2444,10 @@ def map_clause_state_interaction_instantiate(
             ((var.name, val) for var, val in zip(variables, values)),
             ((d.name, val) for d, val in state.as_state(0).const_interps.items())
         ))
-        functions: Dict[str, Dict[Tuple[str,...], str]] = dict(
+        functions: Dict[str, Mapping[Tuple[str,...], str]] = dict(
             (d.name, v) for d, v in state.as_state(0).func_interps.items()
         )
-        relations: Dict[str, Dict[Tuple[str,...], bool]] = dict(
+        relations: Dict[str, Mapping[Tuple[str,...], bool]] = dict(
             (d.name, v) for d, v in state.as_state(0).rel_interps.items()
         )
         def get_term(t: Expr) -> str:
@@ -2239,7 +2501,6 @@ def map_clause_state_interaction_instantiate(
     return result
 
 
-
 class SubclausesMapTurbo:
     '''
     Class used to store a map of subclauses of a certain clause, and
@@ -3328,13 +3589,9 @@ def repeated_houdini(s: Solver) -> str:
     # safety = tuple(inv.expr for inv in prog.invs() if inv.is_safety)
     safety = tuple(chain(*(as_clauses(inv.expr) for inv in prog.invs() if inv.is_safety))) # must be in CNF for use in eval_in_state
     reachable_states : List[PDState] = []
-
-    # TODO: get this from command line option, and from the right file
-    # with open('reachable-states.cache', 'rb') as cache_file:
-    #     reachable_states = tuple(pickle.load(cache_file))
-    # print('initialized reachable states:')
-    # for m in reachable_states:
-    #     print(str(m) + '\n' + '-'*80)
+    if utils.args.seed_reachable_states is not None:
+        reachable_states = explicit.reachable_states(s, utils.args.seed_reachable_states, cpus=utils.args.cpus)
+        print(f'[{datetime.now()}] initialized {len(reachable_states)} reachable states')
 
     clauses : List[Expr] = list(chain(*(as_clauses(x) for x in safety)))  # all top clauses in our abstraction
     sharp_predicates : Sequence[Expr] = ()  # the sharp predicates (minimal clauses true on the known reachable states)
@@ -3436,9 +3693,9 @@ def repeated_houdini_bounds(solver: Solver) -> str:
     def add_state(s: PDState) -> int:
         nonlocal live_states
         assert all(eval_in_state(None, s, predicates[j]) for j in sorted(inductive_invariant))
-        if s in states:
-            # assert False
-            return states.index(s)
+        i = state_index(states, s)
+        if i is not None:
+            return i
         i = len(states)
         states.append(s)
         predicates_of_state.append([])
@@ -3830,7 +4087,7 @@ def repeated_houdini_bounds(solver: Solver) -> str:
             note = '(' + ', '.join(notes) + ')'
             print(f'states[{i:3}]{note}:\n{states[i]}\n' + '-' * 80)
         for i in reachable:
-            if not cheap_check_implication([states[i].as_onestate_formula(0)], safety):
+            if not cheap_check_implication([states[i].as_state(0)], safety):
                 print(f'\nFound safety violation by reachable state (states[{i}]).')
                 dump_caches()
                 return 'UNSAFE'
@@ -3907,24 +4164,26 @@ def repeated_houdini_bounds(solver: Solver) -> str:
             print(f'Trying to reach states[{ii}] in up to 5 steps')
             p = maps[ii].to_clause(maps[ii].all_n)
             changes = False
-            for k in range(1, 6):
-                print(f'Checking if init satisfies WP_{k} of ~states[{ii}]... ',end='')
-                res = check_k_state_implication(solver, inits, p, k)
-                if res is not None:
-                    prestate, *poststates = res
-                    # add all states, including first one that is an initial state
-                    # add new initial state
-                    i_pre = add_state(prestate)
-                    reachable |= {i_pre}
-                    for poststate in poststates:
-                        i_post = add_state(poststate)
-                        transitions.append((i_pre, i_post))
-                        # reachable |= {i_post} # not doing this to trigger discovery of new reachable states on the next loop iteration
-                        i_pre = i_post
-                    changes = True
-                    break
-                else:
-                    print('YES')
+            with IncrementalBMC(solver, p, 5, inits) as bmc:
+                for k in range(1, 6):
+                    print(f'Checking if init satisfies WP_{k} of ~states[{ii}]... ',end='')
+                    res = check_k_state_implication(solver, inits, p, k, bmc=bmc)
+                    if res is not None:
+                        break
+                    else:
+                        print('YES')
+            if res is not None:
+                prestate, *poststates = res
+                # add all states, including first one that is an initial state
+                # add new initial state
+                i_pre = add_state(prestate)
+                reachable |= {i_pre}
+                for poststate in poststates:
+                    i_post = add_state(poststate)
+                    transitions.append((i_pre, i_post))
+                    # reachable |= {i_post} # not doing this to trigger discovery of new reachable states on the next loop iteration
+                    i_pre = i_post
+                changes = True
             if changes:
                 print(f'Managed to reach states[{ii}], looping\n')
                 continue
@@ -4003,7 +4262,8 @@ def cdcl_state_bounds(solver: Solver) -> str:
     def add_state(s: PDState) -> int:
         nonlocal live_states
         assert all(eval_in_state(None, s, predicates[j]) for j in sorted(inductive_invariant))
-        if s not in states:
+        existing = state_index(states, s)
+        if existing is None:
             i = len(states)
             print(f'add_state: adding new state: states[{i}]')
             states.append(s)
@@ -4020,7 +4280,7 @@ def cdcl_state_bounds(solver: Solver) -> str:
             maps.append(SubclausesMapTurbo(c, states, [], True))
             return i
         else:
-            i = states.index(s)
+            i = existing
             if i not in live_states:
                 print(f'add_state: reviving previous state: states[{i}]')
                 live_states |= {i}
@@ -4445,7 +4705,7 @@ def cdcl_state_bounds(solver: Solver) -> str:
             note = '(' + ', '.join(notes) + ')'
             print(f'states[{i:3}]{note}:\n{states[i]}\n' + '-' * 80)
         for i in reachable:
-            if not cheap_check_implication([states[i].as_onestate_formula(0)], safety):
+            if not cheap_check_implication([states[i].as_state(0)], safety):
                 print(f'\nFound safety violation by reachable state (states[{i}]).')
                 dump_caches()
                 return 'UNSAFE'
@@ -4496,24 +4756,26 @@ def cdcl_state_bounds(solver: Solver) -> str:
                 print(f'Trying to reach states[{i}] in up to 2 steps')
                 p = maps[i].to_clause(maps[i].all_n)
                 changes = False
-                for k in range(1, 3):
-                    print(f'Checking if init satisfies WP_{k} of ~states[{i}]... ',end='')
-                    res = check_k_state_implication(solver, inits, p, k)
-                    if res is not None:
-                        prestate, *poststates = res
-                        # add all states, including first one that is an initial state
-                        # add new initial state
-                        i_pre = add_state(prestate)
-                        reachable |= {i_pre}
-                        for poststate in poststates:
-                            i_post = add_state(poststate)
-                            transitions.append((i_pre, i_post))
-                            # reachable |= {i_post} # not doing this to trigger discovery of new reachable states on the next loop iteration
-                            i_pre = i_post
-                        changes = True
-                        break
-                    else:
-                        print('YES')
+                with IncrementalBMC(solver, p, 2, inits) as bmc:
+                    for k in range(1, 3):
+                        print(f'Checking if init satisfies WP_{k} of ~states[{i}]... ',end='')
+                        res = check_k_state_implication(solver, inits, p, k, bmc=bmc)
+                        if res is not None:
+                            break
+                        else:
+                            print('YES')
+                if res is not None:
+                    prestate, *poststates = res
+                    # add all states, including first one that is an initial state
+                    # add new initial state
+                    i_pre = add_state(prestate)
+                    reachable |= {i_pre}
+                    for poststate in poststates:
+                        i_post = add_state(poststate)
+                        transitions.append((i_pre, i_post))
+                        # reachable |= {i_post} # not doing this to trigger discovery of new reachable states on the next loop iteration
+                        i_pre = i_post
+                    changes = True
                 if changes:
                     print(f'Managed to reach states[{i}], looping\n')
                     break # TODO: think about this
@@ -4617,9 +4879,8 @@ def cdcl_predicate_bounds(solver: Solver) -> str:
     def add_state(s: PDState) -> int:
         nonlocal live_states
         assert all(eval_in_state(None, s, predicates[j]) for j in sorted(inductive_invariant))
-        if s in states:
-            # assert False
-            i = states.index(s)
+        i = state_index(states, s)
+        if i is not None:
             assert i in live_states
             return i
         i = len(states)
@@ -4951,7 +5212,7 @@ def cdcl_predicate_bounds(solver: Solver) -> str:
             note = '(' + ', '.join(notes) + ')'
             print(f'states[{i:3}]{note}:\n{states[i]}\n' + '-' * 80)
         for i in reachable:
-            if not cheap_check_implication([states[i].as_onestate_formula(0)], safety):
+            if not cheap_check_implication([states[i].as_state(0)], safety):
                 print(f'\nFound safety violation by reachable state (states[{i}]).')
                 dump_caches()
                 return 'UNSAFE'
@@ -5118,7 +5379,8 @@ def primal_dual_houdini(solver: Solver) -> str:
         nonlocal internal_ctis
         #production# assert all(eval_in_state(None, s, predicates[j]) for j in sorted(inductive_invariant))
         note = ' (internal cti)' if internal_cti else ' (live state)'
-        if s not in states:
+        existing = state_index(states, s)
+        if existing is None:
             print(f'[{datetime.now()}] add_state{note}: checking for substructures... ')
             work = list(chain(
                 ((s, t) for t in states),
@@ -5174,7 +5436,7 @@ def primal_dual_houdini(solver: Solver) -> str:
                 live_states |= {i}
             return i
         else:
-            i = states.index(s)
+            i = existing
             if internal_cti:
                 if i not in internal_ctis:
                     print(f'[{datetime.now()}] add_state{note}: adding states[{i}] to internal_ctis')
@@ -6486,7 +6748,7 @@ def primal_dual_houdini(solver: Solver) -> str:
             print(f'[{datetime.now()}] Proved safety!')
             return 'SAFE'
         for i in reachable:
-            if not cheap_check_implication([states[i].as_onestate_formula(0)], safety):
+            if not cheap_check_implication([states[i].as_state(0)], safety):
                 print(f'\n[{datetime.now()}] Found safety violation by reachable state (states[{i}]).')
                 return 'UNSAFE'
         return None
@@ -7553,7 +7815,7 @@ def cdcl_invariant(solver: Solver) -> str:
                     '')
             print(f'states[{i}]{note}:\n{states[i]}\n' + '-' * 80)
         for i in reachable:
-            if not cheap_check_implication([states[i].as_onestate_formula(0)], safety):
+            if not cheap_check_implication([states[i].as_state(0)], safety):
                 print(f'\nFound safety violation by reachable state (states[{i}]).')
                 dump_caches()
                 return 'UNSAFE'
@@ -7840,147 +8102,13 @@ def cdcl_invariant(solver: Solver) -> str:
 
 
 def enumerate_reachable_states(s: Solver) -> None:
-    # TODO: this function is hacky for paxos, clean up
-    # TODO: this does not use caches at all
-    prog = syntax.the_program
-    states: List[Trace] = []
-    t1 = s.get_translator(1)
-    t2 = s.get_translator(2)
-    with s.new_frame():
-        for sort in prog.sorts():
-            b = 2
-            # an old hack for paxos that is commented out below
-            # if sort.name == 'round':
-            #     b = 3
-            # else:
-            #     b = 2
-            print(f'bounding {sort} to candinality {b}')
-            s.add(s._sort_cardinality_constraint(Z3Translator.sort_to_z3(sort), b))
-
-        unknown = False
-
-        def block_state(t: Z3Translator, m: Trace) -> None:
-            # TODO: with the diagram, smaller states block larger
-            # ones, but with onestate it's slower (paxos can't get
-            # beyond initial states with 2 of everything). we should
-            # collect states by the sizes of their universe
-
-            s.add(t.translate_expr(New(Not(m.as_onestate_formula(0)), t.num_states - 1)))
-
-        print('looking for initial states')
-        with s.new_frame():
-            for init in prog.inits():
-                s.add(t1.translate_expr(init.expr))
-            while True:
-                print(f'{len(states)} total states so far')
-                res = s.check()
-                if res == z3.unsat:
-                    break
-                elif res == z3.unknown:
-                    unknown = True
-                    break
-                else:
-                    m = Z3Translator.model_to_trace(s.model(minimize=False), 1)
-                    states.append(m)
-                    block_state(t1, m)
-        print(f'done finding initial states! found {len(states)} states')
-
-        print('looking for transitions to new states')
-        with s.new_frame():
-            for state in states:
-                block_state(t2, m)
-
-            worklist = list(product(states, prog.transitions()))
-            while len(worklist) > 0:
-                print(f'worklist has length {len(worklist)}')
-                state, ition = worklist.pop()
-                new_states = []
-                with s.new_frame():
-                    s.add(t2.translate_expr(state.as_onestate_formula(0)))
-                    s.add(t2.translate_expr(ition.as_twostate_formula(prog.scope)))
-                    while True:
-                        res = s.check()
-                        if res == z3.unsat:
-                            break
-                        elif res == z3.unknown:
-                            unknown = True
-                            break
-                        _, m = unpack_cti(s.model(minimize=False), keep_prestate_in_poststate=True)
-                        new_states.append(m)
-                        block_state(t2, m)
-                for state in new_states:
-                    worklist.extend([(state, x) for x in prog.transitions()])
-                    block_state(t2, m)
-                states.extend(new_states)
-                if len(new_states) > 0:
-                    print(f'found {len(new_states)} new states via transition {ition.name}')
-                    print(f'{len(states)} total states so far')
-                    # TODO: get this file from command line or somewhere that's at least per example
-                    # with open('reachable-states.cache', 'wb') as cache_file:
-                    #     pickle.dump(states, cache_file)
-
-        print(f'exhausted all transitions from known states! found {len(states)} states')
-        for state in states:
-            print('-' * 80 + '\n' + str(state))
-
-        if unknown:
-            print('encountered unknown! all bets are off.')
-
-
-def add_argparsers(subparsers: argparse._SubParsersAction) -> Iterable[argparse.ArgumentParser]:
-    result : List[argparse.ArgumentParser] = []
-
-    # forward_explore_inv
-    s = subparsers.add_parser('pd-forward-explore-inv', help='Forward explore program w.r.t. its invariant')
-    s.set_defaults(main=forward_explore_inv)
-    result.append(s)
-
-    # enumerate_reachable_states
-    s = subparsers.add_parser('enumerate-reachable-states')
-    s.set_defaults(main=enumerate_reachable_states)
-    result.append(s)
-
-    # repeated_houdini
-    s = subparsers.add_parser('pd-repeated-houdini', help='Run the repeated Houdini algorith in the proof space')
-    s.set_defaults(main=repeated_houdini)
-    s.add_argument('--sharp', action=utils.YesNoAction, default=True,
-                   help='search for sharp invariants')
-    result.append(s)
-
-    # repeated_houdini_bounds
-    s = subparsers.add_parser('pd-repeated-houdini-bounds', help='Run the repeated Houdini algorith in the proof space')
-    s.set_defaults(main=repeated_houdini_bounds)
-    result.append(s)
-
-    # cdcl_state_bounds
-    s = subparsers.add_parser('pd-cdcl-state-bounds', help='Run the "CDCL state bounds" algorithm')
-    s.set_defaults(main=cdcl_state_bounds)
-    result.append(s)
-
-    # cdcl_predicate_bounds
-    s = subparsers.add_parser('pd-cdcl-predicate-bounds', help='Run the "CDCL predicate bounds" algorithm')
-    s.set_defaults(main=cdcl_predicate_bounds)
-    result.append(s)
-
-    # cdcl_invariant
-    s = subparsers.add_parser('pd-cdcl-invariant', help='Run the "CDCL over invariants" algorithm')
-    s.set_defaults(main=cdcl_invariant)
-    result.append(s)
-
-    # primal_dual_houdini
-    s = subparsers.add_parser('pd-primal-dual-houdini', help='Run the "Primal-Dual" algorithm')
-    s.set_defaults(main=primal_dual_houdini)
-    result.append(s)
-
-    for s in result:
-        s.add_argument('--unroll-to-depth', type=int, help='Unroll transitions to given depth during exploration')
-        s.add_argument('--cpus', type=int, help='Number of CPUs to use in parallel')
-        s.add_argument('--restarts', action=utils.YesNoAction, default=False, help='Use restarts outside of Z3 by setting Luby timeouts')
-        s.add_argument('--induction-width', type=int, default=1, help='Upper bound on weight of dual edges to explore.')
-        s.add_argument('--all-subclauses',  action=utils.YesNoAction, default=False, help='Add all subclauses of predicates.')
-        s.add_argument('--optimize-ctis',  action=utils.YesNoAction, default=True, help='Optimize internal ctis')
-        s.add_argument('--domain-independence',  action=utils.YesNoAction, default=True, help='Restrict to domain independent clauses')
-        s.add_argument('--max-quantifiers', type=int, help='Maximal number of quantifiers allowed in the invariant')
-        s.add_argument('--cvc4-minimize-models',  action=utils.YesNoAction, default=True, help='Minimize models when using CVC4')
-
-    return result
+    states = explicit.reachable_states(
+        s,
+        utils.args.cardinality,
+        dfs=utils.args.dfs,
+        cpus=utils.args.cpus,
+        verbose=True,
+    )
+    print(f'exhausted all transitions from known states! found {len(states)} states')
+    for state in states:
+        print('-' * 80 + '\n' + str(state))
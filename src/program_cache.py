@@ -0,0 +1,103 @@
+'''
+Persistent cache of parsed and typechecked programs, for fast startup.
+
+Parsing and typechecking take a noticeable fraction of the running time of
+short mypyvy invocations (e.g., typecheck, or verify of a small model). With
+--program-cache=DIR, the typechecked syntax.Program is pickled to a file in
+DIR, keyed by a hash of the input (its file name and contents) and of the
+mypyvy sources that determine how programs are parsed and typechecked. Later
+runs on the same input load the pickle instead of parsing it again.
+
+Only programs without errors are stored, so errors are always reported by
+the parser and typechecker themselves. Entries are written atomically, so
+several processes can share a cache directory.
+'''
+from __future__ import annotations
+import copyreg
+import hashlib
+import io
+import os
+from pathlib import Path
+import pickle
+import sys
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+import ply.lex
+
+import syntax
+import utils
+
+VERSION = 1
+
+# the modules whose code determines the pickled programs
+_SOURCES = ('parser.py', 'syntax.py', 'typechecker.py', 'ply/lex.py', 'ply/yacc.py')
+_sources_digest: Optional[bytes] = None
+
+def sources_digest() -> bytes:
+    global _sources_digest
+    if _sources_digest is None:
+        h = hashlib.sha256()
+        h.update(f'{VERSION} {sys.version}'.encode())
+        src = Path(__file__).resolve().parent
+        for name in _SOURCES:
+            h.update((src / name).read_bytes())
+        _sources_digest = h.digest()
+    return _sources_digest
+
+def cache_key(filename: str, contents: str) -> str:
+    h = hashlib.sha256(sources_digest())
+    h.update(filename.encode())
+    h.update(b'\0')
+    h.update(contents.encode())
+    return h.hexdigest()
+
+def _token(state: Dict[str, Any]) -> ply.lex.LexToken:
+    tok = ply.lex.LexToken()
+    tok.__dict__.update(state)
+    return tok
+
+def _reduce_token(tok: ply.lex.LexToken) -> Tuple[Any, ...]:
+    # LexToken is not pickled by default (see its __getstate__), but the spans of declarations and
+    # expressions are needed for error messages. the lexer that produced a token is not needed.
+    return _token, ({k: v for k, v in tok.__dict__.items() if k != 'lexer'},)
+
+def _pickler(f: BinaryIO) -> pickle.Pickler:
+    p = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+    p.dispatch_table = dict(copyreg.dispatch_table)
+    p.dispatch_table[ply.lex.LexToken] = _reduce_token
+    return p
+
+class ProgramCache:
+    def __init__(self, dirname: str) -> None:
+        self.dirname = Path(dirname)
+
+    def _path(self, filename: str, contents: str) -> Path:
+        return self.dirname / f'{cache_key(filename, contents)}.pickle'
+
+    def load(self, filename: str, contents: str) -> Optional[syntax.Program]:
+        '''Return the typechecked program stored for this input, or None if there is none.'''
+        try:
+            with open(self._path(filename, contents), 'rb') as f:
+                prog = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            utils.logger.info(f'ignoring unreadable program cache entry for {filename}: {e!r}')
+            return None
+        if not isinstance(prog, syntax.Program):
+            return None
+        utils.logger.info(f'loaded {filename} from program cache')
+        return prog
+
+    def store(self, filename: str, contents: str, prog: syntax.Program) -> None:
+        '''Store the typechecked program for this input.'''
+        buf = io.BytesIO()
+        _pickler(buf).dump(prog)
+        path = self._path(filename, contents)
+        try:
+            self.dirname.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+            tmp.write_bytes(buf.getvalue())
+            os.replace(tmp, path)
+        except OSError as e:
+            utils.logger.warning(f'could not write program cache entry {path}: {e}')
@@ -0,0 +1,236 @@
+'''
+Profiling of solver queries, to find out where solver time goes.
+
+With --query-profile, every call to Solver.check is recorded with its call site,
+wall time, result, the number of asserted formulas, their total size (number of
+AST nodes), and the number of quantifiers in them. When mypyvy exits, it prints a
+table that aggregates the queries by call site, sorted by total time.
+--query-profile-json=PATH also writes the table and the slowest queries as JSON, and
+--query-profile-smt2=DIR writes the slowest queries to DIR as SMT-LIB files, which
+can be given to z3 or cvc4 directly. --query-profile-top=N sets how many of the
+slowest queries are reported (default 10).
+
+The call site of a query is the innermost function outside the solver module
+that issued it. When that function is one of the generic checks in logic.py,
+its caller outside logic.py is included as well (e.g., "logic.check_implication <-
+updr.Frames.push_conjunct"). Queries made by model minimization are marked with
+"minimize model:". Only queries made in the mypyvy process itself are recorded,
+not those made by worker processes (e.g., with --jobs or --cpus).
+'''
+from __future__ import annotations
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+import heapq
+import itertools
+import json
+import os
+from pathlib import Path
+import sys
+from types import FrameType
+from typing import Any, Dict, List, Optional, Sequence, Tuple, cast
+
+import z3
+
+import utils
+
+@dataclass
+class QueryRecord:
+    site: str
+    time: float
+    result: str
+    assertions: int
+    size: int
+    quantifiers: int
+
+_MAX_SIZES = 100000
+_sizes: Dict[Tuple[int, int], Tuple[z3.ExprRef, int, int]] = {}
+
+def formula_size(e: z3.ExprRef) -> Tuple[int, int]:
+    '''Return the number of distinct AST nodes in e, and how many of them are quantifiers.
+
+    The result is memoized by z3 AST id, since the same formulas (e.g., axioms and
+    transition relations) are asserted in many queries. The memo keeps e alive, so
+    that its id is not reused for a different formula.
+    '''
+    key = (id(e.ctx), e.get_id())
+    if key not in _sizes:
+        if len(_sizes) >= _MAX_SIZES:
+            _sizes.clear()
+        seen = set()
+        nodes = quantifiers = 0
+        todo = [e]
+        while todo:
+            x = todo.pop()
+            if x.get_id() in seen:
+                continue
+            seen.add(x.get_id())
+            nodes += 1
+            if z3.is_quantifier(x):
+                quantifiers += 1
+                todo.append(cast(z3.QuantifierRef, x).body())
+            elif z3.is_app(x):
+                todo.extend(x.children())
+        _sizes[key] = (e, nodes, quantifiers)
+    return _sizes[key][1:]
+
+def _function_name(f: FrameType) -> str:
+    code = f.f_code
+    name = code.co_name
+    if code.co_argcount > 0 and code.co_varnames[0] == 'self' and 'self' in f.f_locals:
+        name = f'{type(f.f_locals["self"]).__name__}.{name}'
+    return f'{f.f_globals.get("__name__", "?")}.{name}'
+
+def call_site(f: Optional[FrameType]) -> str:
+    '''Describe the call site of a query, given the frame that called Solver.check.'''
+    minimize = False
+    while f is not None and f.f_globals.get('__name__') == 'solver':
+        minimize = minimize or f.f_code.co_name == '_minimal_model'
+        f = f.f_back
+    if f is None:
+        return '?'
+    site = _function_name(f)
+    if f.f_globals.get('__name__') == 'logic':
+        caller = f.f_back
+        while caller is not None and caller.f_globals.get('__name__') == 'logic':
+            caller = caller.f_back
+        if caller is not None:
+            site += f' <- {_function_name(caller)}'
+    return f'minimize model: {site}' if minimize else site
+
+class QueryProfiler:
+    def __init__(self, top: int, keep_formulas: bool) -> None:
+        self.top = top
+        self.keep_formulas = keep_formulas
+        self.records: List[QueryRecord] = []
+        # the slowest queries so far, as a min-heap by time, with the formulas they checked if keep_formulas
+        self.slowest: List[Tuple[float, int, QueryRecord, Sequence[z3.ExprRef]]] = []
+        self.counter = itertools.count()
+
+    def record(self, seconds: float, result: z3.CheckSatResult,
+               assertions: Sequence[z3.ExprRef], assumptions: Sequence[z3.ExprRef]) -> None:
+        '''Record a query. This must be called by the solver function that checked it.'''
+        site = call_site(sys._getframe(1))
+        size = quantifiers = 0
+        for e in itertools.chain(assertions, assumptions):
+            n, q = formula_size(e)
+            size += n
+            quantifiers += q
+        rec = QueryRecord(site, seconds, str(result), len(assertions) + len(assumptions), size, quantifiers)
+        self.records.append(rec)
+
+        if self.top > 0 and (len(self.slowest) < self.top or seconds > self.slowest[0][0]):
+            formulas = [*assertions, *assumptions] if self.keep_formulas else []
+            entry = (seconds, next(self.counter), rec, formulas)
+            if len(self.slowest) < self.top:
+                heapq.heappush(self.slowest, entry)
+            else:
+                heapq.heapreplace(self.slowest, entry)
+
+    def slowest_queries(self) -> List[Tuple[QueryRecord, Sequence[z3.ExprRef]]]:
+        return [(rec, formulas) for _, _, rec, formulas in sorted(self.slowest, key=lambda x: (-x[0], x[1]))]
+
+    def summary(self) -> List[Dict[str, Any]]:
+        '''Aggregate the queries by call site, in decreasing order of total time.'''
+        by_site: Dict[str, List[QueryRecord]] = defaultdict(list)
+        for rec in self.records:
+            by_site[rec.site].append(rec)
+        rows: List[Dict[str, Any]] = []
+        for site, recs in by_site.items():
+            total = sum(r.time for r in recs)
+            rows.append({
+                'site': site,
+                'count': len(recs),
+                'time': total,
+                'mean_time': total / len(recs),
+                'max_time': max(r.time for r in recs),
+                'sat': sum(r.result == 'sat' for r in recs),
+                'unsat': sum(r.result == 'unsat' for r in recs),
+                'unknown': sum(r.result == 'unknown' for r in recs),
+                'mean_assertions': sum(r.assertions for r in recs) / len(recs),
+                'mean_size': sum(r.size for r in recs) / len(recs),
+                'mean_quantifiers': sum(r.quantifiers for r in recs) / len(recs),
+            })
+        rows.sort(key=lambda row: row['time'], reverse=True)
+        return rows
+
+    def table(self) -> str:
+        rows = self.summary()
+        total = sum(rec.time for rec in self.records)
+        lines = [f'query profile: {len(self.records)} queries in {total:.3f}s',
+                 f'{"time(s)":>9} {"%":>5} {"count":>7} {"mean(ms)":>9} {"max(ms)":>9} '
+                 f'{"sat":>6} {"unsat":>6} {"unk":>4} {"asserts":>8} {"size":>9} {"quants":>7}  site']
+        for row in rows:
+            lines.append(f'{row["time"]:9.3f} {100 * row["time"] / total if total > 0 else 0:5.1f} '
+                         f'{row["count"]:7d} {1000 * row["mean_time"]:9.1f} {1000 * row["max_time"]:9.1f} '
+                         f'{row["sat"]:6d} {row["unsat"]:6d} {row["unknown"]:4d} {row["mean_assertions"]:8.1f} '
+                         f'{row["mean_size"]:9.1f} {row["mean_quantifiers"]:7.1f}  {row["site"]}')
+        if self.slowest:
+            lines.append(f'slowest {len(self.slowest)} queries:')
+            for rec, _ in self.slowest_queries():
+                lines.append(f'{rec.time:9.3f}s {rec.result:>7} {rec.assertions:6d} asserts {rec.size:8d} nodes '
+                             f'{rec.quantifiers:5d} quantifiers  {rec.site}')
+        return '\n'.join(lines)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            'version': 1,
+            'queries': len(self.records),
+            'time': sum(rec.time for rec in self.records),
+            'sites': self.summary(),
+            'slowest': [asdict(rec) for rec, _ in self.slowest_queries()],
+        }
+
+    def dump_smt2(self, dirname: str) -> List[Path]:
+        '''Write each of the slowest queries to an SMT-LIB file in dirname, and return their paths.'''
+        d = Path(dirname)
+        d.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for i, (rec, formulas) in enumerate(self.slowest_queries()):
+            s = z3.Solver()
+            for e in formulas:
+                s.add(e)
+            path = d / f'query-{i:03d}.smt2'
+            with open(path, 'w') as f:
+                f.write(f'; call site: {rec.site}\n')
+                f.write(f'; time: {rec.time:.3f}s, result: {rec.result}\n')
+                f.write(s.to_smt2())
+            paths.append(path)
+        return paths
+
+    def report(self) -> None:
+        '''Print the profile, and write it to the files requested on the command line.'''
+        utils.logger.always_print(self.table())
+        if utils.args.query_profile_json is not None:
+            with open(utils.args.query_profile_json, 'w') as f:
+                json.dump(self.to_json(), f, indent=2)
+        if utils.args.query_profile_smt2 is not None:
+            paths = self.dump_smt2(utils.args.query_profile_smt2)
+            utils.logger.always_print(f'wrote the {len(paths)} slowest queries to {utils.args.query_profile_smt2}')
+
+_profiler: Optional[QueryProfiler] = None
+_profiler_pid: Optional[int] = None
+
+def get_query_profiler() -> Optional[QueryProfiler]:
+    '''Return the profiler selected by --query-profile (and related options), or None if queries are not profiled.'''
+    global _profiler, _profiler_pid
+    if utils.args is None or 'query_profile' not in utils.args:
+        return None
+    if not (utils.args.query_profile or utils.args.query_profile_json is not None or
+            utils.args.query_profile_smt2 is not None):
+        return None
+    # worker processes start with the profile of their parent, which they should not report again
+    if _profiler is None or _profiler_pid != os.getpid():
+        _profiler = QueryProfiler(utils.args.query_profile_top, keep_formulas=utils.args.query_profile_smt2 is not None)
+        _profiler_pid = os.getpid()
+    return _profiler
+
+def report() -> None:
+    '''Print and write the profile of this process, if queries are profiled.'''
+    profiler = get_query_profiler()
+    if profiler is not None:
+        profiler.report()
+
+def reset() -> None:
+    '''Discard the queries recorded so far, e.g., between requests to mypyvy serve.'''
+    global _profiler
+    _profiler = None
@@ -7,7 +7,6 @@ from translator import Z3Translator
 import utils
 import copy
 
-import argparse
 
 from typing import Iterable, List, Tuple, Optional, Set
 
@@ -21,9 +20,9 @@ def get_cti(s: Solver, candidate: Expr) -> Optional[Tuple[Diagram, Diagram]]:
 def bmc_upto_bound(s: Solver, post: Expr, bound: int, preconds: Optional[Iterable[Expr]] = None,
                    minimize: Optional[bool] = None, relaxed_semantics: bool = False) -> Optional[logic.Trace]:
     if not relaxed_semantics:
-        bmcer = lambda bound: logic.check_bmc(s, post, bound, preconds, minimize)
-    else:
-        bmcer = lambda bound: relaxed_traces.check_relaxed_bmc(post, bound, preconds, minimize)
+        return logic.check_bmc_upto(s, post, bound, preconds, minimize)
+
+    bmcer = lambda bound: relaxed_traces.check_relaxed_bmc(post, bound, preconds, minimize)
 
     for k in range(0, bound + 1):
         if (m := bmcer(k)) is not None:
@@ -159,9 +158,12 @@ def post_image_prime_consequence(s: Solver, prev_frame: List[Expr], inits: List[
             valid_in_initial_frame(s, inits, syntax.Not(diag.to_ast()))
         )
 
-    # TODO: unsat core first
+    def prev_frame_core(diag: Diagram) -> Optional[Set[int]]:
+        return logic.check_diagram_blocked(s, prev_frame, inits, diag)
+
     bad_model_copy = copy.deepcopy(bad_model)
-    bad_model_copy.generalize(s, prev_frame_constraint, order=gen_order)
+    bad_model_copy.generalize(s, prev_frame_constraint, order=gen_order,
+                              core=prev_frame_core if not s.use_cvc4 else None)
 
     return syntax.Not(bad_model_copy.to_ast())
 
@@ -215,51 +217,3 @@ def verify_inductive_invariant(s: Solver, inv: List[Expr]) -> None:
     assert logic.check_implication(s, inits, inv) is None
     assert logic.check_implication(s, inv, safeties) is None
     assert logic.check_two_state_implication_all_transitions(s, inv, syntax.And(*inv), minimize=False) is None
-
-
-def add_argparsers(subparsers: argparse._SubParsersAction) -> Iterable[argparse.ArgumentParser]:
-    result: List[argparse.ArgumentParser] = []
-
-    itp_subparser = subparsers.add_parser('itp-literal', help='experimental inference 1')
-    itp_subparser.set_defaults(main=itp_gen)
-    result.append(itp_subparser)
-
-    itp_subparser.add_argument('--forward-depth', type=int, default=4, metavar='N',
-                               help='number of steps in backwards exploration')
-    itp_subparser.add_argument('--generalization-order', type=int,
-                               help='generalization order index, -1 means random')
-    itp_subparser.add_argument('--relax-forwards', action=utils.YesNoAction, default=False,
-                               help='relaxed semantics in forwards BMC')
-
-    brat_subparser = subparsers.add_parser('brat', help='experimental inference 2')
-    brat_subparser.set_defaults(main=brat)
-    result.append(brat_subparser)
-
-    # TODO: remove default for depth
-    brat_subparser.add_argument('--depth', type=int, default=6, metavar='N',
-                                help='number of steps in backwards exploration')
-    brat_subparser.add_argument('--push', action=utils.YesNoAction, default=True,
-                                help='new frame begins with pushing from previous frame')
-    brat_subparser.add_argument('--decrease-depth', action=utils.YesNoAction, default=False,
-                                help='BMC bound decreased as frames increase '
-                                '(similar to PDR with backward-reach cache)')
-    brat_subparser.add_argument('--generalization-order', type=int,
-                                help='generalization order index, -1 means random')
-    brat_subparser.add_argument('--relax-backwards', action=utils.YesNoAction, default=False,
-                                help='relaxed semantics in backwards BMC')
-
-    oneshot_subparser = subparsers.add_parser('oneshot', help='experimental inference 3')
-    oneshot_subparser.set_defaults(main=oneshot)
-    result.append(oneshot_subparser)
-    oneshot_subparser.add_argument('--depth', type=int, default=6, metavar='N',
-                                   help='number of steps in backwards exploration')
-    oneshot_subparser.add_argument('--forward-depth', type=int, default=4, metavar='N',
-                                   help='number of steps in forwards exploration')
-    oneshot_subparser.add_argument('--relax-forwards', action=utils.YesNoAction, default=False,
-                                   help='relaxed semantics in forwards BMC')
-    oneshot_subparser.add_argument('--relax-backwards', action=utils.YesNoAction, default=False,
-                                   help='relaxed semantics in backwards BMC')
-    oneshot_subparser.add_argument('--generalization-order', type=int,
-                                   help='generalization order index, -1 means random')
-
-    return result
@@ -4,10 +4,13 @@ multi-vocabulary formulas, and a convenience class State.
 '''
 
 from __future__ import annotations
+from array import array
 from dataclasses import dataclass
+import hashlib
 from itertools import chain, product, combinations
 import re
-from typing import List, Optional, Tuple, Union, Dict, cast
+import sys
+from typing import Any, Iterator, List, Mapping, Optional, Set, Tuple, Union, Dict, ItemsView, cast
 from abc import ABC, abstractmethod
 
 import utils
@@ -17,8 +20,9 @@ from syntax import Expr, ConstantDecl, RelationDecl, FunctionDecl, SortDecl
 
 Element = str
 Universe = Dict[SortDecl, Tuple[Element, ...]]  # ODED: I think this should be Sort or str, rather than SortDecl. The universe does not interpret sorts like Int or Bool (I think).
-RelationInterp = Dict[Tuple[Element, ...], bool]
-FunctionInterp = Dict[Tuple[Element, ...], Element]
+# interpretations are read-only mappings: traces store them compactly (see PackedRelation)
+RelationInterp = Mapping[Tuple[Element, ...], bool]
+FunctionInterp = Mapping[Tuple[Element, ...], Element]
 RelationInterps = Dict[RelationDecl, RelationInterp]
 ConstantInterps = Dict[ConstantDecl, Element]
 FunctionInterps = Dict[FunctionDecl, FunctionInterp]
@@ -92,7 +96,206 @@ class BareFirstOrderStructure(FirstOrderStructure):
         return self._func_interps
 
 
+# Compact interpretations.
+#
+# Traces are kept around in large numbers (e.g., pd keeps every CTI and
+# reachable state for the whole run), so Trace.compact() replaces their
+# interpretations, which are built as dictionaries, by the immutable
+# mappings below. Elements are coded by their index in the universe of
+# their sort, a tuple of elements by its mixed-radix number (the same
+# coding as the evaluator's), and a relation by a bitmask over these
+# numbers. The universes and indices are shared by all interpretations
+# over the same domains, and since the interpretations are immutable,
+# traces derived from a trace (e.g., by Trace._as_trace) share them too.
+
+class _Shape:
+    '''The domain of an interpretation: the universes of its arguments, and the index of each element.'''
+    __slots__ = ('univs', 'index', 'radices', 'size')
+
+    def __init__(self, univs: Tuple[Tuple[Element, ...], ...]) -> None:
+        self.univs = univs
+        self.index = tuple({e: i for i, e in enumerate(u)} for u in univs)
+        self.radices = tuple(len(u) for u in univs)
+        self.size = 1
+        for n in self.radices:
+            self.size *= n
+
+    def encode(self, tup: Tuple[Element, ...]) -> Optional[int]:
+        if len(tup) != len(self.univs):
+            return None
+        off = 0
+        for index, n, e in zip(self.index, self.radices, tup):
+            i = index.get(e)
+            if i is None:
+                return None
+            off = off * n + i
+        return off
+
+    def __reduce__(self) -> Any:
+        # intern the shape again when unpickling, instead of keeping a copy per interpretation
+        return (_shape, (self.univs,))
+
+_MAX_SHAPES = 10000
+_shapes: Dict[Tuple[Tuple[Element, ...], ...], _Shape] = {}
+
+def _shape(univs: Tuple[Tuple[Element, ...], ...]) -> _Shape:
+    shape = _shapes.get(univs)
+    if shape is None:
+        shape = _Shape(tuple(tuple(sys.intern(e) for e in u) for u in univs))
+        if len(_shapes) < _MAX_SHAPES:
+            _shapes[univs] = shape
+    return shape
+
+class _PackedItems(ItemsView):
+    def __iter__(self) -> Iterator[Any]:
+        return cast(Any, self)._mapping._items()
+
+class PackedRelation(RelationInterp):
+    '''An immutable relation interpretation, stored as a bitmask over the tuples of its domain.'''
+    __slots__ = ('shape', 'known', 'bits')
+
+    def __init__(self, shape: _Shape, known: Optional[int], bits: int) -> None:
+        self.shape = shape
+        self.known = known  # the tuples that are interpreted, or None if all of them are
+        self.bits = bits
+
+    def _has(self, i: Optional[int]) -> bool:
+        return i is not None and (self.known is None or (self.known >> i) & 1 == 1)
+
+    def __getitem__(self, tup: Tuple[Element, ...]) -> bool:
+        i = self.shape.encode(tup)
+        if not self._has(i):
+            raise KeyError(tup)
+        assert i is not None
+        return (self.bits >> i) & 1 == 1
+
+    def __contains__(self, tup: object) -> bool:
+        return isinstance(tup, tuple) and self._has(self.shape.encode(tup))
+
+    def __iter__(self) -> Iterator[Tuple[Element, ...]]:
+        for i, tup in enumerate(product(*self.shape.univs)):
+            if self.known is None or (self.known >> i) & 1:
+                yield tup
+
+    def _items(self) -> Iterator[Tuple[Tuple[Element, ...], bool]]:
+        for i, tup in enumerate(product(*self.shape.univs)):
+            if self.known is None or (self.known >> i) & 1:
+                yield tup, (self.bits >> i) & 1 == 1
+
+    def items(self) -> ItemsView[Tuple[Element, ...], bool]:
+        return _PackedItems(self)
+
+    def __len__(self) -> int:
+        return self.shape.size if self.known is None else bin(self.known).count('1')
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, PackedRelation) and other.shape is self.shape:
+            return self.known == other.known and self.bits == other.bits
+        return super().__eq__(other)
+
+    def __repr__(self) -> str:
+        return repr(dict(self._items()))
+
+    def table(self) -> List[Optional[bool]]:
+        '''Return the value of each tuple of the domain, in the order of their codes (None if not interpreted).'''
+        return [(self.bits >> i) & 1 == 1 if self.known is None or (self.known >> i) & 1 else None
+                for i in range(self.shape.size)]
+
+class PackedFunction(FunctionInterp):
+    '''An immutable total function interpretation, stored as an array of the indices of its values.'''
+    __slots__ = ('shape', 'image', 'codes')
+
+    def __init__(self, shape: _Shape, image: _Shape, codes: array[int]) -> None:
+        self.shape = shape
+        self.image = image  # a shape with one universe, that of the function's sort
+        self.codes = codes
+
+    def __getitem__(self, tup: Tuple[Element, ...]) -> Element:
+        i = self.shape.encode(tup)
+        if i is None:
+            raise KeyError(tup)
+        return self.image.univs[0][self.codes[i]]
+
+    def __contains__(self, tup: object) -> bool:
+        return isinstance(tup, tuple) and self.shape.encode(tup) is not None
+
+    def __iter__(self) -> Iterator[Tuple[Element, ...]]:
+        return product(*self.shape.univs)
+
+    def _items(self) -> Iterator[Tuple[Tuple[Element, ...], Element]]:
+        univ = self.image.univs[0]
+        return ((tup, univ[v]) for tup, v in zip(product(*self.shape.univs), self.codes))
+
+    def items(self) -> ItemsView[Tuple[Element, ...], Element]:
+        return _PackedItems(self)
+
+    def __len__(self) -> int:
+        return self.shape.size
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, PackedFunction) and other.shape is self.shape and other.image is self.image:
+            return self.codes == other.codes
+        return super().__eq__(other)
+
+    def __repr__(self) -> str:
+        return repr(dict(self._items()))
+
+def _domain_shape(univs: Universe, arity: syntax.Arity) -> Optional[_Shape]:
+    doms = []
+    for s in arity:
+        if not isinstance(s, syntax.UninterpretedSort) or s.decl not in univs:
+            return None
+        doms.append(univs[s.decl])
+    return _shape(tuple(doms))
+
+def pack_relation(univs: Universe, d: RelationDecl, interp: RelationInterp) -> RelationInterp:
+    '''Return a compact copy of interp, or interp itself if its tuples are not over the given universes.'''
+    if isinstance(interp, PackedRelation):
+        return interp
+    shape = _domain_shape(univs, d.arity)
+    if shape is None:
+        return interp
+    # the masks are built as strings of binary digits, most significant first, since setting bits
+    # of large ints one by one takes quadratic time
+    n = shape.size
+    if len(interp) == n and list(interp) == list(product(*shape.univs)):
+        # the common case of a total interpretation listed in the order of the encoding
+        digits = ''.join('1' if b else '0' for b in reversed(list(interp.values())))
+        return PackedRelation(shape, None, int(digits, 2))
+    known = bytearray(b'0') * n
+    bits = bytearray(b'0') * n
+    for tup, b in interp.items():
+        i = shape.encode(tup)
+        if i is None:
+            return interp
+        known[n - 1 - i] = ord('1')
+        if b:
+            bits[n - 1 - i] = ord('1')
+    return PackedRelation(shape, None if len(interp) == n else int(known, 2), int(bits, 2))
+
+def pack_function(univs: Universe, d: FunctionDecl, interp: FunctionInterp) -> FunctionInterp:
+    '''Return a compact copy of interp, or interp itself if it is partial or not over the given universes.'''
+    if isinstance(interp, PackedFunction):
+        return interp
+    shape = _domain_shape(univs, d.arity)
+    image = _domain_shape(univs, (d.sort,))
+    if shape is None or image is None or len(interp) != shape.size:
+        return interp
+    codes = array('B' if len(image.univs[0]) <= 256 else 'L', [0]) * shape.size
+    for tup, res in interp.items():
+        i = shape.encode(tup)
+        v = image.index[0].get(res)
+        if i is None or v is None:
+            return interp
+        codes[i] = v
+    return PackedFunction(shape, image, codes)
+
+
 class Trace:
+    __slots__ = ('num_states', 'univs', 'immut_rel_interps', 'immut_const_interps', 'immut_func_interps',
+                 'rel_interps', 'const_interps', 'func_interps', 'transitions',
+                 'onestate_formula_cache', 'canonical_labelling_cache', '__weakref__')
+
     def __init__(
             self,
             num_states: int,
@@ -112,10 +315,52 @@ class Trace:
 
         self.transitions: List[str] = ['' for i in range(self.num_states - 1)]
         self.onestate_formula_cache: Dict[int, Expr] = {}
+        self.canonical_labelling_cache: Dict[Optional[int], Tuple[str, Dict[Element, Element]]] = {}
+
+    def __setstate__(self, state: Any) -> None:
+        # traces pickled before Trace had __slots__ (e.g., in old checkpoints) have a dict as their state
+        if isinstance(state, tuple):
+            _, state = state
+        self.onestate_formula_cache = {}
+        self.canonical_labelling_cache = {}
+        for k, v in state.items():
+            setattr(self, k, v)
+
+    def compact(self) -> Trace:
+        '''
+        Replace the interpretations of relations and functions by compact,
+        immutable ones (see PackedRelation), and return the trace. Traces
+        should not be modified afterwards, except by assigning new
+        interpretations to symbols.
+        '''
+        packed: Dict[int, Any] = {}  # interpretations shared by several states are packed once
+
+        def rels(interps: RelationInterps) -> None:
+            for R, l in interps.items():
+                if id(l) not in packed:
+                    packed[id(l)] = (l, pack_relation(self.univs, R, l))
+                interps[R] = packed[id(l)][1]
+
+        def funcs(interps: FunctionInterps) -> None:
+            for F, l in interps.items():
+                if id(l) not in packed:
+                    packed[id(l)] = (l, pack_function(self.univs, F, l))
+                interps[F] = packed[id(l)][1]
+
+        self.univs = {s: _shape((u,)).univs[0] for s, u in self.univs.items()}
+        for r in chain([self.immut_rel_interps], self.rel_interps):
+            rels(r)
+        for f in chain([self.immut_func_interps], self.func_interps):
+            funcs(f)
+        for c in chain([self.immut_const_interps], self.const_interps):
+            for C, e in c.items():
+                c[C] = sys.intern(e)
+        return self
 
     def _as_trace(self, indices: Tuple[int, ...]) -> Trace:
         assert all(0 <= i < self.num_states for i in indices)
         assert indices in [(1, 0), (1,), tuple(reversed(range(len(indices))))], 'should only be used in legacy pd.py code'
+        # the interpretations themselves are shared, see compact
         t = Trace(len(indices))
         t.univs = self.univs.copy()
         t.immut_rel_interps = self.immut_rel_interps.copy()
@@ -123,7 +368,7 @@ class Trace:
         t.immut_func_interps = self.immut_func_interps.copy()
         t.rel_interps = [self.rel_interps[i].copy() for i in indices]
         t.const_interps = [self.const_interps[i].copy() for i in indices]
-        t.func_interps = [self.func_interps[i] for i in indices]
+        t.func_interps = [self.func_interps[i].copy() for i in indices]
         # no transition labels in permuted trace
         return t
 
@@ -205,6 +450,52 @@ class Trace:
         assert 0 <= i < self.num_states
         return State(self, i)
 
+    def _canonical_labelling(self, index: Optional[int] = None) -> Tuple[str, Dict[Element, Element]]:
+        # like onestate_formula_cache, this assumes the trace is not modified after it is first called
+        if index not in self.canonical_labelling_cache:
+            self.canonical_labelling_cache[index] = canonical_labelling(self, index)
+        return self.canonical_labelling_cache[index]
+
+    def fingerprint(self, index: Optional[int] = None) -> str:
+        '''
+        Return a string that is equal for two traces iff they are
+        isomorphic, i.e., equal up to renaming of elements. Transition
+        labels are ignored. If index is given, only the immutable
+        symbols and the given state are considered.
+        '''
+        assert index is None or 0 <= index < self.num_states
+        return self._canonical_labelling(index)[0]
+
+    def canonicalize(self) -> Trace:
+        '''Return a copy of the trace with its elements renamed canonically.'''
+        renaming = self._canonical_labelling()[1]
+
+        def tup(t: Tuple[Element, ...]) -> Tuple[Element, ...]:
+            return tuple(renaming.get(e, e) for e in t)
+
+        def rels(interps: RelationInterps) -> RelationInterps:
+            return {R: {tup(t): ans for t, ans in sorted(l.items(), key=lambda x: tup(x[0]))}
+                    for R, l in interps.items()}
+
+        def consts(interps: ConstantInterps) -> ConstantInterps:
+            return {C: renaming.get(c, c) for C, c in interps.items()}
+
+        def funcs(interps: FunctionInterps) -> FunctionInterps:
+            return {F: {tup(t): renaming.get(res, res) for t, res in sorted(l.items(), key=lambda x: tup(x[0]))}
+                    for F, l in interps.items()}
+
+        t = Trace(self.num_states)
+        t.univs = {s: tuple(sorted(tup(u), key=lambda e: int(e[len(s.name):]))) for s, u in self.univs.items()}
+        t.immut_rel_interps = rels(self.immut_rel_interps)
+        t.immut_const_interps = consts(self.immut_const_interps)
+        t.immut_func_interps = funcs(self.immut_func_interps)
+        t.rel_interps = [rels(x) for x in self.rel_interps]
+        t.const_interps = [consts(x) for x in self.const_interps]
+        t.func_interps = [funcs(x) for x in self.func_interps]
+        t.transitions = list(self.transitions)
+        t.canonical_labelling_cache[None] = (self.fingerprint(), {e: e for e in renaming.values()})
+        return t.compact()
+
     def eval(self, full_expr: Expr, starting_index: Optional[int]) -> Union[Element, bool]:
         # this function assumes expr does not contain macros (i.e., macros have been expanded)
         def go(expr: Expr, index: Optional[int]) -> Union[Element, bool]:
@@ -473,3 +764,171 @@ def _struct_str(
                                       print_element(struct, F.sort, res)))
 
     return '\n'.join(l)
+
+
+# Canonical labelling of traces.
+#
+# Two traces that differ only in the names of their elements (e.g.,
+# two models of the same query returned by different solver calls)
+# should be treated as the same trace by caches. The functions below
+# compute a canonical labelling of the elements of a trace, in the
+# style of nauty: the elements are colored by their sort and then the
+# coloring is refined according to the interpretations of the
+# relations, constants and functions until it is stable. If the
+# stable coloring is not discrete, an element of the first
+# non-singleton color class is individualized and the search
+# branches, keeping the lexicographically smallest certificate over
+# all leaves. Elements that are interchangeable (swapping them is an
+# automorphism) are only branched on once, which keeps the search
+# small for the common case of many unconstrained elements.
+
+# Facts are encoded with integers only, so that they can be compared and
+# hashed quickly: elements are represented by their (nonnegative)
+# index, and values of other sorts (e.g., the value of a relation) by
+# negative integers, which are assigned in a canonical order. Symbols
+# are likewise represented by their index in a canonical order.
+_Fact = Tuple[int, Tuple[int, ...], int]
+_Certificate = Tuple[Tuple[Tuple[str, int], ...], Tuple[str, ...], Tuple[str, ...], Tuple[_Fact, ...]]
+
+
+class _CanonicalLabelling:
+    def __init__(self, trace: Trace, index: Optional[int]) -> None:
+        self.trace = trace
+        self.sorts = sorted(trace.univs, key=lambda s: s.name)
+        self.elems: List[Tuple[SortDecl, Element]] = [(s, e) for s in self.sorts for e in trace.univs[s]]
+        positions = {(s.name, e): i for i, (s, e) in enumerate(self.elems)}
+
+        interps: List[Tuple[int, RelationInterps, ConstantInterps, FunctionInterps]] = [
+            (-1, trace.immut_rel_interps, trace.immut_const_interps, trace.immut_func_interps)
+        ]
+        interps.extend((i, trace.rel_interps[i], trace.const_interps[i], trace.func_interps[i])
+                       for i in (range(trace.num_states) if index is None else [index]))
+        symbols: List[Tuple[int, int, str]] = []
+        raw: List[Tuple[int, Tuple[Tuple[syntax.Sort, Element], ...], Tuple[Optional[syntax.Sort], Element]]] = []
+        for i, rels, consts, funcs in interps:
+            for R, rl in rels.items():
+                symbols.append((i, 0, R.name))
+                raw.extend((len(symbols) - 1, tuple(zip(R.arity, tup)), (None, str(ans))) for tup, ans in rl.items())
+            for C, c in consts.items():
+                symbols.append((i, 1, C.name))
+                raw.append((len(symbols) - 1, (), (C.sort, c)))
+            for F, fl in funcs.items():
+                symbols.append((i, 2, F.name))
+                raw.extend((len(symbols) - 1, tuple(zip(F.arity, tup)), (F.sort, res)) for tup, res in fl.items())
+
+        # canonical order of symbols and of values not in the universes
+        symbol_order = sorted(range(len(symbols)), key=lambda k: symbols[k])
+        symbol_index = {k: i for i, k in enumerate(symbol_order)}
+        self.symbols = tuple(f'{symbols[k][0]}:{symbols[k][1]}:{symbols[k][2]}' for k in symbol_order)
+        self.values = tuple(sorted(set(
+            e for _, args, res in raw for s, e in chain(args, (res,))
+            if not isinstance(s, syntax.UninterpretedSort)
+        )))
+        value_index = {v: -1 - i for i, v in enumerate(self.values)}
+
+        def value(s: Optional[syntax.Sort], e: Element) -> int:
+            if isinstance(s, syntax.UninterpretedSort):
+                return positions[(s.name, e)]
+            else:
+                return value_index[e]
+
+        self.facts: List[_Fact] = [
+            (symbol_index[k], tuple(value(s, e) for s, e in args), value(*res))
+            for k, args, res in raw
+        ]
+        self.fact_set = frozenset(self.facts)
+
+        # for each element, the indices of the facts it occurs in (with multiplicity)
+        self.occurrences: List[List[int]] = [[] for _ in self.elems]
+        for i, (_, args, res) in enumerate(self.facts):
+            for v in args:
+                if v >= 0:
+                    self.occurrences[v].append(i)
+            if res >= 0:
+                self.occurrences[res].append(i)
+
+    def _color_facts(self, colors: List[int]) -> List[_Fact]:
+        return [(k, tuple(colors[v] if v >= 0 else v for v in args), colors[res] if res >= 0 else res)
+                for k, args, res in self.facts]
+
+    def refine(self, colors: List[int]) -> List[int]:
+        '''Refine colors until stable. Colors are renumbered canonically.'''
+        n = len(set(colors))
+        while True:
+            # hashes of tuples of integers do not depend on the process, and collisions only
+            # make the refinement weaker, not the labelling incorrect
+            hashes = [hash(f) for f in self._color_facts(colors)]
+            sigs = [
+                (colors[x], tuple(sorted(hashes[i] for i in self.occurrences[x])))
+                for x in range(len(self.elems))
+            ]
+            ranks = {sig: i for i, sig in enumerate(sorted(set(sigs)))}
+            colors = [ranks[sig] for sig in sigs]
+            if len(ranks) == n:
+                return colors
+            n = len(ranks)
+
+    def certificate(self, colors: List[int]) -> _Certificate:
+        return (tuple((s.name, len(self.trace.univs[s])) for s in self.sorts), self.symbols, self.values,
+                tuple(sorted(self._color_facts(colors))))
+
+    def is_automorphism(self, perm: Dict[int, int]) -> bool:
+        def p(v: int) -> int:
+            return perm.get(v, v)
+        return all((k, tuple(p(v) for v in args), p(res)) in self.fact_set
+                   for x in perm for k, args, res in (self.facts[i] for i in self.occurrences[x]))
+
+    def twins(self, colors: List[int]) -> List[int]:
+        '''Map each element to the smallest element it can be swapped with (twins are interchangeable).'''
+        rep = list(range(len(self.elems)))
+        for x in range(len(self.elems)):
+            for y in range(x):
+                if rep[y] == y and colors[x] == colors[y] and self.is_automorphism({x: y, y: x}):
+                    rep[x] = y
+                    break
+        return rep
+
+    def search(self, colors: List[int], rep: List[int]) -> Tuple[_Certificate, List[int]]:
+        colors = self.refine(colors)
+        cells: Dict[int, List[int]] = {}
+        for x, c in enumerate(colors):
+            cells.setdefault(c, []).append(x)
+        cell = next((cells[c] for c in sorted(cells) if len(cells[c]) > 1), None)
+        if cell is None:
+            return self.certificate(colors), colors
+        best: Optional[Tuple[_Certificate, List[int]]] = None
+        explored: Set[int] = set()
+        for x in cell:
+            if rep[x] in explored:
+                continue
+            explored.add(rep[x])
+            individualized = [2 * c + (1 if c == colors[x] and y != x else 0) for y, c in enumerate(colors)]
+            res = self.search(individualized, rep)
+            if best is None or res[0] < best[0]:
+                best = res
+        assert best is not None
+        return best
+
+    def run(self) -> Tuple[_Certificate, Dict[Element, Element]]:
+        initial = self.refine([self.sorts.index(s) for s, _ in self.elems])
+        cert, colors = self.search(initial, self.twins(initial))
+        renaming: Dict[Element, Element] = {}
+        for s in self.sorts:
+            ordered = sorted((colors[i], e) for i, (t, e) in enumerate(self.elems) if t == s)
+            renaming.update((e, f'{s.name}{i}') for i, (_, e) in enumerate(ordered))
+        return cert, renaming
+
+
+def canonical_labelling(trace: Trace, index: Optional[int] = None) -> Tuple[str, Dict[Element, Element]]:
+    '''
+    Compute a fingerprint of the trace that is invariant under
+    renaming of elements, together with a renaming of the trace's
+    elements to canonical names. Two traces have the same fingerprint
+    iff they are isomorphic (up to hash collisions), and renaming them
+    with their canonical renamings makes them equal. If index is
+    given, only the immutable symbols and the given state are
+    considered, i.e., the fingerprint is that of trace.as_state(index).
+    '''
+    cert, renaming = _CanonicalLabelling(trace, index).run()
+    fingerprint = hashlib.sha1(repr((trace.num_states if index is None else 1, cert)).encode()).hexdigest()
+    return fingerprint, renaming
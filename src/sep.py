@@ -4,15 +4,15 @@ Experiments in separation using "QBF" solvers
 
 from __future__ import annotations
 
-import argparse
 import itertools
-from itertools import product, chain, combinations, repeat
+from itertools import product, chain, combinations
 from functools import reduce
 from collections import defaultdict
 from pathlib import Path
 import pickle
 import sys
 import os
+import time
 import math
 import multiprocessing
 import multiprocessing.connection
@@ -27,11 +27,14 @@ from contextlib import contextmanager
 
 from syntax import *
 from logic import *
+import typechecker
 
-from typing import TypeVar, Iterable, FrozenSet, Union, Callable, Generator, Set, Optional, cast, Type, Collection, TYPE_CHECKING, AbstractSet, Iterator
+from typing import TypeVar, Iterable, FrozenSet, Union, Callable, Generator, Set, Optional, cast, Type, Collection, TYPE_CHECKING, AbstractSet, Iterator, Sequence
 
 from pd import cheap_check_implication
+import evaluator
 import z3
+from z3_utils import mk_and, mk_or
 
 @contextmanager
 def z3_full_print(max_width: int = 200) -> Iterator[None]:
@@ -59,9 +62,24 @@ def z3_full_print(max_width: int = 200) -> Iterator[None]:
 
 
 class UniversalFixedPrefixSep:
+    '''
+    Find universally quantified clauses with a fixed prefix that separate given states.
+
+    The separator solver only has propositional variables: one per literal, saying whether it
+    is in the clause, and one per state, giving the value of the clause in that state. Since
+    universes are finite, the value of the clause in a state is the conjunction, over the
+    assignments of the prefix variables to elements of the state, of the disjunction of the
+    literals that are true under that assignment. These truth values are computed with the
+    compiled evaluator, whose indexed form of a state numbers the elements of each sort and
+    tabulates its interpretations, so the solver never sees the elements themselves.
+
+    States are encoded the first time they are used, under an assumption literal, so a state
+    only constrains the queries that use it, and can be retired once it is no longer needed.
+    '''
     def __init__(self,
                  prefix_sorts: Tuple[UninterpretedSort, ...],
                  states: List[State],  # assumed to only grow, indices are used as "state keys"
+                 verbose: bool = True,  # print the terms, atoms, and literals
     ):
         self.prog = syntax.the_program
         self.states = states
@@ -73,6 +91,8 @@ class UniversalFixedPrefixSep:
         # generate terms, atoms, and literals
         terms: Dict[str, List[Expr]] = defaultdict(list)
         def print_terms(msg: str = 'terms') -> None:
+            if not verbose:
+                return
             print(f'[{datetime.now()}] {msg} ({sum(len(ts) for ts in terms.values())}):')
             for k in sorted(terms.keys()):
                 print(f'{k:10} ({len(terms[k]):4}): ' + ' '.join(sorted(str(t) for t in terms[k])))
@@ -108,32 +128,43 @@ class UniversalFixedPrefixSep:
                 atoms.append(Apply(r.name, ts))
         atoms.extend(Eq(x, y) for ts in terms.values() for x, y in combinations(ts, 2))
         atoms = sorted(atoms)
-        print(f'[{datetime.now()}] atoms ({len(atoms)}):\n' + ''.join(f'    {a}\n' for a in atoms))
-        # literals
+        if verbose:
+            print(f'[{datetime.now()}] atoms ({len(atoms)}):\n' + ''.join(f'    {a}\n' for a in atoms))
+        # literals, where literals[2 * j] is atoms[j] and literals[2 * j + 1] is its negation
         literals = tuple(lit for a in atoms for lit in (a, Not(a)))
-        print(f'[{datetime.now()}] literals ({len(literals)}):\n' + ''.join(f'{i:8}: {lit}\n' for i, lit in enumerate(literals)))
+        if verbose:
+            print(f'[{datetime.now()}] literals ({len(literals)}):\n' + ''.join(f'{i:8}: {lit}\n' for i, lit in enumerate(literals)))
         self.literals = literals
 
+        self.compiled_atoms: List[evaluator.CompiledExpr] = []
+        for a in atoms:
+            c = evaluator.compile_expr(a, self.vs)
+            assert c is not None, f'cannot evaluate {a}'
+            self.compiled_atoms.append(c)
+
         self.n_clauses = 1
         self.lit_vs: Dict[Tuple[int, Expr], z3.ExprRef] = {
             (i, lit): z3.Bool(f'lit_{i}_{j}')
             for i in range(self.n_clauses)
             for j, lit in enumerate(self.literals)
         }
+        self.lit_decls = {k: x.decl() for k, x in self.lit_vs.items()}
 
         self.state_vs: Dict[int, z3.ExprRef] = {}  # state_vs[i] represents the value of the separator in self.states[i]
+        self.active: Dict[int, z3.ExprRef] = {}  # assumption literal under which the value of state_vs[i] is asserted
+        self.retired: Set[int] = set()
 
         self.solver = z3.Solver()
-        self.seen: Set[str] = set()  # used to assert we don't have name collisions
 
     def separate(self,
                  pos: Collection[int] = (),
                  neg: Collection[int] = (),
     ) -> Optional[Expr]:
-        assert all(0 <= i < len(self.states) for i in chain(pos, neg))
+        assert all(0 <= i < len(self.states) and i not in self.retired for i in chain(pos, neg))
         assumptions = tuple(chain(
             (self.state_v(i) for i in sorted(pos)),
             (z3.Not(self.state_v(i)) for i in sorted(neg)),
+            (self.active[i] for i in sorted(set(chain(pos, neg)))),
         ))
         res = self.solver.check(*assumptions)
         assert res in (z3.sat, z3.unsat), f'{res}\n\n{self.solver}'
@@ -143,8 +174,8 @@ class UniversalFixedPrefixSep:
             m = self.solver.model()
             # bias toward strongest separator, but no minimization for now
             assignment: Dict[Tuple[int, Expr], bool] = {
-                k: z3.is_true(m[x])
-                for k, x in self.lit_vs.items()
+                k: z3.is_true(m.get_interp(d))
+                for k, d in self.lit_decls.items()
             }
             return Forall(self.vs, And(*(
                 Or(*(lit for lit in self.literals if assignment[i, lit]))
@@ -154,131 +185,164 @@ class UniversalFixedPrefixSep:
     def state_v(self, i: int) -> z3.ExprRef:
         assert 0 <= i < len(self.states)
         if i not in self.state_vs:
-            assertions, self.state_vs[i] = self._eval_sep(self.states[i], f'state_{i}')
-            for a in assertions:
-                self.solver.add(a)
+            self.state_vs[i] = z3.Bool(f'state_{i}_models_sep')
+            self.active[i] = z3.Bool(f'state_{i}_active')
+            self.solver.add(z3.Implies(self.active[i], self.state_vs[i] == self._eval_sep(self.states[i])))
         return self.state_vs[i]
 
-    def _eval_sep(self, state: State, st_prefix: str) -> Tuple[List[z3.ExprRef], z3.ExprRef]:
+    def retire(self, indices: Iterable[int]) -> None:
+        '''Remove the constraints of the given states, which can then no longer be separated.'''
+        for i in indices:
+            if i in self.active and i not in self.retired:
+                self.solver.add(z3.Not(self.active[i]))
+            self.retired.add(i)
+
+    def _eval_sep(self, state: State) -> z3.ExprRef:
         '''
-        create new state variable add assertions enforcing its value
+        Return the value of the separator in state, in terms of the literal variables.
         '''
-        def p(st: str, must_be_new: bool = True) -> str:
-            st = st_prefix + '_' + st
-            assert (not must_be_new) or st not in self.seen, (st, self.seen)
-            self.seen.add(st)
-            return st
-
-        assertions: List[z3.ExprRef] = []  # will be added to the solver
-        state_models_sep = z3.Bool(p('models_sep'))  # will become self.state_vs[i]
-
-        # create z3 symbols for all relations, functions, and constants, and assert their meaning
-
-        # create universe unary relations
-        scope = max(len(elems) for elems in state.univs.values())
-        V = z3.Datatype(p('elements'))
-        def e(i: int) -> str:
-            return f'e{i}'
-        for i in range(scope):
-            V.declare(e(i))
-        V = V.create()
-        def is_e(i: int) -> z3.FuncDeclRef:
-            return getattr(V, 'is_' + e(i))
-        def ee(i: int) -> z3.ExprRef:
-            return getattr(V, e(i))
-        universes = {s.name: z3.Function(p(s.name), V, z3.BoolSort()) for s in state.univs}
-        elem_to_z3: Dict[str, z3.ExprRef] = {}
-        for s, elems in state.univs.items():
-            assertions.extend(universes[s.name](ee(i)) for i in range(len(elems)))
-            assertions.extend(z3.Not(universes[s.name](ee(i))) for i in range(len(elems), scope))
-            for i, elem in enumerate(elems):
-                assert elem not in elem_to_z3
-                elem_to_z3[elem] = ee(i)
-
-        # create relations
-        def lit(e: z3.ExprRef, polarity: bool) -> z3.ExprRef:
-            return e if polarity else z3.Not(e)
-        relations: Dict[str, Union[z3.ExprRef, z3.FuncDeclRef]] = {
-            r.name:
-            z3.Function(p(r.name), *repeat(V, len(r.arity)), z3.BoolSort()) if len(r.arity) > 0 else
-            z3.Bool(p(r.name))
-            for r in state.rel_interps
-        }
-        for r, ri in state.rel_interps.items():
-            if len(r.arity) == 0:
-                assert len(ri) == 1 and () in ri, (r, ri)
-                a = relations[r.name]
-                assert isinstance(a, z3.ExprRef)
-                assertions.append(lit(a, ri[()]))
-            else:
-                for tup, polarity in ri.items():
-                    a = relations[r.name]
-                    assert isinstance(a, z3.FuncDeclRef)
-                    args = [elem_to_z3[x] for x in tup]
-                    assertions.append(lit(a(*args), polarity))
-
-        # create functions
-        assert all(len(f.arity) > 0 for f in state.func_interps)
-        functions: Dict[str, z3.FuncDeclRef] = {
-            f.name:
-            z3.Function(p(f.name), *repeat(V, len(f.arity)), V)
-            for f in state.func_interps
-        }
-        for f, fi in state.func_interps.items():
-            for tup, img in fi.items():
-                args = [elem_to_z3[x] for x in tup]
-                assertions.append(functions[f.name](*args) == elem_to_z3[img])
-
-        # create constants
-        constants: Dict[str, z3.ExprRef] = {
-            c.name: z3.Const(p(c.name), V)
-            for c in state.const_interps
-        }
-        for c, ci in state.const_interps.items():
-            assertions.append(constants[c.name] == elem_to_z3[ci])
-
-        # now force state_models_sep
-        z3_vs = [z3.Const(p(f'V{i}'), V) for i in range(len(self.vs))]
-        def to_z3(e: Expr) -> z3.ExprRef:
-            if isinstance(e, Id):
-                if e.name in self.var_names:
-                    return z3_vs[self.var_names.index(e.name)]
-                elif e.name in constants:
-                    return constants[e.name]
-                elif e.name in relations and isinstance(r := relations[e.name], z3.ExprRef):
-                    return r
-                else:
-                    assert False, e
-            elif isinstance(e, AppExpr) and e.callee in functions:
-                return functions[e.callee](*(map(to_z3, e.args)))
-            elif (isinstance(e, AppExpr) and e.callee in relations and
-                  isinstance(r := relations[e.callee], z3.FuncDeclRef)):
-                return r(*(map(to_z3, e.args)))
-            elif isinstance(e, UnaryExpr) and e.op == 'NOT':
-                return z3.Not(to_z3(e.arg))
-            elif isinstance(e, BinaryExpr) and e.op == 'EQUAL':
-                return to_z3(e.arg1) == to_z3(e.arg2)
-            else:
-                assert False, e
-        value = z3.Implies(
-            z3.And(*(
-                universes[s](v)
-                for v, s in zip(z3_vs, self.prefix_names)
-            )),
-            z3.And(*(
-                z3.Or(*(
-                    z3.And(self.lit_vs[i, lit], to_z3(lit))
-                    for lit in self.literals
-                ))
-                for i in range(self.n_clauses)
+        # the literals true under each assignment to the prefix, without duplicates
+        instances: Set[Tuple[int, ...]] = set()
+        sizes = [len(state.univs.get(cast(SortDecl, s.decl), ())) for s in self.prefix_sorts]
+        for env in product(*(range(n) for n in sizes)):
+            instances.add(tuple(
+                2 * j + (0 if evaluator.eval_compiled(state.trace, c, state.index, env) else 1)
+                for j, c in enumerate(self.compiled_atoms)
             ))
-        )
-        if len(z3_vs) > 0:
-            value = z3.ForAll(z3_vs, value)
-        assertions.append(state_models_sep == value)
-
-        return assertions, state_models_sep
 
+        return mk_and([
+            mk_or([self.lit_vs[i, self.literals[k]] for k in instance])
+            for instance in sorted(instances)
+            for i in range(self.n_clauses)
+        ])
+
+
+def find_counterexample(solver: Solver, p: Expr, sep: Expr) -> Optional[Tuple[bool, State]]:
+    '''
+    Return a state that satisfies exactly one of p and sep, and whether it satisfies p,
+    or None if sep is equivalent to p.
+    '''
+    z3cex = check_implication(solver, [p], [sep], minimize=True)
+    if z3cex is not None:
+        cex = Z3Translator.model_to_trace(z3cex, 1).as_state(0)
+        print(f'[{datetime.now()}] Got positive counterexample:\n\n{cex}\n')
+        return True, cex
+    z3cex = check_implication(solver, [sep], [p], minimize=True)
+    if z3cex is not None:
+        cex = Z3Translator.model_to_trace(z3cex, 1).as_state(0)
+        print(f'[{datetime.now()}] Got negative counterexample:\n\n{cex}\n')
+        return False, cex
+    return None
+
+
+Prefix = Tuple[UninterpretedSort, ...]
+
+def universal_prefixes(max_length: int) -> List[Prefix]:
+    '''
+    Return the prefixes of up to max_length universally quantified variables, shortest first.
+    Since the order of universal quantifiers does not matter, each multiset of sorts is
+    returned once, with the sorts in the order they are declared.
+    '''
+    prog = syntax.the_program
+    sorts = []
+    for d in prog.sorts():
+        s = UninterpretedSort(d.name)
+        typechecker.typecheck_sort(prog.scope, s)
+        sorts.append(s)
+    return [prefix for n in range(max_length + 1) for prefix in itertools.combinations_with_replacement(sorts, n)]
+
+def _sub_prefix(a: Prefix, b: Prefix) -> bool:
+    '''Whether every clause with prefix a is equivalent to one with prefix b.'''
+    return all(a.count(s) <= b.count(s) for s in set(a))
+
+# separators of a worker process of a prefix portfolio, and the states they separate, which
+# are sent to the worker along with the requests that first need them
+_worker_states: List[State] = []
+_worker_separators: Dict[Prefix, UniversalFixedPrefixSep] = {}
+
+def _separate_helper(prefix: Prefix, new_states: List[State],
+                     pos: Tuple[int, ...], neg: Tuple[int, ...]) -> Tuple[Optional[Expr], float]:
+    # runs in a worker process, see PrefixPortfolio
+    _worker_states.extend(new_states)
+    if prefix not in _worker_separators:
+        _worker_separators[prefix] = UniversalFixedPrefixSep(prefix, _worker_states, verbose=False)
+    start = time.perf_counter()
+    sep = _worker_separators[prefix].separate(pos, neg)
+    return sep, time.perf_counter() - start
+
+class PrefixPortfolio:
+    '''
+    Learn a clause by running the separators of several quantifier prefixes in worker processes.
+
+    Each prefix has at most one request at a time, to the worker that keeps its separator.
+    Every counterexample found for a candidate separator is sent to all the separators along
+    with their next request. When the states of a request do not have a separator with its
+    prefix, the prefix and the prefixes contained in it are dropped. The first candidate that
+    is equivalent to the clause wins, and the workers are then terminated, abandoning the
+    requests of the other prefixes.
+    '''
+    def __init__(self, prefixes: Sequence[Prefix], states: List[State], jobs: int) -> None:
+        self.prefixes = list(prefixes)
+        self.states = states  # shared with the caller, and only grows
+        self.jobs = jobs
+        self.separate_times: List[float] = []
+
+    def learn(self, solver: Solver, p: Expr, pos: List[int], neg: List[int]) -> Optional[Expr]:
+        '''
+        Return a separator equivalent to p, or None if none of the prefixes has one. Counterexamples
+        are added to self.states, and their indices to pos or neg.
+        '''
+        workers = [multiprocessing.Pool(1) for _ in range(self.jobs)]
+        sent = [0] * self.jobs  # number of states sent to each worker
+        results: queue.Queue[Tuple[int, int, Union[Tuple[Optional[Expr], float], BaseException]]] = queue.Queue()
+
+        def submit(k: int) -> None:
+            w = k % self.jobs
+            new_states = self.states[sent[w]:]
+            sent[w] = len(self.states)
+            n = len(self.states)
+            workers[w].apply_async(
+                _separate_helper, (self.prefixes[k], new_states, tuple(pos), tuple(neg)),
+                callback=lambda res: results.put((k, n, res)),
+                error_callback=lambda e: results.put((k, n, e)),
+            )
+
+        def holds(sep: Expr, i: int) -> bool:
+            return bool(evaluator.eval_in_trace(self.states[i].trace, sep, self.states[i].index))
+
+        alive = set(range(len(self.prefixes)))
+        try:
+            for k in sorted(alive):
+                submit(k)
+            while alive:
+                k, n, res = results.get()
+                if k not in alive:
+                    continue
+                if isinstance(res, BaseException):
+                    raise res
+                sep, seconds = res
+                self.separate_times.append(seconds)
+                if sep is None:
+                    dropped = {j for j in alive if _sub_prefix(self.prefixes[j], self.prefixes[k])}
+                    print(f'[{datetime.now()}] No separator with prefix {self.prefixes[k]}, dropping '
+                          f'{len(dropped)} prefixes ({len(alive) - len(dropped)} left)\n')
+                    alive -= dropped
+                    continue
+                # the separator may already be refuted by states found since the request
+                if any(holds(sep, i) != (i in pos) for i in chain(pos, neg) if i >= n):
+                    submit(k)
+                    continue
+                print(f'[{datetime.now()}] Candidate separator with prefix {self.prefixes[k]} is: {sep}\n')
+                cex = find_counterexample(solver, p, sep)
+                if cex is None:
+                    return sep
+                (pos if cex[0] else neg).append(len(self.states))
+                self.states.append(cex[1])
+                submit(k)
+            return None
+        finally:
+            for w in workers:
+                w.terminate()
 
 
 def sep_main(solver: Solver) -> str:
@@ -313,61 +377,62 @@ def sep_main(solver: Solver) -> str:
     states: List[State] = [m0]
     n_total_cex = 1
     n_learned = 0
+    separators: Dict[Prefix, UniversalFixedPrefixSep] = {}
+    separate_times: List[float] = []
+    portfolio: Optional[PrefixPortfolio] = None
+    if utils.args.prefix_portfolio:
+        prefixes = universal_prefixes(utils.args.max_prefix_length)
+        print(f'[{datetime.now()}] Using a portfolio of {len(prefixes)} prefixes with {utils.args.jobs} workers')
+        portfolio = PrefixPortfolio(prefixes, states, utils.args.jobs)
     for i, p in reversed(list(enumerate(invs))):
         print(f'\n\n\n[{datetime.now()}] Learning invariant {i}: {p}\n')
         solver = Solver(use_cvc4=utils.args.cvc4) # reusing the same solver too much results in unknowns
 
-        prefix_sorts: List[UninterpretedSort] = []
-        if isinstance(p, QuantifierExpr):
-            assert p.quant == 'FORALL'
-            for v in p.get_vs():
-                assert isinstance(v.sort, UninterpretedSort)
-                prefix_sorts.append(v.sort)
-        separator = UniversalFixedPrefixSep(tuple(prefix_sorts), states)
-
         pos: List[int] = [0]
         neg: List[int] = []
-        n_cex = 0
-        while True:
-            sep = separator.separate(pos, neg)
-            if sep is None:
-                n_total_cex += n_cex
-                print(f'[{datetime.now()}] Failure! Cannot learn invariant {i} after {n_cex} counterexamples. Maybe it has function depth more than 1?\n    {p}\n\n')
-                break
-            print(f'[{datetime.now()}] Candidate separator is: {sep}\n')
-            z3cex = check_implication(solver, [p], [sep], minimize=True)
-            if z3cex is not None:
-                cex = Z3Translator.model_to_trace(z3cex, 1).as_state(0)
-                print(f'[{datetime.now()}] Got positive counterexample:\n\n{cex}\n')
-                pos.append(len(states))
-                states.append(cex)
-                n_cex += 1
-                continue
-            z3cex = check_implication(solver, [sep], [p], minimize=True)
-            if z3cex is not None:
-                cex = Z3Translator.model_to_trace(z3cex, 1).as_state(0)
-                print(f'[{datetime.now()}] Got negative counterexample:\n\n{cex}\n')
-                neg.append(len(states))
-                states.append(cex)
-                n_cex += 1
-                continue
+        sep: Optional[Expr]
+        if portfolio is not None:
+            sep = portfolio.learn(solver, p, pos, neg)
+        else:
+            prefix_sorts: List[UninterpretedSort] = []
+            if isinstance(p, QuantifierExpr):
+                assert p.quant == 'FORALL'
+                for v in p.get_vs():
+                    assert isinstance(v.sort, UninterpretedSort)
+                    prefix_sorts.append(v.sort)
+            if tuple(prefix_sorts) not in separators:
+                separators[tuple(prefix_sorts)] = UniversalFixedPrefixSep(tuple(prefix_sorts), states)
+            separator = separators[tuple(prefix_sorts)]
+
+            while True:
+                start = time.perf_counter()
+                sep = separator.separate(pos, neg)
+                separate_times.append(time.perf_counter() - start)
+                if sep is None:
+                    break
+                print(f'[{datetime.now()}] Candidate separator is: {sep}\n')
+                cex = find_counterexample(solver, p, sep)
+                if cex is None:
+                    break
+                (pos if cex[0] else neg).append(len(states))
+                states.append(cex[1])
+            # the counterexamples of one invariant are not used to learn the others
+            separator.retire(chain(pos[1:], neg))
+
+        n_cex = len(pos) + len(neg) - 1
+        n_total_cex += n_cex
+        if sep is None:
+            print(f'[{datetime.now()}] Failure! Cannot learn invariant {i} after {n_cex} counterexamples. Maybe it has function depth more than 1?\n    {p}\n\n')
+        else:
             # no cex, i.e., sep <=> p
-            n_total_cex += n_cex
             n_learned += 1
             print(f'[{datetime.now()}] Success! Learned invariant {i} after {n_cex} counterexamples:\n    {sep}\n    <=>\n    {p}\n\n')
-            break
 
+    if portfolio is not None:
+        separate_times.extend(portfolio.separate_times)
     print(f'[{datetime.now()}] Successfully learned a total of {n_learned} out of {len(invs)} invariants one by one using a total of {n_total_cex} examples.')
+    print(f'[{datetime.now()}] Made {len(separate_times)} calls to separate() in {sum(separate_times):.3f}s '
+          f'({1000 * sum(separate_times) / max(len(separate_times), 1):.1f}ms per call, '
+          f'{1000 * max(separate_times, default=0):.1f}ms max)')
 
     return 'yo'
-
-
-def add_argparsers(subparsers: argparse._SubParsersAction) -> Iterable[argparse.ArgumentParser]:
-    result : List[argparse.ArgumentParser] = []
-
-    # sep
-    s = subparsers.add_parser('sep', help='Run the experimental separation code')
-    s.set_defaults(main=sep_main)
-    result.append(s)
-
-    return result
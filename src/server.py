@@ -0,0 +1,287 @@
+'''
+A long-running mypyvy process that answers requests from editors and scripts.
+
+`mypyvy serve SOCKET` listens on the Unix socket at the path SOCKET. Clients send
+JSON-RPC 2.0 requests, one per line, and receive one response per line. The
+methods typecheck, verify, bmc, and trace take the parameters
+
+    filename  the input file (required)
+    contents  the text of the input file (default: read from filename)
+    args      a list of command line arguments for the subcommand (default: [])
+    cwd       the directory in which to interpret filename and args (default: the server's)
+
+and behave like the corresponding subcommand run on the command line. Their result
+is an object with the output of the subcommand ("output"), the number of errors
+it reported ("error_count"), and its exit status ("exit_code"). The result of
+verify also has "verification", in the format of `mypyvy verify --json`.
+The method shutdown stops the server.
+
+Compared to running mypyvy once for each check, the server saves importing
+z3, parsing and typechecking unchanged files, and initializing the solver:
+the typechecked program and the solver (with its axioms and translations) are
+kept for each file, and reused until the file changes. Each request starts with
+z3's default global parameters, whatever the previous requests set.
+
+Requests are answered one at a time, in the order they arrive, since
+checking a program uses global state (utils.args, syntax.the_program).
+
+For example, `python3.8 server.py SOCKET verify --no-query-time FILE` sends one
+request and prints its output, so it can be used instead of `mypyvy.py verify
+--no-query-time FILE` by editor integrations such as emacs/flycheck-mypyvy.el.
+'''
+from __future__ import annotations
+from collections import OrderedDict
+import contextlib
+from dataclasses import dataclass, field
+import io
+import json
+import os
+import socket
+import sys
+import traceback
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+import mypyvy
+import syntax
+import utils
+
+if TYPE_CHECKING:
+    from logic import Solver
+
+JSON = Dict[str, Any]
+
+# the arguments that configure a solver when it is created, see mypyvy.configure_z3
+SolverKey = Tuple[bool, int, Optional[int]]
+
+METHODS = ('typecheck', 'verify', 'bmc', 'trace')
+
+# error codes defined by JSON-RPC 2.0
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+# number of files for which the typechecked program and solvers are kept
+_MAX_PROGRAMS = 8
+
+class RequestError(Exception):
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+@dataclass
+class LoadedProgram:
+    contents: str
+    prog: syntax.Program
+    solvers: Dict[SolverKey, Solver] = field(default_factory=dict)  # indexed by solver_key()
+
+def solver_key() -> SolverKey:
+    return (utils.args.cvc4, utils.args.seed, utils.args.timeout)
+
+class Server:
+    def __init__(self) -> None:
+        self.args = utils.args  # the arguments of the server itself, restored after each request
+        self.programs: OrderedDict[str, LoadedProgram] = OrderedDict()
+        self.running = True
+
+    def load(self, filename: str, contents: str) -> LoadedProgram:
+        '''Return the typechecked program for the given input, parsing it only if it changed.'''
+        key = os.path.abspath(filename)
+        loaded = self.programs.get(key)
+        # the program is printed while it is parsed, so --print-program always parses it again
+        if loaded is None or loaded.contents != contents or utils.args.print_program is not None:
+            self.programs.pop(key, None)
+            loaded = LoadedProgram(contents, mypyvy.parse_and_typecheck(contents, filename))
+            self.programs[key] = loaded
+            while len(self.programs) > _MAX_PROGRAMS:
+                self.programs.popitem(last=False)
+        self.programs.move_to_end(key)
+        return loaded
+
+    def solver(self, loaded: LoadedProgram) -> Solver:
+        from logic import Solver
+
+        key = solver_key()
+        if key not in loaded.solvers:
+            loaded.solvers[key] = Solver(use_cvc4=utils.args.cvc4)
+        return loaded.solvers[key]
+
+    def run(self, method: str, params: JSON) -> JSON:
+        filename = params.get('filename')
+        args = params.get('args', [])
+        if not isinstance(filename, str) or not isinstance(args, list) or \
+           not all(isinstance(arg, str) for arg in args) or not isinstance(params.get('contents', ''), str):
+            raise RequestError(INVALID_PARAMS, 'expected a filename, a list of string args, and string contents')
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+            try:
+                utils.args = mypyvy.parse_args([method] + args + [filename])
+            except SystemExit:
+                raise RequestError(INVALID_PARAMS, out.getvalue().strip())
+
+        if 'contents' in params:
+            contents = params['contents']
+        else:
+            try:
+                with open(filename) as f:
+                    contents = f.read()
+            except OSError as e:
+                raise RequestError(INVALID_PARAMS, str(e))
+
+        result: JSON = {}
+        utils.error_count = 0
+        exit_code = 0
+        with contextlib.redirect_stdout(out):
+            mypyvy.configure_logging()
+            loaded: Optional[LoadedProgram] = None
+            s: Optional[Solver] = None
+            try:
+                loaded = self.load(filename, contents)
+                syntax.the_program = loaded.prog
+
+                if method != 'typecheck':
+                    mypyvy.configure_z3()
+                    s = self.solver(loaded)
+                    if method == 'verify':
+                        result['verification'] = mypyvy.verify_result_json(mypyvy.verify(s))
+                    else:
+                        utils.args.main(s)
+                # exit like the command line does, e.g., printing the exit code if requested
+                utils.exit(1 if utils.error_count > 0 else 0)
+            except SystemExit as e:
+                exit_code = e.code if isinstance(e.code, int) else 0 if e.code is None else 1
+            finally:
+                if s is not None:
+                    import query_profile
+                    query_profile.report()
+                    query_profile.reset()
+                # a check that did not finish may have left frames on the solver
+                if loaded is not None and s is not None and len(s.stack) != 1:
+                    del loaded.solvers[solver_key()]
+                if method != 'typecheck':
+                    # configure_z3 (and the subcommand) may have set z3's global parameters, e.g., its timeout
+                    import z3
+                    z3.reset_params()
+
+        result['output'] = out.getvalue()
+        result['error_count'] = utils.error_count
+        result['exit_code'] = exit_code
+        return result
+
+    def handle(self, request: Any) -> Any:
+        if not isinstance(request, dict) or request.get('jsonrpc') != '2.0' or \
+           not isinstance(request.get('method'), str):
+            raise RequestError(INVALID_REQUEST, 'expected a JSON-RPC 2.0 request')
+        method = request['method']
+        params = request.get('params', {})
+        if not isinstance(params, dict):
+            raise RequestError(INVALID_PARAMS, 'expected named parameters')
+
+        if method == 'shutdown':
+            self.running = False
+            return None
+        if method not in METHODS:
+            raise RequestError(METHOD_NOT_FOUND, f'unknown method {method}')
+
+        cwd = os.getcwd()
+        try:
+            if 'cwd' in params:
+                try:
+                    os.chdir(params['cwd'])
+                except (OSError, TypeError) as e:
+                    raise RequestError(INVALID_PARAMS, str(e))
+            return self.run(method, params)
+        finally:
+            os.chdir(cwd)
+            utils.args = self.args
+            mypyvy.configure_logging()
+
+    def respond(self, line: bytes) -> Optional[JSON]:
+        '''Return the response to the given line of input, or None if it is a notification.'''
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                raise RequestError(PARSE_ERROR, str(e))
+            if isinstance(request, dict):
+                request_id = request.get('id')
+            result = self.handle(request)
+            if isinstance(request, dict) and 'id' not in request:
+                return None
+            return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+        except RequestError as e:
+            return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': e.code, 'message': e.message}}
+        except Exception:
+            return {'jsonrpc': '2.0', 'id': request_id,
+                    'error': {'code': INTERNAL_ERROR, 'message': traceback.format_exc()}}
+
+    def serve_connection(self, conn: socket.socket) -> None:
+        with conn, conn.makefile('rb') as reader:
+            for line in reader:
+                if not line.strip():
+                    continue
+                response = self.respond(line)
+                if response is not None:
+                    conn.sendall(json.dumps(response).encode() + b'\n')
+                if not self.running:
+                    break
+
+def _listen(socket_path: str) -> socket.socket:
+    if os.path.exists(socket_path):
+        # remove the socket of a server that is no longer running, but not that of a running one
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(socket_path)
+        except ConnectionRefusedError:
+            os.unlink(socket_path)
+        else:
+            utils.print_error_and_exit(None, f'another server is already listening on {socket_path}')
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(socket_path)
+    sock.listen()
+    return sock
+
+def serve(socket_path: str) -> None:
+    server = Server()
+    with _listen(socket_path) as sock:
+        utils.logger.always_print(f'mypyvy server listening on {socket_path}')
+        try:
+            while server.running:
+                conn, _ = sock.accept()
+                try:
+                    server.serve_connection(conn)
+                except OSError as e:
+                    utils.logger.warning(f'lost connection to client: {e}')
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(socket_path)
+
+def call(socket_path: str, method: str, params: Optional[JSON] = None, request_id: int = 1) -> JSON:
+    '''Send one request to the server listening on socket_path, and return its response.'''
+    request: JSON = {'jsonrpc': '2.0', 'id': request_id, 'method': method}
+    if params is not None:
+        request['params'] = params
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode() + b'\n')
+        with sock.makefile('rb') as reader:
+            return json.loads(reader.readline())
+
+def main(argv: List[str]) -> None:
+    if len(argv) < 3:
+        print(f'usage: {argv[0]} SOCKET SUBCOMMAND [ARGS...] FILE', file=sys.stderr)
+        sys.exit(2)
+    response = call(argv[1], argv[2], {'filename': argv[-1], 'args': argv[3:-1], 'cwd': os.getcwd()})
+    if 'error' in response:
+        print(response['error']['message'], file=sys.stderr)
+        sys.exit(2)
+    print(response['result']['output'], end='')
+    sys.exit(response['result']['exit_code'])
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -29,7 +29,11 @@ from syntax import Expr, Scope, ConstantDecl, RelationDecl, SortDecl
 from syntax import FunctionDecl, DefinitionDecl, Not, New
 from semantics import Trace, State, FirstOrderStructure
 from translator import Z3Translator, TRANSITION_INDICATOR
-from solver_cvc4 import CVC4Model, new_cvc4_process, check_with_cvc4
+from solver_cvc4 import CVC4Model, CVC4Query, get_cvc4_pool
+import query_profile
+import solver_cache
+import solver_portfolio
+from solver_portfolio import PortfolioConfig
 
 CheckSatResult = z3.CheckSatResult
 # TODO: use something like this (unfortunately mypy doesn't help here)
@@ -54,6 +58,10 @@ def result_from_z3(res: z3.CheckSatResult) -> CheckSatResult:
         assert False, res
 
 
+# the size of a relation in a model is only used as a bound for minimization if it has at most
+# this many potential tuples, since computing it requires evaluating each of them
+_MAX_TUPLES_TO_COUNT = 4096
+
 LatorFactory = Callable[[syntax.Scope, int], Z3Translator]
 class Solver:
     def __init__(
@@ -77,10 +85,16 @@ class Solver:
         self.stack: List[List[z3.ExprRef]] = [[]]
         self.include_program = include_program
         self.use_cvc4 = use_cvc4
-        self.cvc4_proc: Optional[subprocess.Popen] = None
+        # assertions shared by cvc4 queries, and their smt2, see _cvc4_shared_smt2
+        self.cvc4_shared: Optional[Tuple[List[z3.ExprRef], str]] = None
         self.cvc4_last_query: Optional[str] = None
         self.cvc4_last_model_response: Optional[str] = None
         self.cvc4_model: Optional[CVC4Model] = None  # model of the last check(), only used with cvc4 models
+        self.cvc4_query: Optional[CVC4Query] = None  # the query being checked by cvc4, which interrupt() stops
+        # if the result of the last check() was not computed by z3solver (it came from the query cache or
+        # from a portfolio race), the assumptions and portfolio configuration with which to run z3solver
+        # if a model or unsat core is requested
+        self.deferred_check: Optional[Tuple[Sequence[z3.ExprRef], Optional[PortfolioConfig]]] = None
 
         self._init_axioms(prog, include_program, reassert_axioms, additional_mutable_axioms)
 
@@ -105,10 +119,39 @@ class Solver:
 
         self.register_mutable_axioms(mutable_axioms)
 
-    def get_cvc4_proc(self) -> subprocess.Popen:
-        if self.cvc4_proc is None:
-            self.cvc4_proc = new_cvc4_process()
-        return self.cvc4_proc
+    def check_with_cvc4(self) -> Optional[CVC4Model]:
+        self.cvc4_query = get_cvc4_pool().submit(self.z3solver.to_smt2(), self._cvc4_shared_smt2())
+        try:
+            return self.cvc4_query.result()
+        finally:
+            self.cvc4_query = None
+
+    def _cvc4_shared_smt2(self) -> str:
+        '''Return the smt2 of the bottom frame (e.g., the axioms), which cvc4 processes keep between queries.'''
+        shared = self.stack[0] if len(self.stack) > 1 else []
+        if self.cvc4_shared is None or [e.get_id() for e in self.cvc4_shared[0]] != [e.get_id() for e in shared]:
+            s = z3.Solver()
+            for e in shared:
+                s.add(e)
+            # keep a copy of the assertions alive, so their ids are not reused
+            self.cvc4_shared = (list(shared), s.to_smt2())
+        return self.cvc4_shared[1]
+
+    def interrupt(self) -> None:
+        '''Stop a check of this solver that is running in another thread.
+
+        With z3, the check returns unknown. With cvc4, the process checking it is killed, and the check
+        raises an exception. Checks of other solvers are not affected.
+        '''
+        if self.use_cvc4:
+            query = self.cvc4_query
+            if query is not None:
+                query.interrupt()
+        else:
+            self.z3solver.ctx.interrupt()
+
+    def _interrupted(self) -> bool:
+        return self.z3solver.reason_unknown() in ('interrupted', 'canceled')
 
     def debug_recent(self) -> Tuple[str, Optional[str], Optional[str]]:
         return (self.z3solver.to_smt2(), self.cvc4_last_query, self.cvc4_last_model_response)
@@ -180,16 +223,94 @@ class Solver:
     def check(self, assumptions: Optional[Sequence[z3.ExprRef]] = None) -> CheckSatResult:
         # logger.debug('solver.check')
         self.cvc4_model = None
+        self.deferred_check = None
         if assumptions is None:
             assert not self.assumptions_necessary
             assumptions = []
         self.nqueries += 1
 
+        profiler = query_profile.get_query_profiler()
+        if profiler is None:
+            return self._check_with_cache(assumptions)
+        start = time.perf_counter()
+        res = self._check_with_cache(assumptions)
+        profiler.record(time.perf_counter() - start, res, list(itertools.chain(*self.stack)), assumptions)
+        return res
+
+    def _check_with_cache(self, assumptions: Sequence[z3.ExprRef]) -> CheckSatResult:
+        cache = solver_cache.get_query_cache()
+        if cache is None:
+            return self._check(assumptions)
+
+        key = solver_cache.query_key(itertools.chain(*self.stack), assumptions)
+        cached = cache.lookup(key)
+        if cached is not None:
+            # the solver is only run if a model or unsat core is requested, see _ensure_checked
+            self.deferred_check = (assumptions, None)
+            return sat if cached else unsat
+        res = self._check(assumptions)
+        if res != unknown:  # e.g., an interrupted or timed-out query
+            cache.store(key, res == sat)
+        return res
+
+    def _ensure_checked(self) -> None:
+        '''Run z3solver on the last query if its result was not computed by z3solver.'''
+        if self.deferred_check is not None:
+            assumptions, config = self.deferred_check
+            self.deferred_check = None
+            if self.use_cvc4:
+                self._check(assumptions)
+            elif config is None:
+                self._check_z3(assumptions)
+            else:
+                solver_portfolio.set_params(self.z3solver, config.params)
+                try:
+                    self._check_z3(assumptions)
+                finally:
+                    solver_portfolio.set_params(self.z3solver, solver_portfolio.default_params())
+
+    def _check(self, assumptions: Sequence[z3.ExprRef]) -> CheckSatResult:
         if self.use_cvc4:
             assert assumptions is None or len(assumptions) == 0, 'assumptions not supported in cvc4'
-            self.cvc4_model = check_with_cvc4(self.get_cvc4_proc(), self.z3solver.to_smt2())
+            self.cvc4_model = self.check_with_cvc4()
             return unsat if self.cvc4_model is None else sat
 
+        if utils.args.portfolio is not None and utils.args.portfolio > 1:
+            res = self._check_portfolio(assumptions, utils.args.portfolio)
+            if res is not None:
+                return res
+
+        return self._check_z3(assumptions)
+
+    def _check_portfolio(self, assumptions: Sequence[z3.ExprRef], n: int) -> Optional[CheckSatResult]:
+        '''Check the query with a portfolio of n solver configurations, see solver_portfolio.
+
+        The query is first given to z3solver alone, for --portfolio-delay milliseconds.
+        Returns None if no configuration returned sat or unsat.
+        '''
+        if utils.args.portfolio_delay > 0:
+            self.z3solver.set('timeout', utils.args.portfolio_delay)
+            try:
+                res = self.z3solver.check(*assumptions)
+            finally:
+                self.z3solver.set('timeout', utils.args.timeout if utils.args.timeout is not None else 2 ** 32 - 1)
+            if res != z3.unknown:
+                return result_from_z3(res)
+
+        query = z3.Solver()
+        for e in itertools.chain(self.z3solver.assertions(), assumptions):
+            query.add(e)
+        won = solver_portfolio.race(query.to_smt2(), solver_portfolio.portfolio_configs(n))
+        if won is None:
+            return None
+        config, ans, model = won
+        if model is not None:
+            self.cvc4_model = model
+        else:
+            self.deferred_check = (assumptions, config if not config.cvc4 else None)
+        return sat if ans == 'sat' else unsat
+
+    def _check_z3(self, assumptions: Sequence[z3.ExprRef]) -> CheckSatResult:
         def luby() -> Iterable[int]:
             l: List[int] = [1]
             k = 1
@@ -204,6 +325,8 @@ class Solver:
 
         if 'restarts' not in utils.args or not utils.args.restarts:
             res = self.z3solver.check(*assumptions)
+            if res == z3.unknown and self._interrupted():
+                return unknown
             if res == z3.unknown:
                 print(f'[{datetime.now()}] Solver.check: encountered unknown, printing debug information')
                 print(f'[{datetime.now()}] Solver.check: z3.solver.reason_unknown: {self.z3solver.reason_unknown()}')
@@ -253,7 +376,7 @@ class Solver:
 
                 if assumptions is None or len(assumptions) == 0:
                     print(f'[{datetime.now()}] Solver.check: trying cvc4')
-                    self.cvc4_model = check_with_cvc4(self.get_cvc4_proc(), self.z3solver.to_smt2())
+                    self.cvc4_model = self.check_with_cvc4()
                     res = z3.unsat if self.cvc4_model is None else z3.sat
                     print(f'[{datetime.now()}] Solver.check: cvc4 result: {res}')
 
@@ -270,6 +393,8 @@ class Solver:
             self.z3solver.set('timeout', tmt)
             t_start = time.time()
             ans = self.z3solver.check(*assumptions)
+            if ans == z3.unknown and self._interrupted():
+                return unknown
             if ans != z3.unknown:
                 assert ans in (z3.sat, z3.unsat)
                 if num_restarts > 0:
@@ -289,6 +414,7 @@ class Solver:
             sorts_to_minimize: Optional[Iterable[z3.SortRef]] = None,
             relations_to_minimize: Optional[Iterable[z3.FuncDeclRef]] = None,
     ) -> z3.ModelRef:
+        self._ensure_checked()
         if self.cvc4_model is not None:
             return cast(z3.ModelRef, self.cvc4_model)
         assert not self.use_cvc4, 'using cvc4 but self.cvc4_model is None!'
@@ -298,7 +424,9 @@ class Solver:
             if sorts_to_minimize is None:
                 sorts_to_minimize = [Z3Translator.sort_to_z3(s) for s in self.scope.sorts.values()
                                      if not syntax.has_annotation(s, 'no_minimize')]
-            if relations_to_minimize is None:
+            if relations_to_minimize is not None:
+                rels_to_minimize = list(relations_to_minimize)
+            else:
                 m = self.z3solver.model()
                 ds = {str(d) for d in m.decls()}
                 rels_to_minimize = []
@@ -357,26 +485,94 @@ class Solver:
         ))))
         return result
 
+    @staticmethod
+    def _model_size(m: z3.ModelRef, x: Union[z3.SortRef, z3.FuncDeclRef]) -> Optional[int]:
+        '''Return the number of elements of sort x, or of tuples in relation x, in m.
+
+        Returns None if this cannot be computed cheaply.
+        '''
+        def universe(sort: z3.SortRef) -> Optional[Sequence[z3.ExprRef]]:
+            if sort == z3.BoolSort():
+                return [z3.BoolVal(False), z3.BoolVal(True)]
+            if not any(sort == s for s in m.sorts()):  # not an uninterpreted sort of the model
+                return None
+            return m.get_universe(sort)
+
+        if isinstance(x, z3.SortRef):
+            u = universe(x)
+            return len(u) if u is not None else None
+        us = [universe(x.domain(j)) for j in range(x.arity())]
+        if any(u is None for u in us) or math.prod(len(cast(Sequence, u)) for u in us) > _MAX_TUPLES_TO_COUNT:
+            return None
+        return sum(z3.is_true(m.eval(x(*t), model_completion=True))
+                   for t in itertools.product(*cast(List[Sequence[z3.ExprRef]], us)))
+
     def _minimal_model(
             self,
             assumptions: Optional[Sequence[z3.ExprRef]],
             sorts_to_minimize: Iterable[z3.SortRef],
             relations_to_minimize: Iterable[z3.FuncDeclRef],
     ) -> z3.ModelRef:
+        '''Return a model minimizing the cardinality of each sort and relation, in order.
+
+        Each cardinality is found by binary search, starting from its size in
+        the most recent model (or from an upper bound found by exponential
+        search when that size is not known). The bounds are asserted once,
+        guarded by literals that are passed as assumptions, so the solver
+        never pops the frame between queries.
+        '''
         assert not self.use_cvc4, 'minimizing models is only for z3'
+        base = list(assumptions) if assumptions is not None else []
+        xs: List[Union[z3.SortRef, z3.FuncDeclRef]] = [*sorts_to_minimize, *relations_to_minimize]
+        guards: Dict[Tuple[str, int], z3.ExprRef] = {}
+        bounds: List[z3.ExprRef] = []  # the guards of the cardinalities found so far
+
+        # a model satisfying all bounds found so far, if one is available without calling the solver
+        model: Optional[z3.ModelRef] = self.z3solver.model()
+
+        def guard(x: Union[z3.SortRef, z3.FuncDeclRef], n: int) -> z3.ExprRef:
+            key = (str(x), n)
+            if key not in guards:
+                guards[key] = z3.Bool(f'card$_guard_{x}_{n}')
+                self.add(z3.Implies(guards[key], self._cardinality_constraint(x, n)))
+            return guards[key]
+
+        def at_most(x: Union[z3.SortRef, z3.FuncDeclRef], n: int) -> Optional[int]:
+            '''Check if x can have at most n elements. If so, return its size in the new model.'''
+            nonlocal model
+            if self.check([*base, *bounds, guard(x, n)]) != sat:
+                return None
+            if self.deferred_check is None and self.cvc4_model is None:
+                model = self.z3solver.model()
+                size = self._model_size(model, x)
+                return max(1, size) if size is not None else n
+            model = None
+            return n
+
         with self.new_frame():
-            for x in itertools.chain(
-                    cast(Iterable[Union[z3.SortRef, z3.FuncDeclRef]], sorts_to_minimize),
-                    relations_to_minimize):
-                for n in itertools.count(1):
-                    with self.new_frame():
-                        self.add(self._cardinality_constraint(x, n))
-                        res = self.check(assumptions)
-                        if res == z3.sat:
-                            break
-                self.add(self._cardinality_constraint(x, n))
-
-            assert self.check(assumptions) == z3.sat
+            for x in xs:
+                lo = 1
+                hi = self._model_size(model, x) if model is not None else None
+                if hi is None:
+                    n = 1
+                    while (hi := at_most(x, n)) is None:
+                        lo = n + 1
+                        n *= 2
+                hi = max(hi, 1)
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if (size := at_most(x, mid)) is not None:
+                        hi = size
+                    else:
+                        lo = mid + 1
+                bounds.append(guard(x, hi))
+
+            if model is not None:
+                return model
+            assert self.check([*base, *bounds]) == z3.sat
+            if self.cvc4_model is not None:  # a cvc4 model from a portfolio race
+                return cast(z3.ModelRef, self.cvc4_model)
+            self._ensure_checked()
             return self.z3solver.model()
 
     def assertions(self) -> Sequence[z3.ExprRef]:
@@ -384,6 +580,7 @@ class Solver:
         return sorted(asserts, key=lambda x: str(x))
 
     def unsat_core(self) -> Sequence[z3.ExprRef]:
+        self._ensure_checked()
         return self.z3solver.unsat_core()
 
     def reason_unknown(self) -> str:
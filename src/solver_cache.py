@@ -0,0 +1,109 @@
+'''
+Persistent cache of solver query results, shared across runs and processes.
+
+Queries are keyed by a canonical hash of the formulas asserted in the solver
+plus the assumptions passed to check(). The key does not depend on the order
+in which formulas were asserted or on how the solver's frames are arranged,
+so the same query issued by verify, updr, or pd-* (or by another process)
+hits the same entry.
+
+Results are stored in an SQLite database, which makes it safe for several
+processes (e.g., script/nightly.py workers) to read and write the cache
+concurrently. Only sat/unsat results are cached; unknown is never stored.
+
+The cache is enabled by passing --query-cache=PATH to mypyvy.
+'''
+from __future__ import annotations
+import hashlib
+import os
+import re
+import sqlite3
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import z3
+
+import utils
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS queries (
+    key TEXT PRIMARY KEY,
+    sat INTEGER NOT NULL
+)
+'''
+
+_MAX_DIGESTS = 100000
+# z3 names let-bound subterms after their AST ids, which depend on what else was created in the process
+_LET_NAME = re.compile(r'[$?]x\d+')
+_digests: Dict[Tuple[int, int], Tuple[z3.ExprRef, bytes]] = {}
+
+def _formula_digest(e: z3.ExprRef) -> bytes:
+    '''Return a hash of the SMT-LIB serialization of e, including the declarations of its symbols.
+
+    Serializing formulas is about as expensive as solving small queries, so
+    digests are memoized by z3 AST id. The memo keeps e alive, so that its id
+    is not reused for a different formula.
+    '''
+    key = (id(e.ctx), e.get_id())
+    if key not in _digests:
+        if len(_digests) >= _MAX_DIGESTS:
+            _digests.clear()
+        smt2 = z3.Z3_benchmark_to_smtlib_string(e.ctx.ref(), '', '', 'unknown', '', 0, (z3.Ast * 0)(), e.as_ast())
+        names: Dict[str, str] = {}
+        smt2 = _LET_NAME.sub(lambda m: names.setdefault(m.group(0), f'$let{len(names)}'), smt2)
+        _digests[key] = (e, hashlib.sha256(smt2.encode()).digest())
+    return _digests[key][1]
+
+def query_key(assertions: Iterable[z3.ExprRef], assumptions: Sequence[z3.ExprRef]) -> str:
+    '''Return a canonical hash of checking the conjunction of assertions under assumptions.
+
+    The key does not depend on the order (or multiplicity) of assertions and assumptions.
+    '''
+    h = hashlib.sha256()
+    h.update(z3.get_version_string().encode())
+    for d in sorted(set(_formula_digest(e) for e in assertions)):
+        h.update(d)
+    h.update(b'assumptions')
+    for d in sorted(set(_formula_digest(e) for e in assumptions)):
+        h.update(d)
+    return h.hexdigest()
+
+class QueryCache:
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite connections must not be shared across fork(), so reconnect in child processes
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.filename, timeout=60, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(_SCHEMA)
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def lookup(self, key: str) -> Optional[bool]:
+        '''Return True if the query is known to be sat, False if unsat, and None if unknown.'''
+        row = self._connection().execute('SELECT sat FROM queries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return bool(row[0])
+
+    def store(self, key: str, sat: bool) -> None:
+        self._connection().execute('INSERT OR REPLACE INTO queries (key, sat) VALUES (?, ?)', (key, int(sat)))
+
+_caches: Dict[str, QueryCache] = {}
+
+def get_query_cache() -> Optional[QueryCache]:
+    '''Return the cache selected by --query-cache, or None if no cache should be used.'''
+    if utils.args is None or 'query_cache' not in utils.args or utils.args.query_cache is None:
+        return None
+    filename = utils.args.query_cache
+    if filename not in _caches:
+        _caches[filename] = QueryCache(filename)
+    return _caches[filename]
@@ -4,7 +4,10 @@ This module contains everything specific to using CVC4 in mypyvy. (Except for so
 Currently, using cvc4 is done by communicating with a subprocess in SMT-LIB2. We generate the smt2 by dumping from z3,
 and parse the model using sexpr.py.
 
-As of now, the cvc4 process is reset using (reset) before every (check-sat).
+check_with_cvc4 resets its cvc4 process using (reset) before every (check-sat). CVC4Pool instead keeps
+several long-lived cvc4 processes, sends the part of the script shared by many queries to each process
+once, and sends each query between (push 1) and (pop 1). Queries can be submitted to the pool
+asynchronously.
 
 Note: cvc4 is guaranteed to return a model of minimal cardinality, so
 we don't minimize models.
@@ -13,22 +16,29 @@ TODO: respect timeout
 
 '''
 from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 import dataclasses
+import os
+from pathlib import Path
+import re
 import sexp
+import shutil
 import subprocess
-from typing import List, Optional, Union, Dict, Sequence, cast
+import threading
+from typing import FrozenSet, List, Optional, Tuple, Union, Dict, Sequence, cast
 
 import z3
 
 import utils
 
 CVC4EXEC = str(utils.PROJECT_ROOT / 'script' / 'run_cvc4.sh')
+CVC4_LOGIC = '(set-logic UFNIA)'
 
 
-def new_cvc4_process() -> subprocess.Popen:
+def new_cvc4_process(*args: str) -> subprocess.Popen:
     return subprocess.Popen(
-        [CVC4EXEC],
+        [CVC4EXEC, *args],
         bufsize=1,
         stdin=subprocess.PIPE,
         stdout=subprocess.PIPE,
@@ -37,18 +47,29 @@ def new_cvc4_process() -> subprocess.Popen:
     )
 
 
+def cvc4_available() -> bool:
+    # same logic as script/run_cvc4.sh
+    return shutil.which('cvc4') is not None or \
+        any(Path(f'./cvc4-{v}-x86_64-linux-opt').exists() for v in ('1.8', '1.7'))
+
+
 _cvc4_last_query: str = ''
 _cvc4_last_model_response: str = ''
 
 
 def check_with_cvc4(cvc4_proc: subprocess.Popen, smt2: str) -> Optional[CVC4Model]:
     global _cvc4_last_query
-    global _cvc4_last_model_response
     cvc4script = cvc4_preprocess(smt2)
     _cvc4_last_query = cvc4script
     print('(reset)', file=cvc4_proc.stdin)
     print(cvc4script, file=cvc4_proc.stdin)
     # print(cvc4script)
+    return read_check_sat_result(cvc4_proc, cvc4script)
+
+
+def read_check_sat_result(cvc4_proc: subprocess.Popen, cvc4script: str) -> Optional[CVC4Model]:
+    '''Read cvc4's answer to a (check-sat) already sent to it, and its model if the answer is sat.'''
+    global _cvc4_last_model_response
     assert cvc4_proc.stdout is not None
     ans = cvc4_proc.stdout.readline()
     if not ans:
@@ -79,7 +100,7 @@ def check_with_cvc4(cvc4_proc: subprocess.Popen, smt2: str) -> Optional[CVC4Mode
                     parser.add_input(line)
             else:
                 _cvc4_last_model_response = ''.join(lines)
-                # print(f'\n\nQUERY:\n{_cvc4_last_query}\n\n')
+                # print(f'\n\nQUERY:\n{cvc4script}\n\n')
                 # print(f'\n\nMODEL:\n{_cvc4_last_model_response}\n\n')
                 # print('got s-expression. not looking for any more input.')
                 assert isinstance(s, sexp.SList), s
@@ -90,11 +111,193 @@ def check_with_cvc4(cvc4_proc: subprocess.Popen, smt2: str) -> Optional[CVC4Mode
             assert False
     else:
         assert False, (f'cvc4 returned unexpected answer to (check-sat): {ans!r}'
-                       f'\n\nQUERY:\n{_cvc4_last_query}\n\n')
+                       f'\n\nQUERY:\n{cvc4script}\n\n')
+
+
+_SPECIAL = re.compile(r'[()]|\|[^|]*\||"[^"]*"|;[^\n]*')
+
+def split_commands(cvc4script: str) -> List[str]:
+    '''Split an SMT-LIB script into its top-level commands.'''
+    commands = []
+    depth = 0
+    start = 0
+    # only parentheses matter, other than inside quoted symbols, strings, and comments
+    for m in _SPECIAL.finditer(cvc4script):
+        c = m.group(0)
+        if c == '(':
+            if depth == 0:
+                start = m.start()
+            depth += 1
+        elif c == ')':
+            depth -= 1
+            if depth == 0:
+                commands.append(cvc4script[start:m.end()])
+    assert depth == 0, cvc4script
+    return commands
+
+
+class CVC4Worker:
+    '''A long-lived cvc4 process, used incrementally.
+
+    The commands shared by many queries (declarations and, e.g., axioms) are
+    sent once, at the bottom of cvc4's assertion stack. Each query then only
+    sends its remaining commands, between (push 1) and (pop 1).
+    '''
+    def __init__(self) -> None:
+        self.proc = new_cvc4_process('--incremental')
+        self.shared: Optional[Tuple[str, ...]] = None  # None until the logic is set
+        self.shared_set: FrozenSet[str] = frozenset()
+        self.nqueries = 0
+
+    def check(self, shared: Tuple[str, ...], commands: Sequence[str]) -> Optional[CVC4Model]:
+        '''Check the conjunction of shared and commands (both lists of commands, without (check-sat)).'''
+        global _cvc4_last_query
+        assert self.proc.stdin is not None
+        if shared != self.shared:
+            print('(reset)', file=self.proc.stdin)
+            print(CVC4_LOGIC, file=self.proc.stdin)
+            print('\n'.join(shared), file=self.proc.stdin)
+            self.shared = shared
+            self.shared_set = frozenset(shared)
+        query = '\n'.join(c for c in commands if c not in self.shared_set)
+        _cvc4_last_query = query
+        print('(push 1)', file=self.proc.stdin)
+        print(query, file=self.proc.stdin)
+        print('(check-sat)', file=self.proc.stdin)
+        try:
+            return read_check_sat_result(self.proc, query)
+        finally:
+            print('(pop 1)', file=self.proc.stdin)
+            self.nqueries += 1
+
+    def kill(self) -> None:
+        self.proc.kill()
+
+
+def _commands_of(smt2: str) -> Tuple[str, ...]:
+    return tuple(c for c in split_commands(cvc4_preprocess(smt2))
+                 if c != '(check-sat)' and not c.startswith('(set-logic '))
+
+
+class CVC4Query:
+    '''A query submitted to a CVC4Pool, see CVC4Pool.submit.'''
+    def __init__(self, pool: CVC4Pool) -> None:
+        self.pool = pool
+        self.future: Future[Optional[CVC4Model]]
+        self.worker: Optional[CVC4Worker] = None  # the process checking the query, while it runs
+        self.interrupted = False
+
+    def result(self) -> Optional[CVC4Model]:
+        '''Wait for the query, and return its model, or None if it is unsat.'''
+        return self.future.result()
+
+    def interrupt(self) -> None:
+        '''Stop the query, by killing the process checking it. Its result then raises an exception.'''
+        with self.pool.cond:
+            self.interrupted = True
+            if self.worker is not None:
+                self.worker.kill()
+
+
+class CVC4Pool:
+    '''A pool of long-lived cvc4 processes, to which queries are submitted asynchronously.
+
+    Each query is given as the SMT-LIB dump of a z3 solver (as in
+    check_with_cvc4), together with the dump of a prefix of its assertions
+    that is shared with other queries (e.g., the axioms). A query is sent to
+    a process that already has its shared part loaded, if there is one, so
+    only the rest of the query needs to be sent and processed by cvc4.
+    '''
+    def __init__(self, size: int) -> None:
+        assert size > 0
+        self.size = size
+        self.executor = ThreadPoolExecutor(max_workers=size)
+        self.idle: List[CVC4Worker] = []
+        self.nworkers = 0
+        self.cond = threading.Condition()
+
+    def _acquire(self, shared: Tuple[str, ...]) -> CVC4Worker:
+        with self.cond:
+            while not self.idle and self.nworkers == self.size:
+                self.cond.wait()
+            for w in self.idle:
+                if w.shared == shared:
+                    self.idle.remove(w)
+                    return w
+            if self.nworkers < self.size:
+                self.nworkers += 1
+            else:
+                return self.idle.pop()
+        try:
+            return CVC4Worker()
+        except BaseException:
+            with self.cond:
+                self.nworkers -= 1
+                self.cond.notify()
+            raise
+
+    def _release(self, w: CVC4Worker) -> None:
+        with self.cond:
+            self.idle.append(w)
+            self.cond.notify()
+
+    def _check(self, query: CVC4Query, smt2: str, shared_smt2: str) -> Optional[CVC4Model]:
+        shared = _commands_of(shared_smt2)
+        commands = _commands_of(smt2)
+        w = self._acquire(shared)
+        with self.cond:
+            query.worker = w
+            if query.interrupted:
+                w.kill()
+        try:
+            res = w.check(shared, commands)
+        except BaseException:
+            # the process is in an unknown state, so don't reuse it
+            w.kill()
+            with self.cond:
+                query.worker = None
+                self.nworkers -= 1
+                self.cond.notify()
+            raise
+        with self.cond:
+            query.worker = None
+        self._release(w)
+        return res
+
+    def submit(self, smt2: str, shared_smt2: str = '') -> CVC4Query:
+        '''Check smt2 in some process of the pool.'''
+        query = CVC4Query(self)
+        query.future = self.executor.submit(self._check, query, smt2, shared_smt2)
+        return query
+
+    def check(self, smt2: str, shared_smt2: str = '') -> Optional[CVC4Model]:
+        return self.submit(smt2, shared_smt2).result()
+
+    def shutdown(self) -> None:
+        self.executor.shutdown()
+        with self.cond:
+            for w in self.idle:
+                w.kill()
+            self.nworkers -= len(self.idle)
+            self.idle.clear()
+
+
+_pool: Optional[CVC4Pool] = None
+_pool_pid: Optional[int] = None
+
+def get_cvc4_pool() -> CVC4Pool:
+    '''Return this process's pool, with --cvc4-processes processes.'''
+    global _pool, _pool_pid
+    # the threads and pipes of a pool are not usable after fork, so child processes get their own pool
+    if _pool is None or _pool_pid != os.getpid():
+        size = utils.args.cvc4_processes if utils.args is not None and 'cvc4_processes' in utils.args else 1
+        _pool = CVC4Pool(size)
+        _pool_pid = os.getpid()
+    return _pool
 
 
 def cvc4_preprocess(z3str: str) -> str:
-    lines = ['(set-logic UFNIA)']
+    lines = [CVC4_LOGIC]
     for st in z3str.splitlines():
         st = st.strip()
         if st == '' or st.startswith(';') or st.startswith('(set-info '):
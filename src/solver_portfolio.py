@@ -0,0 +1,117 @@
+'''
+Portfolio solving: race several solver configurations on the same query, in
+separate processes, and take the first definitive (sat or unsat) answer.
+
+Each configuration is a set of z3 solver parameters (random seed, relevancy,
+etc.), or CVC4 via solver_cvc4 (if a cvc4 executable is available). Workers
+get the query as SMT-LIB and solve it in their own z3 context; once one of
+them answers, the others are terminated. z3 models cannot be sent between
+processes, so when a z3 configuration wins, Solver re-runs its own z3 solver
+with that configuration's parameters if a model or unsat core is needed.
+
+The number of wins of each configuration is recorded in `wins`, and
+reported at the end of the run, so the portfolio can be tuned per example.
+'''
+from __future__ import annotations
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+import multiprocessing
+import queue
+import signal
+import sys
+from typing import Any, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import z3
+
+import utils
+from solver_cvc4 import CVC4Model, cvc4_available, new_cvc4_process, check_with_cvc4
+
+@dataclass(frozen=True)
+class PortfolioConfig:
+    name: str
+    params: Tuple[Tuple[str, Any], ...] = ()
+    cvc4: bool = False
+
+def default_params() -> Tuple[Tuple[str, Any], ...]:
+    '''Values of the parameters set by configurations, in the default configuration.'''
+    return (('random_seed', utils.args.seed), ('smt.relevancy', 2))
+
+wins: Counter[str] = Counter()
+
+def portfolio_configs(n: int) -> List[PortfolioConfig]:
+    '''Return the first n configurations of the default portfolio.'''
+    configs = [PortfolioConfig('z3')]
+    if cvc4_available():
+        configs.append(PortfolioConfig('cvc4', cvc4=True))
+    configs.append(PortfolioConfig('z3-relevancy=0', (('smt.relevancy', 0),)))
+    k = 1
+    while len(configs) < n:
+        seed = utils.args.seed + k
+        configs.append(PortfolioConfig(f'z3-seed={seed}', (('random_seed', seed),)))
+        k += 1
+    return configs[:n]
+
+def set_params(s: z3.Solver, params: Sequence[Tuple[str, Any]]) -> None:
+    for name, value in params:
+        s.set(name, value)
+
+# see: https://mypy.readthedocs.io/en/latest/common_issues.html#using-classes-that-are-generic-in-stubs-but-not-at-runtime
+if TYPE_CHECKING:
+    ResultQueue = multiprocessing.Queue[Tuple[int, str, Optional[CVC4Model]]]  # this is only processed by mypy
+else:
+    ResultQueue = multiprocessing.Queue  # this is not seen by mypy but will be executed at runtime.
+
+def _portfolio_worker(i: int, config: PortfolioConfig, smt2: str, results: ResultQueue) -> None:
+    try:
+        if config.cvc4:
+            # make terminate() raise SystemExit, so that the cvc4 process is killed too
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+            cvc4_proc = new_cvc4_process()
+            try:
+                model = check_with_cvc4(cvc4_proc, smt2)
+            finally:
+                cvc4_proc.kill()
+            results.put((i, 'unsat' if model is None else 'sat', model))
+        else:
+            s = z3.Solver(ctx=z3.Context())
+            s.from_string(smt2)
+            set_params(s, config.params)
+            results.put((i, str(s.check()), None))
+    except Exception as e:
+        results.put((i, f'error: {e}', None))
+
+def race(smt2: str, configs: Sequence[PortfolioConfig]) -> Optional[Tuple[PortfolioConfig, str, Optional[CVC4Model]]]:
+    '''Check the SMT-LIB query smt2 with all configs in parallel.
+
+    Returns the first configuration to return sat or unsat, its answer, and its model (for CVC4).
+    Returns None if no configuration gave a definitive answer.
+    '''
+    start = datetime.now()
+    results: ResultQueue = ResultQueue()
+    procs = [multiprocessing.Process(target=_portfolio_worker, args=(i, config, smt2, results), daemon=True)
+             for i, config in enumerate(configs)]
+    for p in procs:
+        p.start()
+    try:
+        remaining = len(procs)
+        while remaining > 0:
+            try:
+                i, ans, model = results.get(timeout=1)
+            except queue.Empty:
+                if not any(p.is_alive() for p in procs) and results.empty():
+                    break
+                continue
+            remaining -= 1
+            if ans in ('sat', 'unsat'):
+                utils.logger.info(f'portfolio: {configs[i].name} answered {ans} after {datetime.now() - start}')
+                wins[configs[i].name] += 1
+                return configs[i], ans, model
+            utils.logger.info(f'portfolio: {configs[i].name} answered {ans}')
+        return None
+    finally:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+        for p in procs:
+            p.join()
@@ -9,12 +9,15 @@ unknown: CheckSatResult
 z3printer: Any
 
 class Z3PPObject: ...
-class Context: ...
+class Context:
+    def ref(self) -> Any: ...
+    def interrupt(self) -> None: ...
 class ModelRef(Z3PPObject, Iterable):
     def decls(self) -> List[FuncDeclRef]: ...
     def sorts(self) -> List[SortRef]: ...
     def get_universe(self, s: SortRef) -> Sequence[ExprRef]: ...
     def eval(self, e: ExprRef, model_completion: bool=False) -> ExprRef: ...
+    def get_interp(self, decl: FuncDeclRef) -> Any: ...
     def __iter__(self) -> Iterator[FuncDeclRef]: ... # this doesn't actually exist, but __len__ and __getitem__ are not enough (yet), see: https://github.com/python/mypy/issues/2220
     def __len__(self) -> int: ...
     def __getitem__(self, idx: Any) -> Any: ... # can't really type this...
@@ -22,6 +25,7 @@ class ModelRef(Z3PPObject, Iterable):
 class Statistics: ...
 
 class Solver(Z3PPObject):
+    ctx: Context
     def __init__(self, ctx: Optional[Context] = None) -> None: ...
 #    def __setattr__(self, name: str, value: Any) -> None: ...
     def __enter__(self) -> None: ...
@@ -30,6 +34,7 @@ class Solver(Z3PPObject):
     def check(self, *args: ExprRef) -> CheckSatResult: ...
     def model(self) -> ModelRef: ...
     def to_smt2(self) -> str: ...
+    def from_string(self, s: str) -> None: ...
     def unsat_core(self) -> Sequence[ExprRef]: ...
     def assertions(self) -> Sequence[ExprRef]: ...
     def push(self) -> None: ...
@@ -42,11 +47,16 @@ class Solver(Z3PPObject):
 def SolverFor(logic: str, ctx: Optional[Context]=None) -> Solver: ...
 
 
-class AstRef(Z3PPObject): ...
+class AstRef(Z3PPObject):
+    ctx: Context
+    def get_id(self) -> int: ...
+    def eq(self, other: AstRef) -> bool: ...
+    def as_ast(self) -> Any: ...
 
 class SortRef(AstRef):
     def name(self) -> str: ...
 class ExprRef(AstRef):
+      def __init__(self, ast: Any, ctx: Optional[Context] = None) -> None: ...
       def __eq__(self, other: ExprRef) -> ExprRef: ... # type: ignore
       def __ne__(self, other: ExprRef) -> ExprRef: ... # type: ignore
       def __ge__(self, other: ExprRef) -> ExprRef: ...
@@ -95,6 +105,7 @@ class Tactic:
 
 def Function(name: str, *args: SortRef) -> FuncDeclRef: ...
 def Bool(name: str) -> ExprRef: ...
+def Bools(names: str) -> List[ExprRef]: ...
 def Const(name: str, sort: SortRef) -> ExprRef: ...
 def Consts(names: str, sort: SortRef) -> List[ExprRef]: ...
 def DeclareSort(name: str, ctx: Optional[Context] = ...) -> SortRef: ...
@@ -124,7 +135,20 @@ def Update(a: ExprRef, i: ExprRef, v: ExprRef) -> ExprRef: ...
 
 def main_ctx() -> Context: ...
 
+def get_version_string() -> str: ...
+
+Ast: Any
+def Z3_benchmark_to_smtlib_string(ctx: Any, name: str, logic: str, status: str, attributes: str,
+                                  num_assumptions: int, assumptions: Any, formula: Any) -> str: ...
+def Z3_mk_app(ctx: Any, d: Any, num_args: int, args: Any) -> Any: ...
+def Z3_mk_not(ctx: Any, a: Any) -> Any: ...
+def Z3_mk_eq(ctx: Any, l: Any, r: Any) -> Any: ...
+def Z3_mk_and(ctx: Any, num_args: int, args: Any) -> Any: ...
+def Z3_mk_or(ctx: Any, num_args: int, args: Any) -> Any: ...
+
 def set_param(*args: Any) -> None: ...
+def get_param(name: str) -> str: ...
+def reset_params() -> None: ...
 
 def substitute(t: ExprRef, *m: Tuple[ExprRef, ExprRef]) -> ExprRef: ...
 def substitute_vars(t: ExprRef, *m: ExprRef) -> ExprRef: ...
@@ -143,3 +167,33 @@ def open_log(filename: str) -> None: ...
 def append_log(msg: str) -> None: ...
 
 def Datatype(name: str) -> Any: ...  # TODO: type this better
+
+class FuncEntry:
+    def num_args(self) -> int: ...
+    def arg_value(self, idx: int) -> ExprRef: ...
+    def value(self) -> ExprRef: ...
+
+class FuncInterp(Z3PPObject):
+    def else_value(self) -> ExprRef: ...
+    def num_entries(self) -> int: ...
+    def entry(self, idx: int) -> FuncEntry: ...
+
+def is_var(a: ExprRef) -> bool: ...
+def get_var_index(a: ExprRef) -> int: ...
+
+Z3_OP_UNINTERPRETED: Z3DeclKind
+Z3_OP_ITE: Z3DeclKind
+Z3_OP_AND: Z3DeclKind
+Z3_OP_OR: Z3DeclKind
+Z3_OP_NOT: Z3DeclKind
+Z3_OP_EQ: Z3DeclKind
+Z3_OP_IFF: Z3DeclKind
+Z3_OP_IMPLIES: Z3DeclKind
+Z3_OP_DISTINCT: Z3DeclKind
+Z3_OP_LE: Z3DeclKind
+Z3_OP_LT: Z3DeclKind
+Z3_OP_GE: Z3DeclKind
+Z3_OP_GT: Z3DeclKind
+Z3_OP_ADD: Z3DeclKind
+Z3_OP_SUB: Z3DeclKind
+Z3_OP_UMINUS: Z3DeclKind
@@ -6,12 +6,16 @@ from dataclasses import dataclass
 import functools
 import itertools
 import ply.lex
+import weakref
 from typing import List, Union, Tuple, Optional, Dict, Iterator, \
-    Callable, Any, Set, TypeVar, Generic, Iterable, Mapping, cast
+    Callable, Any, Set, TypeVar, Generic, Iterable, Mapping, cast, TYPE_CHECKING
 from typing_extensions import Protocol
 import utils
 from utils import OrderedSet
-import z3
+
+# z3 only appears in annotations here; importing it is slow, and parsing and typechecking do not need it
+if TYPE_CHECKING:
+    import z3
 
 Token = ply.lex.LexToken
 Span = Tuple[Token, Token]
@@ -539,8 +543,19 @@ def faithful_print_prog(prog: Program, skip_invariants: bool = False) -> str:
     return FaithfulPrinter(prog, skip_invariants).process()
 
 
+_compare_fields: Dict[type, Tuple[str, ...]] = {}
+
+def _get_compare_fields(cls: type) -> Tuple[str, ...]:
+    if cls not in _compare_fields:
+        _compare_fields[cls] = tuple(f.name for f in dataclasses.fields(cls) if f.compare)
+    return _compare_fields[cls]
+
+# Expressions are compared structurally, but the hash of each node is cached (and computed from the
+# cached hashes of its children), so using large formulas as dictionary keys is cheap. Equality
+# checks identity and hashes first, so comparing interned expressions (see intern_expr) is cheap too.
+# Subclasses must be declared with @dataclass(frozen=True, eq=False) to inherit __eq__ and __hash__.
 @functools.total_ordering
-@dataclass
+@dataclass(frozen=True)
 class AbstractExpr:
     def __lt__(self, other: Any) -> bool:
         if not isinstance(other, AbstractExpr):
@@ -549,7 +564,56 @@ class AbstractExpr:
         vs2 = (str(type(other)), *(getattr(other, f.name) for f in dataclasses.fields(other) if f.compare))
         return vs1 < vs2
 
-@dataclass(frozen=True)
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        if hash(self) != hash(other):
+            return False
+        return all(getattr(self, name) == getattr(other, name) for name in _get_compare_fields(type(self)))
+
+    def __hash__(self) -> int:
+        h = self.__dict__.get('_hash')
+        if h is None:
+            h = hash(_intern_key(self))
+            object.__setattr__(self, '_hash', h)  # hack around frozen
+        return h
+
+    def __getstate__(self) -> Any:
+        # string hashes are randomized per process, so the cached hash must not be pickled
+        state = dict(self.__dict__)
+        state.pop('_hash', None)
+        return state
+
+def _intern_key(e: AbstractExpr) -> Tuple:
+    return (type(e), *(getattr(e, name) for name in _get_compare_fields(type(e))))
+
+_interned: weakref.WeakValueDictionary[Tuple, AbstractExpr] = weakref.WeakValueDictionary()
+
+E = TypeVar('E', bound=AbstractExpr)
+
+def intern_expr(e: E) -> E:
+    '''Return the canonical expression structurally equal to e, which is e itself if there is none yet.
+
+    Only nodes without a span are interned, so that spans from the parser are
+    never replaced. Quantifiers are only interned once the sorts of their
+    variables are known, since sort inference mutates the bound variables.
+    The expressions built by Not, And, Forall, etc. are interned.
+    '''
+    if getattr(e, 'span') is not None:
+        return e
+    binder = getattr(e, 'binder', None)
+    if binder is not None and not all(isinstance(v.sort, Sort) for v in binder.vs):
+        return e
+    key = _intern_key(e)
+    canonical = _interned.get(key)
+    if canonical is None:
+        _interned[key] = e
+        return e
+    return cast(E, canonical)
+
+@dataclass(frozen=True, eq=False)
 class Bool(AbstractExpr):
     val: bool
     span: Optional[Span] = dataclasses.field(default=None, compare=False)
@@ -560,7 +624,7 @@ class Bool(AbstractExpr):
 TrueExpr = Bool(True)
 FalseExpr = Bool(False)
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class Int(AbstractExpr):
     val: int
     span: Optional[Span] = dataclasses.field(default=None, compare=False)
@@ -570,7 +634,7 @@ UNOPS = {
     'NEW'
 }
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class UnaryExpr(AbstractExpr):
     op: str
     arg: Expr
@@ -583,13 +647,13 @@ class UnaryExpr(AbstractExpr):
         return pretty(self)
 
 def Not(e: Expr) -> Expr:
-    return UnaryExpr('NOT', e)
+    return intern_expr(UnaryExpr('NOT', e))
 
 def New(e: Expr, n: int = 1) -> Expr:
     # TODO: rename New -> Next
     assert n >= 0, 'are you trying to resurrect old()?'
     for i in range(n):
-        e = UnaryExpr('NEW', e)
+        e = intern_expr(UnaryExpr('NEW', e))
     return e
 
 BINOPS = {
@@ -606,7 +670,7 @@ BINOPS = {
     'MULT'
 }
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class BinaryExpr(AbstractExpr):
     op: str
     arg1: Expr
@@ -625,7 +689,7 @@ NOPS = {
     'DISTINCT'
 }
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class NaryExpr(AbstractExpr):
     op: str
     args: Tuple[Expr, ...]
@@ -640,12 +704,12 @@ class NaryExpr(AbstractExpr):
 def Forall(vs: Tuple[SortedVar, ...], body: Expr) -> Expr:
     if not vs:
         return body
-    return QuantifierExpr('FORALL', vs, body)
+    return intern_expr(QuantifierExpr('FORALL', vs, body))
 
 def Exists(vs: Tuple[SortedVar, ...], body: Expr) -> Expr:
     if not vs:
         return body
-    return QuantifierExpr('EXISTS', vs, body)
+    return intern_expr(QuantifierExpr('EXISTS', vs, body))
 
 def And(*args: Expr) -> Expr:
     if not args:
@@ -653,7 +717,7 @@ def And(*args: Expr) -> Expr:
     elif len(args) == 1:
         return args[0]
     else:
-        return NaryExpr('AND', tuple(args))
+        return intern_expr(NaryExpr('AND', tuple(args)))
 
 def Or(*args: Expr) -> Expr:
     if not args:
@@ -661,24 +725,24 @@ def Or(*args: Expr) -> Expr:
     elif len(args) == 1:
         return args[0]
     else:
-        return NaryExpr('OR', tuple(args))
+        return intern_expr(NaryExpr('OR', tuple(args)))
 
 def Eq(arg1: Expr, arg2: Expr) -> Expr:
-    return BinaryExpr('EQUAL', arg1, arg2)
+    return intern_expr(BinaryExpr('EQUAL', arg1, arg2))
 
 def Neq(arg1: Expr, arg2: Expr) -> Expr:
-    return BinaryExpr('NOTEQ', arg1, arg2)
+    return intern_expr(BinaryExpr('NOTEQ', arg1, arg2))
 
 def Iff(arg1: Expr, arg2: Expr) -> Expr:
-    return BinaryExpr('IFF', arg1, arg2)
+    return intern_expr(BinaryExpr('IFF', arg1, arg2))
 
 def Implies(arg1: Expr, arg2: Expr) -> Expr:
-    return BinaryExpr('IMPLIES', arg1, arg2)
+    return intern_expr(BinaryExpr('IMPLIES', arg1, arg2))
 
 def Apply(callee: str, args: Tuple[Expr, ...]) -> Expr:
-    return AppExpr(callee, args)
+    return intern_expr(AppExpr(callee, args))
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class AppExpr(AbstractExpr):
     callee: str
     args: Tuple[Expr, ...]
@@ -710,7 +774,7 @@ def safe_cast_sort(s: InferenceSort) -> Sort:
 class Binder(Denotable):
     vs: Tuple[SortedVar, ...]
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class QuantifierExpr(AbstractExpr):
     quant: str
     vs: dataclasses.InitVar[Tuple[SortedVar, ...]]
@@ -729,7 +793,7 @@ class QuantifierExpr(AbstractExpr):
     def get_vs(self) -> Tuple[SortedVar, ...]:
         return self.binder.vs
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class Id(AbstractExpr):
     '''Unresolved symbol (might represent a constant or a nullary relation or a variable)'''
     name: str
@@ -738,7 +802,7 @@ class Id(AbstractExpr):
     def __str__(self) -> str:
         return pretty(self)
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class IfThenElse(AbstractExpr):
     branch: Expr
     then: Expr
@@ -748,7 +812,7 @@ class IfThenElse(AbstractExpr):
     def __str__(self) -> str:
         return pretty(self)
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class Let(AbstractExpr):
     var: dataclasses.InitVar[SortedVar]
     binder: Binder = dataclasses.field(init=False)
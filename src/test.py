@@ -5,13 +5,16 @@ import parser
 import typechecker
 import syntax
 import mypyvy
+import semantics
+import server
+from semantics import Trace
 
 import os
 from pathlib import Path
 import shlex
 import subprocess
 
-from typing import List
+from typing import Callable, cast, Dict, List, Optional, Set, Tuple, Union
 
 lockserv_path = utils.PROJECT_ROOT / 'examples' / 'lockserv.pyv'
 
@@ -77,6 +80,31 @@ class SyntaxTests(unittest.TestCase):
                 self.assertEqual(e1, e2)
                 self.assertEqual(hash(e1), hash(e2))
 
+    def test_interning(self) -> None:
+        import pickle
+
+        prog = load_lockserv()
+        for inv in prog.invs():
+            for clause in syntax.as_clauses(inv.expr):
+                if not isinstance(clause, syntax.QuantifierExpr):
+                    continue
+                body = clause.body
+                assert isinstance(body, syntax.NaryExpr)
+                c1 = syntax.Forall(clause.binder.vs, syntax.Or(*body.args))
+                c2 = syntax.Forall(clause.binder.vs, syntax.Or(*body.args))
+                with self.subTest(clause=str(clause)):
+                    self.assertIs(c1, c2)
+                    self.assertEqual(c1, clause)
+                    self.assertEqual(hash(c1), hash(clause))
+                    # the cached hash is not pickled, since string hashes differ between processes
+                    self.assertNotIn('_hash', pickle.loads(pickle.dumps(c1)).__dict__)
+                    self.assertEqual(pickle.loads(pickle.dumps(c1)), c1)
+
+        # nodes with spans come from the parser, and are never replaced
+        e = parser.parse_expr('p & q')
+        self.assertIsNotNone(e.span)
+        self.assertIs(syntax.intern_expr(e), e)
+
     def test_relativize_quantifiers(self) -> None:
         minipaxos = '''
             sort node
@@ -112,6 +140,1172 @@ class SyntaxTests(unittest.TestCase):
         s2 = syntax.SortDecl('foo')
         self.assertEqual(s1, s2)
 
+def load_lockserv() -> syntax.Program:
+    with open(lockserv_path) as f:
+        prog = mypyvy.parse_program(f.read())
+    typechecker.typecheck_program(prog)
+    syntax.the_program = prog
+    return prog
+
+def load_pigeonhole(n: int = 12) -> syntax.Program:
+    '''
+    Return a program whose axioms put n pigeons into n - 1 holes, so every query about it
+    is unsat, but z3 takes much longer to show it than any test should wait.
+    '''
+    pigeons = [f'p{i}' for i in range(n)]
+    holes = [f'h{j}' for j in range(n - 1)]
+    prog = mypyvy.parse_program('\n'.join([
+        'sort pigeon',
+        'sort hole',
+        'immutable relation nest(pigeon, hole)',
+        'mutable relation r(pigeon)',
+        *(f'immutable constant {p}: pigeon' for p in pigeons),
+        *(f'immutable constant {h}: hole' for h in holes),
+        f'axiom distinct({", ".join(pigeons)})',
+        f'axiom forall H:hole. {" | ".join(f"H = {h}" for h in holes)}',
+        'axiom forall P:pigeon. exists H:hole. nest(P, H)',
+        'axiom forall P1:pigeon, P2:pigeon, H:hole. nest(P1, H) & nest(P2, H) -> P1 = P2',
+        'transition add(p: pigeon)',
+        '  modifies r',
+        '  new(r(P)) <-> r(P) | P = p',
+    ]))
+    typechecker.typecheck_program(prog)
+    syntax.the_program = prog
+    return prog
+
+def lockserv_trace(depth: int) -> Trace:
+    '''Return some execution of syntax.the_program with depth transitions.'''
+    import logic
+    from solver import Solver
+
+    prog = syntax.the_program
+    s = Solver()
+    t = s.get_translator(depth + 1)
+    with s.new_frame():
+        for init in prog.inits():
+            s.add(t.translate_expr(init.expr))
+        for i in range(depth):
+            logic.assert_any_transition(s, t, i)
+        trace = logic.check_solver(s, depth + 1, minimize=False)
+    assert trace is not None
+    return trace
+
+class EvaluatorTests(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.args = mypyvy.parse_args(['typecheck', 'MOCK_FILENAME.pyv'])
+
+    def test_compiled_eval_matches_trace_eval(self) -> None:
+        import evaluator
+
+        prog = load_lockserv()
+        trace = lockserv_trace(3)
+
+        onestate = [init.expr for init in prog.inits()]
+        onestate += [inv.expr for inv in prog.invs()]
+        onestate += [ax.expr for ax in prog.axioms()]
+        onestate += [clause for inv in prog.invs() for clause in syntax.as_clauses(inv.expr)]
+        twostate = [ition.as_twostate_formula(prog.scope) for ition in prog.transitions()]
+        for i in range(trace.num_states):
+            for e in onestate + (twostate if i + 1 < trace.num_states else []):
+                with self.subTest(state=i, expr=str(e)):
+                    with prog.scope.n_states(trace.num_states):
+                        self.assertEqual(evaluator.eval_in_trace(trace, e, i), trace.eval(e, i))
+
+    def test_compiled_cache_is_bounded(self) -> None:
+        import evaluator
+
+        prog = load_lockserv()
+        trace = lockserv_trace(3)
+        clauses = [clause for inv in prog.invs() for clause in syntax.as_clauses(inv.expr)]
+        max_compiled = evaluator._MAX_COMPILED
+        evaluator._MAX_COMPILED = 2
+        try:
+            # evaluate every clause twice, so that evicted clauses are compiled again
+            for _ in range(2):
+                for e in clauses:
+                    for i in range(trace.num_states):
+                        with self.subTest(state=i, expr=str(e)):
+                            self.assertEqual(evaluator.eval_in_trace(trace, e, i), trace.eval(e, i))
+            self.assertEqual(len(evaluator._compiled[prog]), 2)
+            self.assertEqual(len(evaluator._compiled_by_id[prog]), 2)
+            self.assertLessEqual(len(evaluator._indexed[trace].bound), 2)
+        finally:
+            evaluator._MAX_COMPILED = max_compiled
+
+class ClauseStateInteractionTests(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.args = mypyvy.parse_args(['typecheck', 'MOCK_FILENAME.pyv'])
+
+    def test_instantiate_matches_python(self) -> None:
+        import pd
+
+        prog = load_lockserv()
+        trace = lockserv_trace(4)
+        for inv in prog.invs():
+            for clause in syntax.as_clauses(inv.expr):
+                variables, literals = pd.destruct_clause(clause)
+                # add negated literals and equalities between variables, to get many overlapping MSSs
+                literals += tuple(syntax.Not(lit) for lit in literals)
+                literals += tuple(syntax.Eq(syntax.Id(v1.name), syntax.Id(v2.name))
+                                  for v1 in variables for v2 in variables
+                                  if v1.name < v2.name and str(v1.sort) == str(v2.sort))
+                for i in range(trace.num_states):
+                    state = Trace(1)
+                    state.univs = trace.univs
+                    state.immut_rel_interps = trace.immut_rel_interps
+                    state.immut_const_interps = trace.immut_const_interps
+                    state.immut_func_interps = trace.immut_func_interps
+                    state.rel_interps = [trace.rel_interps[i]]
+                    state.const_interps = [trace.const_interps[i]]
+                    state.func_interps = [trace.func_interps[i]]
+                    with self.subTest(clause=str(clause), state=i):
+                        self.assertEqual(
+                            pd.map_clause_state_interaction_instantiate(variables, literals, state),
+                            pd.map_clause_state_interaction_instantiate_python(variables, literals, state),
+                        )
+
+class CanonicalLabellingTests(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.args = mypyvy.parse_args(['typecheck', 'MOCK_FILENAME.pyv'])
+
+    def test_fingerprint_is_permutation_invariant(self) -> None:
+        load_lockserv()
+        trace = lockserv_trace(3)
+        renaming = {e: u[-1 - i] for u in trace.univs.values() for i, e in enumerate(u)}
+
+        def rename(t: Tuple[str, ...]) -> Tuple[str, ...]:
+            return tuple(renaming.get(e, e) for e in t)
+
+        permuted = Trace(trace.num_states)
+        permuted.univs = {s: rename(u) for s, u in trace.univs.items()}
+        permuted.immut_rel_interps = {R: {rename(t): b for t, b in l.items()}
+                                      for R, l in trace.immut_rel_interps.items()}
+        permuted.immut_const_interps = {C: renaming.get(c, c) for C, c in trace.immut_const_interps.items()}
+        permuted.rel_interps = [{R: {rename(t): b for t, b in l.items()} for R, l in rels.items()}
+                                for rels in trace.rel_interps]
+        permuted.const_interps = [{C: renaming.get(c, c) for C, c in consts.items()}
+                                  for consts in trace.const_interps]
+        permuted.func_interps = [{} for _ in trace.func_interps]
+        permuted.transitions = trace.transitions
+
+        self.assertNotEqual(str(trace), str(permuted))
+        self.assertEqual(trace.fingerprint(), permuted.fingerprint())
+        self.assertEqual(str(trace.canonicalize()), str(permuted.canonicalize()))
+        self.assertEqual(trace.canonicalize().fingerprint(), trace.fingerprint())
+
+        different = Trace(trace.num_states)
+        different.univs = trace.univs
+        different.immut_rel_interps = trace.immut_rel_interps
+        different.immut_const_interps = trace.immut_const_interps
+        different.rel_interps = [dict(rels) for rels in trace.rel_interps]
+        different.const_interps = trace.const_interps
+        different.func_interps = trace.func_interps
+        R, l = next(iter(different.rel_interps[-1].items()))
+        tup = next(iter(l))
+        different.rel_interps[-1][R] = {**l, tup: not l[tup]}
+        self.assertNotEqual(trace.fingerprint(), different.fingerprint())
+
+class ExplicitStateTests(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.args = mypyvy.parse_args(['typecheck', 'MOCK_FILENAME.pyv'])
+
+    def test_successors_match_solver(self) -> None:
+        import explicit
+        from solver import Solver
+
+        prog = load_lockserv()
+        s = Solver()
+        states = explicit.reachable_states(s, 2)
+        self.assertEqual(len(states), 23)
+        for state in states[:5]:
+            succs = explicit.successors(state)
+            for ition in prog.transitions():
+                self.assertEqual({post.fingerprint(0) for name, post in succs if name == ition.name},
+                                 {post.fingerprint(0) for post in explicit._smt_successors(s, state, ition)})
+
+class ModelToTraceTests(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.args = mypyvy.parse_args(['typecheck', 'MOCK_FILENAME.pyv'])
+
+    def test_tables_match_eval(self) -> None:
+        import z3
+        import logic
+        import translator
+        from solver import Solver
+
+        prog = load_lockserv()
+        for minimize in (False, True):
+            s = Solver()
+            t = s.get_translator(4)
+            with s.new_frame():
+                for init in prog.inits():
+                    s.add(t.translate_expr(init.expr))
+                for i in range(3):
+                    logic.assert_any_transition(s, t, i)
+                self.assertEqual(s.check(), z3.sat)
+                z3model = s.model(minimize=minimize)
+            fast = translator.Z3Translator.model_to_trace(z3model, 4)
+            # force the fallback to one z3model.eval per tuple
+            table = translator._ModelTables.table
+            try:
+                translator._ModelTables.table = lambda self, z3decl: None  # type: ignore
+                slow = translator.Z3Translator.model_to_trace(z3model, 4)
+            finally:
+                translator._ModelTables.table = table  # type: ignore
+            self.assertEqual(fast.immut_rel_interps, slow.immut_rel_interps)
+            self.assertEqual(fast.rel_interps, slow.rel_interps)
+            self.assertEqual(fast.const_interps, slow.const_interps)
+            self.assertEqual(fast.func_interps, slow.func_interps)
+            self.assertEqual(str(fast), str(slow))
+            self.assertTrue(all(isinstance(l, semantics.PackedRelation) for l in fast.immut_rel_interps.values()))
+
+class CompactTraceTests(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.args = mypyvy.parse_args(['typecheck', 'MOCK_FILENAME.pyv'])
+
+    def test_compact(self) -> None:
+        import evaluator
+        import pickle
+
+        prog = mypyvy.parse_program('''
+            sort node
+            immutable relation le(node, node)
+            mutable relation r(node)
+            mutable function f(node): node
+            mutable constant c: node
+        ''')
+        typechecker.typecheck_program(prog)
+        syntax.the_program = prog
+        node = prog.scope.get_sort('node')
+        le, r, f, c = (prog.scope.get(name) for name in ('le', 'r', 'f', 'c'))
+        assert node is not None and isinstance(le, syntax.RelationDecl) and isinstance(r, syntax.RelationDecl)
+        assert isinstance(f, syntax.FunctionDecl) and isinstance(c, syntax.ConstantDecl)
+
+        univ = ('node0', 'node1', 'node2')
+        trace = Trace(2)
+        trace.univs = {node: univ}
+        trace.immut_rel_interps = {le: {(a, b): a <= b for a in univ for b in univ}}
+        trace.rel_interps = [{r: {(a,): a != 'node1' for a in univ}}, {r: {('node1',): True}}]  # partial in state 1
+        trace.func_interps = [{f: {(a,): univ[(i + k) % 3] for i, a in enumerate(univ)}} for k in range(2)]
+        trace.const_interps = [{c: 'node2'}, {c: 'node0'}]
+        rels = [dict(x[r]) for x in trace.rel_interps]
+        funcs = [dict(x[f]) for x in trace.func_interps]
+        printed = str(trace)
+
+        self.assertIs(trace.compact(), trace)
+        self.assertIsInstance(trace.immut_rel_interps[le], semantics.PackedRelation)
+        self.assertIsInstance(trace.rel_interps[1][r], semantics.PackedRelation)
+        self.assertIsInstance(trace.func_interps[0][f], semantics.PackedFunction)
+        self.assertEqual([x[r] for x in trace.rel_interps], rels)
+        self.assertEqual([dict(x[f].items()) for x in trace.func_interps], funcs)
+        self.assertEqual(len(trace.rel_interps[1][r]), 1)
+        self.assertNotIn(('node0',), trace.rel_interps[1][r])
+        with self.assertRaises(KeyError):
+            trace.rel_interps[1][r][('node0',)]
+        self.assertEqual(str(trace), printed)
+
+        copy = pickle.loads(pickle.dumps(trace))
+        self.assertEqual(str(copy), printed)
+        self.assertEqual(copy.rel_interps[0][r], trace.rel_interps[0][r])
+        packed = copy.rel_interps[0][r]
+        assert isinstance(packed, semantics.PackedRelation)
+        self.assertIs(packed.shape, cast(semantics.PackedRelation, trace.rel_interps[0][r]).shape)
+
+        swapped = trace._as_trace((1, 0))
+        self.assertIs(swapped.immut_rel_interps[le], trace.immut_rel_interps[le])
+        self.assertIs(swapped.rel_interps[1][r], trace.rel_interps[0][r])
+        swapped.rel_interps[1][r] = {(a,): False for a in univ}  # does not affect trace
+        self.assertEqual(trace.rel_interps[0][r], rels[0])
+
+        e = parser.parse_expr('forall X. r(X) -> le(X, f(X)) & f(X) != c')
+        with prog.scope.n_states(1):
+            typechecker.typecheck_expr(prog.scope, e, None)
+        self.assertEqual(evaluator.eval_in_trace(trace, e, 0), trace.eval(e, 0))
+
+class TranslationCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.args = mypyvy.parse_args(['typecheck', 'MOCK_FILENAME.pyv'])
+
+    def test_cached_translations(self) -> None:
+        import z3
+        import translator
+        from translator import Z3Translator
+
+        prog = load_lockserv()
+        scope = cast(syntax.Scope[z3.ExprRef], prog.scope)
+        cache = translator.translation_cache
+        for inv in prog.invs():
+            e1 = Z3Translator(scope, 2).translate_expr(inv.expr)
+            hits = cache.hits
+            e2 = Z3Translator(scope, 2).translate_expr(syntax.New(inv.expr, 0))
+            self.assertEqual(cache.hits, hits + 1)
+            self.assertIs(e1, e2)
+            # without the cache, bound variables are still named deterministically
+            cache.clear()
+            self.assertTrue(Z3Translator(scope, 2).translate_expr(inv.expr).eq(e1))
+
+    def test_nested_quantifiers(self) -> None:
+        import z3
+        from translator import Z3Translator
+
+        prog = mypyvy.parse_program('''
+            sort node
+            mutable relation r(node, node)
+            mutable relation s(node)
+            invariant forall x. s(x) | (exists y. r(x, y) & (forall x. r(y, x)))
+        ''')
+        typechecker.typecheck_program(prog)
+        syntax.the_program = prog
+        inv, = prog.invs()
+        e = Z3Translator(cast(syntax.Scope[z3.ExprRef], prog.scope), 1).translate_expr(inv.expr)
+        node = z3.DeclareSort('node')
+        r = z3.Function('_0__r', node, node, z3.BoolSort())
+        s = z3.Function('_0__s', node, z3.BoolSort())
+        x, y, z = z3.Consts('x y z', node)
+        expected = z3.ForAll([x], z3.Or(s(x), z3.Exists([y], z3.And(r(x, y), z3.ForAll([z], r(y, z))))))
+        solver = z3.Solver()
+        solver.add(z3.Not(e == expected))
+        self.assertEqual(solver.check(), z3.unsat)
+
+    def test_failed_translation_restores_depth(self) -> None:
+        import z3
+        from translator import Z3Translator
+
+        prog = mypyvy.parse_program('''
+            sort node
+            mutable relation s(node)
+            invariant forall x. s(x)
+        ''')
+        typechecker.typecheck_program(prog)
+        syntax.the_program = prog
+        inv, = prog.invs()
+        q = inv.expr
+        assert isinstance(q, syntax.QuantifierExpr)
+        t = Z3Translator(cast(syntax.Scope[z3.ExprRef], prog.scope), 1)
+        # the body refers to a second state, which a one-state translator does not have
+        with self.assertRaises(AssertionError):
+            t.translate_expr(syntax.QuantifierExpr(q.quant, q.binder.vs, syntax.New(q.body)))
+        self.assertEqual(t.depth, 0)
+
+class StateTranslationTests(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.args = mypyvy.parse_args(['typecheck', 'MOCK_FILENAME.pyv'])
+
+    def test_translate_state_matches_diagram(self) -> None:
+        import z3
+        from translator import Z3Translator
+
+        def instantiate(e: z3.ExprRef) -> z3.ExprRef:
+            # both diagrams bind the elements in the same order, so comparing their bodies
+            # avoids a quantifier alternation that z3 does not always solve quickly
+            q = cast(z3.QuantifierRef, e)
+            self.assertTrue(z3.is_quantifier(q) and not q.is_forall())
+            elements = [z3.Const(f'e{k}', q.var_sort(k)) for k in range(q.num_vars())]
+            return z3.substitute_vars(q.body(), *reversed(elements))
+
+        prog = load_lockserv()
+        trace = lockserv_trace(2)
+        t = Z3Translator(cast(syntax.Scope[z3.ExprRef], prog.scope), 2)
+        for i in range(trace.num_states):
+            state = trace.as_state(i)
+            for state_index in (0, 1):
+                with self.subTest(state=i, state_index=state_index):
+                    e = t.translate_state(state, state_index)
+                    self.assertEqual(trace.onestate_formula_cache, {})
+                    self.assertIs(t.translate_state(trace.as_state(i), state_index), e)
+                    diagram = t.translate_expr(syntax.New(state.as_onestate_formula(), state_index))
+                    solver = z3.Solver()
+                    solver.add(z3.Not(instantiate(e) == instantiate(diagram)))
+                    self.assertEqual(solver.check(), z3.unsat)
+                    trace.onestate_formula_cache.clear()
+
+class SeparatorTests(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.args = mypyvy.parse_args(['sep', 'MOCK_FILENAME.pyv'])
+
+    def test_separate(self) -> None:
+        import evaluator
+        import sep
+
+        prog = load_lockserv()
+        trace = lockserv_trace(3)
+        states = [trace.as_state(i) for i in range(trace.num_states)]
+        clause = next(c for inv in prog.invs() for c in syntax.as_clauses(inv.expr)
+                      if isinstance(c, syntax.QuantifierExpr) and len(c.binder.vs) == 2)
+        assert isinstance(clause, syntax.QuantifierExpr)
+        prefix = tuple(cast(syntax.UninterpretedSort, v.sort) for v in clause.binder.vs)
+        separator = sep.UniversalFixedPrefixSep(prefix, states)
+
+        # any separator found must be true in the positive states and false in the negative ones
+        for i in range(trace.num_states):
+            for j in range(trace.num_states):
+                with self.subTest(pos=i, neg=j):
+                    e = separator.separate([i], [j])
+                    if i == j:
+                        self.assertIsNone(e)
+                    elif e is not None:
+                        self.assertTrue(evaluator.eval_in_trace(trace, e, i))
+                        self.assertFalse(evaluator.eval_in_trace(trace, e, j))
+        e = separator.separate(range(trace.num_states), [])
+        assert e is not None
+        self.assertTrue(all(evaluator.eval_in_trace(trace, e, i) for i in range(trace.num_states)))
+
+        separator.retire([0])
+        self.assertIsNotNone(separator.separate([1, 2], []))
+        with self.assertRaises(AssertionError):
+            separator.separate([0], [])
+
+    def test_prefix_portfolio(self) -> None:
+        import logic
+        import sep
+        from solver import Solver
+
+        prog = load_lockserv()
+        clause = next(c for inv in prog.invs() for c in syntax.as_clauses(inv.expr)
+                      if isinstance(c, syntax.QuantifierExpr) and len(c.binder.vs) == 2)
+        prefixes = sep.universal_prefixes(2)
+        self.assertEqual([len(prefix) for prefix in prefixes], [0, 1, 2])  # lockserv has one sort
+        states = [lockserv_trace(0).as_state(0)]
+        pos: List[int] = [0]
+        neg: List[int] = []
+        s = Solver()
+        e = sep.PrefixPortfolio(prefixes, states, 2).learn(s, clause, pos, neg)
+        assert e is not None
+        self.assertIsNone(logic.check_implication(s, [clause], [e]))
+        self.assertIsNone(logic.check_implication(s, [e], [clause]))
+        self.assertEqual(sorted(pos + neg), list(range(len(states))))
+
+class ParallelVerifyTests(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.args = mypyvy.parse_args(['verify', 'MOCK_FILENAME.pyv'])
+
+    def test_parallel_matches_sequential(self) -> None:
+        import logic
+        from solver import Solver
+
+        prog = load_lockserv()
+        self.assertEqual(logic.check_init_and_transitions_parallel(2), (None, None))
+
+        # drop an invariant needed for inductiveness
+        invs = list(prog.invs())
+        prog.decls.remove(invs[1])
+        init_res, tr_res = logic.check_init_and_transitions_parallel(2)
+        self.assertIsNone(init_res)
+        assert tr_res is not None
+        s = Solver()
+        self.assertIsNone(logic.check_init(s, verbose=False))
+        seq_res = logic.check_transitions(s, verbose=False)
+        assert seq_res is not None
+        self.assertEqual((tr_res[0], tr_res[2]), (seq_res[0], seq_res[2]))
+
+    def test_parallel_prints_every_transition(self) -> None:
+        import logic
+        from solver import Solver
+
+        prog = load_lockserv()
+        # no invariant is selected, so no transition has any obligations
+        utils.args = mypyvy.parse_args(['verify', '--check-invariant', 'no_such_invariant', 'MOCK_FILENAME.pyv'])
+
+        def headers(check: Callable[[], object]) -> List[str]:
+            with self.assertLogs('mypyvy', level=utils.MyLogger.ALWAYS_PRINT) as logs:
+                check()
+            return [r.getMessage() for r in logs.records if r.getMessage().startswith('checking transition')]
+
+        expected = ['checking transition %s:\n' % (ition.name,) for ition in prog.transitions()]
+        self.assertEqual(headers(lambda: logic.check_transitions(Solver())), expected)
+        self.assertEqual(headers(lambda: logic.check_init_and_transitions_parallel(2)), expected)
+
+class IncrementalBMCTests(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.args = mypyvy.parse_args(['bmc', 'MOCK_FILENAME.pyv'])
+
+    def test_incremental_matches_check_bmc(self) -> None:
+        import logic
+        from solver import Solver
+
+        load_lockserv()
+        s = Solver()
+        nobody_locks = parser.parse_expr('forall N:node. !holds_lock(N)')
+        with syntax.the_program.scope.n_states(1):
+            typechecker.typecheck_expr(syntax.the_program.scope, nobody_locks, syntax.BoolSort)
+        with logic.IncrementalBMC(s, nobody_locks, 5) as bmc:
+            for k in range(5):
+                res = bmc.check(k)
+                self.assertEqual(res is None, logic.check_bmc(Solver(), nobody_locks, k) is None)
+                if res is not None:
+                    self.assertEqual(res.num_states, k + 1)
+                    self.assertFalse(res.eval(nobody_locks, k))
+        self.assertEqual(s.z3solver.num_scopes(), 0)
+        res = logic.check_bmc_upto(s, nobody_locks, 5)
+        assert res is not None
+        self.assertEqual(res.num_states, 4)
+
+class GeneralizationTests(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.args = mypyvy.parse_args(['updr', 'MOCK_FILENAME.pyv'])
+
+    def test_quickxplain(self) -> None:
+        from logic import _quickxplain
+
+        self.assertEqual(_quickxplain(lambda xs: {2, 5} <= set(xs), list(range(8))), [2, 5])
+        self.assertEqual(_quickxplain(lambda xs: 1 in xs or 4 in xs, list(range(8))), [1])
+        self.assertEqual(_quickxplain(lambda xs: True, list(range(8))), [])
+
+    def test_generalize_is_minimal(self) -> None:
+        import copy
+        import logic
+        from solver import Solver
+
+        from translator import Z3Translator
+
+        prog = load_lockserv()
+        s = Solver()
+        invs = [inv.expr for inv in prog.invs()]
+        inits = [init.expr for init in prog.inits()]
+
+        def constraint(diag: logic.Diagram) -> bool:
+            return logic.check_diagram_blocked(s, invs, inits, diag) is not None
+
+        def core(diag: logic.Diagram) -> Optional[Set[int]]:
+            return logic.check_diagram_blocked(s, invs, inits, diag)
+
+        # a state violating an invariant has no predecessors satisfying the invariants
+        m = logic.check_implication(s, [], invs[:1], minimize=False)
+        assert m is not None
+        state = Z3Translator.model_to_trace(m, 1).as_state(0)
+        diag = logic.Diagram(state)
+        self.assertTrue(constraint(diag))
+        with_core = copy.deepcopy(diag)
+        with_core.generalize(s, constraint, core=core)
+        diag.generalize(s, constraint)
+        for d in (diag, with_core):
+            self.assertTrue(constraint(d))
+            self.assertLess(len(list(d.conjuncts())), len(list(logic.Diagram(state).conjuncts())))
+            for x, j, _ in d.conjuncts():
+                with d.without(x, j):
+                    self.assertFalse(constraint(d))
+
+class ModelMinimizationTests(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.args = mypyvy.parse_args(['verify', 'MOCK_FILENAME.pyv'])
+
+    def test_minimal_model_matches_linear_search(self) -> None:
+        import z3
+        from solver import Solver
+        from translator import Z3Translator
+
+        prog = load_lockserv()
+        s = Solver()
+        t = s.get_translator(1)
+        sorts = [Z3Translator.sort_to_z3(sort) for sort in prog.sorts()]
+        rels = []
+        for r in prog.relations():
+            z3r = Z3Translator.relation_to_z3(r, None if not r.mutable else Z3Translator._get_keys(1)[0])
+            rels.append(z3r.decl() if isinstance(z3r, z3.ExprRef) else z3r)
+        xs: List[Union[z3.SortRef, z3.FuncDeclRef]] = [*sorts, *rels]
+        with s.new_frame():
+            # a state violating an invariant, which has several nodes
+            s.add(t.translate_expr(syntax.Not(list(prog.invs())[0].expr)))
+            self.assertEqual(s.check(), z3.sat)
+            m = s.model(minimize=True, sorts_to_minimize=sorts, relations_to_minimize=rels)
+            sizes = [Solver._model_size(m, x) for x in xs]
+
+            # the minimal cardinalities, found one at a time by linear search
+            expected = []
+            for x in xs:
+                n = 1
+                while True:
+                    with s.new_frame():
+                        s.add(s._cardinality_constraint(x, n))
+                        if s.check() == z3.sat:
+                            break
+                    n += 1
+                s.add(s._cardinality_constraint(x, n))
+                expected.append(n)
+        self.assertEqual([max(1, cast(int, n)) for n in sizes], expected)
+        self.assertGreater(expected[0], 1)
+
+class ParallelUPDRTests(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.args = mypyvy.parse_args(['updr', 'MOCK_FILENAME.pyv'])
+
+    def test_parallel_is_reproducible(self) -> None:
+        import updr
+        from solver import Solver
+
+        load_lockserv()
+        frames = []
+        for jobs in (1, 2, 2):
+            fs = updr.Frames(Solver(), jobs)
+            try:
+                frames.append(fs.search().summary())
+            finally:
+                fs.close()
+        self.assertEqual(frames[1], frames[2])
+        self.assertEqual(len(frames[0]), len(frames[1]))
+
+class HoareWorkerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.args = mypyvy.parse_args(['pd-primal-dual-houdini', 'MOCK_FILENAME.pyv'])
+
+    def test_worker_is_reused_after_cancel(self) -> None:
+        import multiprocessing.connection
+        from datetime import timedelta
+        import pd
+
+        prog = load_lockserv()
+        invs = tuple(inv.expr for inv in prog.invs())
+        clause = syntax.as_clauses(next(inv.expr for inv in prog.invs() if inv.is_safety))[0]
+        lits = frozenset(range(len(pd.destruct_clause(clause)[1])))
+        worker = pd.HoareWorker()
+
+        def check(ps: Tuple[syntax.Expr, ...], cancel: bool = False) -> List[Tuple[pd.HoareQuery, bool, bool]]:
+            hq = pd.HoareQuery(p=frozenset(range(len(ps))), q_pre=(lits,), q_post=(lits,),
+                               cardinalities=(), i_transition=0)
+            worker.submit(ps, (clause,), hq, True, False, False, False, False, [], timedelta(seconds=60))
+            if cancel:
+                worker.cancel()
+            results = []
+            while worker.busy:
+                multiprocessing.connection.wait([worker.results])
+                for hq, valid, cti in worker.receive():
+                    # a cti must violate the clause after the transition
+                    self.assertTrue(valid or (cti is not None and not pd.eval_in_state(None, cti[1], clause)))
+                    results.append((hq, valid, cti is not None))
+            return results
+
+        try:
+            pid = worker.process.pid
+            self.assertEqual(check((), cancel=True), [])
+            # the safety property is only inductive relative to the invariants
+            self.assertFalse(all(valid for _, valid, _ in check(())))
+            valid = check(invs)
+            self.assertEqual(len(valid), len(list(prog.transitions())))
+            self.assertTrue(all(valid for _, valid, _ in valid))
+            self.assertEqual(check((), cancel=True), [])
+            self.assertFalse(all(valid for _, valid, _ in check(())))
+            self.assertEqual(worker.process.pid, pid)
+        finally:
+            worker.terminate()
+
+    def test_cancelled_query_is_not_cached(self) -> None:
+        import multiprocessing.connection
+        import sqlite3
+        import tempfile
+        import time
+        from datetime import timedelta
+        import pd
+
+        prog = load_pigeonhole()
+        clause = parser.parse_expr('forall P:pigeon. !r(P)')
+        with prog.scope.n_states(1):
+            typechecker.typecheck_expr(prog.scope, clause, None)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = str(Path(tmpdir) / 'queries.db')
+            utils.args = mypyvy.parse_args(['pd-primal-dual-houdini', f'--query-cache={filename}', 'MOCK_FILENAME.pyv'])
+            worker = pd.HoareWorker()
+            try:
+                hq = pd.HoareQuery(p=frozenset(), q_pre=(frozenset([0]),), q_post=(frozenset([0]),),
+                                   cardinalities=(), i_transition=0)
+                worker.submit((), (clause,), hq, True, False, False, False, False, [], timedelta(seconds=60))
+                time.sleep(1)
+                self.assertTrue(worker.busy)
+                worker.cancel()
+                results = []
+                while worker.busy:
+                    self.assertTrue(multiprocessing.connection.wait([worker.results], timeout=60))
+                    results += worker.receive()
+                self.assertEqual(results, [])
+                self.assertTrue(worker.process.is_alive())
+            finally:
+                worker.terminate()
+            with sqlite3.connect(filename) as conn:
+                self.assertEqual(conn.execute('SELECT COUNT(*) FROM queries').fetchone()[0], 0)
+
+class ProgramCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.args = mypyvy.parse_args(['typecheck', 'MOCK_FILENAME.pyv'])
+
+    def test_program_cache(self) -> None:
+        import program_cache
+        import tempfile
+
+        with open(lockserv_path) as f:
+            contents = f.read()
+        filename = str(lockserv_path)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = program_cache.ProgramCache(tmpdir)
+            self.assertIsNone(cache.load(filename, contents))
+            prog = mypyvy.parse_and_typecheck(contents, filename)
+            cache.store(filename, contents, prog)
+
+            cached = cache.load(filename, contents)
+            assert cached is not None
+            self.assertEqual(str(cached), str(prog))
+            self.assertEqual(cached.input, contents)
+            self.assertEqual([str(d.span) for d in cached.decls], [str(d.span) for d in prog.decls])
+            inv = next(iter(cached.invs()))
+            assert inv.span is not None
+            self.assertFalse(hasattr(inv.span[0], "lexer"))
+            self.assertEqual(inv.span[0].filename, filename)
+
+            self.assertIsNone(cache.load(filename, contents + '\n'))
+            self.assertIsNone(cache.load('other.pyv', contents))
+
+class StartupTests(unittest.TestCase):
+    def test_typecheck_imports(self) -> None:
+        proc = subprocess.run(build_python_cmd() + ['typecheck', '--startup-profile', str(lockserv_path)],
+                              stdout=subprocess.PIPE, universal_newlines=True)
+        self.assertEqual(proc.returncode, 0, msg=proc.stdout)
+        # lines of the report look like '   12.3ms    4.5ms  module'
+        rows = [line.split() for line in proc.stdout.splitlines()]
+        modules = {row[2] for row in rows if len(row) == 3 and row[0].endswith('ms') and row[1].endswith('ms')}
+        self.assertIn('syntax', modules)
+        self.assertIn('parse and typecheck program', proc.stdout)
+        for heavy in ['z3', 'logic', 'pd', 'sep', 'rethink', 'updr', 'networkx']:
+            self.assertNotIn(heavy, modules)
+
+    def test_lazy_main(self) -> None:
+        args = mypyvy.parse_args(['pd-cdcl-invariant', 'MOCK_FILENAME.pyv'])
+        assert isinstance(args.main, mypyvy.LazyMain)
+        import pd
+        self.assertIs(args.main.resolve(), pd.cdcl_invariant)
+        self.assertTrue(args.needs_solver)
+        self.assertFalse(mypyvy.parse_args(['typecheck', 'MOCK_FILENAME.pyv']).needs_solver)
+
+class ServerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.args = mypyvy.parse_args(['typecheck', 'MOCK_FILENAME.pyv'])
+
+    def tearDown(self) -> None:
+        import logging
+        for h in list(logging.root.handlers):
+            if h.get_name() == 'mypyvy':
+                logging.root.removeHandler(h)
+
+    def request(self, s: server.Server, method: str, **params: object) -> server.JSON:
+        import json
+        response = s.respond(json.dumps({'jsonrpc': '2.0', 'id': 7, 'method': method, 'params': params}).encode())
+        assert response is not None
+        self.assertEqual(response['id'], 7)
+        return response
+
+    def test_requests(self) -> None:
+        s = server.Server()
+        filename = str(lockserv_path)
+        result = self.request(s, 'typecheck', filename=filename)['result']
+        self.assertEqual((result['exit_code'], result['error_count']), (0, 0))
+
+        result = self.request(s, 'verify', filename=filename, args=['--no-query-time'])['result']
+        self.assertEqual(result['exit_code'], 0)
+        self.assertEqual(result['verification'], {'version': 1, 'subcommand': 'verify', 'is_inductive': True})
+        self.assertIn('all ok!', result['output'])
+        loaded = s.programs[os.path.abspath(filename)]
+        solver = loaded.solvers[(False, 0, None)]
+
+        # the program and solver are reused while the file does not change
+        self.request(s, 'verify', filename=filename)
+        self.assertIs(s.programs[os.path.abspath(filename)], loaded)
+        self.assertIs(loaded.solvers[(False, 0, None)], solver)
+
+        with open(lockserv_path) as f:
+            contents = f.read().replace('safety [mutex] holds_lock(N1) & holds_lock(N2) -> N1 = N2',
+                                        'safety [mutex] holds_lock(N1) -> N1 = N2')
+        result = self.request(s, 'verify', filename=filename, contents=contents,
+                              args=['--print-exit-code'])['result']
+        self.assertEqual(result['exit_code'], 1)
+        self.assertGreater(result['error_count'], 0)
+        self.assertFalse(result['verification']['is_inductive'])
+        self.assertEqual(result['verification']['counterexample']['invariant']['name'], 'mutex')
+        self.assertIn('mypyvy exiting with status 1', result['output'])
+        self.assertIsNot(s.programs[os.path.abspath(filename)], loaded)
+
+        result = self.request(s, 'typecheck', filename=filename, contents=contents + '\nfoo')['result']
+        self.assertEqual(result['exit_code'], 1)
+        self.assertIn('syntax error', result['output'])
+
+        self.assertEqual(self.request(s, 'updr', filename=filename)['error']['code'], server.METHOD_NOT_FOUND)
+        self.assertEqual(self.request(s, 'verify', filename=filename, args=['--bogus'])['error']['code'],
+                         server.INVALID_PARAMS)
+        self.assertEqual(self.request(s, 'verify', filename='no-such-file.pyv')['error']['code'],
+                         server.INVALID_PARAMS)
+        self.assertEqual(s.respond(b'{')['error']['code'], server.PARSE_ERROR)  # type: ignore
+        self.assertEqual(utils.args.subcommand, 'typecheck')
+
+    def test_z3_params_are_reset(self) -> None:
+        import z3
+
+        s = server.Server()
+        filename = str(lockserv_path)
+        defaults = (z3.get_param('timeout'), z3.get_param('smt.random_seed'))
+        result = self.request(s, 'verify', filename=filename, args=['--timeout=100000', '--seed=3'])['result']
+        self.assertEqual(result['exit_code'], 0)
+        self.assertEqual((z3.get_param('timeout'), z3.get_param('smt.random_seed')), defaults)
+
+        result = self.request(s, 'verify', filename=filename)['result']
+        self.assertEqual(result['exit_code'], 0)
+        self.assertEqual((z3.get_param('timeout'), z3.get_param('smt.random_seed')), defaults)
+        # solvers are created with the seed and timeout of a request, so they are not shared between different ones
+        loaded = s.programs[os.path.abspath(filename)]
+        self.assertEqual(set(loaded.solvers), {(False, 3, 100000), (False, 0, None)})
+
+    def test_socket(self) -> None:
+        import tempfile
+        import threading
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            socket_path = os.path.join(tmpdir, 'mypyvy.sock')
+            thread = threading.Thread(target=server.serve, args=(socket_path,))
+            thread.start()
+            try:
+                for _ in range(100):
+                    if os.path.exists(socket_path):
+                        break
+                    thread.join(0.05)
+                response = server.call(socket_path, 'typecheck', {'filename': str(lockserv_path)})
+                self.assertEqual(response['result']['exit_code'], 0)
+            finally:
+                self.assertEqual(server.call(socket_path, 'shutdown'), {'jsonrpc': '2.0', 'id': 1, 'result': None})
+                thread.join()
+            self.assertFalse(os.path.exists(socket_path))
+
+class IncrementalVerifyTests(unittest.TestCase):
+    def setUp(self) -> None:
+        utils.args = mypyvy.parse_args(['verify', 'MOCK_FILENAME.pyv'])
+
+    def test_incremental(self) -> None:
+        import incremental
+        import logic
+        import tempfile
+        from solver import Solver
+
+        prog = load_lockserv()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = str(Path(tmpdir) / 'results.json')
+            s = Solver()
+            self.assertEqual(incremental.check_init_and_transitions_incremental(s, filename), (None, None))
+            self.assertGreater(s.nqueries, 0)
+
+            s = Solver()
+            self.assertEqual(incremental.check_init_and_transitions_incremental(s, filename), (None, None))
+            self.assertEqual(s.nqueries, 0)
+
+            # drop an invariant needed for inductiveness
+            invs = list(prog.invs())
+            prog.decls.remove(invs[1])
+            s = Solver()
+            init_res, tr_res = incremental.check_init_and_transitions_incremental(s, filename)
+            self.assertIsNone(init_res)
+            assert tr_res is not None
+            self.assertLess(s.nqueries, len(list(prog.invs())) * len(list(prog.transitions())))
+            seq_res = logic.check_transitions(Solver(), verbose=False)
+            assert seq_res is not None
+            self.assertEqual((tr_res[0], tr_res[2]), (seq_res[0], seq_res[2]))
+
+    def test_incremental_prints_every_transition(self) -> None:
+        import incremental
+        import tempfile
+        from solver import Solver
+
+        prog = load_lockserv()
+        # no invariant is selected, so no transition has any obligations
+        utils.args = mypyvy.parse_args(['verify', '--check-invariant', 'no_such_invariant', 'MOCK_FILENAME.pyv'])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with self.assertLogs('mypyvy', level=utils.MyLogger.ALWAYS_PRINT) as logs:
+                incremental.check_init_and_transitions_incremental(Solver(), str(Path(tmpdir) / 'results.json'))
+        self.assertEqual([r.getMessage() for r in logs.records if r.getMessage().startswith('checking transition')],
+                         ['checking transition %s:\n' % (ition.name,) for ition in prog.transitions()])
+
+class QueryCacheTests(unittest.TestCase):
+    def test_query_key_is_order_independent(self) -> None:
+        import z3
+        import solver_cache
+
+        p, q = z3.Bool('p'), z3.Bool('q')
+        self.assertEqual(solver_cache.query_key([z3.Or(p, q), z3.Not(p)], [q]),
+                         solver_cache.query_key([z3.Not(p), z3.Or(p, q), z3.Not(p)], [q]))
+        self.assertNotEqual(solver_cache.query_key([z3.Or(p, q), z3.Not(p)], [q]),
+                            solver_cache.query_key([z3.Or(p, q), z3.Not(p)], []))
+        # same text, but different declarations
+        a, b = z3.Consts('a b', z3.DeclareSort('S'))
+        c, d = z3.Consts('a b', z3.BoolSort())
+        self.assertNotEqual(solver_cache.query_key([z3.Distinct(a, b)], []),
+                            solver_cache.query_key([z3.Distinct(c, d)], []))
+
+    def test_cached_results_and_models(self) -> None:
+        import logic
+        import solver_cache
+        import tempfile
+        from solver import Solver
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = str(Path(tmpdir) / 'queries.db')
+            utils.args = mypyvy.parse_args(['typecheck', f'--query-cache={filename}', 'MOCK_FILENAME.pyv'])
+            load_lockserv()
+            self.assertIsNotNone(lockserv_trace(2))
+            self.assertIsNone(logic.check_init(Solver(), safety_only=False))
+
+            solver_cache._caches.clear()  # start from a fresh connection, as a new process would
+            trace = lockserv_trace(2)  # answered from the cache, but the solver still runs to get the model
+            self.assertIsNotNone(trace)
+            self.assertIsNone(logic.check_init(Solver(), safety_only=False))
+            cache = solver_cache.get_query_cache()
+            assert cache is not None
+            self.assertEqual(cache.misses, 0)
+            self.assertGreater(cache.hits, 0)
+            solver_cache._caches.clear()
+
+    def test_interrupted_query_is_not_cached(self) -> None:
+        import threading
+        import tempfile
+        import z3
+        import solver_cache
+        from solver import Solver
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = str(Path(tmpdir) / 'queries.db')
+            utils.args = mypyvy.parse_args(['typecheck', f'--query-cache={filename}', 'MOCK_FILENAME.pyv'])
+            load_pigeonhole()
+            s = Solver()
+            # interrupt the check once it has started. an interrupt that arrives after the check
+            # would leave z3's context cancelled, so any such interrupt is cleared below
+            timer = threading.Timer(0.5, s.interrupt)
+            timer.start()
+            try:
+                res = s.check()
+            finally:
+                timer.cancel()
+                timer.join()
+                z3.Solver().check()
+            self.assertEqual(res, z3.unknown)
+            cache = solver_cache.get_query_cache()
+            assert cache is not None
+            self.assertEqual(cache._connection().execute('SELECT COUNT(*) FROM queries').fetchone()[0], 0)
+            solver_cache._caches.clear()
+
+class QueryProfileTests(unittest.TestCase):
+    def tearDown(self) -> None:
+        import query_profile
+        query_profile.reset()
+
+    def test_profile_and_smt2(self) -> None:
+        import logic
+        import query_profile
+        import tempfile
+        import z3
+        from solver import Solver
+
+        utils.args = mypyvy.parse_args(['typecheck', 'MOCK_FILENAME.pyv'])
+        self.assertIsNone(query_profile.get_query_profiler())
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            utils.args = mypyvy.parse_args(['typecheck', f'--query-profile-smt2={tmpdir}', '--query-profile-top=2',
+                                            'MOCK_FILENAME.pyv'])
+            load_lockserv()
+            self.assertIsNone(logic.check_init(Solver(), safety_only=False))
+            profiler = query_profile.get_query_profiler()
+            assert profiler is not None
+            rows = profiler.summary()
+            self.assertEqual([row['site'] for row in rows],
+                             ['logic.check_solver <- test.QueryProfileTests.test_profile_and_smt2'])
+            self.assertEqual(rows[0]['count'], len(profiler.records))
+            self.assertEqual(rows[0]['unsat'], len(profiler.records))
+            self.assertTrue(all(rec.quantifiers > 0 and rec.size > rec.assertions for rec in profiler.records))
+
+            paths = profiler.dump_smt2(tmpdir)
+            self.assertEqual(len(paths), 2)
+            for path in paths:
+                s = z3.Solver()
+                s.from_string(path.read_text())
+                self.assertEqual(s.check(), z3.unsat)
+
+class PortfolioTests(unittest.TestCase):
+    def test_race(self) -> None:
+        import z3
+        import solver_portfolio
+
+        utils.args = mypyvy.parse_args(['typecheck', 'MOCK_FILENAME.pyv'])
+        configs = solver_portfolio.portfolio_configs(3)
+        self.assertEqual(len(configs), 3)
+        self.assertEqual(len(set(configs)), 3)
+        p, q = z3.Bools('p q')
+        for formula, expected in [(z3.And(z3.Or(p, q), z3.Not(p)), 'sat'), (z3.And(p, z3.Not(p)), 'unsat')]:
+            s = z3.Solver()
+            s.add(formula)
+            won = solver_portfolio.race(s.to_smt2(), configs)
+            assert won is not None
+            self.assertIn(won[0], configs)
+            self.assertEqual(won[1], expected)
+
+    def test_portfolio_results_and_models(self) -> None:
+        import logic
+        import solver_portfolio
+        from solver import Solver
+
+        utils.args = mypyvy.parse_args(['typecheck', '--portfolio=2', '--portfolio-delay=0', 'MOCK_FILENAME.pyv'])
+        load_lockserv()
+        solver_portfolio.wins.clear()
+        self.assertIsNotNone(lockserv_trace(2))  # the winner is replayed to get the model
+        self.assertIsNone(logic.check_init(Solver(), safety_only=False))
+        self.assertGreater(sum(solver_portfolio.wins.values()), 0)
+        solver_portfolio.wins.clear()
+
+# A stand-in for cvc4, which logs the commands it gets (with its PID), and answers unsat to
+# every (check-sat), after FAKE_CVC4_DELAY seconds.
+_FAKE_CVC4 = r'''
+import os, re, sys, time
+special = re.compile(r'[()]|\|[^|]*\||"[^"]*"|;[^\n]*')
+log = open(os.environ['FAKE_CVC4_LOG'], 'a')
+buf = ''
+for line in sys.stdin:
+    buf += line
+    while True:
+        depth = 0
+        end = None
+        for m in special.finditer(buf):
+            if m.group(0) == '(':
+                depth += 1
+            elif m.group(0) == ')':
+                depth -= 1
+                if depth == 0:
+                    end = m.end()
+                    break
+        if end is None:
+            break
+        command, buf = buf[:end].strip(), buf[end:]
+        log.write(f'{os.getpid()} {command!r}\n')
+        log.flush()
+        if command == '(check-sat)':
+            time.sleep(float(os.environ['FAKE_CVC4_DELAY']))
+            print('unsat', flush=True)
+'''
+
+class CVC4PoolTests(unittest.TestCase):
+    def fake_cvc4(self, delay: float = 0) -> Path:
+        '''Put a fake cvc4 first on PATH for the rest of the test, and return the path of its log.'''
+        import sys
+        import tempfile
+
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        exe = Path(tmpdir.name) / 'cvc4'
+        exe.write_text(f'#!{sys.executable}\n{_FAKE_CVC4}')
+        exe.chmod(0o755)
+        log = Path(tmpdir.name) / 'log'
+        log.touch()
+        env = {'PATH': f'{tmpdir.name}:{os.environ["PATH"]}', 'FAKE_CVC4_LOG': str(log), 'FAKE_CVC4_DELAY': str(delay)}
+        saved = {k: os.environ.get(k) for k in env}
+        os.environ.update(env)
+
+        def restore() -> None:
+            for k, v in saved.items():
+                if v is None:
+                    del os.environ[k]
+                else:
+                    os.environ[k] = v
+        self.addCleanup(restore)
+        return log
+
+    def fake_cvc4_commands(self, log: Path) -> List[List[str]]:
+        '''
+        Return the commands logged by each fake cvc4 process, in the order they started, up to
+        the last (check-sat) of the process (the commands after it may not have been read yet).
+        '''
+        import ast
+
+        commands: Dict[int, List[str]] = {}
+        for line in log.read_text().splitlines():
+            pid, command = line.split(' ', 1)
+            commands.setdefault(int(pid), []).append(ast.literal_eval(command))
+        for cs in commands.values():
+            while cs and cs[-1] != '(check-sat)':
+                cs.pop()
+        return list(commands.values())
+
+    def test_split_commands(self) -> None:
+        import solver_cvc4
+
+        script = '(declare-sort S 0)\n; a comment (\n(assert (forall ((x S))\n  (|p (x)| x)))\n(check-sat)'
+        self.assertEqual(solver_cvc4.split_commands(script),
+                         ['(declare-sort S 0)', '(assert (forall ((x S))\n  (|p (x)| x)))', '(check-sat)'])
+        script = '(set-info :status unknown)\n(declare-sort S 0)\n; a comment (\n(assert (|p (x)| s))\n(check-sat)'
+        self.assertEqual(solver_cvc4._commands_of(script), ('(declare-sort S 0)', '(assert (|p (x)| s))'))
+
+    def test_pool_reuses_shared_commands(self) -> None:
+        import solver_cvc4
+
+        log = self.fake_cvc4()
+        decls = '(declare-sort S 0)\n(declare-fun p (S) Bool)\n(declare-fun s () S)\n'
+        axioms1 = decls + '(assert (forall ((x S)) (p x)))\n'
+        axioms2 = decls + '(assert (forall ((x S)) (not (p x))))\n'
+        pool = solver_cvc4.CVC4Pool(2)
+        try:
+            self.assertIsNone(pool.check(axioms1 + '(assert (not (p s)))\n(check-sat)', axioms1))
+            # the idle process has other shared commands, so a new process is started
+            self.assertIsNone(pool.check(axioms2 + '(assert (p s))\n(check-sat)', axioms2))
+            # each of the processes already has the shared commands of these queries
+            self.assertIsNone(pool.check(axioms1 + '(assert (not (p s)))\n(check-sat)', axioms1))
+            self.assertIsNone(pool.check(axioms2 + '(assert (p s))\n(check-sat)', axioms2))
+        finally:
+            pool.shutdown()
+
+        commands = self.fake_cvc4_commands(log)
+        self.assertEqual(len(commands), 2)
+        shared = ['(declare-sort S 0)', '(declare-fun p (S) Bool)', '(declare-fun s () S)']
+        self.assertEqual(commands[0],
+                         ['(reset)', solver_cvc4.CVC4_LOGIC, *shared, '(assert (forall ((x S)) (p x)))',
+                          '(push 1)', '(assert (not (p s)))', '(check-sat)', '(pop 1)',
+                          '(push 1)', '(assert (not (p s)))', '(check-sat)'])
+        self.assertEqual(commands[1],
+                         ['(reset)', solver_cvc4.CVC4_LOGIC, *shared, '(assert (forall ((x S)) (not (p x))))',
+                          '(push 1)', '(assert (p s))', '(check-sat)', '(pop 1)',
+                          '(push 1)', '(assert (p s))', '(check-sat)'])
+
+    def test_interrupt_stops_only_its_query(self) -> None:
+        import threading
+        import z3
+        import solver_cvc4
+        from solver import Solver
+
+        self.fake_cvc4(delay=2)
+        utils.args = mypyvy.parse_args(['typecheck', '--cvc4-processes=2', 'MOCK_FILENAME.pyv'])
+        solver_cvc4._pool = None  # a new pool of 2 processes
+        load_lockserv()
+        solvers = [Solver(use_cvc4=True), Solver(use_cvc4=True)]
+        results: List[object] = [None, None]
+
+        def check(i: int) -> None:
+            try:
+                results[i] = solvers[i].check()
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=check, args=(i,)) for i in range(2)]
+        try:
+            for thread in threads:
+                thread.start()
+            while any(s.cvc4_query is None or s.cvc4_query.worker is None for s in solvers):
+                threads[0].join(0.01)
+            solvers[0].interrupt()
+            for thread in threads:
+                thread.join()
+        finally:
+            solver_cvc4.get_cvc4_pool().shutdown()
+            solver_cvc4._pool = None
+        self.assertIsInstance(results[0], Exception)
+        self.assertEqual(results[1], z3.unsat)
+
+    @unittest.skipUnless(__import__('solver_cvc4').cvc4_available(), 'cvc4 is not installed')
+    def test_pool_matches_z3(self) -> None:
+        import logic
+        from solver import Solver
+
+        utils.args = mypyvy.parse_args(['typecheck', '--cvc4-processes=2', 'MOCK_FILENAME.pyv'])
+        load_lockserv()
+        self.assertIsNone(logic.check_init(Solver(use_cvc4=True), safety_only=False))
+        self.assertIsNone(logic.check_transitions(Solver(use_cvc4=True)))
+
 def build_python_cmd() -> List[str]:
     python = os.getenv('PYTHON') or 'python3.8'
     return [python, str((utils.PROJECT_ROOT / 'src' / 'mypyvy.py').resolve())]
@@ -1,25 +1,225 @@
 from __future__ import annotations
 
+from collections import OrderedDict
 from itertools import chain, product
+import weakref
 
-from typing import Callable, cast, Dict, Iterator, List, Optional, Tuple, Union
+from typing import Callable, cast, Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union, TYPE_CHECKING
 
 import z3
-from networkx import DiGraph  # type: ignore
 
 import syntax
 from syntax import Scope, Binder, Expr, Bool, Int, UnaryExpr, BinaryExpr, NaryExpr
 from syntax import AppExpr, QuantifierExpr, Id, Let, IfThenElse
 from syntax import DefinitionDecl, RelationDecl, FunctionDecl, ConstantDecl
 from syntax import Program, SortDecl, Sort, UninterpretedSort, BoolSort, IntSort, SortInferencePlaceholder
-from semantics import Trace, Element, RelationInterp, FunctionInterp, FirstOrderStructure, BareFirstOrderStructure
-from z3_utils import z3_quantifier_alternations
+from semantics import Trace, State, Element, RelationInterp, FunctionInterp
+from semantics import FirstOrderStructure, BareFirstOrderStructure
+from z3_utils import z3_quantifier_alternations, mk_and
 from solver_cvc4 import CVC4Model, CVC4Int
 
+# networkx takes a long time to import and is only needed for quantifier alternation graphs
+if TYPE_CHECKING:
+    from networkx import DiGraph  # type: ignore
+
 
 TRANSITION_INDICATOR = 'tid'
 
 
+_ModelValue = Union[bool, int, Element]
+_ModelFn = Callable[[Tuple[_ModelValue, ...]], _ModelValue]
+
+
+class _ModelTables:
+    '''
+    Interpretations of the declarations of a z3 model, as Python dictionaries.
+
+    The interpretations are read directly from the model (the entries and the
+    else value of each z3.FuncInterp), which is much faster than calling
+    z3model.eval once for every tuple. An else value is an expression over the
+    arguments (z3 variables), which is compiled to a Python function. If it
+    uses an operator not supported here, table returns None, and the caller
+    should fall back to z3model.eval.
+    '''
+
+    _BINOPS: Dict[z3.Z3DeclKind, Callable[[_ModelValue, _ModelValue], _ModelValue]] = {
+        z3.Z3_OP_EQ: lambda x, y: x == y,
+        z3.Z3_OP_IFF: lambda x, y: x == y,
+        z3.Z3_OP_IMPLIES: lambda x, y: (not x) or bool(y),
+        z3.Z3_OP_LE: lambda x, y: cast(int, x) <= cast(int, y),
+        z3.Z3_OP_LT: lambda x, y: cast(int, x) < cast(int, y),
+        z3.Z3_OP_GE: lambda x, y: cast(int, x) >= cast(int, y),
+        z3.Z3_OP_GT: lambda x, y: cast(int, x) > cast(int, y),
+        z3.Z3_OP_SUB: lambda x, y: cast(int, x) - cast(int, y),
+    }
+
+    def __init__(self, z3model: z3.ModelRef, elements: Dict[int, Element],
+                 univs: Dict[str, Tuple[Element, ...]]) -> None:
+        self.z3model = z3model
+        self.elements = elements  # by z3 AST id
+        self.univs = univs  # by sort name
+        self.decls = set(d.get_id() for d in z3model.decls())
+        self.tables: Dict[int, Optional[Dict[Tuple[Element, ...], _ModelValue]]] = {}
+        self.in_progress: Set[int] = set()
+        self.compiled: Dict[int, Optional[_ModelFn]] = {}  # by z3 AST id, since else values share subterms
+
+    def table(self, z3decl: z3.FuncDeclRef) -> Optional[Dict[Tuple[Element, ...], _ModelValue]]:
+        key = z3decl.get_id()
+        if key not in self.tables:
+            if key in self.in_progress or key not in self.decls:
+                return None
+            self.in_progress.add(key)
+            try:
+                self.tables[key] = self._compute_table(z3decl)
+            finally:
+                self.in_progress.remove(key)
+        return self.tables[key]
+
+    def _compute_table(self, z3decl: z3.FuncDeclRef) -> Optional[Dict[Tuple[Element, ...], _ModelValue]]:
+        domains = []
+        for i in range(z3decl.arity()):
+            name = z3decl.domain(i).name()
+            if name not in self.univs:
+                return None
+            domains.append(self.univs[name])
+        interp = self.z3model.get_interp(z3decl)
+        if not domains:
+            f = self.compile(interp)
+            return None if f is None else {(): f(())}
+        if not isinstance(interp, z3.FuncInterp):
+            return None
+        default = self.compile(interp.else_value())
+        if default is None:
+            return None
+        table = {row: default(row) for row in product(*domains)}
+        for j in range(interp.num_entries()):
+            entry = interp.entry(j)
+            row = []
+            for k in range(entry.num_args()):
+                arg = self.elements.get(entry.arg_value(k).get_id())
+                if arg is None:
+                    return None
+                row.append(arg)
+            f = self.compile(entry.value())
+            if f is None:
+                return None
+            table[tuple(row)] = f(())
+        return table
+
+    def compile(self, e: z3.ExprRef) -> Optional[_ModelFn]:
+        '''Compile e, whose variable i is the i'th argument, to a Python function of the arguments.'''
+        key = e.get_id()
+        if key not in self.compiled:
+            self.compiled[key] = self._compile(e)
+        return self.compiled[key]
+
+    def _compile(self, e: z3.ExprRef) -> Optional[_ModelFn]:
+        if z3.is_var(e):
+            i = z3.get_var_index(e)
+            return lambda args: args[i]
+        if z3.is_true(e):
+            return lambda args: True
+        if z3.is_false(e):
+            return lambda args: False
+        if z3.is_int_value(e):
+            n = e.as_long()
+            return lambda args: n
+        if e.get_id() in self.elements:
+            x = self.elements[e.get_id()]
+            return lambda args: x
+        if not z3.is_app(e):
+            return None
+
+        children: List[_ModelFn] = []
+        for child in e.children():
+            f = self.compile(child)
+            if f is None:
+                return None
+            children.append(f)
+
+        kind = e.decl().kind()
+        if kind == z3.Z3_OP_UNINTERPRETED:
+            table = self.table(e.decl())
+            if table is None:
+                return None
+            return lambda args: table[tuple(cast(Element, f(args)) for f in children)]
+        elif kind == z3.Z3_OP_ITE:
+            cond, a, b = children
+            return lambda args: a(args) if cond(args) else b(args)
+        elif kind == z3.Z3_OP_AND:
+            return lambda args: all(f(args) for f in children)
+        elif kind == z3.Z3_OP_OR:
+            return lambda args: any(f(args) for f in children)
+        elif kind == z3.Z3_OP_NOT:
+            a, = children
+            return lambda args: not a(args)
+        elif kind == z3.Z3_OP_DISTINCT:
+            return lambda args: len(set(f(args) for f in children)) == len(children)
+        elif kind == z3.Z3_OP_ADD:
+            return lambda args: sum(cast(int, f(args)) for f in children)
+        elif kind == z3.Z3_OP_UMINUS:
+            a, = children
+            return lambda args: -cast(int, a(args))
+        elif kind in _ModelTables._BINOPS and len(children) == 2:
+            op = _ModelTables._BINOPS[kind]
+            a, b = children
+            return lambda args: op(a(args), b(args))
+        else:
+            return None
+
+
+class TranslationCache:
+    '''
+    LRU cache of the translations of closed expressions, shared by all Z3Translators.
+
+    A translation only depends on the expression, the number of states, and
+    the scope (which does not change after typechecking). Entries keep their
+    scope alive, so that its id is not reused.
+    '''
+
+    def __init__(self, max_size: int = 10000) -> None:
+        self.max_size = max_size
+        self.entries: OrderedDict[Tuple[Expr, int, int], Tuple[Scope, z3.ExprRef]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[Expr, int, int]) -> Optional[z3.ExprRef]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Tuple[Expr, int, int], scope: Scope, e: z3.ExprRef) -> None:
+        self.entries[key] = (scope, e)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def __str__(self) -> str:
+        return (f'{self.hits} hits, {self.misses} misses, {self.evictions} evictions, '
+                f'{len(self.entries)} entries')
+
+
+translation_cache = TranslationCache()
+
+
+# translations of state diagrams (see Z3Translator.translate_state), by trace, and then by state index
+# and key of the state whose symbols the diagram is about
+_state_translations: weakref.WeakKeyDictionary[Trace, Dict[Tuple[Optional[int], str], z3.ExprRef]] = \
+    weakref.WeakKeyDictionary()
+
+
+class _NotUninterpreted(Exception):
+    pass
+
+
 class Z3Translator:
     z3_UNOPS: Dict[str, Callable[[z3.ExprRef], z3.ExprRef]] = {
         'NOT': z3.Not,
@@ -55,6 +255,7 @@ class Z3Translator:
         self.num_states = num_states
         self.scope = scope
         self.counter = 0
+        self.depth = 0  # number of quantifiers around the subexpression being translated
 
     @staticmethod
     def _get_keys(num_states: int) -> Tuple[str, ...]:
@@ -81,11 +282,102 @@ class Z3Translator:
             bs.append(z3.Const(n, Z3Translator.sort_to_z3(sv.sort)))
         return bs
 
+    def _bind_nested(self, binder: Binder) -> List[z3.ExprRef]:
+        # quantifiers inside the translated expression are named by their depth, so translating
+        # the same expression always gives the same z3 AST (see translation_cache). the names
+        # cannot clash with the names given by bind, or with the names of nested quantifiers.
+        bs = []
+        for sv in binder.vs:
+            assert sv.sort is not None and not isinstance(sv.sort, syntax.SortInferencePlaceholder)
+            bs.append(z3.Const(f'{sv.name}!{self.depth}', Z3Translator.sort_to_z3(sv.sort)))
+            self.depth += 1
+        return bs
+
     def translate_expr(self, expr: Expr) -> z3.ExprRef:
         assert self.scope.num_states == 0, self.scope.num_states
         assert self.scope.current_state_index == 0, self.scope.current_state_index
+        # the translation of an open expression depends on the bindings in the scope
+        cacheable = len(self.scope.stack) == 0
+        if cacheable:
+            key = (expr, self.num_states, id(self.scope))
+            cached = translation_cache.get(key)
+            if cached is not None:
+                return cached
         with self.scope.n_states(self.num_states):
-            return self.__translate_expr(expr)
+            e = self.__translate_expr(expr)
+        if cacheable:
+            translation_cache.put(key, self.scope, e)
+        return e
+
+    def translate_state(self, state: State, state_index: int = 0) -> z3.ExprRef:
+        '''
+        Translate the diagram of state, i.e., state.as_onestate_formula(), as a formula about
+        the given state of the translator. The formula is built directly from the state's
+        interpretations, using Distinct for the elements of each sort, and is cached
+        per state, so neither the expression nor its typechecking are needed. The
+        translation of the expression is used only if the state interprets symbols of sort
+        int or bool.
+        '''
+        trace = state.trace
+        key = (state.index, self.get_key(state_index))
+        cache = _state_translations.setdefault(trace, {})
+        if key not in cache:
+            try:
+                cache[key] = self._state_to_z3(state, key[1])
+            except _NotUninterpreted:
+                cache[key] = self.translate_expr(syntax.New(state.as_onestate_formula(), state_index))
+        return cache[key]
+
+    @staticmethod
+    def _state_to_z3(state: State, key: str) -> z3.ExprRef:
+        # the literals are built with the C API, since the Python API checks the sorts of the arguments
+        # of every application, which takes most of the time for large states
+        ctx = z3.main_ctx()
+
+        def mk(f: Callable[..., z3.Ast], *args: object) -> z3.ExprRef:
+            return z3.ExprRef(f(ctx.ref(), *args), ctx)
+
+        def app(f: z3.FuncDeclRef, args: Sequence[z3.ExprRef]) -> z3.ExprRef:
+            return mk(z3.Z3_mk_app, f.as_ast(), len(args), (z3.Ast * len(args))(*(a.as_ast() for a in args)))
+
+        univs = state.univs
+        elements: Dict[SortDecl, Dict[Element, z3.ExprRef]] = {}
+        for sort in univs:
+            z3sort = Z3Translator.sort_to_z3(sort)
+            elements[sort] = {e: z3.Const(f'{e}!{sort.name}', z3sort) for e in univs[sort]}
+
+        def element(s: Sort, e: Element) -> z3.ExprRef:
+            if not isinstance(s, UninterpretedSort) or s.decl not in elements or e not in elements[s.decl]:
+                raise _NotUninterpreted()
+            return elements[s.decl][e]
+
+        def z3decl(d: syntax.StateDecl) -> Union[z3.FuncDeclRef, z3.ExprRef]:
+            return Z3Translator.statedecl_to_z3(d, key if d.mutable else None)
+
+        conjuncts: List[z3.ExprRef] = []
+        for sort in univs:
+            if len(univs[sort]) > 1:
+                conjuncts.append(z3.Distinct(*elements[sort].values()))
+        for R, l in chain(state.mut_rel_interps.items(), state.immut_rel_interps.items()):
+            z3R = z3decl(R)
+            for tup, ans in l.items():
+                lit = app(cast(z3.FuncDeclRef, z3R), [element(s, e) for s, e in zip(R.arity, tup)]) \
+                    if R.arity else cast(z3.ExprRef, z3R)
+                conjuncts.append(lit if ans else mk(z3.Z3_mk_not, lit.as_ast()))
+        for C, c in chain(state.mut_const_interps.items(), state.immut_const_interps.items()):
+            conjuncts.append(mk(z3.Z3_mk_eq, cast(z3.ExprRef, z3decl(C)).as_ast(), element(C.sort, c).as_ast()))
+        for F, fl in chain(state.mut_func_interps.items(), state.immut_func_interps.items()):
+            z3F = cast(z3.FuncDeclRef, z3decl(F))
+            for tup, res in fl.items():
+                term = app(z3F, [element(s, e) for s, e in zip(F.arity, tup)])
+                conjuncts.append(mk(z3.Z3_mk_eq, term.as_ast(), element(F.sort, res).as_ast()))
+        for sort in univs:
+            x = z3.Const(f'!{sort.name}', Z3Translator.sort_to_z3(sort))  # cannot clash with an element
+            conjuncts.append(z3.ForAll([x], z3.Or(*(x == e for e in elements[sort].values()))))
+
+        body = mk_and(conjuncts)
+        vs = [e for es in elements.values() for e in es.values()]
+        return z3.Exists(vs, body) if vs else body
 
     def _decl_to_z3(self, d: syntax.StateDecl) -> Union[z3.FuncDeclRef, z3.ExprRef]:
         return Z3Translator.statedecl_to_z3(
@@ -133,9 +425,12 @@ class Z3Translator:
             else:
                 assert False, f'{d}\n{expr}'
         elif isinstance(expr, QuantifierExpr) and expr.quant in self.z3_QUANT:
-            bs = self.bind(expr.binder)
-            with self.scope.in_scope(expr.binder, bs):
-                e = self.__translate_expr(expr.body)
+            bs = self._bind_nested(expr.binder)
+            try:
+                with self.scope.in_scope(expr.binder, bs):
+                    e = self.__translate_expr(expr.body)
+            finally:
+                self.depth -= len(bs)
             return self.z3_QUANT[expr.quant](bs, e)
         elif isinstance(expr, Id):
             d = self.scope.get(expr.name)
@@ -214,7 +509,7 @@ class Z3Translator:
             if decl is not None:
                 if isinstance(decl, RelationDecl):
                     if decl.arity:
-                        rl: RelationInterp = {}
+                        rl: Dict[Tuple[Element, ...], bool] = {}
                         domains = [z3model.get_universe(z3decl.domain(i))
                                    for i in range(z3decl.arity())]
                         if not any(x is None for x in domains):
@@ -232,7 +527,7 @@ class Z3Translator:
                         assert decl not in R
                         R[decl] = {(): bool(ans)}
                 elif isinstance(decl, FunctionDecl):
-                    fl: FunctionInterp = {}
+                    fl: Dict[Tuple[Element, ...], Element] = {}
                     domains = [z3model.get_universe(z3decl.domain(i))
                                for i in range(z3decl.arity())]
                     if not any(x is None for x in domains):
@@ -272,7 +567,7 @@ class Z3Translator:
                         pass
 
         if allow_undefined:
-            return trace
+            return trace.compact()
 
         def get_univ(d: SortDecl) -> Tuple[Element, ...]:
             if d not in trace.univs:
@@ -329,7 +624,7 @@ class Z3Translator:
             else:
                 assert False, decl
 
-        return trace
+        return trace.compact()
 
     @staticmethod
     def model_to_trace(z3model: z3.ModelRef, num_states: int, allow_undefined: bool = False) -> Trace:
@@ -406,7 +701,7 @@ class Z3Translator:
                 assert False, (d, decl)
 
         if allow_undefined:
-            return trace
+            return trace.compact()
 
         def get_univ(d: SortDecl) -> Tuple[Element, ...]:
             if d not in trace.univs:
@@ -463,7 +758,7 @@ class Z3Translator:
             else:
                 assert False, decl
 
-        return trace
+        return trace.compact()
 
     @staticmethod
     def model_to_first_order_structure(z3model: z3.ModelRef) -> FirstOrderStructure:
@@ -523,6 +818,11 @@ class Z3Translator:
                 return elements[sort, ans]
             return _eval
 
+        tables = _ModelTables(
+            z3model,
+            {x.get_id(): e for (sort, x), e in elements.items()},
+            {d.name: struct.univs[d] for d in sort_decls.values()},
+        )
         for z3decl in sorted(z3model.decls(), key=str):
             name = z3decl.name()
             dom = tuple(
@@ -547,14 +847,21 @@ class Z3Translator:
                 _eval = _eval_elem(rng)
             else:
                 assert False, (decl, rng)
-            domains = [struct.univs[sort_decls[sort]] for sort in dom]
-            fi = {
-                row: _eval(z3decl(*(
-                    z3elements[sort, e]
-                    for sort, e in zip(dom, row)
-                )))
-                for row in product(*domains)
-            }
+            table = tables.table(z3decl)
+            fi: Dict[Tuple[Element, ...], _ModelValue]
+            if table is None:
+                domains = [struct.univs[sort_decls[sort]] for sort in dom]
+                fi = {
+                    row: _eval(z3decl(*(
+                        z3elements[sort, e]
+                        for sort, e in zip(dom, row)
+                    )))
+                    for row in product(*domains)
+                }
+            elif rng is IntSort:
+                fi = {row: str(v) for row, v in table.items()}
+            else:
+                fi = table
             if isinstance(decl, RelationDecl):
                 assert decl not in struct.rel_interps
                 assert all(isinstance(v, bool) for v in fi.values())
@@ -692,6 +999,7 @@ def qa_edges_expr(prog: Program, expr: Expr) -> Iterator[Tuple[str, str]]:
 
 
 def quantifier_alternation_graph(prog: Program, exprs: List[Expr]) -> DiGraph:
+    from networkx import DiGraph  # type: ignore
     qa_graph = DiGraph()
 
     for expr in exprs:
@@ -1,5 +1,7 @@
 import dataclasses
 from dataclasses import dataclass
+import multiprocessing
+import multiprocessing.pool
 import z3
 
 import utils
@@ -9,10 +11,12 @@ from logic import Solver, Diagram, Trace, State
 import syntax
 from syntax import Expr, TrueExpr, DefinitionDecl, New
 import pickle
-from typing import List, Optional, Tuple, Union, Sequence
+from typing import Any, Callable, List, Optional, Set, Tuple, TypeVar, Union, Sequence
 from translator import Z3Translator
 from solver import CheckSatResult, sat, unsat
 
+T = TypeVar('T')
+
 RelaxedTrace = List[Tuple[Optional[DefinitionDecl], Union[Diagram, Expr]]]
 
 class AbstractCounterexample(Exception):
@@ -66,9 +70,70 @@ def negate_clause(c: Expr) -> Expr:
     else:
         assert False, f'unsupported expression {c} in negate_clause'
 
+# solvers of a worker process of a parallel UPDR run, each with the conjuncts of a frame
+# asserted in its bottom frame, most recently used last
+_frame_solvers: List[Tuple[Tuple[Expr, ...], Solver]] = []
+_MAX_FRAME_SOLVERS = 4
+
+def _get_frame_solver(frame: Tuple[Expr, ...]) -> Solver:
+    # frames are only strengthened by appending conjuncts, so a solver for an older version
+    # of the frame can be brought up to date by asserting the new conjuncts
+    for k, (key, s) in enumerate(_frame_solvers):
+        if frame[:len(key)] == key:
+            del _frame_solvers[k]
+            new_conjuncts = frame[len(key):]
+            break
+    else:
+        if len(_frame_solvers) >= _MAX_FRAME_SOLVERS:
+            del _frame_solvers[0]
+        s = Solver()
+        new_conjuncts = frame
+    t = s.get_translator(2)
+    for c in new_conjuncts:
+        s.add(t.translate_expr(c))
+    _frame_solvers.append((frame, s))
+    return s
+
+def _push_conjunct_helper(frame: Tuple[Expr, ...], c: Expr) -> bool:
+    # runs in a worker process, see Frames.push_frame
+    s = _get_frame_solver(frame)
+    return logic.check_two_state_implication_all_transitions(s, [], c, minimize=False) is None
+
+def _find_predecessor_helper(
+        frame: Tuple[Expr, ...],
+        i_transition: int,
+        diag_or_expr: Union[Diagram, Expr],
+) -> Tuple[CheckSatResult, Union[Optional[List[int]], Trace]]:
+    # runs in a worker process, see Frames.find_predecessor. returns the model (if sat), or the
+    # unsat core as indices into the trackers of the diagram (if unsat and cores are used)
+    prog = syntax.the_program
+    ition = list(prog.transitions())[i_transition]
+    s = _get_frame_solver(frame)
+    t = s.get_translator(2)
+    with s.new_frame(), s.mark_assumptions_necessary():
+        if isinstance(diag_or_expr, Diagram):
+            s.add(diag_or_expr.to_z3(t, new=True))
+            trackers = diag_or_expr.trackers
+        else:
+            s.add(t.translate_expr(New(diag_or_expr)))
+            trackers = []
+        s.add(t.translate_expr(ition.as_twostate_formula(prog.scope)))
+        res = s.check(trackers)
+        if res == sat:
+            return sat, Z3Translator.model_to_trace(s.model(trackers), 2)
+        assert res == unsat, ('z3 returned unknown', res)
+        if utils.args.use_z3_unsat_cores and isinstance(diag_or_expr, Diagram):
+            return unsat, sorted(int(x.decl().name()[1:]) for x in s.unsat_core())
+        return unsat, None
+
 class Frames:
-    def __init__(self, solver: Solver) -> None:
+    def __init__(self, solver: Solver, jobs: int = 1) -> None:
         self.solver = solver
+        # when running in parallel, pushing conjuncts and the queries of find_predecessor for
+        # different transitions are checked by worker processes, which keep the frames asserted
+        # between queries. results are merged in the same order as the sequential version.
+        self.workers: List[multiprocessing.pool.Pool] = []
+        self.start_workers(jobs)
         self.fs: List[Frame] = []
         self.predicates: List[Expr] = []
         self.safeties = []
@@ -202,13 +267,21 @@ class Frames:
                 assert res is None, ("Non inductive trace:\n\t%s\n\t%s" % (c, f))
 
     def push_frame(self, i: int, f: Frame) -> None:
-        conjuncts = f._summary
-        j = 0
-        while j < len(conjuncts):
-            c = conjuncts.l[j]
-            if c not in self.fs[i + 1]._summary:
-                self.push_conjunct(i, c)
-            j += 1
+        if not self.workers:
+            conjuncts = f._summary
+            j = 0
+            while j < len(conjuncts):
+                c = conjuncts.l[j]
+                if c not in self.fs[i + 1]._summary:
+                    self.push_conjunct(i, c)
+                j += 1
+        else:
+            frame = tuple(f.summary())
+            to_push = [c for c in frame if c not in self.fs[i + 1]._summary]
+            results = [self.submit(_push_conjunct_helper, (frame, c)) for c in to_push]
+            for c, r in zip(to_push, results):
+                if r.get():
+                    self[i + 1].strengthen(c)
 
     def block(
             self,
@@ -256,8 +329,12 @@ class Frames:
                 self.valid_in_initial_frame(syntax.Not(diag.to_ast()))
             )
 
+        def prev_frame_core(diag: Diagram) -> Optional[Set[int]]:
+            return logic.check_diagram_blocked(self.solver, self[j - 1].summary(), self.fs[0].summary(), diag)
+
         if isinstance(diag_or_expr, Diagram):
-            diag_or_expr.generalize(self.solver, prev_frame_constraint)
+            diag_or_expr.generalize(self.solver, prev_frame_constraint,
+                                    core=prev_frame_core if utils.args.use_z3_unsat_cores else None)
         e = syntax.Not(as_expr())
         utils.logger.info(f'block({j}) using {e}')
         self.add(e, j)
@@ -309,6 +386,9 @@ class Frames:
             j: int,
             diag_or_expr: Union[Diagram, Expr]
     ) -> Tuple[CheckSatResult, Union[Optional[MySet[int]], Tuple[DefinitionDecl, Trace]]]:
+        if self.workers:
+            return self._find_predecessor_parallel(j, diag_or_expr)
+
         pre_frame = self[j]
         prog = syntax.the_program
         solver = self.solver
@@ -340,12 +420,7 @@ class Frames:
                     solver.add(t.translate_expr(ition.as_twostate_formula(prog.scope)))
                     if (res := solver.check(trackers())) == sat:
                         m = Z3Translator.model_to_trace(solver.model(trackers()), 2)
-                        state = m.as_state(0)
-                        src = self.currently_blocking
-                        assert src is not None
-                        steps_from_cex = src.known_absent_until_frame + 1 - j + src.num_steps_to_bad
-                        bstate = BackwardReachableState(len(self.backwards_reachable_states), state, steps_from_cex)
-                        self.record_backwards_reachable_state(bstate)
+                        self.record_predecessor(j, m)
                         return (sat, (ition, m))
                     elif res == unsat:
                         if utils.args.use_z3_unsat_cores and isinstance(diag_or_expr, Diagram):
@@ -370,6 +445,65 @@ class Frames:
                 ret_core = None
             return (unsat, ret_core)
 
+    def _find_predecessor_parallel(
+            self,
+            j: int,
+            diag_or_expr: Union[Diagram, Expr]
+    ) -> Tuple[CheckSatResult, Union[Optional[MySet[int]], Tuple[DefinitionDecl, Trace]]]:
+        '''
+        Like find_predecessor, but checks each transition in a worker
+        process. The result is that of the first transition in program
+        order with a predecessor. If there is none, the core is the union
+        of the cores of all transitions (rather than only of those not
+        already covered by the cores of earlier transitions).
+        '''
+        prog = syntax.the_program
+        frame = tuple(self[j].summary())
+        results = [self.submit(_find_predecessor_helper, (frame, i, diag_or_expr))
+                   for i in range(len(list(prog.transitions())))]
+
+        core: Optional[MySet[int]] = MySet() if utils.args.use_z3_unsat_cores else None
+        for ition, r in zip(prog.transitions(), results):
+            res, x = r.get()
+            if res == sat:
+                assert isinstance(x, Trace)
+                self.record_predecessor(j, x)
+                return (sat, (ition, x))
+            if core is not None and x is not None:
+                assert isinstance(x, list)
+                for i in x:
+                    core.add(i)
+
+        if isinstance(diag_or_expr, Diagram):
+            # the core refers to the trackers of the diagram, see Diagram.minimize_from_core
+            diag_or_expr.to_z3(self.solver.get_translator(2), new=True)
+        return (unsat, MySet(sorted(core)) if core is not None else None)
+
+    def record_predecessor(self, j: int, m: Trace) -> None:
+        src = self.currently_blocking
+        assert src is not None
+        steps_from_cex = src.known_absent_until_frame + 1 - j + src.num_steps_to_bad
+        bstate = BackwardReachableState(len(self.backwards_reachable_states), m.as_state(0), steps_from_cex)
+        self.record_backwards_reachable_state(bstate)
+
+    def start_workers(self, jobs: int) -> None:
+        assert not self.workers
+        self.workers = [multiprocessing.Pool(1) for _ in range(jobs)] if jobs > 1 else []
+        self.tasks_submitted = 0
+
+    def submit(self, func: Callable[..., T], args: Tuple[Any, ...]) -> 'multiprocessing.pool.AsyncResult[T]':
+        # tasks are assigned to workers round-robin, rather than to whichever worker is idle,
+        # so that the solvers of each worker see the same sequence of queries in every run with
+        # the same number of jobs. this keeps the results (e.g., --checkpoint-out) reproducible.
+        w = self.workers[self.tasks_submitted % len(self.workers)]
+        self.tasks_submitted += 1
+        return w.apply_async(func, args)
+
+    def close(self) -> None:
+        for w in self.workers:
+            w.terminate()
+        self.workers = []
+
     def clause_implied_by_transitions_from_frame(
             self,
             pre_frame: Frame,
@@ -411,17 +545,22 @@ class Frames:
 
     def store_frames(self, out_filename: str) -> None:
         s = self.solver
+        workers = self.workers
         try:
             self.solver = None  # type: ignore
+            self.workers = []
             with open(out_filename, "wb") as f:
                 pickle.dump(self, f)
         finally:
             self.solver = s
+            self.workers = workers
 
-def load_frames(in_filename: str, s: Solver) -> Frames:
+def load_frames(in_filename: str, s: Solver, jobs: int = 1) -> Frames:
     with open(in_filename, "rb") as f:
         fs: Frames = pickle.load(f)
     fs.solver = s
+    fs.workers = []
+    fs.start_workers(jobs)
 
     fs.always_assert_inductive_trace()
 
@@ -8,9 +8,6 @@ from pathlib import Path
 import ply
 import ply.lex
 import sys
-import xml
-import xml.sax
-import xml.sax.saxutils
 import itertools
 
 from typing import List, Optional, Set, Iterable, Generic, Iterator, TypeVar, NoReturn, \
@@ -79,6 +76,7 @@ MySet = OrderedSet
 # which options are available.
 class MypyvyArgs:
     forbid_parser_rebuild: bool
+    program_cache: Optional[str]
     log: str
     log_time: bool
     log_xml: bool
@@ -105,12 +103,23 @@ class MypyvyArgs:
     check_invariant: Sequence[str]
     safety: str
     depth: int
+    depth_range: Optional[Tuple[int, int]]
     filename: str
     sharp: bool
+    seed_reachable_states: Optional[int]
+    cardinality: int
+    dfs: bool
     clear_cache: bool
     clear_cache_memo: bool
     cache_only: bool
     cache_only_discovered: bool
+    query_cache: Optional[str]
+    query_profile: bool
+    query_profile_json: Optional[str]
+    query_profile_smt2: Optional[str]
+    query_profile_top: int
+    portfolio: Optional[int]
+    portfolio_delay: int
     unroll_to_depth: Optional[int]
     cpus: Optional[int]
     restarts: bool
@@ -118,12 +127,17 @@ class MypyvyArgs:
     all_subclauses: bool
     optimize_ctis: bool
     json: bool
+    jobs: int
+    prefix_portfolio: bool
+    max_prefix_length: int
+    incremental: Optional[str]
     subcommand: str
     checkpoint_in: Optional[str]
     checkpoint_out: Optional[str]
     domain_independence: bool
     max_quantifiers: Optional[int]
     cvc4: bool
+    cvc4_processes: int
     cvc4_minimize_models: bool
     push: bool
     decrease_depth: bool
@@ -132,6 +146,8 @@ class MypyvyArgs:
     relax: bool
     relax_backwards: bool
     relax_forwards: bool
+    needs_solver: bool
+    startup_profile: bool
 
     def main(self, solver: Any) -> None:
         ...
@@ -225,6 +241,8 @@ class MyLogger:
     def log(self, lvl: int, msg: str, end: str = '\n') -> None:
         if self.isEnabledFor(lvl):
             if args.log_xml:
+                # imported here because xml.sax.saxutils imports urllib, which is slow to import
+                import xml.sax.saxutils
                 msg = xml.sax.saxutils.escape(msg)
                 with LogTag(self, 'msg', lvl=lvl, time=str(self.time())):
                     self.rawlog(MyLogger.ALWAYS_PRINT, msg, end=end)
@@ -243,6 +261,7 @@ class LogTag:
 
     def __enter__(self) -> None:
         if args.log_xml and self.logger.isEnabledFor(self.lvl):
+            import xml.sax.saxutils
             msg = ''
             for k, v in self.kwargs.items():
                 msg += ' %s="%s"' % (k, xml.sax.saxutils.escape(v))
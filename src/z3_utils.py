@@ -1,5 +1,5 @@
 import z3
-from typing import Set, Tuple, Iterator
+from typing import Any, Callable, Sequence, Set, Tuple, Iterator
 
 def is_function_symbol(s: z3.ExprRef) -> bool:
     if not z3.is_app(s):
@@ -41,3 +41,19 @@ def z3_quantifier_alternations(e: z3.ExprRef) -> Iterator[Tuple[z3.SortRef, z3.S
     for fsym in function_symbols(skolemized):
         for i in range(0, fsym.arity()):
             yield (fsym.domain(i), fsym.range())
+
+
+# The Python API's z3.And and z3.Or check the sort of every argument, which takes most of the time
+# when building large formulas. These build the same formulas with the C API.
+
+def _mk_nary(f: Callable[[Any, int, Any], Any], args: Sequence[z3.ExprRef]) -> z3.ExprRef:
+    ctx = args[0].ctx if args else z3.main_ctx()
+    return z3.ExprRef(f(ctx.ref(), len(args), (z3.Ast * len(args))(*(a.as_ast() for a in args))), ctx)
+
+def mk_and(args: Sequence[z3.ExprRef]) -> z3.ExprRef:
+    '''Like z3.And(*args), for boolean args.'''
+    return _mk_nary(z3.Z3_mk_and, args)
+
+def mk_or(args: Sequence[z3.ExprRef]) -> z3.ExprRef:
+    '''Like z3.Or(*args), for boolean args.'''
+    return _mk_nary(z3.Z3_mk_or, args)